@@ -0,0 +1,383 @@
+import asyncio
+import fnmatch
+import json
+import time
+import uuid
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Iterable
+
+from redis.asyncio import Redis
+
+from bot.logger_mesh import logger
+
+# Pub/sub channel used by TieredBackend instances to drop each other's local copies
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+# Delete KEYS[1] only while it still holds ARGV[1] (lock release by its holder)
+DELETE_IF_EQUAL_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class CacheBackend:
+    """
+    Storage interface used by CacheManager.
+
+    Backends store already-encoded bytes; (de)serialization stays in CacheManager.
+    """
+    name = "backend"
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: bytes, ttl: int) -> None:
+        raise NotImplementedError
+
+    async def delete(self, *keys: str) -> int:
+        raise NotImplementedError
+
+    async def delete_pattern(self, pattern: str) -> int:
+        raise NotImplementedError
+
+    async def invalidate(self, keys: Iterable[str], counters: Iterable[str]) -> None:
+        """Delete keys and increment counters as one batch"""
+        keys = list(keys)
+        if keys:
+            await self.delete(*keys)
+        for counter in counters:
+            await self.incr(counter)
+
+    async def add(self, key: str, value: bytes, ttl: int) -> bool:
+        """Set key only if it does not exist (SET NX); True if it was set"""
+        raise NotImplementedError
+
+    async def delete_if_equal(self, key: str, value: bytes) -> bool:
+        """Delete key only if it still holds value (atomic compare-and-delete); True if it was deleted"""
+        raise NotImplementedError
+
+    async def get_counter(self, key: str) -> int:
+        """Current value of a counter (0 if unset); counters never expire"""
+        raise NotImplementedError
+
+    async def incr(self, key: str) -> int:
+        """Atomically increment a counter and return the new value"""
+        raise NotImplementedError
+
+    async def start(self) -> None:
+        """Start background work (no-op by default)"""
+
+    async def close(self) -> None:
+        """Stop background work (no-op by default)"""
+
+    def _count(self, value: Optional[bytes]) -> Optional[bytes]:
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-tier statistics"""
+        total = self.hits + self.misses
+        return {
+            self.name: {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total * 100, 2) if total else 0,
+            }
+        }
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+
+
+class MemoryBackend(CacheBackend):
+    """Bounded in-process cache: per-key TTL, least recently used entries evicted first"""
+    name = "local"
+
+    def __init__(self, max_entries: int = 10000, max_ttl: Optional[int] = None):
+        super().__init__()
+        self.max_entries = max_entries
+        self.max_ttl = max_ttl  # Cap on entry lifetime (bounds staleness when used as a front tier)
+        self._data: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self._counters: Dict[str, int] = {}
+        self.evictions = 0
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._data.get(key)
+        if entry is None:
+            return self._count(None)
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return self._count(None)
+
+        self._data.move_to_end(key)
+        return self._count(value)
+
+    async def set(self, key: str, value: bytes, ttl: int) -> None:
+        if self.max_ttl:
+            ttl = min(ttl, self.max_ttl)
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    async def delete(self, *keys: str) -> int:
+        return self.discard(keys)
+
+    async def delete_pattern(self, pattern: str) -> int:
+        return self.discard_pattern(pattern)
+
+    async def add(self, key: str, value: bytes, ttl: int) -> bool:
+        entry = self._data.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            return False
+        await self.set(key, value, ttl)
+        return True
+
+    async def delete_if_equal(self, key: str, value: bytes) -> bool:
+        entry = self._data.get(key)
+        if entry is None or entry[0] <= time.monotonic() or entry[1] != value:
+            return False
+        del self._data[key]
+        return True
+
+    async def get_counter(self, key: str) -> int:
+        return self._counters.get(key, 0)
+
+    async def incr(self, key: str) -> int:
+        self._counters[key] = self._counters.get(key, 0) + 1
+        return self._counters[key]
+
+    def discard(self, keys: Iterable[str]) -> int:
+        """Synchronous delete (used by the invalidation listener)"""
+        return sum(self._data.pop(key, None) is not None for key in keys)
+
+    def discard_pattern(self, pattern: str) -> int:
+        keys = [key for key in self._data if fnmatch.fnmatchcase(key, pattern)]
+        return self.discard(keys)
+
+    def clear(self):
+        self._data.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = super().get_stats()
+        stats[self.name].update(size=len(self._data), max_entries=self.max_entries, evictions=self.evictions)
+        return stats
+
+
+class RedisBackend(CacheBackend):
+    """Shared cache in Redis"""
+    name = "redis"
+
+    def __init__(self, redis: Redis):
+        super().__init__()
+        self.redis = redis
+        self._delete_if_equal = redis.register_script(DELETE_IF_EQUAL_SCRIPT)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return self._count(await self.redis.get(key))
+
+    async def set(self, key: str, value: bytes, ttl: int) -> None:
+        await self.redis.setex(key, ttl, value)
+
+    async def delete(self, *keys: str) -> int:
+        if not keys:
+            return 0
+        return await self.redis.delete(*keys)
+
+    async def delete_pattern(self, pattern: str) -> int:
+        keys = []
+        async for key in self.redis.scan_iter(match=pattern):
+            keys.append(key)
+
+        if keys:
+            return await self.redis.delete(*keys)
+        return 0
+
+    async def invalidate(self, keys: Iterable[str], counters: Iterable[str]) -> Dict[str, int]:
+        """One pipelined round trip; returns the new counter values"""
+        keys, counters = list(keys), list(counters)
+        pipe = self.redis.pipeline(transaction=False)
+        if keys:
+            pipe.delete(*keys)
+        for counter in counters:
+            pipe.incr(counter)
+        results = await pipe.execute()
+        return dict(zip(counters, results[1:] if keys else results))
+
+    async def add(self, key: str, value: bytes, ttl: int) -> bool:
+        return bool(await self.redis.set(key, value, ex=ttl, nx=True))
+
+    async def delete_if_equal(self, key: str, value: bytes) -> bool:
+        return bool(await self._delete_if_equal(keys=[key], args=[value]))
+
+    async def get_counter(self, key: str) -> int:
+        return int(await self.redis.get(key) or 0)
+
+    async def incr(self, key: str) -> int:
+        return await self.redis.incr(key)
+
+
+class TieredBackend(CacheBackend):
+    """
+    In-process LRU in front of Redis.
+
+    Reads are served locally when possible; deletes are applied to both tiers and
+    published on INVALIDATION_CHANNEL so other bot instances drop their local copies.
+    Counters (cache generations) are mirrored locally and their increments published
+    the same way, so versioned lookups need no Redis round trip.
+    Local entries also expire after local_ttl, which bounds staleness if a message is lost.
+    """
+    name = "tiered"
+
+    def __init__(self, redis: Redis, max_entries: int = 10000, local_ttl: int = 30):
+        super().__init__()
+        self.local = MemoryBackend(max_entries=max_entries, max_ttl=local_ttl)
+        self.remote = RedisBackend(redis)
+        self._counters: Dict[str, tuple[float, int]] = {}  # key -> (expires_at, value)
+        self.instance_id = uuid.uuid4().hex
+        self._listener: Optional[asyncio.Task] = None
+
+    async def get(self, key: str) -> Optional[bytes]:
+        value = await self.local.get(key)
+        if value is not None:
+            return self._count(value)
+
+        try:
+            value = await self.remote.get(key)
+        except Exception as e:
+            # Redis outage: keep serving from the local tier only
+            logger.warning(f"Redis cache tier unavailable: {e}")
+            return self._count(None)
+
+        if value is not None:
+            await self.local.set(key, value, self.local.max_ttl)
+        return self._count(value)
+
+    async def set(self, key: str, value: bytes, ttl: int) -> None:
+        await self.local.set(key, value, ttl)
+        await self.remote.set(key, value, ttl)
+
+    async def delete(self, *keys: str) -> int:
+        self.local.discard(keys)
+        deleted = await self.remote.delete(*keys)
+        await self.publish(keys=list(keys))
+        return deleted
+
+    async def delete_pattern(self, pattern: str) -> int:
+        self.local.discard_pattern(pattern)
+        deleted = await self.remote.delete_pattern(pattern)
+        await self.publish(patterns=[pattern])
+        return deleted
+
+    async def invalidate(self, keys: Iterable[str], counters: Iterable[str]) -> None:
+        keys = list(keys)
+        self.local.discard(keys)
+        values = await self.remote.invalidate(keys, counters)
+        for counter, value in values.items():
+            self._store_counter(counter, value)
+        await self.publish(keys=keys, counters=values)
+
+    async def add(self, key: str, value: bytes, ttl: int) -> bool:
+        # Used for locks: only the shared tier can arbitrate between instances
+        return await self.remote.add(key, value, ttl)
+
+    async def delete_if_equal(self, key: str, value: bytes) -> bool:
+        # Lock release: locks only live in the shared tier
+        return await self.remote.delete_if_equal(key, value)
+
+    async def get_counter(self, key: str) -> int:
+        entry = self._counters.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1]
+
+        value = await self.remote.get_counter(key)
+        self._store_counter(key, value)
+        return value
+
+    async def incr(self, key: str) -> int:
+        value = await self.remote.incr(key)
+        self._store_counter(key, value)
+        await self.publish(counters={key: value})
+        return value
+
+    def _store_counter(self, key: str, value: int) -> None:
+        self._counters[key] = (time.monotonic() + self.local.max_ttl, value)
+
+    async def publish(self, keys: list[str] = None, patterns: list[str] = None,
+                      counters: Dict[str, int] = None) -> None:
+        """Tell other instances to drop local copies"""
+        message = {"origin": self.instance_id, "keys": keys or [], "patterns": patterns or [],
+                   "counters": counters or {}}
+        await self.remote.redis.publish(INVALIDATION_CHANNEL, json.dumps(message))
+
+    def apply_invalidation(self, raw: bytes | str) -> None:
+        """Apply an invalidation message received from another instance"""
+        message = json.loads(raw)
+        if message.get("origin") == self.instance_id:
+            return
+        self.local.discard(message.get("keys", []))
+        for pattern in message.get("patterns", []):
+            self.local.discard_pattern(pattern)
+        for key, value in message.get("counters", {}).items():
+            current = self._counters.get(key)
+            # Messages may arrive out of order: never move a counter backwards
+            if current is None or current[1] < value:
+                self._store_counter(key, value)
+
+    async def _listen(self) -> None:
+        while True:
+            pubsub = self.remote.redis.pubsub()
+            try:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                while True:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message and message.get("type") == "message":
+                        self.apply_invalidation(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Messages may have been missed while disconnected
+                logger.warning(f"Cache invalidation listener error, dropping local tier: {e}")
+                self.local.clear()
+                self._counters.clear()
+                await asyncio.sleep(5)
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
+    async def start(self) -> None:
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def close(self) -> None:
+        if self._listener:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = super().get_stats()
+        stats.update(self.local.get_stats())
+        stats.update(self.remote.get_stats())
+        return stats
+
+    def reset_stats(self):
+        super().reset_stats()
+        self.local.reset_stats()
+        self.remote.reset_stats()
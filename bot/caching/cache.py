@@ -1,55 +1,53 @@
-import json
-import pickle
-from typing import Optional, Any, Dict
+import secrets
+from typing import Optional, Any, Dict, Iterable
 from redis.asyncio import Redis
 from functools import wraps
+from bot.caching import codec
+from bot.caching.backends import CacheBackend, MemoryBackend, RedisBackend, TieredBackend
+from bot.caching.single_flight import load_cached
 from bot.logger_mesh import logger
 from bot.monitoring.metrics import get_metrics
 
 
+# Counter keys holding the current generation of each versioned namespace
+GENERATION_PREFIX = "gen:"
+
+
+def generation_key(namespace: str, generation: int, key: str) -> str:
+    """Key inside a generation-versioned namespace: "<namespace>:v<generation>:<key>"."""
+    return f"{namespace}:v{generation}:{key}"
+
+
 class CacheManager:
     """Centralized caching manager"""
 
-    def __init__(self, redis_client: Redis):
-        self.redis = redis_client
+    def __init__(self, backend: CacheBackend | Redis):
+        # A bare Redis client keeps the previous single-tier behaviour
+        self.backend = backend if isinstance(backend, CacheBackend) else RedisBackend(backend)
         self.default_ttl = 300
         self.hits = 0
         self.misses = 0
 
     async def get(self, key: str, deserialize: bool = True) -> Optional[Any]:
-        """Get value from cache with correct deserialization"""
+        """Get value from cache (decoded with the cache codec)"""
         try:
-            # Redis returns bytes
-            value = await self.redis.get(key)
+            value = await self.backend.get(key)
 
             if value is None:
                 self.misses += 1
                 return None
 
-            self.hits += 1
-
             if not deserialize:
+                self.hits += 1
                 return value
 
-            # Trying different ways of deserializing
-            if isinstance(value, bytes):
-                # Try JSON first
-                try:
-                    decoded = value.decode('utf-8')
-                    return json.loads(decoded)
-                except (UnicodeDecodeError, json.JSONDecodeError):
-                    # If not JSON, try pickle
-                    try:
-                        return pickle.loads(value)
-                    except Exception:
-                        logger.error(f"Failed to deserialize cache value for key {key}")
-                        return None
-            else:
-                # If there's already a line
-                try:
-                    return json.loads(value)
-                except json.JSONDecodeError:
-                    return value
+            if not codec.is_encoded(value):
+                # Written by an older serializer: treat as a miss, it is rewritten on the next set
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            return codec.decode(value)
 
         except Exception as e:
             logger.error(f"Cache get error for key {key}: {e}")
@@ -62,30 +60,12 @@ class CacheManager:
             ttl: Optional[int] = None,
             serialize: bool = True
     ) -> bool:
-        """Save the value to cache with correct serialization"""
+        """Save the value to cache (Decimal, datetime and DTOs keep their types)"""
         try:
             ttl = ttl or self.default_ttl
+            serialized = codec.encode(value) if serialize else value
 
-            if not serialize:
-                await self.redis.setex(key, ttl, value)
-                return True
-
-            # Try serializing to JSON (more efficient)
-            try:
-                serialized = json.dumps(value).encode('utf-8')
-            except (TypeError, ValueError):
-                # Try JSON with default=str for complex objects
-                try:
-                    serialized = json.dumps(value, default=str).encode('utf-8')
-                except (TypeError, ValueError):
-                    # If JSON still fails, use pickle
-                    try:
-                        serialized = pickle.dumps(value)
-                    except Exception:
-                        # If even pickle fails, convert to string as last resort
-                        serialized = str(value).encode('utf-8')
-
-            await self.redis.setex(key, ttl, serialized)
+            await self.backend.set(key, serialized, ttl)
             return True
 
         except Exception as e:
@@ -95,22 +75,92 @@ class CacheManager:
     async def delete(self, key: str) -> bool:
         """Delete a value from the cache"""
         try:
-            await self.redis.delete(key)
+            await self.backend.delete(key)
             return True
         except Exception as e:
             logger.error(f"Cache delete error for key {key}: {e}")
             return False
 
+    async def delete_many(self, *keys: str) -> bool:
+        """Delete several keys in one backend call"""
+        try:
+            await self.backend.delete(*keys)
+            return True
+        except Exception as e:
+            logger.error(f"Cache delete error for keys {keys}: {e}")
+            return False
+
+    async def get_generation(self, namespace: str) -> Optional[int]:
+        """Current generation of a namespace (None if it cannot be read)"""
+        try:
+            return await self.backend.get_counter(GENERATION_PREFIX + namespace)
+        except Exception as e:
+            logger.error(f"Cache generation read error for namespace {namespace}: {e}")
+            return None
+
+    async def versioned_key(self, namespace: str, key: str) -> Optional[str]:
+        """
+        Key inside a generation-versioned namespace (see generation_key).
+
+        Returns None if the generation cannot be read (callers then skip the cache).
+        """
+        generation = await self.get_generation(namespace)
+        if generation is None:
+            return None
+        return generation_key(namespace, generation, key)
+
+    async def invalidate_namespace(self, namespace: str) -> Optional[int]:
+        """
+        Invalidate every versioned key of a namespace with a single INCR.
+
+        Keys of older generations are never read again and expire by their TTL.
+        Returns the new generation (None on error).
+        """
+        try:
+            return await self.backend.incr(GENERATION_PREFIX + namespace)
+        except Exception as e:
+            logger.error(f"Cache invalidate error for namespace {namespace}: {e}")
+            return None
+
+    async def invalidate_batch(self, keys: Iterable[str] = (), namespaces: Iterable[str] = ()) -> bool:
+        """Delete keys and invalidate namespaces in one backend round trip"""
+        try:
+            await self.backend.invalidate(keys, [GENERATION_PREFIX + namespace for namespace in namespaces])
+            return True
+        except Exception as e:
+            logger.error(f"Cache batch invalidate error: {e}")
+            return False
+
+    async def acquire_lock(self, name: str, ttl: int) -> Optional[str]:
+        """
+        Take a short-lived lock shared by all bot instances (expires after ttl).
+
+        Returns the holder's token (pass it to release_lock), or None if the lock is
+        held by someone else. Fails open: if the backend errors the caller gets a
+        token and proceeds as if it held the lock.
+        """
+        token = secrets.token_hex(16)
+        try:
+            return token if await self.backend.add(name, token.encode(), ttl) else None
+        except Exception as e:
+            logger.error(f"Cache lock error for {name}: {e}")
+            return token
+
+    async def release_lock(self, name: str, token: str) -> bool:
+        """
+        Release a lock taken with acquire_lock, only if the token still holds it:
+        after the ttl it may have expired and been taken by someone else
+        """
+        try:
+            return await self.backend.delete_if_equal(name, token.encode())
+        except Exception as e:
+            logger.error(f"Cache lock release error for {name}: {e}")
+            return False
+
     async def invalidate_pattern(self, pattern: str) -> int:
         """Invalidate all keys by pattern"""
         try:
-            keys = []
-            async for key in self.redis.scan_iter(match=pattern):
-                keys.append(key)
-
-            if keys:
-                return await self.redis.delete(*keys)
-            return 0
+            return await self.backend.delete_pattern(pattern)
         except Exception as e:
             logger.error(f"Cache invalidate error for pattern {pattern}: {e}")
             return 0
@@ -124,13 +174,16 @@ class CacheManager:
             "hits": self.hits,
             "misses": self.misses,
             "total_requests": total_requests,
-            "hit_rate": round(hit_rate, 2)
+            "hit_rate": round(hit_rate, 2),
+            "backend": self.backend.name,
+            "tiers": self.backend.get_stats()
         }
 
     def reset_stats(self):
         """Reset cache statistics"""
         self.hits = 0
         self.misses = 0
+        self.backend.reset_stats()
 
     def log_stats(self):
         """Log current cache statistics"""
@@ -155,9 +208,17 @@ class CacheManager:
 def cache_result(
         ttl: int = 300,
         key_prefix: str = "",
-        key_func: Optional[callable] = None
+        key_func: Optional[callable] = None,
+        namespace: Optional[str] = None,
+        lock: bool = False
 ):
-    """Decorator for caching function results"""
+    """
+    Decorator for caching function results.
+
+    Concurrent misses share one call (see single_flight.load_cached); lock=True
+    extends that across bot instances. With a namespace, keys are versioned and
+    the whole namespace is dropped by CacheManager.invalidate_namespace.
+    """
 
     def decorator(func):
         @wraps(func)
@@ -174,35 +235,28 @@ def cache_result(
 
             # Trying to get from the cache
             cache_manager = get_cache_manager()
-            if cache_manager:
-                cached = await cache_manager.get(cache_key)
-                if cached is not None:
-                    logger.debug(f"Cache hit for {cache_key}")
-                    # Track cache hit for specific operation
-                    metrics = get_metrics()
-                    if metrics:
-                        metrics.track_event("cache_hit", None, {
-                            "key": cache_key[:100],  # Limit key length
-                            "function": func.__name__
-                        })
-                    return cached
-
-            # Cache miss - call the original function
-            logger.debug(f"Cache miss for {cache_key}")
+            if cache_manager and namespace:
+                cache_key = await cache_manager.versioned_key(namespace, cache_key)
+                if cache_key is None:
+                    # Generation unavailable: bypass the cache
+                    return await func(*args, **kwargs)
+
+            if not cache_manager:
+                return await func(*args, **kwargs)
+
+            result, hit = await load_cached(
+                cache_manager, cache_key, ttl, lambda: func(*args, **kwargs), lock=lock
+            )
+
+            logger.debug(f"Cache {'hit' if hit else 'miss'} for {cache_key}")
+            # Track cache hit/miss for specific operation
             metrics = get_metrics()
             if metrics:
-                metrics.track_event("cache_miss", None, {
-                    "key": cache_key[:100],
+                metrics.track_event("cache_hit" if hit else "cache_miss", None, {
+                    "key": cache_key[:100],  # Limit key length
                     "function": func.__name__
                 })
 
-            result = await func(*args, **kwargs)
-
-            # Save to cache
-            if cache_manager and result is not None:
-                await cache_manager.set(cache_key, result, ttl)
-                logger.debug(f"Cache set for {cache_key}")
-
             return result
 
         return wrapper
@@ -219,8 +273,40 @@ def get_cache_manager() -> Optional[CacheManager]:
     return _cache_manager
 
 
-async def init_cache_manager(redis: Redis):
+def create_cache_backend(redis: Optional[Redis]) -> CacheBackend:
+    """
+    Build the backend selected by CACHE_BACKEND (memory, redis or tiered).
+
+    Defaults to tiered when Redis is available and to memory otherwise.
+    """
+    from bot.config import EnvKeys
+
+    kind = (EnvKeys.CACHE_BACKEND or ("tiered" if redis is not None else "memory")).lower()
+    if redis is None and kind != "memory":
+        logger.warning(f"Cache backend '{kind}' needs Redis, falling back to in-process cache")
+        kind = "memory"
+
+    if kind == "memory":
+        return MemoryBackend(max_entries=EnvKeys.CACHE_LOCAL_MAX_ENTRIES)
+    if kind == "redis":
+        return RedisBackend(redis)
+    if kind == "tiered":
+        return TieredBackend(redis, max_entries=EnvKeys.CACHE_LOCAL_MAX_ENTRIES, local_ttl=EnvKeys.CACHE_LOCAL_TTL)
+    raise ValueError(f"Unknown CACHE_BACKEND: {kind}")
+
+
+async def init_cache_manager(redis: Optional[Redis] = None):
     """Initialize cache manager"""
     global _cache_manager
-    _cache_manager = CacheManager(redis)
-    logger.info("Cache manager initialized")
+    backend = create_cache_backend(redis)
+    await backend.start()
+    _cache_manager = CacheManager(backend)
+    logger.info(f"Cache manager initialized ({backend.name} backend)")
+
+
+async def close_cache_manager():
+    """Stop cache background tasks (call on shutdown)"""
+    global _cache_manager
+    if _cache_manager:
+        await _cache_manager.backend.close()
+        _cache_manager = None
@@ -0,0 +1,74 @@
+import io
+import pickle
+from typing import Any
+
+# Header: magic byte + format version + payload type tag
+MAGIC = b"\xc5"
+VERSION = 1
+
+TAG_STR = b"s"  # UTF-8 text
+TAG_INT = b"i"  # ASCII decimal integer
+TAG_BYTES = b"b"  # Raw bytes
+TAG_OBJECT = b"o"  # Restricted pickle (dicts, lists, Decimal, datetime, DTOs, ...)
+
+_HEADER_STR = MAGIC + bytes([VERSION]) + TAG_STR
+_HEADER_INT = MAGIC + bytes([VERSION]) + TAG_INT
+_HEADER_BYTES = MAGIC + bytes([VERSION]) + TAG_BYTES
+_HEADER_OBJECT = MAGIC + bytes([VERSION]) + TAG_OBJECT
+HEADER_SIZE = 3
+
+# Classes an object payload may reference; anything else is refused on decode
+_SAFE_GLOBALS = {
+    ("decimal", "Decimal"),
+    ("datetime", "datetime"),
+    ("datetime", "date"),
+    ("datetime", "time"),
+    ("datetime", "timedelta"),
+    ("datetime", "timezone"),
+}
+
+
+class CodecError(ValueError):
+    """Value was not written by this codec (or by an unsupported version)"""
+
+
+class _RestrictedUnpickler(pickle.Unpickler):
+    def find_class(self, module: str, name: str):
+        if (module, name) in _SAFE_GLOBALS:
+            return super().find_class(module, name)
+        if module == "bot.database.dto":
+            from bot.database.dto import DTO_TYPES
+            if name in DTO_TYPES:
+                return DTO_TYPES[name]
+        raise pickle.UnpicklingError(f"Refusing to decode {module}.{name} from cache")
+
+
+def encode(value: Any) -> bytes:
+    """Serialize a cache value; Decimal, datetime and DTOs round-trip with their types"""
+    value_type = type(value)
+    if value_type is str:
+        return _HEADER_STR + value.encode("utf-8")
+    if value_type is int:
+        return _HEADER_INT + str(value).encode("ascii")
+    if value_type is bytes:
+        return _HEADER_BYTES + value
+    return _HEADER_OBJECT + pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def decode(data: bytes) -> Any:
+    """Deserialize a value written by encode()"""
+    header = data[:HEADER_SIZE]
+    if header == _HEADER_OBJECT:
+        return _RestrictedUnpickler(io.BytesIO(data[HEADER_SIZE:])).load()
+    if header == _HEADER_STR:
+        return data[HEADER_SIZE:].decode("utf-8")
+    if header == _HEADER_INT:
+        return int(data[HEADER_SIZE:])
+    if header == _HEADER_BYTES:
+        return data[HEADER_SIZE:]
+    raise CodecError(f"Unknown cache value header {header!r}")
+
+
+def is_encoded(data: bytes) -> bool:
+    """Whether data carries a header of the current codec version"""
+    return data[:2] == MAGIC + bytes([VERSION])
@@ -11,9 +11,8 @@ async def invalidate_stats_periodically():
 
         cache = get_cache_manager()
         if cache:
-            await cache.invalidate_pattern("stats:*")
-            await cache.invalidate_pattern("user_count")
-            await cache.invalidate_pattern("admin_count")
+            await cache.invalidate_namespace("stats")
+            await cache.delete_many("user_count:", "admin_count:")
             logger.info("Stats cache invalidated by scheduler")
 
 
@@ -45,8 +44,8 @@ async def daily_cleanup():
             cache.log_stats()
 
             # Full invalidation of non-critical data
-            await cache.invalidate_pattern("item:*")
-            await cache.invalidate_pattern("category:*")
+            await cache.invalidate_namespace("item")
+            await cache.invalidate_namespace("category")
             logger.info("Daily cache cleanup completed")
 
             # Reset stats after daily cleanup
@@ -0,0 +1,149 @@
+import asyncio
+import math
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from bot.logger_mesh import logger
+
+# Values written by load_cached are wrapped as (ENTRY_TAG, expires_at, compute_seconds, value)
+ENTRY_TAG = "xf1"
+
+# Stored in place of None when "not found" results are cached (see negative_ttl)
+NOT_FOUND = "\x00not-found"
+
+# Early refresh aggressiveness (XFetch beta): above 1 refreshes earlier, below 1 later
+EARLY_REFRESH_BETA = 1.0
+
+LOCK_TTL = 30  # Upper bound (s) a process may hold the cross-process load lock
+LOCK_WAIT = 5.0  # How long (s) lock losers wait for the winner's value
+LOCK_POLL_INTERVAL = 0.05
+
+
+class SingleFlight:
+    """Runs at most one load per key at a time; concurrent callers share its result"""
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    def in_flight(self, key: str) -> bool:
+        return key in self._inflight
+
+    async def do(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(loader())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+
+        # A cancelled caller must not cancel the load the others are waiting for
+        return await asyncio.shield(task)
+
+    def _done(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # Mark as retrieved even if every caller went away
+
+
+_flights = SingleFlight()
+_background: set[asyncio.Task] = set()
+_MISSING = object()
+
+
+def _unwrap(entry: Any) -> Optional[tuple]:
+    if type(entry) is tuple and len(entry) == 4 and entry[0] == ENTRY_TAG:
+        return entry
+    return None
+
+
+def _should_refresh_early(expires_at: float, delta: float) -> bool:
+    """XFetch: refresh with a probability that grows as expiry nears and with the load cost"""
+    return time.time() - delta * EARLY_REFRESH_BETA * math.log(1.0 - random.random()) >= expires_at
+
+
+async def load_cached(
+        cache,
+        key: str,
+        ttl: int,
+        loader: Callable[[], Awaitable[Any]],
+        lock: bool = False,
+        negative_ttl: int = 0
+) -> tuple[Any, bool]:
+    """
+    Read-through load of key with stampede protection; returns (value, cache_hit).
+
+    Concurrent misses in this process share one loader call. With lock=True a
+    short cache lock also makes other processes wait for that value instead of
+    computing it themselves. Entries close to expiry are recomputed early by a
+    single background task while callers keep getting the current value.
+    A None result is cached for negative_ttl seconds (never if 0).
+    """
+    entry = _unwrap(await cache.get(key))
+    if entry is not None:
+        _, expires_at, delta, value = entry
+        if _should_refresh_early(expires_at, delta):
+            _refresh_in_background(cache, key, ttl, loader, lock, negative_ttl)
+        return (None if value == NOT_FOUND else value), True
+
+    value = await _flights.do(key, lambda: _compute(cache, key, ttl, loader, lock, negative_ttl))
+    return value, False
+
+
+def _refresh_in_background(cache, key: str, ttl: int, loader, lock: bool, negative_ttl: int) -> None:
+    if _flights.in_flight(key):
+        return
+
+    task = asyncio.create_task(
+        _flights.do(key, lambda: _compute(cache, key, ttl, loader, lock, negative_ttl))
+    )
+    _background.add(task)
+    task.add_done_callback(_refresh_done)
+
+
+def _refresh_done(task: asyncio.Task) -> None:
+    _background.discard(task)
+    if not task.cancelled() and task.exception():
+        logger.warning(f"Background cache refresh failed: {task.exception()}")
+
+
+async def _compute(cache, key: str, ttl: int, loader, lock: bool, negative_ttl: int) -> Any:
+    if not lock:
+        return await _load_and_store(cache, key, ttl, loader, negative_ttl)
+
+    lock_key = f"lock:{key}"
+    token = await cache.acquire_lock(lock_key, LOCK_TTL)
+    if token is not None:
+        try:
+            return await _load_and_store(cache, key, ttl, loader, negative_ttl)
+        finally:
+            await cache.release_lock(lock_key, token)
+
+    value = await _wait_for_value(cache, key)
+    if value is not _MISSING:
+        return value
+
+    # The lock holder is slow or failed: load it ourselves
+    return await _load_and_store(cache, key, ttl, loader, negative_ttl)
+
+
+async def _wait_for_value(cache, key: str) -> Any:
+    deadline = time.monotonic() + LOCK_WAIT
+    while time.monotonic() < deadline:
+        await asyncio.sleep(LOCK_POLL_INTERVAL)
+        entry = _unwrap(await cache.get(key))
+        if entry is not None:
+            return None if entry[3] == NOT_FOUND else entry[3]
+    return _MISSING
+
+
+async def _load_and_store(cache, key: str, ttl: int, loader, negative_ttl: int = 0) -> Any:
+    started = time.monotonic()
+    value = await loader()
+    delta = time.monotonic() - started
+
+    if value is not None:
+        await cache.set(key, (ENTRY_TAG, time.time() + ttl, delta, value), ttl)
+    elif negative_ttl:
+        await cache.set(key, (ENTRY_TAG, time.time() + negative_ttl, delta, NOT_FOUND), negative_ttl)
+    return value
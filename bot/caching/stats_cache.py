@@ -11,34 +11,36 @@ class StatsCache:
         self.cache = cache_manager
         self.stats_ttl = 60  # 1 minute for statistics
 
-    @cache_result(ttl=60, key_prefix="stats:daily")
+    @cache_result(ttl=60, key_prefix="daily", namespace="stats", lock=True)
     async def get_daily_stats(self, date: str) -> Dict[str, Any]:
         """Cached daily statistics"""
+        from bot.database import run_db
         from bot.database.methods import (
             select_today_users, select_today_orders,
             select_today_operations
         )
 
         return {
-            "users": select_today_users(date),
-            "orders": select_today_orders(date),
-            "operations": select_today_operations(date)
+            "users": await run_db(select_today_users, date),
+            "orders": await run_db(select_today_orders, date),
+            "operations": await run_db(select_today_operations, date)
         }
 
-    @cache_result(ttl=300, key_prefix="stats:global")
+    @cache_result(ttl=300, key_prefix="global", namespace="stats", lock=True)
     async def get_global_stats(self) -> Dict[str, Any]:
         """Cached global statistics"""
+        from bot.database import run_db
         from bot.database.methods import (
             get_user_count, select_admins, select_all_orders,
             select_count_items, select_count_goods
         )
 
         return {
-            "total_users": get_user_count(),
-            "total_admins": select_admins(),
-            "total_revenue": select_all_orders(),
-            "total_items": select_count_items(),
-            "total_goods": select_count_goods()
+            "total_users": await run_db(get_user_count),
+            "total_admins": await run_db(select_admins),
+            "total_revenue": await run_db(select_all_orders),
+            "total_items": await run_db(select_count_items),
+            "total_goods": await run_db(select_count_goods)
         }
 
     async def warm_up_cache(self):
@@ -1 +1,3 @@
-from .broadcast_system import *
\ No newline at end of file
+from .broadcast_system import *
+from .outbox import *
+from .rate_governor import *
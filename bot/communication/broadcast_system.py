@@ -1,4 +1,5 @@
 import asyncio
+from enum import Enum
 from typing import List, Optional, Callable, Awaitable, Union
 from dataclasses import dataclass
 from datetime import datetime
@@ -7,8 +8,27 @@ from aiogram import Bot
 from aiogram.types import InlineKeyboardMarkup
 from aiogram.exceptions import TelegramRetryAfter, TelegramForbiddenError, TelegramBadRequest
 
+from bot.communication.rate_governor import SendPriority, send_priority
+from bot.database import run_db
+from bot.database.dto import BroadcastJobDTO
+from bot.database.methods.broadcasts import get_broadcast_recipients, checkpoint_broadcast, finish_broadcast_job
 from bot.logger_mesh import logger
 
+# Recipients read from the database per keyset page
+BROADCAST_PAGE_SIZE = 500
+
+ProgressCallback = Union[
+    Callable[['BroadcastStats'], None],
+    Callable[['BroadcastStats'], Awaitable[None]]
+]
+
+
+class DeliveryResult(str, Enum):
+    """Outcome of sending one broadcast message"""
+    SENT = "sent"
+    FAILED = "failed"
+    BLOCKED = "blocked"  # the user blocked the bot
+
 
 @dataclass
 class BroadcastStats:
@@ -40,20 +60,23 @@ class BroadcastManager:
             self,
             bot: Bot,
             batch_size: int = 30,
-            batch_delay: float = 1.0,
-            retry_count: int = 3
+            batch_delay: float = 0.0,
+            retry_count: int = 3,
+            page_size: int = BROADCAST_PAGE_SIZE
     ):
         """
         Args:
             bot: Bot instance
-            batch_size: Number of messages in a batch
-            batch_delay: Delay between batches (sec)
+            batch_size: Number of messages in a batch (one checkpoint per batch)
+            batch_delay: Extra delay between batches (sec); sends are paced by the send governor
             retry_count: Number of retries on error
+            page_size: Number of recipients read from the database at once
         """
         self.bot = bot
         self.batch_size = batch_size
         self.batch_delay = batch_delay
         self.retry_count = retry_count
+        self.page_size = page_size
         self._cancelled = False
 
     async def _send_message_safe(
@@ -62,40 +85,42 @@ class BroadcastManager:
             text: str,
             reply_markup: Optional[InlineKeyboardMarkup] = None,
             parse_mode: str = "HTML"
-    ) -> bool:
+    ) -> DeliveryResult:
         """
         Securely sending a message with error handling
 
         Returns:
-            True if sent successfully, False if failed
+            SENT if sent successfully, BLOCKED if the user blocked the bot, FAILED otherwise
         """
         for attempt in range(self.retry_count):
             try:
-                await self.bot.send_message(
-                    chat_id=user_id,
-                    text=text,
-                    reply_markup=reply_markup,
-                    parse_mode=parse_mode,
-                    disable_notification=True # Don't spam notifications
-                )
-                return True
+                # Broadcasts only get the send slots replies and notifications leave free
+                with send_priority(SendPriority.BROADCAST):
+                    await self.bot.send_message(
+                        chat_id=user_id,
+                        text=text,
+                        reply_markup=reply_markup,
+                        parse_mode=parse_mode,
+                        disable_notification=True # Don't spam notifications
+                    )
+                return DeliveryResult.SENT
 
             except TelegramRetryAfter as e:
                 # Telegram asks to wait
                 if attempt < self.retry_count - 1:
                     await asyncio.sleep(e.retry_after)
                     continue
-                return False
+                return DeliveryResult.FAILED
 
             except TelegramForbiddenError:
                 # Bot blocked by user
                 logger.debug(f"Bot blocked by user {user_id}")
-                return False
+                return DeliveryResult.BLOCKED
 
             except TelegramBadRequest as e:
                 # Invalid message parameters
                 logger.error(f"Bad request for user {user_id}: {e}")
-                return False
+                return DeliveryResult.FAILED
 
             except Exception as e:
                 # Unknown error
@@ -103,9 +128,22 @@ class BroadcastManager:
                 if attempt < self.retry_count - 1:
                     await asyncio.sleep(1)
                     continue
-                return False
+                return DeliveryResult.FAILED
+
+        return DeliveryResult.FAILED
 
-        return False
+    async def _report_progress(self, progress_callback: Optional[ProgressCallback], stats: BroadcastStats):
+        """Calling a progress callback (can be async or sync)"""
+        if not progress_callback:
+            return
+        try:
+            # Check if the callback is asynchronous
+            if asyncio.iscoroutinefunction(progress_callback):
+                await progress_callback(stats)
+            else:
+                progress_callback(stats)
+        except Exception as e:
+            logger.error(f"Progress callback error: {e}")
 
     async def broadcast(
             self,
@@ -113,10 +151,7 @@ class BroadcastManager:
             text: str,
             reply_markup: Optional[InlineKeyboardMarkup] = None,
             parse_mode: str = "HTML",
-            progress_callback: Optional[Union[
-                Callable[[BroadcastStats], None],
-                Callable[[BroadcastStats], Awaitable[None]]
-            ]] = None
+            progress_callback: Optional[ProgressCallback] = None
     ) -> BroadcastStats:
         """
         Perform broadcast to a list of users
@@ -157,30 +192,97 @@ class BroadcastManager:
 
             # Update the statistics
             for result in results:
-                if isinstance(result, Exception):
-                    stats.failed += 1
-                elif result:
+                if result == DeliveryResult.SENT:
                     stats.sent += 1
                 else:
                     stats.failed += 1
+                    if result == DeliveryResult.BLOCKED:
+                        stats.blocked += 1
 
-            # Calling a progress collback
-            if progress_callback:
-                try:
-                    # Check if the callback is asynchronous
-                    if asyncio.iscoroutinefunction(progress_callback):
-                        await progress_callback(stats)
-                    else:
-                        progress_callback(stats)
-                except Exception as e:
-                    logger.error(f"Progress callback error: {e}")
+            await self._report_progress(progress_callback, stats)
 
             # Delay between batches
-            if i + self.batch_size < len(user_ids):
+            if self.batch_delay and i + self.batch_size < len(user_ids):
+                await asyncio.sleep(self.batch_delay)
+
+        stats.end_time = datetime.now()
+
+        return stats
+
+    async def run_job(
+            self,
+            job: BroadcastJobDTO,
+            reply_markup: Optional[InlineKeyboardMarkup] = None,
+            progress_callback: Optional[ProgressCallback] = None
+    ) -> BroadcastStats:
+        """
+        Deliver a stored broadcast job, starting after its last acknowledged user
+
+        Recipients are streamed in keyset pages over users.telegram_id (users who
+        blocked the bot are skipped). After every batch the cursor, the counters and
+        newly blocked users are checkpointed in the database, so a restart resumes
+        the job and repeats at most one batch. Checkpoints renew this instance's
+        lease on the job; if another instance took it over meanwhile, delivery
+        stops here and the job is left to the new owner.
+
+        Args:
+            job: Broadcast job (new, or interrupted by a restart)
+            reply_markup: Keyboard
+            progress_callback: Callback for tracking progress (can be async or sync)
+
+        Returns:
+            Broadcast statistics, including batches delivered before a restart
+        """
+        stats = BroadcastStats(
+            total=job.total,
+            sent=job.sent,
+            failed=job.failed,
+            blocked=job.blocked,
+            start_time=datetime.now()
+        )
+
+        self._cancelled = False
+        cursor = job.last_user_id
+        page: List[int] = []
+        status = 'completed'
+
+        while True:
+            if self._cancelled:
+                logger.info(f"Broadcast {job.id} cancelled")
+                status = 'cancelled'
+                break
+
+            if not page:
+                page = await run_db(get_broadcast_recipients, cursor, self.page_size)
+                if not page:
+                    break
+
+            batch, page = page[:self.batch_size], page[self.batch_size:]
+            results = await asyncio.gather(*(
+                self._send_message_safe(user_id, job.text, reply_markup, job.parse_mode)
+                for user_id in batch
+            ), return_exceptions=True)
+
+            sent = sum(1 for result in results if result == DeliveryResult.SENT)
+            blocked_ids = [user_id for user_id, result in zip(batch, results) if result == DeliveryResult.BLOCKED]
+            cursor = batch[-1]
+            if not await run_db(checkpoint_broadcast, job.id, cursor, sent, len(batch) - sent, blocked_ids):
+                # This instance stalled past its lease: another one resumed the job from the last checkpoint
+                logger.warning(f"Broadcast {job.id} was taken over by another instance, stopping")
+                status = None
+                break
+
+            stats.sent += sent
+            stats.failed += len(batch) - sent
+            stats.blocked += len(blocked_ids)
+            await self._report_progress(progress_callback, stats)
+
+            if self.batch_delay:
                 await asyncio.sleep(self.batch_delay)
 
+        if status is not None:
+            await run_db(finish_broadcast_job, job.id, status)
         stats.end_time = datetime.now()
-        stats.blocked = stats.failed  # Estimate
 
         return stats
 
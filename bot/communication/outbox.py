@@ -0,0 +1,244 @@
+import asyncio
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter, TelegramForbiddenError, TelegramBadRequest
+from sqlalchemy import event, update
+from sqlalchemy.orm import Session
+
+from bot.communication.rate_governor import SendPriority, send_priority
+from bot.database.executor import run_db
+from bot.database.main import Database
+from bot.database.models.main import NotificationOutbox
+from bot.logger_mesh import logger
+
+# Messages claimed (and sent) per database round trip
+OUTBOX_BATCH_SIZE = 50
+
+# Look for due messages at least this often, even without a wake-up
+# (retries coming due, messages queued by the CLI or another instance)
+OUTBOX_POLL_INTERVAL = 10
+
+# A claimed message is not handed out again for this long (crashed worker)
+OUTBOX_LEASE = 60
+
+# Transient failures are retried with exponential backoff, then marked failed
+MAX_ATTEMPTS = 8
+BACKOFF_BASE = 5
+BACKOFF_MAX = 3600
+
+# Pause after an unexpected error before trying again
+RETRY_DELAY = 30
+
+# session.info flag: the session queued messages, wake the worker once it commits
+_SESSION_ENQUEUED = "outbox_enqueued"
+
+
+@dataclass(frozen=True, slots=True)
+class OutboxMessage:
+    """A claimed outbox row, detached from its session"""
+    id: int
+    chat_id: int
+    kind: str
+    text: str
+    attempts: int
+
+
+def enqueue_notification(session: Session, chat_id: int, text: str, kind: str) -> NotificationOutbox:
+    """
+    Queue a Telegram message in the caller's transaction.
+
+    The message is written together with the change it reports: it is sent by the
+    outbox worker once the transaction commits, and never if it rolls back.
+    """
+    message = NotificationOutbox(chat_id=chat_id, kind=kind, text=text)
+    session.add(message)
+    session.info[_SESSION_ENQUEUED] = True
+    return message
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_worker_on_commit(session: Session) -> None:
+    if session.info.pop(_SESSION_ENQUEUED, False) and _worker is not None:
+        _worker.wake()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session: Session) -> None:
+    session.info.pop(_SESSION_ENQUEUED, None)
+
+
+def backoff_delay(attempts: int) -> float:
+    """Seconds to wait before attempt number `attempts + 1`"""
+    return min(BACKOFF_BASE * 2 ** max(attempts - 1, 0), BACKOFF_MAX)
+
+
+def _claim_due(limit: int, lease: int = OUTBOX_LEASE) -> List[OutboxMessage]:
+    """Lock due messages and push their next attempt past the lease, so no other worker takes them"""
+    now = datetime.now(timezone.utc)
+    with Database().session() as session:
+        rows = (session.query(NotificationOutbox)
+                .filter(NotificationOutbox.status == 'pending', NotificationOutbox.next_attempt_at <= now)
+                .order_by(NotificationOutbox.next_attempt_at, NotificationOutbox.id)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+                .all())
+        claimed = []
+        for row in rows:
+            row.next_attempt_at = now + timedelta(seconds=lease)
+            claimed.append(OutboxMessage(row.id, row.chat_id, row.kind, row.text, row.attempts))
+        return claimed
+
+
+def _record_results(results: List[Dict[str, Any]]) -> None:
+    """Store send outcomes with one executemany UPDATE by primary key"""
+    if not results:
+        return
+    with Database().session() as session:
+        session.execute(update(NotificationOutbox), results)
+
+
+def _result(message: OutboxMessage, status: str, attempts: int, next_attempt_at: datetime = None,
+            error: str = None) -> Dict[str, Any]:
+    now = datetime.now(timezone.utc)
+    return {
+        'id': message.id,
+        'status': status,
+        'attempts': attempts,
+        'next_attempt_at': next_attempt_at or now,
+        'sent_at': now if status == 'sent' else None,
+        'last_error': error[:500] if error else None,
+    }
+
+
+class OutboxWorker:
+    """
+    Drains the notification outbox through one shared Bot (one pooled HTTP session).
+
+    Committed transactions that queued messages wake it up; otherwise it polls every
+    OUTBOX_POLL_INTERVAL seconds. Transient errors are retried with exponential backoff,
+    TelegramRetryAfter pauses the whole worker (flood control is per bot) and puts the
+    rest of the batch back, blocked chats and bad requests are marked failed.
+    """
+
+    def __init__(self, bot: Bot, batch_size: int = OUTBOX_BATCH_SIZE,
+                 poll_interval: float = OUTBOX_POLL_INTERVAL):
+        self.bot = bot
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._wakeup = asyncio.Event()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def wake(self) -> None:
+        """Signal that messages were committed (safe to call from database executor threads)"""
+        loop = self._loop
+        if loop is None:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+
+        if running is loop:
+            self._wakeup.set()
+        elif loop.is_running():
+            loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def _send_batch(self, messages: List[OutboxMessage]) -> Optional[int]:
+        """Send claimed messages; returns the flood-control pause in seconds, if Telegram asked for one"""
+        results = []
+        pause = None
+        for index, message in enumerate(messages):
+            try:
+                with send_priority(SendPriority.NOTIFICATION):
+                    await self.bot.send_message(message.chat_id, message.text)
+            except TelegramRetryAfter as e:
+                # Not the message's fault: no attempt is counted
+                retry_at = datetime.now(timezone.utc) + timedelta(seconds=e.retry_after)
+                results.extend(_result(rest, 'pending', rest.attempts, retry_at, str(e))
+                               for rest in messages[index:])
+                pause = e.retry_after
+                break
+            except (TelegramForbiddenError, TelegramBadRequest) as e:
+                logger.warning(f"Outbox message {message.id} ({message.kind}) to {message.chat_id} failed: {e}")
+                results.append(_result(message, 'failed', message.attempts + 1, error=str(e)))
+            except Exception as e:
+                attempts = message.attempts + 1
+                if attempts >= MAX_ATTEMPTS:
+                    logger.error(f"Outbox message {message.id} ({message.kind}) gave up after {attempts} attempts: {e}")
+                    results.append(_result(message, 'failed', attempts, error=str(e)))
+                else:
+                    retry_at = datetime.now(timezone.utc) + timedelta(seconds=backoff_delay(attempts))
+                    results.append(_result(message, 'pending', attempts, retry_at, str(e)))
+            else:
+                results.append(_result(message, 'sent', message.attempts + 1))
+
+        await run_db(_record_results, results)
+        return pause
+
+    async def drain(self) -> int:
+        """Send every due message; returns the number of batches processed"""
+        batches = 0
+        while True:
+            messages = await run_db(_claim_due, self.batch_size)
+            if not messages:
+                return batches
+
+            batches += 1
+            pause = await self._send_batch(messages)
+            if pause is not None:
+                logger.warning(f"Telegram flood control: outbox paused for {pause}s")
+                await asyncio.sleep(pause)
+            elif len(messages) < self.batch_size:
+                return batches
+
+    async def run(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        logger.info("Outbox worker started")
+
+        while True:
+            try:
+                self._wakeup.clear()
+                await self.drain()
+
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in outbox worker: {e}", exc_info=True)
+                await asyncio.sleep(RETRY_DELAY)
+
+
+_worker: Optional[OutboxWorker] = None
+_task: Optional[asyncio.Task] = None
+
+
+def get_outbox_worker() -> Optional[OutboxWorker]:
+    """The running outbox worker, None before start_outbox_worker()"""
+    return _worker
+
+
+def start_outbox_worker(bot: Bot) -> OutboxWorker:
+    """Start draining the outbox through the bot's own session (call on startup)"""
+    global _worker, _task
+    _worker = OutboxWorker(bot)
+    _task = asyncio.create_task(_worker.run())
+    return _worker
+
+
+async def stop_outbox_worker() -> None:
+    """Stop the outbox worker (call on shutdown, before the bot session is closed)"""
+    global _worker, _task
+    if _task:
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+    _worker = _task = None
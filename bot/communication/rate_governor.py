@@ -0,0 +1,259 @@
+import asyncio
+import heapq
+import itertools
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import (
+    CopyMessage, CopyMessages, ForwardMessage, ForwardMessages, GetUpdates, Response, SendAnimation, SendAudio,
+    SendChecklist, SendContact, SendDice, SendDocument, SendGame, SendInvoice, SendLocation, SendMediaGroup,
+    SendMessage, SendPaidMedia, SendPhoto, SendPoll, SendSticker, SendVenue, SendVideo, SendVideoNote, SendVoice,
+    TelegramMethod
+)
+from aiogram.methods.base import TelegramType
+
+from bot.logger_mesh import logger
+from bot.monitoring import get_metrics
+
+# Telegram limits: about 30 messages per second overall, one per second in a
+# private chat (short bursts tolerated) and 20 per minute in a group
+GLOBAL_RATE = 30
+GLOBAL_BURST = 30
+PRIVATE_CHAT_RATE = 1
+GROUP_CHAT_RATE = 20 / 60
+CHAT_BURST = 3
+
+# Forget idle per-chat buckets once there are more than this many
+MAX_CHAT_BUCKETS = 10000
+
+# Long polling is not a send and must never wait behind queued messages
+EXEMPT_METHODS = (GetUpdates,)
+
+# Calls posting a new message: only these count against the per-chat limit
+# (edits, deletions, chat actions and callback answers only take a global slot)
+MESSAGE_METHODS = (
+    SendMessage, SendPhoto, SendVideo, SendAnimation, SendAudio, SendDocument, SendVoice, SendVideoNote,
+    SendMediaGroup, SendPaidMedia, SendSticker, SendLocation, SendVenue, SendContact, SendPoll, SendDice,
+    SendChecklist, SendGame, SendInvoice, CopyMessage, CopyMessages, ForwardMessage, ForwardMessages,
+)
+
+
+class SendPriority(IntEnum):
+    """Who gets the next free slot when sends queue up (lower goes first)"""
+    INTERACTIVE = 0  # replies to the user in front of the bot
+    NOTIFICATION = 1  # outbox: order notifications, admin alerts
+    BROADCAST = 2  # mass mailing
+
+
+_send_priority: ContextVar[SendPriority] = ContextVar("send_priority", default=SendPriority.INTERACTIVE)
+
+
+@contextmanager
+def send_priority(priority: SendPriority) -> Iterator[None]:
+    """Send API calls made inside the block (and tasks started from it) with the given priority"""
+    token = _send_priority.set(priority)
+    try:
+        yield
+    finally:
+        _send_priority.reset(token)
+
+
+class TokenBucket:
+    """Token bucket where a send reserves its token up front; tokens may go negative (a queue of reservations)"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self) -> float:
+        """Seconds until one token is available"""
+        self._refill()
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self) -> None:
+        self._refill()
+        self.tokens -= 1
+
+    def reserve(self) -> float:
+        """Take a token now and return how long to wait before using it"""
+        delay = self.delay()
+        self.tokens -= 1
+        return delay
+
+    def pause(self, seconds: float) -> None:
+        """Hand out nothing for `seconds` (flood control)"""
+        self._refill()
+        self.tokens = min(self.tokens, 1 - seconds * self.rate)
+
+    @property
+    def idle(self) -> bool:
+        self._refill()
+        return self.tokens >= self.capacity
+
+
+class SendGovernor:
+    """
+    Paces every outgoing Telegram API call of the bot.
+
+    A new message first waits for its chat's bucket (so one busy chat never holds
+    up the others), then every call waits for a slot from the global bucket. Slots of the global
+    bucket go to waiting calls by priority, then in arrival order: a broadcast
+    never delays a checkout reply, it only uses what replies leave free.
+    A TelegramRetryAfter pauses the global bucket for the requested time.
+    """
+
+    def __init__(self, global_rate: float = GLOBAL_RATE, global_burst: float = GLOBAL_BURST,
+                 private_chat_rate: float = PRIVATE_CHAT_RATE, group_chat_rate: float = GROUP_CHAT_RATE,
+                 chat_burst: float = CHAT_BURST):
+        self.bucket = TokenBucket(global_rate, global_burst)
+        self.private_chat_rate = private_chat_rate
+        self.group_chat_rate = group_chat_rate
+        self.chat_burst = chat_burst
+        self.chat_buckets: Dict[Union[int, str], TokenBucket] = {}
+
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+        self.depth: Dict[SendPriority, int] = {priority: 0 for priority in SendPriority}
+        self.throttled: Dict[SendPriority, int] = defaultdict(int)
+        self.retry_after_count = 0
+
+    def _chat_bucket(self, chat_id: Union[int, str]) -> TokenBucket:
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self.chat_buckets) >= MAX_CHAT_BUCKETS:
+                self.chat_buckets = {key: value for key, value in self.chat_buckets.items() if not value.idle}
+            # Negative ids are groups and channels
+            is_group = not isinstance(chat_id, int) or chat_id < 0
+            bucket = TokenBucket(self.group_chat_rate if is_group else self.private_chat_rate, self.chat_burst)
+            self.chat_buckets[chat_id] = bucket
+        return bucket
+
+    def _dispatch(self) -> None:
+        """Hand free global slots to waiters, best priority first; re-arm a timer for the rest"""
+        self._timer = None
+        while self._waiters:
+            waiter = self._waiters[0][2]
+            if waiter.done():
+                heapq.heappop(self._waiters)
+                continue
+
+            delay = self.bucket.delay()
+            if delay > 0:
+                self._timer = asyncio.get_running_loop().call_later(delay, self._dispatch)
+                return
+
+            self.bucket.take()
+            heapq.heappop(self._waiters)
+            waiter.set_result(None)
+
+    async def acquire(self, chat_id: Union[int, str, None] = None, priority: SendPriority = None) -> float:
+        """Wait until a call to `chat_id` may be made; returns the time spent waiting"""
+        priority = _send_priority.get() if priority is None else priority
+        started_at = time.monotonic()
+        self.depth[priority] += 1
+        self._report_depth()
+        try:
+            if chat_id is not None:
+                delay = self._chat_bucket(chat_id).reserve()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+            waiter = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._waiters, (priority, next(self._sequence), waiter))
+            if self._timer is None:
+                self._dispatch()
+            await waiter
+        finally:
+            self.depth[priority] -= 1
+            self._report_depth()
+
+        waited = time.monotonic() - started_at
+        if waited > 0.001:
+            self.throttled[priority] += 1
+            metrics = get_metrics()
+            if metrics:
+                metrics.track_timing(f"send_throttle_wait_{priority.name.lower()}", waited)
+        return waited
+
+    def retry_after(self, seconds: float) -> None:
+        """Telegram asked to slow down: pause every send"""
+        self.retry_after_count += 1
+        self.bucket.pause(seconds)
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._dispatch()
+
+        logger.warning(f"Telegram flood control: all sends paused for {seconds}s")
+        metrics = get_metrics()
+        if metrics:
+            metrics.track_event("telegram_retry_after")
+
+    def _report_depth(self) -> None:
+        metrics = get_metrics()
+        if metrics:
+            for priority, depth in self.depth.items():
+                metrics.set_gauge(f"send_queue_depth_{priority.name.lower()}", depth)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Queue depth and throttled calls per priority class"""
+        return {
+            priority.name.lower(): {"queued": self.depth[priority], "throttled": self.throttled[priority]}
+            for priority in SendPriority
+        }
+
+
+class SendGovernorMiddleware(BaseRequestMiddleware):
+    """Bot session middleware routing every API call through the send governor"""
+
+    def __init__(self, governor: SendGovernor):
+        self.governor = governor
+
+    async def __call__(
+            self,
+            make_request: NextRequestMiddlewareType[TelegramType],
+            bot: Bot,
+            method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        if isinstance(method, EXEMPT_METHODS):
+            return await make_request(bot, method)
+
+        chat_id = getattr(method, "chat_id", None) if isinstance(method, MESSAGE_METHODS) else None
+        await self.governor.acquire(chat_id)
+        try:
+            return await make_request(bot, method)
+        except TelegramRetryAfter as e:
+            self.governor.retry_after(e.retry_after)
+            raise
+
+
+_governor: Optional[SendGovernor] = None
+
+
+def get_send_governor() -> Optional[SendGovernor]:
+    """The installed send governor, None before setup_send_governor()"""
+    return _governor
+
+
+def setup_send_governor(bot: Bot) -> SendGovernor:
+    """Route all API calls of the bot through one shared send governor (call once at startup)"""
+    global _governor
+    _governor = SendGovernor()
+    bot.session.middleware(SendGovernorMiddleware(_governor))
+    return _governor
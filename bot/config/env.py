@@ -33,6 +33,35 @@ class EnvKeys(ABC):
     REDIS_DB: Final = int(os.getenv("REDIS_DB", 0))
     REDIS_PASSWORD: Final = os.getenv("REDIS_PASSWORD")
 
+    # Cache (memory, redis or tiered; empty = tiered with Redis, memory without)
+    CACHE_BACKEND: Final = os.getenv("CACHE_BACKEND", "")
+    CACHE_LOCAL_MAX_ENTRIES: Final = int(os.getenv("CACHE_LOCAL_MAX_ENTRIES", 10000))
+    CACHE_LOCAL_TTL: Final = int(os.getenv("CACHE_LOCAL_TTL", 30))
+
+    # Flash sales (atomic stock counters + bounded checkout queue in front of reservations)
+    FLASH_SALE_MODE: Final = os.getenv("FLASH_SALE_MODE", "0")
+    FLASH_SALE_QUEUE_SIZE: Final = int(os.getenv("FLASH_SALE_QUEUE_SIZE", 200))
+    FLASH_SALE_CONCURRENCY: Final = int(os.getenv("FLASH_SALE_CONCURRENCY", 4))
+    FLASH_SALE_RECONCILE_INTERVAL: Final = int(os.getenv("FLASH_SALE_RECONCILE_INTERVAL", 30))
+
+    # Where Bitcoin addresses come from: "file" (btc_addresses.txt) or "xpub" (derived from BTC_XPUB)
+    BTC_ADDRESS_SOURCE: Final = os.getenv("BTC_ADDRESS_SOURCE", "file")
+    # Account-level extended public key (xpub/ypub/zpub) for the "xpub" source
+    BTC_XPUB: Final = os.getenv("BTC_XPUB")
+
+    # Bitcoin addresses claimed ahead of checkout and kept in memory (0 = claim at checkout)
+    BTC_ADDRESS_PREFETCH: Final = int(os.getenv("BTC_ADDRESS_PREFETCH", 0))
+
+    # On-chain payment detection: "bitcoind" or "electrum" JSON-RPC (empty = admins confirm payments by hand)
+    BTC_PAYMENT_BACKEND: Final = os.getenv("BTC_PAYMENT_BACKEND", "")
+    BTC_RPC_URL: Final = os.getenv("BTC_RPC_URL", "http://127.0.0.1:8332")
+    BTC_RPC_USER: Final = os.getenv("BTC_RPC_USER")
+    BTC_RPC_PASSWORD: Final = os.getenv("BTC_RPC_PASSWORD")
+    BTC_CONFIRMATIONS: Final = int(os.getenv("BTC_CONFIRMATIONS", 1))
+    BTC_PAYMENT_POLL_INTERVAL: Final = int(os.getenv("BTC_PAYMENT_POLL_INTERVAL", 60))
+    # Price of 1 BTC in PAY_CURRENCY to check amounts (empty = any confirmed payment counts)
+    BTC_EXCHANGE_RATE: Final = os.getenv("BTC_EXCHANGE_RATE")
+
     # Database (MariaDB/MySQL)
     DB_HOST: Final = os.getenv("DB_HOST", "localhost")
     DB_PORT: Final = int(os.getenv("DB_PORT", 3306))
@@ -40,6 +69,9 @@ class EnvKeys(ABC):
     DB_USER: Final = os.getenv("DB_USER", "shop_user")
     DB_PASSWORD: Final = os.getenv("DB_PASSWORD", "")
     DB_DRIVER: Final = os.getenv("DB_DRIVER", "mysql+pymysql")
+    DB_ASYNC_DRIVER: Final = os.getenv("DB_ASYNC_DRIVER", "mysql+aiomysql")
+    DB_REPLICA_URL: Final = os.getenv("DB_REPLICA_URL")
+    DB_REPLICA_MAX_LAG: Final = int(os.getenv("DB_REPLICA_MAX_LAG", 30))
 
     # Monitoring
     MONITORING_HOST: Final = os.getenv("MONITORING_HOST", "localhost")
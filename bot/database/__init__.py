@@ -1 +1,2 @@
-from bot.database.main import Database
+from bot.database.main import Database, use_replica
+from bot.database.executor import run_db, get_db_executor
@@ -1,4 +1,17 @@
 import os
+from typing import Optional
+
+from sqlalchemy.engine import make_url
+
+# Sync driver -> asyncio driver used by Database.async_session()
+ASYNC_DRIVERS = {
+    "mysql": "mysql+aiomysql",
+    "mysql+pymysql": "mysql+aiomysql",
+    "mariadb": "mariadb+aiomysql",
+    "mariadb+pymysql": "mariadb+aiomysql",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+}
 
 
 def dsn() -> str:
@@ -19,3 +32,29 @@ def dsn() -> str:
     driver = os.getenv("DB_DRIVER", "mysql+pymysql")
 
     return f"{driver}://{user}:{password}@{host}:{port}/{database}?charset=utf8mb4"
+
+
+def async_dsn() -> str:
+    """Build the asyncio connection string.
+
+    Derived from dsn() by swapping the driver (DB_ASYNC_DRIVER overrides the mapping).
+    """
+    url = make_url(dsn())
+    async_driver = os.getenv("DB_ASYNC_DRIVER") or ASYNC_DRIVERS.get(url.drivername, url.drivername)
+    return url.set(drivername=async_driver).render_as_string(hide_password=False)
+
+
+def replica_dsn() -> Optional[str]:
+    """Connection string of the optional read replica (DB_REPLICA_URL), None if not configured."""
+    return os.getenv("DB_REPLICA_URL") or None
+
+
+def async_replica_dsn() -> Optional[str]:
+    """Asyncio connection string of the read replica (same driver swap as async_dsn())."""
+    replica_url = replica_dsn()
+    if not replica_url:
+        return None
+
+    url = make_url(replica_url)
+    async_driver = os.getenv("DB_ASYNC_DRIVER") or ASYNC_DRIVERS.get(url.drivername, url.drivername)
+    return url.set(drivername=async_driver).render_as_string(hide_password=False)
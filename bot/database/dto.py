@@ -0,0 +1,138 @@
+import datetime
+from dataclasses import dataclass, fields
+from decimal import Decimal
+from typing import Any, Optional
+
+
+class RowDTO:
+    """
+    Base for detached, slotted row snapshots returned by query helpers.
+
+    Unlike ORM objects (or their __dict__), DTOs carry no SQLAlchemy state, so
+    they are safe to cache and share between sessions. Dict-style access
+    (row['name'], row.get('name')) keeps the helpers' previous return contract.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_model(cls, row: Any):
+        """Copy column values from an ORM object (None passes through)"""
+        if row is None:
+            return None
+        return cls(*(getattr(row, field.name) for field in fields(cls)))
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.keys()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default)
+
+    def keys(self) -> tuple[str, ...]:
+        return tuple(field.name for field in fields(self))
+
+    def to_dict(self) -> dict:
+        return {key: getattr(self, key) for key in self.keys()}
+
+    def __reduce__(self):
+        # Rebuild through the constructor: much cheaper than the dataclass __setstate__ for slots
+        return type(self), tuple(getattr(self, field.name) for field in fields(self))
+
+
+@dataclass(frozen=True, slots=True)
+class UserDTO(RowDTO):
+    telegram_id: int
+    role_id: int
+    referral_id: Optional[int]
+    registration_date: datetime.datetime
+    is_banned: bool
+    banned_at: Optional[datetime.datetime]
+    banned_by: Optional[int]
+    ban_reason: Optional[str]
+
+
+@dataclass(frozen=True, slots=True)
+class CategoryDTO(RowDTO):
+    name: str
+
+
+@dataclass(frozen=True, slots=True)
+class GoodsDTO(RowDTO):
+    name: str
+    price: Decimal
+    description: str
+    category_name: str
+    stock_quantity: int
+    reserved_quantity: int
+
+    @property
+    def available_quantity(self) -> int:
+        """Calculate available stock (total - reserved)"""
+        return max(0, self.stock_quantity - self.reserved_quantity)
+
+
+@dataclass(frozen=True, slots=True)
+class BoughtGoodsDTO(RowDTO):
+    id: int
+    item_name: str
+    value: str
+    price: Decimal
+    buyer_id: Optional[int]
+    bought_datetime: datetime.datetime
+    unique_id: int
+
+
+@dataclass(frozen=True, slots=True)
+class OrderDTO(RowDTO):
+    id: int
+    order_code: Optional[str]
+    buyer_id: Optional[int]
+    total_price: Decimal
+    bonus_applied: Optional[Decimal]
+    payment_method: str
+    delivery_address: str
+    phone_number: str
+    delivery_note: Optional[str]
+    bitcoin_address: Optional[str]
+    order_status: str
+    reserved_until: Optional[datetime.datetime]
+    delivery_time: Optional[datetime.datetime]
+    created_at: datetime.datetime
+    completed_at: Optional[datetime.datetime]
+
+
+@dataclass(frozen=True, slots=True)
+class ReferralEarningDTO(RowDTO):
+    id: int
+    referrer_id: int
+    referral_id: Optional[int]
+    amount: Decimal
+    original_amount: Decimal
+    created_at: datetime.datetime
+
+
+@dataclass(frozen=True, slots=True)
+class BroadcastJobDTO(RowDTO):
+    id: int
+    text: str
+    parse_mode: Optional[str]
+    status: str
+    created_by: Optional[int]
+    total: int
+    last_user_id: int
+    sent: int
+    failed: int
+    blocked: int
+    progress_chat_id: Optional[int]
+    progress_message_id: Optional[int]
+
+
+# All DTO types, by name (used by the cache codec to whitelist decodable classes)
+DTO_TYPES = {cls.__name__: cls for cls in (
+    UserDTO, CategoryDTO, GoodsDTO, BoughtGoodsDTO, OrderDTO, ReferralEarningDTO, BroadcastJobDTO
+)}
@@ -0,0 +1,136 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Optional
+
+from bot.database.main import Database
+from bot.monitoring.metrics import get_metrics
+
+
+class DatabaseExecutor:
+    """
+    Dedicated thread pool for synchronous database calls.
+
+    Sized to the connection pool (pool_size + max_overflow), so a worker never
+    waits for a connection: when every worker is busy, calls queue here instead,
+    and queue depth / wait time show pool starvation separately from slow queries.
+    """
+
+    def __init__(self, max_workers: int = None):
+        self.max_workers = max_workers or (Database.POOL_SIZE + Database.MAX_OVERFLOW)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="db")
+        self._lock = threading.Lock()
+        self.queued = 0  # Submitted, waiting for a free worker
+        self.active = 0  # Currently executing
+        self.max_queued = 0
+        self.completed = 0
+        self.loop: Optional[asyncio.AbstractEventLoop] = None  # Loop submitting the work
+
+    def _update_gauges(self):
+        metrics = get_metrics()
+        if metrics:
+            metrics.set_gauge("db_executor_queue_depth", self.queued)
+            metrics.set_gauge("db_executor_active", self.active)
+
+    def _call(self, fn: Callable, submitted_at: float) -> Any:
+        """Runs in a worker thread"""
+        started_at = time.perf_counter()
+        with self._lock:
+            self.queued -= 1
+            self.active += 1
+        self._update_gauges()
+
+        try:
+            return fn()
+        finally:
+            finished_at = time.perf_counter()
+            with self._lock:
+                self.active -= 1
+                self.completed += 1
+            self._update_gauges()
+
+            metrics = get_metrics()
+            if metrics:
+                metrics.track_timing("db_executor_wait", started_at - submitted_at)
+                metrics.track_timing("db_executor_exec", finished_at - started_at)
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run a blocking function in the pool without blocking the event loop"""
+        with self._lock:
+            self.queued += 1
+            self.max_queued = max(self.max_queued, self.queued)
+        self._update_gauges()
+
+        loop = self.loop = asyncio.get_running_loop()
+        call = partial(fn, *args, **kwargs)
+        return await loop.run_in_executor(self._executor, self._call, call, time.perf_counter())
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get executor statistics"""
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "queued": self.queued,
+                "active": self.active,
+                "max_queued": self.max_queued,
+                "completed": self.completed,
+            }
+
+    def shutdown(self, wait: bool = True):
+        """Stop accepting work and join worker threads"""
+        self._executor.shutdown(wait=wait)
+
+
+# Singleton for the database executor
+_db_executor: Optional[DatabaseExecutor] = None
+_db_executor_lock = threading.Lock()
+
+
+def get_db_executor() -> DatabaseExecutor:
+    """Get (or lazily create) the database executor"""
+    global _db_executor
+    with _db_executor_lock:
+        if _db_executor is None:
+            _db_executor = DatabaseExecutor()
+        return _db_executor
+
+
+def get_db_executor_loop() -> Optional[asyncio.AbstractEventLoop]:
+    """Event loop the database executor runs work for (None before the first call)"""
+    return _db_executor.loop if _db_executor is not None else None
+
+
+async def run_db(fn: Callable, *args, **kwargs) -> Any:
+    """Run a synchronous database helper on the dedicated database executor"""
+    return await get_db_executor().run(fn, *args, **kwargs)
+
+
+async def run_db_to_completion(fn: Callable, *args, **kwargs) -> Any:
+    """
+    run_db() for helpers given the caller's session: if the caller is cancelled,
+    the cancellation waits until the worker thread is done with the session, so
+    the caller never rolls it back or closes it while the worker still uses it
+    """
+    work = asyncio.ensure_future(run_db(fn, *args, **kwargs))
+    try:
+        return await asyncio.shield(work)
+    except asyncio.CancelledError:
+        while not work.done():
+            try:
+                await asyncio.wait([work])
+            except asyncio.CancelledError:
+                pass
+        if not work.cancelled():
+            work.exception()  # Retrieved: the caller is cancelled, the outcome goes nowhere
+        raise
+
+
+def shutdown_db_executor(wait: bool = True):
+    """Shut the database executor down (call on bot shutdown)"""
+    global _db_executor
+    with _db_executor_lock:
+        if _db_executor is not None:
+            _db_executor.shutdown(wait=wait)
+            _db_executor = None
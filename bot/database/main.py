@@ -1,31 +1,107 @@
+import functools
+import inspect
 import logging
-from contextlib import contextmanager
-from sqlalchemy import create_engine, Engine, QueuePool
+import threading
+import time
+from contextlib import contextmanager, asynccontextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import create_engine, Connection, Engine, QueuePool
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
 
-from bot.database.dsn import dsn
+from bot.config.env import EnvKeys
+from bot.database.dsn import dsn, async_dsn, replica_dsn, async_replica_dsn
 from bot.utils import SingletonMeta
 
+# Set by @use_replica: sessions opened without an explicit readonly flag go to the replica
+_prefer_replica: ContextVar[bool] = ContextVar("prefer_replica", default=False)
+
+
+def _replication_lag(conn: Connection) -> Optional[float]:
+    """Seconds the replica is behind its primary (None if unknown or not a replica)."""
+    if conn.dialect.name not in ("mysql", "mariadb"):
+        return None
+
+    # SHOW REPLICA STATUS: MariaDB 10.5+/MySQL 8.0.22+, SHOW SLAVE STATUS: older servers
+    for statement in ("SHOW REPLICA STATUS", "SHOW SLAVE STATUS"):
+        try:
+            row = conn.exec_driver_sql(statement).mappings().first()
+        except DBAPIError as e:
+            if e.connection_invalidated:
+                raise
+            continue
+
+        if row is None:
+            return None
+        lag = row.get("Seconds_Behind_Source", row.get("Seconds_Behind_Master"))
+        # NULL means the replication thread is stopped
+        return float("inf") if lag is None else float(lag)
+
+    return None
+
 
 class Database(metaclass=SingletonMeta):
     BASE = declarative_base()
 
+    # Connection pool sizing (shared by the sync and async engines)
+    POOL_SIZE = 20
+    MAX_OVERFLOW = 40
+
+    # Read replica routing
+    REPLICA_MAX_LAG = EnvKeys.DB_REPLICA_MAX_LAG  # seconds behind primary before fallback
+    REPLICA_CHECK_INTERVAL = 10  # seconds between lag probes
+    REPLICA_RETRY_AFTER = 60  # seconds an unreachable replica is skipped
+
     def __init__(self):
         connection_url = dsn()
-        is_sqlite = connection_url.startswith("sqlite")
 
+        self.__engine: Engine = create_engine(connection_url, **self.__engine_kwargs(connection_url))
+
+        # Pool state logging
+        logging.info(f"Database pool initialized: size={self.POOL_SIZE}, max_overflow={self.MAX_OVERFLOW}")
+
+        self.__SessionLocal = sessionmaker(bind=self.__engine, autoflush=False, autocommit=False, future=True,
+                                           expire_on_commit=False)
+
+        # Optional read-only replica for reporting and browsing queries
+        self.__replica_engine: Optional[Engine] = None
+        self.__ReplicaSessionLocal = None
+        replica_url = replica_dsn()
+        if replica_url:
+            self.__replica_engine = create_engine(replica_url, **self.__engine_kwargs(replica_url))
+            self.__ReplicaSessionLocal = sessionmaker(bind=self.__replica_engine, autoflush=False,
+                                                      autocommit=False, future=True, expire_on_commit=False)
+            logging.info("Read replica configured")
+
+        self.__replica_lock = threading.Lock()
+        self.__replica_ok = True
+        self.__replica_checked_at = 0.0
+        self.__replica_down_until = 0.0
+
+        # Async engine is created lazily, so sync-only entry points (bot_cli.py)
+        # never need the async driver installed
+        self.__async_engine: Optional[AsyncEngine] = None
+        self.__AsyncSessionLocal: Optional[async_sessionmaker[AsyncSession]] = None
+        self.__async_replica_engine: Optional[AsyncEngine] = None
+        self.__AsyncReplicaSessionLocal: Optional[async_sessionmaker[AsyncSession]] = None
+
+    def __engine_kwargs(self, connection_url: str) -> dict:
+        """Engine settings for the sync primary/replica engines."""
         engine_kwargs = dict(
             echo=False,  # Disable SQL logging (enable only for debug)
             pool_pre_ping=True,  # Check the connection before use
             future=True,  # Using SQLAlchemy 2.0 style
         )
 
-        if not is_sqlite:
+        if not connection_url.startswith("sqlite"):
             # Production settings for MariaDB/MySQL
             engine_kwargs.update(
                 poolclass=QueuePool,
-                pool_size=20,
-                max_overflow=40,
+                pool_size=self.POOL_SIZE,
+                max_overflow=self.MAX_OVERFLOW,
                 pool_timeout=30,
                 pool_recycle=3600,
                 connect_args={
@@ -35,18 +111,116 @@ class Database(metaclass=SingletonMeta):
                 },
             )
 
-        self.__engine: Engine = create_engine(connection_url, **engine_kwargs)
+        return engine_kwargs
 
-        # Pool state logging
-        logging.info(f"Database pool initialized: size={20}, max_overflow={40}")
+    def __async_engine_kwargs(self, connection_url: str) -> dict:
+        """Engine settings for the async primary/replica engines."""
+        engine_kwargs = dict(
+            echo=False,
+            pool_pre_ping=True,
+        )
 
-        self.__SessionLocal = sessionmaker(bind=self.__engine, autoflush=False, autocommit=False, future=True,
-                                           expire_on_commit=False)
+        if not connection_url.startswith("sqlite"):
+            engine_kwargs.update(
+                pool_size=self.POOL_SIZE,
+                max_overflow=self.MAX_OVERFLOW,
+                pool_timeout=30,
+                pool_recycle=3600,
+                connect_args={
+                    "connect_timeout": 10,
+                },
+            )
+
+        return engine_kwargs
+
+    def __init_async_engine(self) -> None:
+        """Create the asyncio engine (aiomysql for MariaDB/MySQL, aiosqlite for tests)."""
+        connection_url = async_dsn()
+
+        self.__async_engine = create_async_engine(connection_url, **self.__async_engine_kwargs(connection_url))
+        self.__AsyncSessionLocal = async_sessionmaker(bind=self.__async_engine, autoflush=False,
+                                                      expire_on_commit=False)
+
+        replica_url = async_replica_dsn()
+        if replica_url and self.__replica_engine is not None:
+            self.__async_replica_engine = create_async_engine(replica_url, **self.__async_engine_kwargs(replica_url))
+            self.__AsyncReplicaSessionLocal = async_sessionmaker(bind=self.__async_replica_engine,
+                                                                 autoflush=False, expire_on_commit=False)
+
+        logging.info(f"Async database pool initialized: size={self.POOL_SIZE}, max_overflow={self.MAX_OVERFLOW}")
+
+    def __mark_replica_down(self, error: Exception) -> None:
+        logging.warning(f"Read replica unavailable, using primary for {self.REPLICA_RETRY_AFTER}s: {error}")
+        self.__replica_ok = False
+        self.__replica_checked_at = time.monotonic()
+        self.__replica_down_until = self.__replica_checked_at + self.REPLICA_RETRY_AFTER
+
+    def __record_replica_lag(self, lag: Optional[float]) -> None:
+        ok = lag is None or lag <= self.REPLICA_MAX_LAG
+        if not ok and self.__replica_ok:
+            logging.warning(f"Read replica lagging {lag}s (max {self.REPLICA_MAX_LAG}s), using primary")
+        self.__replica_ok = ok
+        self.__replica_checked_at = time.monotonic()
+
+    def __replica_probe_due(self) -> bool:
+        now = time.monotonic()
+        return now >= self.__replica_down_until and now - self.__replica_checked_at >= self.REPLICA_CHECK_INTERVAL
+
+    def replica_available(self) -> bool:
+        """Whether read-only sessions can use the replica (reachable and not lagging)."""
+        if self.__replica_engine is None or time.monotonic() < self.__replica_down_until:
+            return False
+
+        if self.__replica_probe_due():
+            with self.__replica_lock:
+                if self.__replica_probe_due():
+                    try:
+                        with self.__replica_engine.connect() as conn:
+                            self.__record_replica_lag(_replication_lag(conn))
+                    except Exception as e:
+                        self.__mark_replica_down(e)
+
+        return self.__replica_ok
+
+    async def async_replica_available(self) -> bool:
+        """Async variant of replica_available() that probes through the async replica engine."""
+        if self.__AsyncSessionLocal is None:
+            self.__init_async_engine()
+        if self.__async_replica_engine is None or time.monotonic() < self.__replica_down_until:
+            return False
+
+        if self.__replica_probe_due():
+            try:
+                async with self.__async_replica_engine.connect() as conn:
+                    self.__record_replica_lag(await conn.run_sync(_replication_lag))
+            except Exception as e:
+                self.__mark_replica_down(e)
+
+        return self.__replica_ok
+
+    def __open_session(self, readonly: bool):
+        if readonly and self.replica_available():
+            db = self.__ReplicaSessionLocal()
+            try:
+                db.connection()  # Fail over now rather than on the first query
+                return db
+            except DBAPIError as e:
+                db.close()
+                self.__mark_replica_down(e)
+
+        return self.__SessionLocal()
 
     @contextmanager
-    def session(self):
-        """Contextual session: guaranteed to close/rollback on error."""
-        db = self.__SessionLocal()
+    def session(self, readonly: Optional[bool] = None):
+        """Contextual session: guaranteed to close/rollback on error.
+
+        readonly=True routes the session to the read replica (if configured and healthy),
+        falling back to the primary otherwise. Defaults to the @use_replica setting.
+        """
+        if readonly is None:
+            readonly = _prefer_replica.get()
+
+        db = self.__open_session(readonly)
         try:
             yield db
             db.commit()
@@ -56,6 +230,80 @@ class Database(metaclass=SingletonMeta):
         finally:
             db.close()
 
+    async def __open_async_session(self, readonly: bool) -> AsyncSession:
+        if readonly and await self.async_replica_available():
+            db = self.__AsyncReplicaSessionLocal()
+            try:
+                await db.connection()
+                return db
+            except DBAPIError as e:
+                await db.close()
+                self.__mark_replica_down(e)
+
+        return self.__AsyncSessionLocal()
+
+    @asynccontextmanager
+    async def async_session(self, readonly: Optional[bool] = None):
+        """Async contextual session: queries run without blocking the event loop."""
+        if self.__AsyncSessionLocal is None:
+            self.__init_async_engine()
+        if readonly is None:
+            readonly = _prefer_replica.get()
+
+        db = await self.__open_async_session(readonly)
+        try:
+            yield db
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+        finally:
+            await db.close()
+
     @property
     def engine(self) -> Engine:
         return self.__engine
+
+    @property
+    def replica_engine(self) -> Optional[Engine]:
+        return self.__replica_engine
+
+    @property
+    def async_engine(self) -> AsyncEngine:
+        if self.__async_engine is None:
+            self.__init_async_engine()
+        return self.__async_engine
+
+    async def dispose_async(self) -> None:
+        """Close all pooled async connections (call on shutdown)."""
+        if self.__async_engine is not None:
+            await self.__async_engine.dispose()
+        if self.__async_replica_engine is not None:
+            await self.__async_replica_engine.dispose()
+
+
+def use_replica(func):
+    """Route sessions opened inside func (sync or async) to the read replica.
+
+    Only for read-only helpers: writes made inside would go to the replica too.
+    """
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            token = _prefer_replica.set(True)
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                _prefer_replica.reset(token)
+
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        token = _prefer_replica.set(True)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _prefer_replica.reset(token)
+
+    return wrapper
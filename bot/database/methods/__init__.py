@@ -3,6 +3,9 @@ from bot.database.methods.read import *
 from bot.database.methods.update import *
 from bot.database.methods.delete import *
 from bot.database.methods.lazy_queries import *
+from bot.database.methods.catalog import *
 from bot.database.methods.cache_utils import *
 from bot.database.methods.inventory import *
+from bot.database.methods.flash_sale import *
 from bot.database.methods.media import *
+from bot.database.methods.broadcasts import *
@@ -0,0 +1,151 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional
+
+from sqlalchemy import func, or_, update
+
+from bot.database.dto import BroadcastJobDTO
+from bot.database.models import Database
+from bot.database.models.main import BotBlockedUser, BroadcastJob, User
+
+# Owner recorded on the broadcast jobs this process delivers
+INSTANCE_ID = uuid.uuid4().hex
+
+# A running job whose owner did not checkpoint for this long is taken over by another instance
+BROADCAST_LEASE = timedelta(minutes=5)
+
+
+def _recipients(session):
+    """Users a broadcast goes to: everyone who has not blocked the bot"""
+    blocked = session.query(BotBlockedUser.telegram_id).filter(BotBlockedUser.telegram_id == User.telegram_id)
+    return session.query(User.telegram_id).filter(~blocked.exists())
+
+
+def count_broadcast_recipients() -> int:
+    """Number of users a new broadcast would go to."""
+    with Database().session() as s:
+        return _recipients(s).with_entities(func.count(User.telegram_id)).scalar()
+
+
+def create_broadcast_job(text: str, parse_mode: Optional[str], created_by: Optional[int], total: int,
+                         progress_chat_id: int = None, progress_message_id: int = None) -> BroadcastJobDTO:
+    """Store a new broadcast; the progress message is updated by whoever runs (or resumes) it."""
+    with Database().session() as s:
+        job = BroadcastJob(
+            text=text,
+            parse_mode=parse_mode,
+            created_by=created_by,
+            total=total,
+            progress_chat_id=progress_chat_id,
+            progress_message_id=progress_message_id,
+            owner=INSTANCE_ID,
+            heartbeat_at=datetime.now(),
+        )
+        s.add(job)
+        s.flush()
+        return BroadcastJobDTO.from_model(job)
+
+
+def get_broadcast_job(job_id: int) -> BroadcastJobDTO | None:
+    """Return broadcast job by id, or None."""
+    with Database().session() as s:
+        return BroadcastJobDTO.from_model(s.get(BroadcastJob, job_id))
+
+
+def get_running_broadcast_jobs() -> list[BroadcastJobDTO]:
+    """Broadcasts still running, on this or another instance, or cut off by a restart."""
+    with Database().session() as s:
+        jobs = s.query(BroadcastJob).filter(BroadcastJob.status == 'running').order_by(BroadcastJob.id)
+        return [BroadcastJobDTO.from_model(job) for job in jobs]
+
+
+def claim_interrupted_broadcast_job() -> BroadcastJobDTO | None:
+    """
+    Take over the oldest running broadcast whose owner stopped checkpointing
+    (crashed or shut down), or None. Jobs of live instances are left alone.
+    """
+    expired = datetime.now() - BROADCAST_LEASE
+    stale = or_(BroadcastJob.heartbeat_at.is_(None), BroadcastJob.heartbeat_at < expired)
+    with Database().session() as s:
+        candidates = (s.query(BroadcastJob.id)
+                      .filter(BroadcastJob.status == 'running', stale)
+                      .order_by(BroadcastJob.id)
+                      .all())
+        for job_id, in candidates:
+            # Another instance may claim the same job meanwhile: only one update matches
+            taken = s.execute(
+                update(BroadcastJob)
+                .where(BroadcastJob.id == job_id, BroadcastJob.status == 'running', stale)
+                .values(owner=INSTANCE_ID, heartbeat_at=datetime.now())
+            ).rowcount
+            if taken == 1:
+                return BroadcastJobDTO.from_model(s.get(BroadcastJob, job_id))
+        return None
+
+
+def release_broadcast_jobs() -> int:
+    """Let other instances resume this instance's running broadcasts right away (call on shutdown)."""
+    with Database().session() as s:
+        return s.execute(
+            update(BroadcastJob)
+            .where(BroadcastJob.owner == INSTANCE_ID, BroadcastJob.status == 'running')
+            .values(heartbeat_at=None)
+        ).rowcount
+
+
+def get_broadcast_recipients(after_id: int, limit: int) -> list[int]:
+    """Next page of recipients after the keyset cursor, in telegram_id order."""
+    with Database().session() as s:
+        rows = (_recipients(s)
+                .filter(User.telegram_id > after_id)
+                .order_by(User.telegram_id)
+                .limit(limit))
+        return [telegram_id for telegram_id, in rows]
+
+
+def checkpoint_broadcast(job_id: int, last_user_id: int, sent: int, failed: int,
+                         blocked_ids: Iterable[int] = ()) -> bool:
+    """
+    Acknowledge a delivered batch: move the cursor, add the batch counters,
+    renew this instance's lease and record users who blocked the bot, in one
+    transaction. Returns False (and changes nothing) if another instance has
+    taken the job over.
+    """
+    blocked_ids = set(blocked_ids)
+    with Database().session() as s:
+        owned = s.execute(
+            update(BroadcastJob)
+            .where(BroadcastJob.id == job_id, BroadcastJob.owner == INSTANCE_ID)
+            .values(
+                last_user_id=last_user_id,
+                sent=BroadcastJob.sent + sent,
+                failed=BroadcastJob.failed + failed,
+                blocked=BroadcastJob.blocked + len(blocked_ids),
+                heartbeat_at=datetime.now(),
+            )
+        ).rowcount
+        if not owned:
+            return False
+
+        if blocked_ids:
+            known = {telegram_id for telegram_id, in s.query(BotBlockedUser.telegram_id)
+                     .filter(BotBlockedUser.telegram_id.in_(blocked_ids))}
+            s.add_all(BotBlockedUser(telegram_id=telegram_id, broadcast_id=job_id)
+                      for telegram_id in sorted(blocked_ids - known))
+        return True
+
+
+def finish_broadcast_job(job_id: int, status: str) -> None:
+    """Mark broadcast as completed or cancelled."""
+    with Database().session() as s:
+        s.execute(
+            update(BroadcastJob)
+            .where(BroadcastJob.id == job_id)
+            .values(status=status, finished_at=datetime.now(timezone.utc))
+        )
+
+
+def forget_bot_blocked(telegram_id: int) -> None:
+    """User is talking to the bot again: include them in broadcasts."""
+    with Database().session() as s:
+        s.query(BotBlockedUser).filter(BotBlockedUser.telegram_id == telegram_id).delete()
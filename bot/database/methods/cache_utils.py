@@ -1,18 +1,41 @@
 import asyncio
 from typing import Coroutine, Any
 
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from bot.database.executor import get_db_executor_loop, run_db
+from bot.database.methods.catalog import get_catalog, publish_catalog_change
+from bot.database.methods.read import invalidate_items_cache, invalidate_categories_cache, invalidate_user_cache
+from bot.logger_mesh import logger
+
+# session.info keys holding item/category names and user ids whose cache must be dropped once the session commits
+_PENDING_ITEMS = "pending_item_invalidation"
+_PENDING_CATEGORIES = "pending_category_invalidation"
+_PENDING_USERS = "pending_user_invalidation"
+
 
 def safe_create_task(coro: Coroutine[Any, Any, None]) -> None:
     """
     Safely create an async task for cache invalidation.
-    Works both in async context (with event loop) and sync context (tests).
+    Works in async context (with event loop), in database executor threads and in sync context (tests).
+
+    From an executor thread the coroutine runs on the bot's event loop (which owns
+    the Redis connections); the worker does not wait for it.
     """
     try:
         # Try to get the running event loop
         loop = asyncio.get_running_loop()
         # If we have a loop, create task as usual
         loop.create_task(coro)
+        return
     except RuntimeError:
+        pass
+
+    bot_loop = get_db_executor_loop()
+    if bot_loop is not None and bot_loop.is_running():
+        asyncio.run_coroutine_threadsafe(coro, bot_loop)
+    else:
         # No event loop running (probably in tests)
         # Run the coroutine in a new event loop
         try:
@@ -21,3 +44,79 @@ def safe_create_task(coro: Coroutine[Any, Any, None]) -> None:
             # If asyncio.run() also fails (nested event loop), just ignore
             # This is fire-and-forget for cache invalidation anyway
             pass
+
+
+def invalidate_item_after_commit(session: Session, item_name: str) -> None:
+    """
+    Queue cache invalidation of an item until the session's transaction commits.
+
+    All items touched by a transaction are flushed in one batch after commit, so
+    readers cannot re-cache pre-commit data; a rollback discards the queue.
+    """
+    session.info.setdefault(_PENDING_ITEMS, set()).add(item_name)
+
+
+def invalidate_category_after_commit(session: Session, category_name: str) -> None:
+    """Queue cache invalidation of a category (and its goods in the catalog) until commit"""
+    session.info.setdefault(_PENDING_CATEGORIES, set()).add(category_name)
+
+
+def invalidate_user_after_commit(session: Session, telegram_id: int) -> None:
+    """Queue cache invalidation of a user (and their role) until commit"""
+    session.info.setdefault(_PENDING_USERS, set()).add(telegram_id)
+
+
+async def _refresh_catalog(item_names: list[str], category_names: list[str]) -> None:
+    """Apply a committed change to this instance's catalog snapshot"""
+    catalog = get_catalog()
+    try:
+        await run_db(catalog.refresh_categories, category_names)
+        await run_db(catalog.refresh_items, item_names)
+    except Exception as e:
+        logger.error(f"Catalog snapshot refresh failed, reloading on next read: {e}")
+        catalog.stale = True
+
+
+async def _invalidate_committed(item_names: list[str], category_names: list[str], user_ids: list[int]) -> None:
+    for user_id in user_ids:
+        await invalidate_user_cache(user_id)
+    if not item_names and not category_names:
+        return
+
+    if get_catalog().loaded:
+        await _refresh_catalog(item_names, category_names)
+    if item_names:
+        await invalidate_items_cache(item_names)
+    if category_names:
+        await invalidate_categories_cache(category_names)
+    if get_catalog().loaded:
+        await publish_catalog_change()
+    if item_names:
+        from bot.database.methods.flash_sale import reconcile_flash_stock
+        await reconcile_flash_stock(item_names)
+
+
+@event.listens_for(Session, "after_commit")
+def _flush_pending_invalidation(session: Session) -> None:
+    from bot.database.methods.flash_sale import settle_flash_sale
+    settle_flash_sale(session, committed=True)
+
+    item_names = sorted(session.info.pop(_PENDING_ITEMS, ()))
+    category_names = sorted(session.info.pop(_PENDING_CATEGORIES, ()))
+    user_ids = sorted(session.info.pop(_PENDING_USERS, ()))
+    if not item_names and not category_names and not user_ids:
+        return
+
+    # The committing session still holds its connection: re-reading the catalog and
+    # talking to the cache happen in a task, so this worker never waits for a second one
+    safe_create_task(_invalidate_committed(item_names, category_names, user_ids))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_invalidation(session: Session) -> None:
+    from bot.database.methods.flash_sale import settle_flash_sale
+    settle_flash_sale(session, committed=False)
+
+    session.info.pop(_PENDING_ITEMS, None)
+    session.info.pop(_PENDING_CATEGORIES, None)
+    session.info.pop(_PENDING_USERS, None)
@@ -0,0 +1,254 @@
+import bisect
+import threading
+import time
+from typing import Any, Iterable, Optional
+
+from sqlalchemy import true
+
+from bot.caching import get_cache_manager
+from bot.caching.single_flight import SingleFlight
+from bot.database.dto import GoodsDTO
+from bot.database.executor import run_db
+from bot.database.main import Database
+from bot.database.models.main import Categories, Goods, GoodsMedia
+from bot.logger_mesh import logger
+
+# Cache namespace whose generation tells every bot instance that the catalog changed
+CATALOG_NAMESPACE = "catalog"
+
+# Full reload after this many seconds, for changes made without the bot noticing (CLI, other tools)
+CATALOG_MAX_AGE = 300
+
+
+def _media_dict(media: GoodsMedia) -> dict:
+    # Same shape as get_goods_media()
+    return {
+        'id': media.id,
+        'item_name': media.item_name,
+        'file_id': media.file_id,
+        'media_type': media.media_type,
+        'position': media.position,
+    }
+
+
+def _query_media(session, condition) -> dict[str, tuple[dict, ...]]:
+    media = {}
+    for row in session.query(GoodsMedia).filter(condition).order_by(GoodsMedia.item_name, GoodsMedia.position):
+        media.setdefault(row.item_name, []).append(_media_dict(row))
+    return {name: tuple(rows) for name, rows in media.items()}
+
+
+def _page(keys: list[str], offset: int, limit: int, after: Optional[str]) -> list[str]:
+    start = bisect.bisect_right(keys, after) if after is not None else offset
+    return keys[start:start + limit]
+
+
+class CatalogSnapshot:
+    """
+    In-process read model of the shop: sorted categories, sorted goods per category,
+    goods rows (price, stock, reserved) and media file_ids.
+
+    Loaded once at startup, then updated incrementally after every committed catalog,
+    media or stock change (see cache_utils); `version` grows with each applied change.
+    Writers swap whole lists under a lock, so readers never see a half-applied change.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.loaded = False
+        self.version = 0
+        self.generation = 0  # CATALOG_NAMESPACE generation the snapshot is in sync with
+        self.stale = False  # Another instance changed the catalog: reload before use
+        self.loaded_at = 0.0  # time.monotonic() of the last full load
+        self._categories: list[str] = []
+        self._items: dict[str, list[str]] = {}
+        self._goods: dict[str, GoodsDTO] = {}
+        self._media: dict[str, tuple[dict, ...]] = {}
+
+    # Loading
+
+    def load(self, generation: Optional[int] = None) -> None:
+        """Full (re)load in one session"""
+        with Database().session() as s:
+            categories = sorted(name for name, in s.query(Categories.name))
+            goods = [GoodsDTO.from_model(row) for row in s.query(Goods)]
+            media = _query_media(s, true())
+
+        items: dict[str, list[str]] = {name: [] for name in categories}
+        for row in goods:
+            items.setdefault(row.category_name, []).append(row.name)
+
+        with self._lock:
+            self._categories = categories
+            self._items = {name: sorted(names) for name, names in items.items()}
+            self._goods = {row.name: row for row in goods}
+            self._media = media
+            if generation is not None:
+                self.generation = generation
+            self.stale = False
+            self.loaded = True
+            self.loaded_at = time.monotonic()
+            self.version += 1
+
+        logger.info(f"Catalog snapshot loaded: {len(categories)} categories, {len(goods)} goods (v{self.version})")
+
+    def refresh_items(self, item_names: Iterable[str]) -> None:
+        """Re-read the given goods (and their media); missing ones are removed"""
+        names = set(item_names)
+        if not self.loaded or not names:
+            return
+
+        with Database().session() as s:
+            rows = {row.name: GoodsDTO.from_model(row) for row in s.query(Goods).filter(Goods.name.in_(names))}
+            media = _query_media(s, GoodsMedia.item_name.in_(names))
+
+        with self._lock:
+            for name in names:
+                self._remove_goods(name)
+                if name in rows:
+                    self._put_goods(rows[name], media.get(name, ()))
+            self.version += 1
+
+    def refresh_categories(self, category_names: Iterable[str]) -> None:
+        """Re-read the given categories with all of their goods"""
+        names = set(category_names)
+        if not self.loaded or not names:
+            return
+
+        with Database().session() as s:
+            existing = {name for name, in s.query(Categories.name).filter(Categories.name.in_(names))}
+            goods = [GoodsDTO.from_model(row) for row in s.query(Goods).filter(Goods.category_name.in_(names))]
+            media = _query_media(s, GoodsMedia.item_name.in_([row.name for row in goods])) if goods else {}
+
+        with self._lock:
+            categories = [name for name in self._categories if name not in names]
+            for name in names:
+                for item_name in self._items.pop(name, ()):
+                    self._goods.pop(item_name, None)
+                    self._media.pop(item_name, None)
+            for name in existing:
+                bisect.insort(categories, name)
+                self._items[name] = []
+            self._categories = categories
+
+            for row in goods:
+                self._put_goods(row, media.get(row.name, ()))
+            self.version += 1
+
+    def _remove_goods(self, name: str) -> None:
+        row = self._goods.pop(name, None)
+        self._media.pop(name, None)
+        if row is not None:
+            self._items[row.category_name] = [item for item in self._items.get(row.category_name, ()) if item != name]
+
+    def _put_goods(self, row: GoodsDTO, media: tuple[dict, ...]) -> None:
+        self._goods[row.name] = row
+        self._media[row.name] = media
+        items = list(self._items.get(row.category_name, ()))
+        bisect.insort(items, row.name)
+        self._items[row.category_name] = items
+
+    # Reading
+
+    def categories(self, offset: int = 0, limit: int = 10, after: Optional[str] = None) -> list[str]:
+        return _page(self._categories, offset, limit, after)
+
+    def count_categories(self) -> int:
+        return len(self._categories)
+
+    def items(self, category_name: str, offset: int = 0, limit: int = 10, after: Optional[str] = None) -> list[str]:
+        return _page(self._items.get(category_name, []), offset, limit, after)
+
+    def count_items(self, category_name: str) -> int:
+        return len(self._items.get(category_name, ()))
+
+    def get_item(self, item_name: str) -> Optional[GoodsDTO]:
+        return self._goods.get(item_name)
+
+    def get_media(self, item_name: str) -> list[dict]:
+        return list(self._media.get(item_name, ()))
+
+
+_catalog = CatalogSnapshot()
+_loads = SingleFlight()
+
+
+def get_catalog() -> CatalogSnapshot:
+    """get singleton instance of the catalog snapshot"""
+    return _catalog
+
+
+async def load_catalog() -> bool:
+    """Load the catalog snapshot (call at startup); False if it could not be loaded"""
+    cache = get_cache_manager()
+    generation = await cache.get_generation(CATALOG_NAMESPACE) if cache else None
+    try:
+        await _loads.do("catalog", lambda: run_db(_catalog.load, generation))
+        return True
+    except Exception as e:
+        logger.error(f"Failed to load catalog snapshot: {e}")
+        return False
+
+
+async def ensure_catalog() -> Optional[CatalogSnapshot]:
+    """
+    The catalog snapshot, reloaded first if another instance changed the catalog
+    or the last full load is older than CATALOG_MAX_AGE.
+
+    None if the snapshot was never loaded or cannot be reloaded: callers then query the database.
+    """
+    if not _catalog.loaded:
+        return None
+
+    cache = get_cache_manager()
+    if cache:
+        generation = await cache.get_generation(CATALOG_NAMESPACE)
+        if generation is not None and generation > _catalog.generation:
+            _catalog.stale = True
+    if time.monotonic() - _catalog.loaded_at > CATALOG_MAX_AGE:
+        _catalog.stale = True
+
+    if _catalog.stale and not await load_catalog():
+        return None
+    return _catalog
+
+
+async def publish_catalog_change() -> None:
+    """Tell other instances the catalog changed (this instance already applied the change)"""
+    cache = get_cache_manager()
+    if not cache:
+        return
+
+    expected = _catalog.generation + 1
+    generation = await cache.invalidate_namespace(CATALOG_NAMESPACE)
+    if generation == expected:
+        _catalog.generation = generation
+    elif generation is not None:
+        # Another instance changed the catalog in between: its change is not applied here
+        _catalog.stale = True
+
+
+async def query_catalog_categories(offset: int = 0, limit: int = 10, count_only: bool = False,
+                                   after: str = None) -> Any:
+    """query_categories served from the catalog snapshot"""
+    catalog = await ensure_catalog()
+    if catalog is None:
+        from bot.database.methods.lazy_queries import query_categories
+        return await query_categories(offset, limit, count_only, after)
+
+    if count_only:
+        return catalog.count_categories()
+    return catalog.categories(offset, limit, after)
+
+
+async def query_catalog_items(category_name: str, offset: int = 0, limit: int = 10,
+                              count_only: bool = False, after: str = None) -> Any:
+    """query_items_in_category served from the catalog snapshot"""
+    catalog = await ensure_catalog()
+    if catalog is None:
+        from bot.database.methods.lazy_queries import query_items_in_category
+        return await query_items_in_category(category_name, offset, limit, count_only, after)
+
+    if count_only:
+        return catalog.count_items(category_name)
+    return catalog.items(category_name, offset, limit, after)
@@ -1,9 +1,11 @@
 from datetime import datetime
 
-from sqlalchemy import exists
+from sqlalchemy import exists, select
 
 from bot.database.models import User, Goods, Categories, ShoppingCart
 from bot.database import Database
+from bot.database.methods.cache_utils import invalidate_item_after_commit, invalidate_category_after_commit, \
+    invalidate_user_after_commit
 from bot.logger_mesh import logger
 
 
@@ -20,6 +22,8 @@ def create_user(telegram_id: int, registration_date: datetime, referral_id: int
                 referral_id=referral_id,
             )
         )
+        # Drop a cached "not found" (and role 0) once the user is committed
+        invalidate_user_after_commit(s, telegram_id)
 
 
 def create_item(item_name: str, item_description: str, item_price: int, category_name: str) -> None:
@@ -35,6 +39,7 @@ def create_item(item_name: str, item_description: str, item_price: int, category
                 category_name=category_name,
             )
         )
+        invalidate_item_after_commit(s, item_name)
 
 
 def create_category(category_name: str) -> None:
@@ -43,6 +48,7 @@ def create_category(category_name: str) -> None:
         if s.query(exists().where(Categories.name == category_name)).scalar():
             return
         s.add(Categories(name=category_name))
+        invalidate_category_after_commit(s, category_name)
 
 
 async def add_to_cart(user_id: int, item_name: str, quantity: int = 1) -> tuple[bool, str]:
@@ -61,32 +67,31 @@ async def add_to_cart(user_id: int, item_name: str, quantity: int = 1) -> tuple[
     from bot.database.methods.read import check_value, select_item_values_amount_cached
 
     try:
-        with Database().session() as session:
+        async with Database().async_session() as session:
             # Check if item exists and has stock
-            good = session.query(Goods).filter_by(name=item_name).first()
+            good = await session.scalar(select(Goods).where(Goods.name == item_name))
             if not good:
                 return False, "Item not found"
 
+            cart_item = await session.scalar(
+                select(ShoppingCart).where(
+                    ShoppingCart.user_id == user_id,
+                    ShoppingCart.item_name == item_name
+                )
+            )
+
             # Check stock availability
             is_unlimited = check_value(item_name)
             if not is_unlimited:
                 available_stock = await select_item_values_amount_cached(item_name)
-                existing_cart = session.query(ShoppingCart).filter_by(
-                    user_id=user_id, item_name=item_name
-                ).first()
 
-                current_cart_qty = existing_cart.quantity if existing_cart else 0
+                current_cart_qty = cart_item.quantity if cart_item else 0
                 total_requested = current_cart_qty + quantity
 
                 if available_stock < total_requested:
                     return False, f"Only {available_stock} items available in stock"
 
             # Add or update cart item
-            cart_item = session.query(ShoppingCart).filter_by(
-                user_id=user_id,
-                item_name=item_name
-            ).first()
-
             if cart_item:
                 cart_item.quantity += quantity
             else:
@@ -97,7 +102,7 @@ async def add_to_cart(user_id: int, item_name: str, quantity: int = 1) -> tuple[
                 )
                 session.add(cart_item)
 
-            session.commit()
+            await session.commit()
             return True, "Item added to cart"
 
     except Exception as e:
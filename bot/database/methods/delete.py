@@ -1,5 +1,6 @@
-from bot.database.methods import invalidate_item_cache, invalidate_category_cache
-from bot.database.methods.cache_utils import safe_create_task
+from sqlalchemy import delete, select
+
+from bot.database.methods.cache_utils import invalidate_item_after_commit, invalidate_category_after_commit
 from bot.database.models import Database, Goods, Categories, ShoppingCart
 from bot.logger_mesh import logger
 
@@ -9,8 +10,8 @@ def delete_item(item_name: str) -> None:
     with Database().session() as s:
         s.query(Goods).filter(Goods.name == item_name).delete(synchronize_session=False)
 
-    # Invalidate the cache
-    safe_create_task(invalidate_item_cache(item_name))
+        # Invalidate the cache
+        invalidate_item_after_commit(s, item_name)
 
 
 def delete_category(category_name: str) -> None:
@@ -18,8 +19,8 @@ def delete_category(category_name: str) -> None:
     with Database().session() as s:
         s.query(Categories).filter(Categories.name == category_name).delete(synchronize_session=False)
 
-    # Invalidate the cache
-    safe_create_task(invalidate_category_cache(category_name))
+        # Invalidate the cache
+        invalidate_category_after_commit(s, category_name)
 
 
 async def remove_from_cart(cart_id: int, user_id: int) -> tuple[bool, str]:
@@ -34,16 +35,16 @@ async def remove_from_cart(cart_id: int, user_id: int) -> tuple[bool, str]:
         Tuple of (success, message)
     """
     try:
-        with Database().session() as session:
-            cart_item = session.query(ShoppingCart).filter_by(
-                id=cart_id, user_id=user_id
-            ).first()
+        async with Database().async_session() as session:
+            cart_item = await session.scalar(
+                select(ShoppingCart).where(ShoppingCart.id == cart_id, ShoppingCart.user_id == user_id)
+            )
 
             if not cart_item:
                 return False, "Item not found in cart"
 
-            session.delete(cart_item)
-            session.commit()
+            await session.delete(cart_item)
+            await session.commit()
             return True, "Item removed from cart"
 
     except Exception as e:
@@ -62,9 +63,9 @@ async def clear_cart(user_id: int) -> tuple[bool, str]:
         Tuple of (success, message)
     """
     try:
-        with Database().session() as session:
-            session.query(ShoppingCart).filter_by(user_id=user_id).delete()
-            session.commit()
+        async with Database().async_session() as session:
+            await session.execute(delete(ShoppingCart).where(ShoppingCart.user_id == user_id))
+            await session.commit()
             return True, "Cart cleared"
 
     except Exception as e:
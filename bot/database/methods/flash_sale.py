@@ -0,0 +1,367 @@
+import asyncio
+import itertools
+import threading
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from redis.asyncio import Redis
+from sqlalchemy.orm import Session
+
+from bot.config import EnvKeys
+from bot.database.executor import run_db, run_db_to_completion
+from bot.database.main import Database
+from bot.database.methods.cache_utils import safe_create_task
+from bot.database.methods.catalog import get_catalog
+from bot.database.methods.inventory import reserve_inventory
+from bot.database.models.main import Goods
+from bot.logger_mesh import logger
+from bot.monitoring import get_metrics
+
+# Redis keys mirroring `stock_quantity - reserved_quantity` per item
+STOCK_KEY_PREFIX = "flash:stock:"
+
+# session.info key holding (FlashSale, quantities) taken for reservations made in that session
+_SESSION_TAKEN = "flash_sale_taken"
+
+# KEYS: stock counters, ARGV: requested quantities (same order).
+# All-or-nothing decrement: {0, 0} on success, {i, available} if item i is short,
+# {-i, 0} if the counter of item i is missing (not mirrored yet).
+RESERVE_SCRIPT = """
+for i, key in ipairs(KEYS) do
+    local available = redis.call('GET', key)
+    if not available then
+        return {-i, 0}
+    end
+    if tonumber(available) < tonumber(ARGV[i]) then
+        return {i, tonumber(available)}
+    end
+end
+for i, key in ipairs(KEYS) do
+    redis.call('DECRBY', key, ARGV[i])
+end
+return {0, 0}
+"""
+
+
+class CheckoutQueueFull(Exception):
+    """The checkout queue has no free place: the customer should retry later"""
+
+
+class StockGate:
+    """Atomic admission check in front of the database reservation"""
+
+    async def take(self, items: Dict[str, int]) -> Tuple[int, int]:
+        """Decrement all counters or none; returns a RESERVE_SCRIPT status pair"""
+        raise NotImplementedError
+
+    async def give_back(self, items: Dict[str, int]) -> None:
+        """Return quantities taken by take()"""
+        raise NotImplementedError
+
+    async def set_available(self, available: Dict[str, int]) -> None:
+        """Overwrite counters with the given values"""
+        raise NotImplementedError
+
+
+class RedisStockGate(StockGate):
+    """Counters in Redis, shared by all bot instances"""
+
+    def __init__(self, redis: Redis):
+        self.redis = redis
+        self._script = redis.register_script(RESERVE_SCRIPT)
+
+    async def take(self, items: Dict[str, int]) -> Tuple[int, int]:
+        status, available = await self._script(
+            keys=[STOCK_KEY_PREFIX + name for name in items],
+            args=list(items.values())
+        )
+        return int(status), int(available)
+
+    async def give_back(self, items: Dict[str, int]) -> None:
+        pipe = self.redis.pipeline(transaction=False)
+        for name, quantity in items.items():
+            pipe.incrby(STOCK_KEY_PREFIX + name, quantity)
+        await pipe.execute()
+
+    async def set_available(self, available: Dict[str, int]) -> None:
+        if available:
+            await self.redis.mset({STOCK_KEY_PREFIX + name: value for name, value in available.items()})
+
+
+class LocalStockGate(StockGate):
+    """In-process counters for a single instance without Redis (methods never yield, so they are atomic)"""
+
+    def __init__(self):
+        self.counters: Dict[str, int] = {}
+
+    async def take(self, items: Dict[str, int]) -> Tuple[int, int]:
+        for i, (name, quantity) in enumerate(items.items(), start=1):
+            if name not in self.counters:
+                return -i, 0
+            if self.counters[name] < quantity:
+                return i, self.counters[name]
+        for name, quantity in items.items():
+            self.counters[name] -= quantity
+        return 0, 0
+
+    async def give_back(self, items: Dict[str, int]) -> None:
+        for name, quantity in items.items():
+            if name in self.counters:
+                self.counters[name] += quantity
+
+    async def set_available(self, available: Dict[str, int]) -> None:
+        self.counters.update(available)
+
+
+class CheckoutQueue:
+    """
+    Bounded FIFO in front of the database: at most `concurrency` reservations run at once,
+    at most `max_size` customers wait; anyone beyond that is turned away immediately.
+    """
+
+    def __init__(self, max_size: int, concurrency: int):
+        self.max_size = max_size
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._waiting: deque[int] = deque()
+        self._tickets = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._waiting)
+
+    def position(self, ticket: int) -> int:
+        """1-based place in the queue"""
+        return self._waiting.index(ticket) + 1
+
+    @asynccontextmanager
+    async def slot(self, on_queued: Optional[Callable[[int], Awaitable[None]]] = None):
+        """Wait for a free reservation slot; on_queued(position) is awaited if the customer has to wait"""
+        if len(self._waiting) >= self.max_size:
+            raise CheckoutQueueFull()
+
+        ticket = next(self._tickets)
+        self._waiting.append(ticket)
+        try:
+            if self._semaphore.locked() and on_queued:
+                try:
+                    await on_queued(self.position(ticket))
+                except Exception as e:
+                    logger.warning(f"Failed to report checkout queue position: {e}")
+            await self._semaphore.acquire()
+        finally:
+            self._waiting.remove(ticket)
+
+        try:
+            yield
+        finally:
+            self._semaphore.release()
+
+
+def _query_available(item_names: Optional[Iterable[str]] = None) -> Dict[str, int]:
+    # Always the primary: a lagging replica would hand out stock that is already reserved
+    with Database().session(readonly=False) as s:
+        query = s.query(Goods.name, Goods.stock_quantity - Goods.reserved_quantity)
+        if item_names is not None:
+            query = query.filter(Goods.name.in_(list(item_names)))
+        return {name: max(0, available) for name, available in query}
+
+
+class FlashSale:
+    """
+    Flash-sale mode: stock counters (`stock - reserved`) mirrored in Redis are decremented
+    atomically at checkout, so customers who lose the race are rejected without touching
+    the database. Winners then pass a bounded checkout queue to the normal reserve_inventory(),
+    which stays the source of truth: a drifted counter can cause a false rejection or an
+    extra database attempt, never an oversell. Counters are re-synced after committed stock
+    changes and periodically (reconcile()).
+    """
+
+    def __init__(self, gate: StockGate, queue: CheckoutQueue):
+        self.gate = gate
+        self.queue = queue
+        # Quantities taken from the counters whose reservation is not committed yet
+        # (changed by the event loop and by commit hooks in database executor threads)
+        self._in_flight: Dict[str, int] = {}
+        self._in_flight_lock = threading.Lock()
+        self._reconcile_task: Optional[asyncio.Task] = None
+
+    def _track(self, items: Dict[str, int], sign: int) -> None:
+        with self._in_flight_lock:
+            for name, quantity in items.items():
+                in_flight = self._in_flight.get(name, 0) + sign * quantity
+                if in_flight:
+                    self._in_flight[name] = in_flight
+                else:
+                    self._in_flight.pop(name, None)
+
+    def _forget(self, session: Optional[Session], taken: Dict[str, int]) -> None:
+        held = session.info.get(_SESSION_TAKEN) if session is not None else None
+        if held and (self, taken) in held:
+            held.remove((self, taken))
+        self._track(taken, -1)
+
+    def settle(self, taken: Dict[str, int], committed: bool) -> None:
+        """Reservation session ended: committed quantities leave the in-flight set, rolled back ones are given back"""
+        self._track(taken, -1)
+        if not committed:
+            safe_create_task(self.gate.give_back(taken))
+
+    async def reserve(self, order_id: int, items: List[Dict[str, any]], payment_method: str = None,
+                      session: Session = None,
+                      on_queued: Optional[Callable[[int], Awaitable[None]]] = None) -> Tuple[bool, str]:
+        """
+        reserve_inventory() behind the stock counters and the checkout queue.
+
+        With a caller session the taken counters stay in flight until that session commits,
+        and are given back if it rolls back.
+
+        Raises:
+            CheckoutQueueFull: too many customers are already waiting (counters are given back)
+        """
+        wanted: Dict[str, int] = {}
+        for item in items:
+            wanted[item['item_name']] = wanted.get(item['item_name'], 0) + item['quantity']
+        names = list(wanted)
+        metrics = get_metrics()
+
+        status, available = await self.gate.take(wanted)
+        if status > 0:
+            if metrics:
+                metrics.track_event("flash_sale_rejected")
+            name = names[status - 1]
+            return False, f"Insufficient stock for '{name}'. Available: {available}, Requested: {wanted[name]}"
+
+        taken = wanted if status == 0 else {}
+        if status < 0:
+            # Not mirrored yet: let the database decide and mirror the item for next time
+            logger.warning(f"No flash-sale stock counter for '{names[-status - 1]}', reconciling")
+            await self.reconcile(names)
+
+        self._track(taken, 1)
+        if session is not None and taken:
+            session.info.setdefault(_SESSION_TAKEN, []).append((self, taken))
+        try:
+            async with self.queue.slot(on_queued):
+                success, message = await run_db_to_completion(reserve_inventory, order_id, items,
+                                                              payment_method=payment_method, session=session)
+        except BaseException:
+            self._forget(session, taken)
+            await self.gate.give_back(taken)
+            raise
+
+        if session is None:
+            # reserve_inventory() committed or rolled back on its own
+            self._track(taken, -1)
+            if not success:
+                await self.gate.give_back(taken)
+
+        if not success:
+            # The counter was ahead of the database: re-sync
+            await self.reconcile(names)
+        return success, message
+
+    async def reconcile(self, item_names: Optional[Iterable[str]] = None,
+                        available: Optional[Dict[str, int]] = None) -> None:
+        """
+        Reset counters to the committed database values (all goods if item_names is None).
+
+        Quantities of reservations still in flight on this instance are kept subtracted.
+        """
+        if available is None:
+            names = list(item_names) if item_names is not None else None
+            available = await run_db(_query_available, names)
+        with self._in_flight_lock:
+            in_flight = dict(self._in_flight)
+        await self.gate.set_available({
+            name: max(0, value - in_flight.get(name, 0)) for name, value in available.items()
+        })
+
+    async def reconcile_committed(self, item_names: Iterable[str]) -> None:
+        """Re-sync items after a commit, from the catalog snapshot when it holds them (no query)"""
+        names = list(item_names)
+        catalog = get_catalog()
+        rows = {name: catalog.get_item(name) for name in names} if catalog.loaded and not catalog.stale else {}
+        if rows and all(rows.values()):
+            await self.reconcile(available={
+                name: max(0, row.stock_quantity - row.reserved_quantity) for name, row in rows.items()
+            })
+        else:
+            await self.reconcile(names)
+
+    async def _reconcile_periodically(self, interval: int) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.reconcile()
+            except Exception as e:
+                logger.error(f"Flash-sale stock reconciliation failed: {e}")
+
+    async def start(self, interval: int) -> None:
+        """Mirror all stock counters and keep them reconciled every `interval` seconds"""
+        await self.reconcile()
+        self._reconcile_task = asyncio.create_task(self._reconcile_periodically(interval))
+
+    async def stop(self) -> None:
+        if self._reconcile_task:
+            self._reconcile_task.cancel()
+            try:
+                await self._reconcile_task
+            except asyncio.CancelledError:
+                pass
+            self._reconcile_task = None
+
+
+_flash_sale: Optional[FlashSale] = None
+
+
+def get_flash_sale() -> Optional[FlashSale]:
+    """The flash-sale coordinator, None unless FLASH_SALE_MODE is enabled"""
+    return _flash_sale
+
+
+async def init_flash_sale(redis: Optional[Redis] = None) -> Optional[FlashSale]:
+    """Start flash-sale mode if FLASH_SALE_MODE is enabled (counters in Redis, in-process without it)"""
+    global _flash_sale
+    if EnvKeys.FLASH_SALE_MODE != "1":
+        return None
+
+    gate = RedisStockGate(redis) if redis is not None else LocalStockGate()
+    flash_sale = FlashSale(gate, CheckoutQueue(EnvKeys.FLASH_SALE_QUEUE_SIZE, EnvKeys.FLASH_SALE_CONCURRENCY))
+    await flash_sale.start(EnvKeys.FLASH_SALE_RECONCILE_INTERVAL)
+    _flash_sale = flash_sale
+    logger.info(f"Flash-sale mode enabled ({type(gate).__name__}, queue {EnvKeys.FLASH_SALE_QUEUE_SIZE})")
+    return flash_sale
+
+
+async def close_flash_sale() -> None:
+    global _flash_sale
+    if _flash_sale:
+        await _flash_sale.stop()
+        _flash_sale = None
+
+
+def settle_flash_sale(session: Session, committed: bool) -> None:
+    """Called by the session commit/rollback hooks (see cache_utils)"""
+    for flash_sale, taken in session.info.pop(_SESSION_TAKEN, ()):
+        flash_sale.settle(taken, committed)
+
+
+async def reconcile_flash_stock(item_names: Iterable[str]) -> None:
+    """Re-sync the stock counters of committed items (no-op unless flash-sale mode is on)"""
+    if _flash_sale is not None:
+        await _flash_sale.reconcile_committed(item_names)
+
+
+async def flash_reserve_inventory(order_id: int, items: List[Dict[str, any]], payment_method: str = None,
+                                  session: Session = None,
+                                  on_queued: Optional[Callable[[int], Awaitable[None]]] = None) -> Tuple[bool, str]:
+    """
+    Reserve inventory for an order, through the flash-sale gate when the mode is enabled.
+
+    Raises:
+        CheckoutQueueFull: flash-sale checkout queue is full
+    """
+    if _flash_sale is None:
+        return await run_db_to_completion(reserve_inventory, order_id, items, payment_method=payment_method,
+                                          session=session)
+    return await _flash_sale.reserve(order_id, items, payment_method, session, on_queued)
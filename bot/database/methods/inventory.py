@@ -1,24 +1,47 @@
+import time
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
-from typing import List, Dict, Tuple, Optional
-from sqlalchemy import and_
+from decimal import Decimal
+from typing import List, Dict, Tuple, Optional, Iterable
+from sqlalchemy import case, event, func, insert, update
 from sqlalchemy.orm import Session
 import logging
 
-from aiogram import Bot
-from aiogram.client.default import DefaultBotProperties
-
+from bot.communication.outbox import enqueue_notification
+from bot.database.executor import run_db
 from bot.database.main import Database
 from bot.database.models.main import Goods, Order, OrderItem, InventoryLog, CustomerInfo
-from bot.database.methods import invalidate_item_cache
-from bot.database.methods.cache_utils import safe_create_task
+from bot.database.methods.cache_utils import invalidate_item_after_commit, safe_create_task
 from bot.database.methods.read import get_bot_setting
 from bot.export.custom_logging import log_order_cancellation
 from bot.export.customer_csv import get_username_by_telegram_id, sync_customer_to_csv
-from bot.config import EnvKeys
 from bot.monitoring import get_metrics
 
 logger = logging.getLogger(__name__)
 
+# Expired orders released per transaction by cleanup_expired_reservations()
+EXPIRY_CHUNK_SIZE = 200
+
+# session.info key holding reserved_until of reservations made in that session (order_id -> deadline)
+_PENDING_DEADLINES = "pending_reservation_deadlines"
+
+
+@event.listens_for(Session, "after_commit")
+def _schedule_committed_deadlines(session: Session) -> None:
+    deadlines = session.info.pop(_PENDING_DEADLINES, None)
+    if not deadlines:
+        return
+
+    from bot.tasks.reservation_cleaner import get_reservation_scheduler
+    scheduler = get_reservation_scheduler()
+    if scheduler:
+        safe_create_task(scheduler.schedule(deadlines))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_deadlines(session: Session) -> None:
+    session.info.pop(_PENDING_DEADLINES, None)
+
 
 def log_inventory_change(item_name: str, change_type: str, quantity_change: int,
                           order_id: int = None, admin_id: int = None,
@@ -61,10 +84,74 @@ def log_inventory_change(item_name: str, change_type: str, quantity_change: int,
             session.close()
 
 
+def _log_inventory_changes(session: Session, entries: List[Dict[str, any]]) -> None:
+    """Insert audit log rows for several changes in one statement"""
+    if entries:
+        session.execute(insert(InventoryLog), entries)
+
+
+def _sum_quantities(items: Iterable[Dict[str, any]]) -> Dict[str, int]:
+    """Requested quantity per item, in name order (the order rows are locked in)"""
+    quantities: Dict[str, int] = {}
+    for item_data in items:
+        quantities[item_data['item_name']] = quantities.get(item_data['item_name'], 0) + item_data['quantity']
+    return dict(sorted(quantities.items()))
+
+
+def _lock_goods(session: Session, item_names: Iterable[str]) -> Dict[str, Goods]:
+    """
+    Lock goods rows in one statement, in name order.
+
+    Every inventory path locks goods in the same order, so two orders sharing items
+    cannot deadlock by locking them in opposite (cart) order.
+    """
+    rows = (session.query(Goods)
+            .filter(Goods.name.in_(sorted(set(item_names))))
+            .order_by(Goods.name)
+            .with_for_update()
+            .populate_existing())
+    return {goods.name: goods for goods in rows}
+
+
+def _expire_goods(session: Session, item_names: Iterable[str]) -> None:
+    """Drop stale quantities of loaded goods after a bulk UPDATE (reloaded on next access)"""
+    for item_name in item_names:
+        goods = session.identity_map.get(session.identity_key(Goods, item_name))
+        if goods is not None:
+            session.expire(goods, ['stock_quantity', 'reserved_quantity'])
+
+
+def _run_in_session(func, *args, **kwargs) -> Tuple[bool, str]:
+    """Run an inventory operation in its own transaction (for callers without a session)"""
+    with Database().session() as session:
+        success, message = func(*args, session=session, **kwargs)
+        if not success:
+            session.rollback()
+        return success, message
+
+
+def _reservation_failure(session: Session, quantities: Dict[str, int]) -> str:
+    """Explain which item blocked a reservation (only runs on the failure path)"""
+    available = dict(
+        session.query(Goods.name, Goods.stock_quantity - Goods.reserved_quantity)
+        .filter(Goods.name.in_(quantities))
+    )
+    for item_name, quantity in quantities.items():
+        if item_name not in available:
+            return f"Item '{item_name}' not found"
+        if available[item_name] < quantity:
+            return f"Insufficient stock for '{item_name}'. Available: {available[item_name]}, Requested: {quantity}"
+    return "Stock changed during reservation, please try again"
+
+
 def reserve_inventory(order_id: int, items: List[Dict[str, any]], payment_method: str = None, session: Session = None) -> Tuple[bool, str]:
     """
     Reserve inventory for an order. Sets reservation timeout based on payment method.
 
+    All items are reserved by one conditional UPDATE (reserved += requested where enough
+    stock is available): the order is complete only if every row matched, otherwise the
+    transaction is rolled back.
+
     Args:
         order_id: Order ID to reserve items for
         items: List of dicts with 'item_name' and 'quantity' keys
@@ -74,11 +161,13 @@ def reserve_inventory(order_id: int, items: List[Dict[str, any]], payment_method
     Returns:
         Tuple of (success: bool, message: str)
     """
-    should_commit = session is None
     if session is None:
-        session = Database().session()
+        return _run_in_session(reserve_inventory, order_id, items, payment_method)
 
     try:
+        # Read before taking row locks, so they are held for as short as possible
+        timeout_hours = get_bot_setting('cash_order_timeout_hours', default=24, value_type=int)
+
         order = session.query(Order).filter_by(id=order_id).with_for_update().first()
         if not order:
             return False, "Order not found"
@@ -87,57 +176,42 @@ def reserve_inventory(order_id: int, items: List[Dict[str, any]], payment_method
         if payment_method is None:
             payment_method = order.payment_method
 
-        # Check and reserve each item
-        for item_data in items:
-            item_name = item_data['item_name']
-            quantity = item_data['quantity']
-
-            # Lock the goods row
-            goods = session.query(Goods).filter_by(name=item_name).with_for_update().first()
-            if not goods:
+        quantities = _sum_quantities(items)
+        if quantities:
+            requested = case(quantities, value=Goods.name)
+            result = session.execute(
+                update(Goods)
+                .where(Goods.name.in_(quantities),
+                       Goods.stock_quantity - Goods.reserved_quantity >= requested)
+                .values(reserved_quantity=Goods.reserved_quantity + requested)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount != len(quantities):
                 session.rollback()
-                return False, f"Item '{item_name}' not found"
+                return False, _reservation_failure(session, quantities)
+            _expire_goods(session, quantities)
 
-            # Check available stock
-            available = goods.stock_quantity - goods.reserved_quantity
-            if available < quantity:
-                session.rollback()
-                return False, f"Insufficient stock for '{item_name}'. Available: {available}, Requested: {quantity}"
-
-            # Reserve the stock
-            goods.reserved_quantity += quantity
-
-            # Log the reservation
-            log_inventory_change(
-                item_name=item_name,
-                change_type='reserve',
-                quantity_change=quantity,
-                order_id=order_id,
-                comment=f"Reserved for order {order.order_code or order_id} ({payment_method} payment)",
-                session=session
-            )
+        comment = f"Reserved for order {order.order_code or order_id} ({payment_method} payment)"
+        _log_inventory_changes(session, [
+            {'item_name': item_name, 'change_type': 'reserve', 'quantity_change': quantity,
+             'order_id': order_id, 'comment': comment}
+            for item_name, quantity in quantities.items()
+        ])
 
-            # Invalidate cache for this item
-            safe_create_task(invalidate_item_cache(item_name))
+        # Invalidate cache for these items (after commit)
+        for item_name in quantities:
+            invalidate_item_after_commit(session, item_name)
 
         # Set reservation timeout
-        timeout_hours = get_bot_setting('cash_order_timeout_hours', default=24, value_type=int)
         order.reserved_until = datetime.now(timezone.utc) + timedelta(hours=timeout_hours)
+        session.info.setdefault(_PENDING_DEADLINES, {})[order_id] = order.reserved_until
 
         order.order_status = 'reserved'
 
-        if should_commit:
-            session.commit()
-
         return True, "Inventory reserved successfully"
 
     except Exception as e:
-        if should_commit:
-            session.rollback()
         return False, f"Error reserving inventory: {str(e)}"
-    finally:
-        if should_commit:
-            session.close()
 
 
 def release_reservation(order_id: int, reason: str = "Order cancelled", session: Session = None) -> Tuple[bool, str]:
@@ -153,45 +227,40 @@ def release_reservation(order_id: int, reason: str = "Order cancelled", session:
     Returns:
         Tuple of (success: bool, message: str)
     """
-    should_commit = session is None
     if session is None:
-        session = Database().session()
+        return _run_in_session(release_reservation, order_id, reason)
 
     try:
         order = session.query(Order).filter_by(id=order_id).with_for_update().first()
         if not order:
             return False, "Order not found"
 
+        goods_rows = _lock_goods(session, (order_item.item_name for order_item in order.items))
+
         # Release each item in the order
+        log_entries = []
         for order_item in order.items:
-            goods = session.query(Goods).filter_by(name=order_item.item_name).with_for_update().first()
+            goods = goods_rows.get(order_item.item_name)
             if goods:
-                # Release the reservation
-                goods.reserved_quantity -= order_item.quantity
-
-                # Ensure reserved_quantity doesn't go negative
-                if goods.reserved_quantity < 0:
-                    goods.reserved_quantity = 0
-
-                # Log the release
-                log_inventory_change(
-                    item_name=order_item.item_name,
-                    change_type='release',
-                    quantity_change=-order_item.quantity,  # Negative because we're reducing reserved
-                    order_id=order_id,
-                    comment=f"{reason} - {order.order_code or order_id}",
-                    session=session
-                )
-
-                # Invalidate cache for this item
-                safe_create_task(invalidate_item_cache(order_item.item_name))
+                # Release the reservation (reserved_quantity never goes negative)
+                goods.reserved_quantity = max(0, goods.reserved_quantity - order_item.quantity)
+
+                log_entries.append({
+                    'item_name': order_item.item_name,
+                    'change_type': 'release',
+                    'quantity_change': -order_item.quantity,  # Negative because we're reducing reserved
+                    'order_id': order_id,
+                    'comment': f"{reason} - {order.order_code or order_id}",
+                })
+
+                # Invalidate cache for this item (after commit)
+                invalidate_item_after_commit(session, order_item.item_name)
+
+        _log_inventory_changes(session, log_entries)
 
         # Clear reservation timeout
         order.reserved_until = None
 
-        if should_commit:
-            session.commit()
-
         # Track inventory release metrics
         metrics = get_metrics()
         if metrics:
@@ -206,12 +275,7 @@ def release_reservation(order_id: int, reason: str = "Order cancelled", session:
         return True, "Reservation released successfully"
 
     except Exception as e:
-        if should_commit:
-            session.rollback()
         return False, f"Error releasing reservation: {str(e)}"
-    finally:
-        if should_commit:
-            session.close()
 
 
 def deduct_inventory(order_id: int, admin_id: int = None, session: Session = None) -> Tuple[bool, str]:
@@ -227,53 +291,50 @@ def deduct_inventory(order_id: int, admin_id: int = None, session: Session = Non
     Returns:
         Tuple of (success: bool, message: str)
     """
-    should_commit = session is None
     if session is None:
-        session = Database().session()
+        return _run_in_session(deduct_inventory, order_id, admin_id)
 
     try:
         order = session.query(Order).filter_by(id=order_id).with_for_update().first()
         if not order:
             return False, "Order not found"
 
+        goods_rows = _lock_goods(session, (order_item.item_name for order_item in order.items))
+
         # Deduct each item from stock
+        log_entries = []
         for order_item in order.items:
-            goods = session.query(Goods).filter_by(name=order_item.item_name).with_for_update().first()
+            goods = goods_rows.get(order_item.item_name)
             if not goods:
                 session.rollback()
                 return False, f"Item '{order_item.item_name}' not found"
 
-            # Deduct from both stock_quantity and reserved_quantity
-            goods.stock_quantity -= order_item.quantity
-            goods.reserved_quantity -= order_item.quantity
-
             # Safety check
-            if goods.stock_quantity < 0:
+            if goods.stock_quantity < order_item.quantity:
                 session.rollback()
                 return False, f"Stock would go negative for '{order_item.item_name}'"
-            if goods.reserved_quantity < 0:
-                goods.reserved_quantity = 0  # Fix if somehow went negative
-
-            # Log the deduction
-            log_inventory_change(
-                item_name=order_item.item_name,
-                change_type='deduct',
-                quantity_change=-order_item.quantity,
-                order_id=order_id,
-                admin_id=admin_id,
-                comment=f"Order confirmed: {order.order_code or order_id}",
-                session=session
-            )
 
-            # Invalidate cache for this item
-            safe_create_task(invalidate_item_cache(order_item.item_name))
+            # Deduct from both stock_quantity and reserved_quantity (fix if somehow went negative)
+            goods.stock_quantity -= order_item.quantity
+            goods.reserved_quantity = max(0, goods.reserved_quantity - order_item.quantity)
+
+            log_entries.append({
+                'item_name': order_item.item_name,
+                'change_type': 'deduct',
+                'quantity_change': -order_item.quantity,
+                'order_id': order_id,
+                'admin_id': admin_id,
+                'comment': f"Order confirmed: {order.order_code or order_id}",
+            })
+
+            # Invalidate cache for this item (after commit)
+            invalidate_item_after_commit(session, order_item.item_name)
+
+        _log_inventory_changes(session, log_entries)
 
         # Clear reservation timeout since it's now confirmed
         order.reserved_until = None
 
-        if should_commit:
-            session.commit()
-
         # Track inventory deduction metrics
         metrics = get_metrics()
         if metrics:
@@ -288,12 +349,7 @@ def deduct_inventory(order_id: int, admin_id: int = None, session: Session = Non
         return True, "Inventory deducted successfully"
 
     except Exception as e:
-        if should_commit:
-            session.rollback()
         return False, f"Error deducting inventory: {str(e)}"
-    finally:
-        if should_commit:
-            session.close()
 
 
 def add_inventory(item_name: str, quantity: int, admin_id: int = None,
@@ -333,8 +389,8 @@ def add_inventory(item_name: str, quantity: int, admin_id: int = None,
             session=session
         )
 
-        # Invalidate cache for this item
-        safe_create_task(invalidate_item_cache(item_name))
+        # Invalidate cache for this item (after commit)
+        invalidate_item_after_commit(session, item_name)
 
         if should_commit:
             session.commit()
@@ -372,111 +428,193 @@ def get_inventory_stats(item_name: str) -> Optional[Dict[str, int]]:
         }
 
 
-async def cleanup_expired_reservations() -> Tuple[int, List[str]]:
-    """
-    Find and release expired reservations.
-    Called by background task every 1-2 minutes.
+@dataclass(frozen=True, slots=True)
+class ExpiredReservation:
+    """An order released by the expiry job, with what is needed for after-commit side effects"""
+    order_id: int
+    order_code: Optional[str]
+    buyer_id: Optional[int]
+    total: Decimal
+    items_summary: str
+    bonus_refund: Optional[Decimal] = None
+    old_bonus_balance: Optional[Decimal] = None
+    new_bonus_balance: Optional[Decimal] = None
 
-    Returns:
-        Tuple of (count: int, order_codes: List[str])
+
+def _count_expired_reservations(now: datetime) -> int:
+    with Database().session() as session:
+        return session.query(func.count(Order.id)).filter(
+            Order.order_status == 'reserved',
+            Order.reserved_until < now
+        ).scalar()
+
+
+def _expire_reservation_chunk(now: datetime, limit: int) -> List[ExpiredReservation]:
+    """
+    Release up to `limit` expired reservations in one transaction, with set-based statements:
+    lock orders, read their items, return stock with one UPDATE, log with one INSERT,
+    mark the orders expired with one UPDATE, refund applied bonuses and queue the
+    refund notices in the outbox.
     """
     with Database().session() as session:
-        # Find expired orders
-        now = datetime.now(timezone.utc)
-        expired_orders = session.query(Order).filter(
-            and_(
-                Order.order_status == 'reserved',
-                Order.reserved_until < now
+        orders = (session.query(Order)
+                  .filter(Order.order_status == 'reserved', Order.reserved_until < now)
+                  .order_by(Order.id)
+                  .limit(limit)
+                  .with_for_update()
+                  .all())
+        if not orders:
+            return []
+
+        order_ids = [order.id for order in orders]
+        items_by_order: Dict[int, List[OrderItem]] = {}
+        for order_item in session.query(OrderItem).filter(OrderItem.order_id.in_(order_ids)).order_by(OrderItem.id):
+            items_by_order.setdefault(order_item.order_id, []).append(order_item)
+
+        # Return reserved stock (reserved_quantity never goes negative)
+        quantities = _sum_quantities(
+            {'item_name': order_item.item_name, 'quantity': order_item.quantity}
+            for order_items in items_by_order.values() for order_item in order_items
+        )
+        existing = {name for name, in session.query(Goods.name)
+                    .filter(Goods.name.in_(quantities)).order_by(Goods.name).with_for_update()}
+        if existing:
+            released = case({name: quantities[name] for name in existing}, value=Goods.name)
+            session.execute(
+                update(Goods)
+                .where(Goods.name.in_(existing))
+                .values(reserved_quantity=case(
+                    (Goods.reserved_quantity >= released, Goods.reserved_quantity - released),
+                    else_=0
+                ))
+                .execution_options(synchronize_session=False)
             )
-        ).all()
+            for item_name in existing:
+                invalidate_item_after_commit(session, item_name)
+
+        _log_inventory_changes(session, [
+            {'item_name': order_item.item_name, 'change_type': 'release', 'quantity_change': -order_item.quantity,
+             'order_id': order.id, 'comment': f"Reservation timeout expired - {order.order_code or order.id}"}
+            for order in orders for order_item in items_by_order.get(order.id, ())
+            if order_item.item_name in existing
+        ])
+
+        session.execute(
+            update(Order)
+            .where(Order.id.in_(order_ids))
+            .values(order_status='expired', reserved_until=None)
+            .execution_options(synchronize_session=False)
+        )
 
-        count = 0
-        order_codes = []
+        # Refund referral bonuses applied to the expired orders
+        refund_buyers = {order.buyer_id for order in orders if order.bonus_applied and order.bonus_applied > 0}
+        customers = {}
+        if refund_buyers:
+            customers = {customer.telegram_id: customer for customer in session.query(CustomerInfo)
+                         .filter(CustomerInfo.telegram_id.in_(refund_buyers)).with_for_update()}
+
+        expired = []
+        for order in orders:
+            refund = {}
+            customer = customers.get(order.buyer_id) if order.bonus_applied and order.bonus_applied > 0 else None
+            if customer:
+                old_bonus_balance = customer.bonus_balance
+                customer.bonus_balance += order.bonus_applied
+                refund = {'bonus_refund': order.bonus_applied, 'old_bonus_balance': old_bonus_balance,
+                          'new_bonus_balance': customer.bonus_balance}
+                enqueue_notification(session, order.buyer_id, (
+                    f"⏱️ <b>Order Expired</b>\n\n"
+                    f"Your order <b>{order.order_code}</b> has expired due to payment timeout.\n\n"
+                    f"💰 <b>Bonus Refund: ${order.bonus_applied}</b>\n"
+                    f"📊 New Bonus Balance: <b>${customer.bonus_balance}</b>\n\n"
+                    f"Your referral bonus has been returned to your account.\n"
+                    f"You can use it for your next order!"
+                ), "bonus_refund")
+
+            order_items = items_by_order.get(order.id)
+            expired.append(ExpiredReservation(
+                order_id=order.id,
+                order_code=order.order_code,
+                buyer_id=order.buyer_id,
+                total=order.total_price,
+                items_summary=", ".join(f"{item.item_name} x {item.quantity}" for item in order_items)
+                if order_items else "N/A",
+                **refund
+            ))
+        return expired
+
+
+def _sync_refunded_customers(buyer_ids: Iterable[int]) -> None:
+    for buyer_id in buyer_ids:
+        buyer_username = get_username_by_telegram_id(buyer_id) or f"user_{buyer_id}"
+        sync_customer_to_csv(buyer_id, buyer_username)
+
+
+def _log_expired(expired: List[ExpiredReservation]) -> None:
+    for reservation in expired:
+        buyer_username = get_username_by_telegram_id(reservation.buyer_id) or f"user_{reservation.buyer_id}"
+        log_order_cancellation(
+            order_id=reservation.order_id,
+            buyer_id=reservation.buyer_id,
+            buyer_username=buyer_username,
+            items_summary=reservation.items_summary,
+            total=float(reservation.total),
+            reason="Reservation expired",
+            order_code=reservation.order_code
+        )
 
-        for order in expired_orders:
-            # Release reservation
-            success, message = release_reservation(
-                order.id,
-                reason="Reservation timeout expired",
-                session=session
-            )
 
-            if success:
-                # Mark order as expired
-                order.order_status = 'expired'
-
-                # Refund referral bonus if it was applied
-                if order.bonus_applied and order.bonus_applied > 0:
-                    customer_info = session.query(CustomerInfo).filter_by(
-                        telegram_id=order.buyer_id
-                    ).first()
-
-                    if customer_info:
-                        old_bonus_balance = customer_info.bonus_balance
-                        customer_info.bonus_balance += order.bonus_applied
-                        new_bonus_balance = customer_info.bonus_balance
-
-                        # Get buyer username for CSV sync
-                        buyer_username = get_username_by_telegram_id(order.buyer_id) or f"user_{order.buyer_id}"
-
-                        # Sync to CSV file
-                        sync_customer_to_csv(order.buyer_id, buyer_username)
-
-                        # Send notification to customer about bonus refund
-                        try:
-                            bot = Bot(
-                                token=EnvKeys.TOKEN,
-                                default=DefaultBotProperties(parse_mode="HTML")
-                            )
-
-                            try:
-                                notification_text = (
-                                    f"⏱️ <b>Order Expired</b>\n\n"
-                                    f"Your order <b>{order.order_code}</b> has expired due to payment timeout.\n\n"
-                                    f"💰 <b>Bonus Refund: ${order.bonus_applied}</b>\n"
-                                    f"📊 New Bonus Balance: <b>${new_bonus_balance}</b>\n\n"
-                                    f"Your referral bonus has been returned to your account.\n"
-                                    f"You can use it for your next order!"
-                                )
-
-                                await bot.send_message(order.buyer_id, notification_text)
-                                logger.info(f"Bonus refund notification sent for expired order {order.order_code} (buyer: {order.buyer_id})")
-                            finally:
-                                await bot.session.close()
-
-                        except Exception as e:
-                            logger.warning(f"Failed to send bonus refund notification for order {order.order_code}: {e}")
-                            # Continue execution even if notification fails
-
-                        logger.info(
-                            f"Refunded bonus ${order.bonus_applied} to buyer {order.buyer_id} "
-                            f"(order: {order.order_code}, old balance: ${old_bonus_balance}, "
-                            f"new balance: ${new_bonus_balance})"
-                        )
-
-                # Get order items for logging
-                order_items = session.query(OrderItem).filter_by(order_id=order.id).all()
-                if order_items:
-                    items_list = [f"{item.item_name} x {item.quantity}" for item in order_items]
-                    items_summary = ", ".join(items_list)
-                else:
-                    items_summary = "N/A"
-
-                # Log order cancellation
-                buyer_username = get_username_by_telegram_id(order.buyer_id) or f"user_{order.buyer_id}"
-                log_order_cancellation(
-                    order_id=order.id,
-                    buyer_id=order.buyer_id,
-                    buyer_username=buyer_username,
-                    items_summary=items_summary,
-                    total=float(order.total_price),
-                    reason="Reservation expired",
-                    order_code=order.order_code
-                )
-
-                count += 1
-                order_codes.append(order.order_code or str(order.id))
-
-        session.commit()
-
-        return count, order_codes
+async def _after_expiry_commit(expired: List[ExpiredReservation]) -> None:
+    """Side effects of a committed chunk: CSV sync and audit log"""
+    refunds = [reservation for reservation in expired if reservation.bonus_refund]
+    for reservation in refunds:
+        logger.info(
+            f"Refunded bonus ${reservation.bonus_refund} to buyer {reservation.buyer_id} "
+            f"(order: {reservation.order_code}, old balance: ${reservation.old_bonus_balance}, "
+            f"new balance: ${reservation.new_bonus_balance})"
+        )
+
+    if refunds:
+        await run_db(_sync_refunded_customers, sorted({reservation.buyer_id for reservation in refunds}))
+    await run_db(_log_expired, expired)
+
+
+async def cleanup_expired_reservations(chunk_size: int = EXPIRY_CHUNK_SIZE) -> Tuple[int, List[str]]:
+    """
+    Find and release expired reservations.
+    Called by background task every 1-2 minutes.
+
+    Orders are released in chunks of `chunk_size`, one short transaction each, so a backlog
+    (e.g. after an outage) never turns into one long transaction holding locks. Bonus refund
+    notices are queued in the outbox with the chunk; CSV sync and audit logging run
+    after it has committed.
+
+    Returns:
+        Tuple of (count: int, order_codes: List[str])
+    """
+    started_at = time.perf_counter()
+    now = datetime.now(timezone.utc)
+    backlog = await run_db(_count_expired_reservations, now)
+
+    count = 0
+    order_codes = []
+    while count < backlog:
+        expired = await run_db(_expire_reservation_chunk, now, chunk_size)
+        if not expired:
+            break
+
+        try:
+            await _after_expiry_commit(expired)
+        except Exception as e:
+            logger.error(f"Post-expiry processing failed for {len(expired)} order(s): {e}")
+
+        count += len(expired)
+        order_codes.extend(reservation.order_code or str(reservation.order_id) for reservation in expired)
+
+    metrics = get_metrics()
+    if metrics:
+        metrics.track_timing("reservation_expiry_run", time.perf_counter() - started_at)
+        metrics.set_gauge("reservation_expiry_backlog", backlog)
+        metrics.set_gauge("reservation_expiry_released", count)
+
+    return count, order_codes
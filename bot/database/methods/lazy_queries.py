@@ -1,5 +1,5 @@
 from typing import Any
-from sqlalchemy import func, desc
+from sqlalchemy import func, desc, select, Select
 from bot.database import Database
 from bot.database.models import (
     Categories, Goods, User, BoughtGoods,
@@ -7,135 +7,165 @@ from bot.database.models import (
 )
 
 
-async def query_categories(offset: int = 0, limit: int = 10, count_only: bool = False) -> Any:
+# Catalog pages and the full user list may lag behind on the read replica. Purchases,
+# referrals and admins are listed right after they change (a purchase, a role
+# update), so those pages read from the primary.
+
+
+def _seek(stmt: Select, column, offset: int, after: Any, descending: bool = False) -> Select:
+    """Keyset pagination: continue after the last seen key instead of skipping offset rows"""
+    if after is None:
+        return stmt.offset(offset)
+    return stmt.where(column < after if descending else column > after)
+
+
+async def query_categories(offset: int = 0, limit: int = 10, count_only: bool = False, after: str = None) -> Any:
     """Query categories with pagination"""
-    with Database().session() as s:
+    async with Database().async_session(readonly=True) as s:
         if count_only:
-            return s.query(func.count(Categories.name)).scalar() or 0
+            return await s.scalar(select(func.count(Categories.name))) or 0
 
-        return [row[0] for row in s.query(Categories.name)
-        .order_by(Categories.name.asc())
-        .offset(offset)
-        .limit(limit)
-        .all()]
+        stmt = select(Categories.name).order_by(Categories.name.asc())
+        return list((await s.scalars(
+            _seek(stmt, Categories.name, offset, after).limit(limit)
+        )).all())
 
 
 async def query_items_in_category(category_name: str, offset: int = 0, limit: int = 10,
-                                  count_only: bool = False) -> Any:
+                                  count_only: bool = False, after: str = None) -> Any:
     """Query items in category with pagination"""
-    with Database().session() as s:
-        query = s.query(Goods.name).filter(Goods.category_name == category_name)
-
+    async with Database().async_session(readonly=True) as s:
         if count_only:
-            return query.count()
-
-        return [row[0] for row in query
-        .order_by(Goods.name.asc())
-        .offset(offset)
-        .limit(limit)
-        .all()]
+            return await s.scalar(
+                select(func.count(Goods.name)).where(Goods.category_name == category_name)
+            ) or 0
+
+        stmt = (
+            select(Goods.name)
+            .where(Goods.category_name == category_name)
+            .order_by(Goods.name.asc())
+        )
+        return list((await s.scalars(
+            _seek(stmt, Goods.name, offset, after).limit(limit)
+        )).all())
 
 
-async def query_user_bought_items(user_id: int, offset: int = 0, limit: int = 10, count_only: bool = False) -> Any:
+async def query_user_bought_items(user_id: int, offset: int = 0, limit: int = 10, count_only: bool = False,
+                                  after: int = None) -> Any:
     """Query user's bought items with pagination"""
-    with Database().session() as s:
-        query = s.query(BoughtGoods).filter(BoughtGoods.buyer_id == user_id)
-
+    async with Database().async_session(readonly=False) as s:
         if count_only:
-            return query.count()
-
-        return query.order_by(desc(BoughtGoods.bought_datetime)) \
-            .offset(offset) \
-            .limit(limit) \
-            .all()
+            return await s.scalar(
+                select(func.count(BoughtGoods.id)).where(BoughtGoods.buyer_id == user_id)
+            ) or 0
+
+        # Newest first; ids grow with purchase time, so they serve as the seek key
+        stmt = (
+            select(BoughtGoods)
+            .where(BoughtGoods.buyer_id == user_id)
+            .order_by(desc(BoughtGoods.id))
+        )
+        return list((await s.scalars(
+            _seek(stmt, BoughtGoods.id, offset, after, descending=True).limit(limit)
+        )).all())
 
 
-async def query_all_users(offset: int = 0, limit: int = 10, count_only: bool = False) -> Any:
+async def query_all_users(offset: int = 0, limit: int = 10, count_only: bool = False, after: int = None) -> Any:
     """Query all users with pagination"""
-    with Database().session() as s:
+    async with Database().async_session(readonly=True) as s:
         if count_only:
-            return s.query(func.count(User.telegram_id)).scalar() or 0
+            return await s.scalar(select(func.count(User.telegram_id))) or 0
 
-        return [row[0] for row in s.query(User.telegram_id)
-        .order_by(User.telegram_id.asc())
-        .offset(offset)
-        .limit(limit)
-        .all()]
+        stmt = select(User.telegram_id).order_by(User.telegram_id.asc())
+        return list((await s.scalars(
+            _seek(stmt, User.telegram_id, offset, after).limit(limit)
+        )).all())
 
 
-async def query_admins(offset: int = 0, limit: int = 10, count_only: bool = False) -> Any:
+async def query_admins(offset: int = 0, limit: int = 10, count_only: bool = False, after: int = None) -> Any:
     """Query admin users with pagination"""
-    with Database().session() as s:
-        query = s.query(User.telegram_id).join(Role).filter(Role.name == 'ADMIN')
-
+    async with Database().async_session(readonly=False) as s:
         if count_only:
-            return query.count()
-
-        return [row[0] for row in query
-        .order_by(User.telegram_id.asc())
-        .offset(offset)
-        .limit(limit)
-        .all()]
+            return await s.scalar(
+                select(func.count(User.telegram_id)).join(Role).where(Role.name == 'ADMIN')
+            ) or 0
+
+        stmt = (
+            select(User.telegram_id)
+            .join(Role)
+            .where(Role.name == 'ADMIN')
+            .order_by(User.telegram_id.asc())
+        )
+        return list((await s.scalars(
+            _seek(stmt, User.telegram_id, offset, after).limit(limit)
+        )).all())
 
 
 async def query_user_referrals(user_id: int, offset: int = 0, limit: int = 10, count_only: bool = False) -> Any:
     """Query user's referrals with earnings info"""
-    with Database().session() as s:
+    async with Database().async_session(readonly=False) as s:
         if count_only:
-            return s.query(func.count(User.telegram_id)).filter(User.referral_id == user_id).scalar() or 0
-
-        referrals = s.query(User).filter(User.referral_id == user_id) \
-            .offset(offset) \
-            .limit(limit) \
-            .all()
-
-        result = []
-        for ref in referrals:
-            # Get total earned from this referral
-            total_earned = s.query(func.sum(ReferralEarnings.amount)).filter(
-                ReferralEarnings.referrer_id == user_id,
-                ReferralEarnings.referral_id == ref.telegram_id
-            ).scalar() or 0
+            return await s.scalar(
+                select(func.count(User.telegram_id)).where(User.referral_id == user_id)
+            ) or 0
+
+        # Earnings per referral, aggregated once and joined to the page
+        earned = (
+            select(ReferralEarnings.referral_id, func.sum(ReferralEarnings.amount).label('total_earned'))
+            .where(ReferralEarnings.referrer_id == user_id)
+            .group_by(ReferralEarnings.referral_id)
+            .subquery()
+        )
+        total_earned = func.coalesce(earned.c.total_earned, 0)
 
-            result.append({
-                'telegram_id': ref.telegram_id,
-                'registration_date': ref.registration_date,
-                'total_earned': total_earned
-            })
+        rows = (await s.execute(
+            select(User.telegram_id, User.registration_date, total_earned.label('total_earned'))
+            .outerjoin(earned, earned.c.referral_id == User.telegram_id)
+            .where(User.referral_id == user_id)
+            .order_by(total_earned.desc(), User.telegram_id.asc())
+            .offset(offset)
+            .limit(limit)
+        )).all()
 
-        return sorted(result, key=lambda x: x['total_earned'], reverse=True)
+        return [{
+            'telegram_id': row.telegram_id,
+            'registration_date': row.registration_date,
+            'total_earned': row.total_earned
+        } for row in rows]
 
 
 async def query_referral_earnings_from_user(referrer_id: int, referral_id: int, offset: int = 0, limit: int = 10,
-                                            count_only: bool = False) -> Any:
+                                            count_only: bool = False, after: int = None) -> Any:
     """Query earnings from specific referral"""
-    with Database().session() as s:
-        query = s.query(ReferralEarnings).filter(
-            ReferralEarnings.referrer_id == referrer_id,
-            ReferralEarnings.referral_id == referral_id
-        )
+    conditions = (
+        ReferralEarnings.referrer_id == referrer_id,
+        ReferralEarnings.referral_id == referral_id
+    )
 
+    async with Database().async_session(readonly=False) as s:
         if count_only:
-            return query.count()
+            return await s.scalar(select(func.count(ReferralEarnings.id)).where(*conditions)) or 0
 
-        return query.order_by(desc(ReferralEarnings.created_at)) \
-            .offset(offset) \
-            .limit(limit) \
-            .all()
+        stmt = select(ReferralEarnings).where(*conditions).order_by(desc(ReferralEarnings.id))
+        return list((await s.scalars(
+            _seek(stmt, ReferralEarnings.id, offset, after, descending=True).limit(limit)
+        )).all())
 
 
 async def query_all_referral_earnings(referrer_id: int, offset: int = 0, limit: int = 10,
-                                      count_only: bool = False) -> Any:
+                                      count_only: bool = False, after: int = None) -> Any:
     """Query all referral earnings for user"""
-    with Database().session() as s:
-        query = s.query(ReferralEarnings).filter(
-            ReferralEarnings.referrer_id == referrer_id
-        )
-
+    async with Database().async_session(readonly=False) as s:
         if count_only:
-            return query.count()
-
-        return query.order_by(desc(ReferralEarnings.created_at)) \
-            .offset(offset) \
-            .limit(limit) \
-            .all()
+            return await s.scalar(
+                select(func.count(ReferralEarnings.id)).where(ReferralEarnings.referrer_id == referrer_id)
+            ) or 0
+
+        stmt = (
+            select(ReferralEarnings)
+            .where(ReferralEarnings.referrer_id == referrer_id)
+            .order_by(desc(ReferralEarnings.id))
+        )
+        return list((await s.scalars(
+            _seek(stmt, ReferralEarnings.id, offset, after, descending=True).limit(limit)
+        )).all())
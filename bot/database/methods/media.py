@@ -1,5 +1,6 @@
 from sqlalchemy import func
 
+from bot.database.methods.cache_utils import invalidate_item_after_commit
 from bot.database.models import Database
 from bot.database.models.main import GoodsMedia
 
@@ -24,6 +25,7 @@ def add_goods_media(item_name: str, file_id: str, media_type: str) -> int:
         s.add(media)
         s.flush()
         media_id = media.id
+        invalidate_item_after_commit(s, item_name)
     return media_id
 
 
@@ -56,5 +58,9 @@ def get_goods_media_count(item_name: str) -> int:
 def delete_goods_media(media_id: int) -> bool:
     """Delete a media file by id. Returns True if deleted."""
     with Database().session() as s:
-        count = s.query(GoodsMedia).filter(GoodsMedia.id == media_id).delete()
-        return count > 0
+        media = s.query(GoodsMedia).filter(GoodsMedia.id == media_id).first()
+        if media is None:
+            return False
+        invalidate_item_after_commit(s, media.item_name)
+        s.delete(media)
+        return True
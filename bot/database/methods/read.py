@@ -1,39 +1,47 @@
-import asyncio
 import datetime
 from decimal import Decimal
 from functools import wraps
-from typing import Optional, Dict
+from typing import Optional, Dict, Iterable
 
-from sqlalchemy import func
+from sqlalchemy import func, select
+from sqlalchemy.orm import selectinload
 
 from bot.database.models import Database, User, Goods, Categories, Role, BoughtGoods, \
-    Operations, ReferralEarnings, BotSettings, ShoppingCart, OrderItem, Order
-from bot.caching import get_cache_manager
-
-
-# Wrapper for synchronous functions to asynchronous functions with caching
-def async_cached(ttl: int = 300, key_prefix: str = ""):
+    Operations, ReferralEarnings, BotSettings, ShoppingCart, Order
+from bot.caching import get_cache_manager, generation_key
+from bot.caching.single_flight import load_cached
+from bot.database.executor import run_db
+from bot.database.main import use_replica
+from bot.database.dto import UserDTO, GoodsDTO, CategoryDTO, BoughtGoodsDTO, ReferralEarningDTO
+
+
+# Wrapper for synchronous functions to asynchronous functions with caching.
+# With versioned=True the key prefix is a namespace invalidated as a whole by
+# CacheManager.invalidate_namespace (one INCR instead of a SCAN over its keys).
+# negative_ttl > 0 also caches "not found" (None) results for that many seconds;
+# the matching create_* function must invalidate the key.
+def async_cached(ttl: int = 300, key_prefix: str = "", versioned: bool = False, negative_ttl: int = 0):
     def decorator(sync_func):
         @wraps(sync_func)
         async def async_wrapper(*args, **kwargs):
-            # Generate the cache key
-            cache_key = f"{key_prefix or sync_func.__name__}:{':'.join(str(arg) for arg in args)}"
+            prefix = key_prefix or sync_func.__name__
+            key = ':'.join(str(arg) for arg in args)
 
             cache = get_cache_manager()
             if cache:
-                # Trying to get it from the cache
-                cached_value = await cache.get(cache_key)
-                if cached_value is not None:
-                    return cached_value
-
-            # Execute synchronous function in executor
-            loop = asyncio.get_event_loop()
-            result = await loop.run_in_executor(None, sync_func, *args)
-
-            # Save to cache
-            if cache and result is not None:
-                await cache.set(cache_key, result, ttl)
-
+                # Generate the cache key
+                cache_key = await cache.versioned_key(prefix, key) if versioned else f"{prefix}:{key}"
+                if cache_key is None:
+                    # Generation unavailable: bypass the cache rather than risk a stale read
+                    cache = None
+
+            if not cache:
+                return await run_db(sync_func, *args)
+
+            # Concurrent misses share one database call; hot keys are refreshed early
+            result, _ = await load_cached(
+                cache, cache_key, ttl, lambda: run_db(sync_func, *args), negative_ttl=negative_ttl
+            )
             return result
 
         return async_wrapper
@@ -48,11 +56,11 @@ def _day_window(date_str: str) -> tuple[datetime.datetime, datetime.datetime]:
     return start, end
 
 
-def check_user(telegram_id: int | str) -> Optional[User]:
+def check_user(telegram_id: int | str) -> Optional[UserDTO]:
     """Return user by Telegram ID or None if not found."""
     with Database().session() as s:
         result = s.query(User).filter(User.telegram_id == telegram_id).one_or_none()
-        return result.__dict__ if result else None
+        return UserDTO.from_model(result)
 
 
 def check_role(telegram_id: int) -> int:
@@ -83,6 +91,7 @@ def select_max_role_id() -> Optional[int]:
         return s.query(func.max(Role.id)).scalar()
 
 
+@use_replica
 def select_today_users(date: str) -> int:
     """Return count of users registered on given date (YYYY-MM-DD)."""
     start_of_day, end_of_day = _day_window(date)
@@ -93,12 +102,14 @@ def select_today_users(date: str) -> int:
         ).count()
 
 
+@use_replica
 def get_user_count() -> int:
     """Return total users count."""
     with Database().session() as s:
         return s.query(User).count()
 
 
+@use_replica
 def select_admins() -> int:
     """Return count of users with role_id > 1."""
     with Database().session() as s:
@@ -111,39 +122,39 @@ def get_all_users() -> list[tuple[int]]:
         return s.query(User.telegram_id).all()
 
 
-def get_bought_item_info(item_id: str) -> dict | None:
-    """Return bought item row as dict by row id, or None."""
+def get_bought_item_info(item_id: str) -> BoughtGoodsDTO | None:
+    """Return bought item row by row id, or None."""
     with Database().session() as s:
         result = s.query(BoughtGoods).filter(BoughtGoods.id == item_id).first()
-        return result.__dict__ if result else None
+        return BoughtGoodsDTO.from_model(result)
 
 
-def get_item_info(item_name: str) -> dict | None:
-    """Return item (position) row as dict by name, or None."""
+def get_item_info(item_name: str) -> GoodsDTO | None:
+    """Return item (position) row by name, or None."""
     with Database().session() as s:
         result = s.query(Goods).filter(Goods.name == item_name).first()
-        return result.__dict__ if result else None
+        return GoodsDTO.from_model(result)
 
 
-def get_goods_info(item_name: str) -> dict | None:
-    """Return goods row as dict by name, or None. (Replaced ItemValues with Goods)"""
+def get_goods_info(item_name: str) -> GoodsDTO | None:
+    """Return goods row by name, or None. (Replaced ItemValues with Goods)"""
     with Database().session() as s:
         result = s.query(Goods).filter(Goods.name == item_name).first()
-        return result.__dict__ if result else None
+        return GoodsDTO.from_model(result)
 
 
-def check_item(item_name: str) -> dict | None:
-    """Return item (position) as dict by name, or None."""
+def check_item(item_name: str) -> GoodsDTO | None:
+    """Return item (position) by name, or None."""
     with Database().session() as s:
         result = s.query(Goods).filter(Goods.name == item_name).first()
-        return result.__dict__ if result else None
+        return GoodsDTO.from_model(result)
 
 
-def check_category(category_name: str) -> dict | None:
-    """Return category as dict by name, or None."""
+def check_category(category_name: str) -> CategoryDTO | None:
+    """Return category by name, or None."""
     with Database().session() as s:
         result = s.query(Categories).filter(Categories.name == category_name).first()
-        return result.__dict__ if result else None
+        return CategoryDTO.from_model(result)
 
 
 def select_item_values_amount(item_name: str) -> int:
@@ -166,13 +177,14 @@ def select_user_items(buyer_id: int | str) -> int:
         return s.query(func.count()).filter(BoughtGoods.buyer_id == buyer_id).scalar() or 0
 
 
-def select_bought_item(unique_id: int) -> dict | None:
-    """Return one bought item by unique_id as dict, or None."""
+def select_bought_item(unique_id: int) -> BoughtGoodsDTO | None:
+    """Return one bought item by unique_id, or None."""
     with Database().session() as s:
         result = s.query(BoughtGoods).filter(BoughtGoods.unique_id == unique_id).first()
-        return result.__dict__ if result else None
+        return BoughtGoodsDTO.from_model(result)
 
 
+@use_replica
 def select_count_items() -> int:
     """Return total stock quantity across all goods."""
     with Database().session() as s:
@@ -180,24 +192,28 @@ def select_count_items() -> int:
         return int(result) if result else 0
 
 
+@use_replica
 def select_count_goods() -> int:
     """Return total count of goods (positions)."""
     with Database().session() as s:
         return s.query(Goods).count()
 
 
+@use_replica
 def select_count_categories() -> int:
     """Return total count of categories."""
     with Database().session() as s:
         return s.query(Categories).count()
 
 
+@use_replica
 def select_count_bought_items() -> int:
     """Return total count of bought items."""
     with Database().session() as s:
         return s.query(BoughtGoods).count()
 
 
+@use_replica
 def select_today_orders(date: str) -> Decimal:
     """Return total revenue for given date (YYYY-MM-DD)."""
     start_of_day, end_of_day = _day_window(date)
@@ -213,12 +229,14 @@ def select_today_orders(date: str) -> Decimal:
         return res or Decimal(0)
 
 
+@use_replica
 def select_all_orders() -> Decimal:
     """Return total revenue for all time (sum of BoughtGoods.price)."""
     with Database().session() as s:
         return s.query(func.sum(BoughtGoods.price)).scalar() or Decimal(0)
 
 
+@use_replica
 def select_today_operations(date: str) -> Decimal:
     """Return total operations value for given date (YYYY-MM-DD)."""
     start_of_day, end_of_day = _day_window(date)
@@ -234,6 +252,7 @@ def select_today_operations(date: str) -> Decimal:
         return res or Decimal(0)
 
 
+@use_replica
 def select_all_operations() -> Decimal:
     """Return total operations value for all time."""
     with Database().session() as s:
@@ -281,13 +300,13 @@ def get_referral_earnings_stats(referrer_id: int) -> Dict:
         }
 
 
-def get_one_referral_earning(earning_id: int) -> dict | None:
+def get_one_referral_earning(earning_id: int) -> ReferralEarningDTO | None:
     """
     Get one user referral earning info.
     """
     with Database().session() as s:
         result = s.query(ReferralEarnings).filter(ReferralEarnings.id == earning_id).first()
-        return result.__dict__ if result else None
+        return ReferralEarningDTO.from_model(result)
 
 
 def get_reference_bonus_percent() -> Decimal:
@@ -357,12 +376,12 @@ async def get_cart_items(user_id: int) -> list:
     Returns:
         List of cart items with product info
     """
-    with Database().session() as session:
-        cart_items = session.query(ShoppingCart, Goods).join(
-            Goods, ShoppingCart.item_name == Goods.name
-        ).filter(
-            ShoppingCart.user_id == user_id
-        ).all()
+    async with Database().async_session() as session:
+        cart_items = (await session.execute(
+            select(ShoppingCart, Goods)
+            .join(Goods, ShoppingCart.item_name == Goods.name)
+            .where(ShoppingCart.user_id == user_id)
+        )).all()
 
         result = []
         for cart_item, good in cart_items:
@@ -376,40 +395,40 @@ async def get_cart_items(user_id: int) -> list:
         return result
 
 
-async def query_user_orders(user_id: int, status: str = None, limit: int = 10, offset: int = 0):
+async def query_user_orders(user_id: int, status: str | list[str] = None, limit: int = 10, offset: int = 0):
     """
     Query user's orders with optional status filter
 
     Args:
         user_id: User's telegram ID
-        status: Order status filter (pending, completed, cancelled) or None for all
+        status: Order status filter (pending, completed, cancelled), list of statuses or None for all
         limit: Number of orders to return
         offset: Offset for pagination
 
     Returns:
         List of Order objects with items
     """
-    with Database().session() as session:
-        query = session.query(Order).filter(Order.buyer_id == user_id)
+    async with Database().async_session() as session:
+        # Items for the whole page are loaded in one extra IN (...) query
+        query = select(Order).options(selectinload(Order.items)).where(Order.buyer_id == user_id)
 
-        if status:
-            query = query.filter(Order.order_status == status)
+        if isinstance(status, (list, tuple)):
+            query = query.where(Order.order_status.in_(status))
+        elif status:
+            query = query.where(Order.order_status == status)
 
         query = query.order_by(Order.created_at.desc())
 
-        orders = query.limit(limit).offset(offset).all()
+        orders = (await session.scalars(query.limit(limit).offset(offset))).all()
 
         # Return order data as dicts to avoid session issues
         result = []
         for order in orders:
-            # Get order items
-            order_items = session.query(OrderItem).filter(OrderItem.order_id == order.id).all()
-
             items_data = [{
                 'item_name': item.item_name,
                 'price': float(item.price),
                 'quantity': item.quantity
-            } for item in order_items]
+            } for item in order.items]
 
             result.append({
                 'id': order.id,
@@ -442,13 +461,13 @@ async def count_user_orders(user_id: int, status: str = None) -> int:
     Returns:
         Number of orders
     """
-    with Database().session() as session:
-        query = session.query(Order).filter(Order.buyer_id == user_id)
+    async with Database().async_session() as session:
+        query = select(func.count(Order.id)).where(Order.buyer_id == user_id)
 
         if status:
-            query = query.filter(Order.order_status == status)
+            query = query.where(Order.order_status == status)
 
-        return query.count()
+        return await session.scalar(query) or 0
 
 
 async def calculate_cart_total(user_id: int) -> int:
@@ -457,7 +476,7 @@ async def calculate_cart_total(user_id: int) -> int:
     return sum(item['total'] for item in items)
 
 
-@async_cached(ttl=60, key_prefix="user")
+@async_cached(ttl=60, key_prefix="user", negative_ttl=30)
 def check_user_cached(telegram_id: int | str):
     """Cached version of check_user"""
     return check_user(telegram_id)
@@ -469,19 +488,19 @@ def check_role_cached(telegram_id: int):
     return check_role(telegram_id)
 
 
-@async_cached(ttl=1800, key_prefix="category")
+@async_cached(ttl=1800, key_prefix="category", versioned=True, negative_ttl=30)
 def check_category_cached(category_name: str):
     """Cached Category Check"""
     return check_category(category_name)
 
 
-@async_cached(ttl=1800, key_prefix="item")
+@async_cached(ttl=1800, key_prefix="item", versioned=True, negative_ttl=30)
 def check_item_cached(item_name: str):
     """Cached product verification"""
     return check_item(item_name)
 
 
-@async_cached(ttl=900, key_prefix="item_info")
+@async_cached(ttl=900, key_prefix="item_info", negative_ttl=30)
 def get_item_info_cached(item_name: str):
     """Cached product information"""
     return get_item_info(item_name)
@@ -510,26 +529,38 @@ async def invalidate_user_cache(user_id: int):
     """Invalidate user cache"""
     cache = get_cache_manager()
     if cache:
-        await cache.delete(f"user:{user_id}")
-        await cache.delete(f"role:{user_id}")
-        await cache.invalidate_pattern(f"user_stats:{user_id}:*")
-        await cache.invalidate_pattern(f"user_items:{user_id}:*")
+        await cache.delete_many(f"user:{user_id}", f"role:{user_id}")
 
 
 async def invalidate_item_cache(item_name: str):
     """Invalidate product cache"""
+    await invalidate_items_cache([item_name])
+
+
+async def invalidate_items_cache(item_names: Iterable[str]):
+    """Invalidate the cache of several products in one batch"""
     cache = get_cache_manager()
     if cache:
-        await cache.delete(f"item:{item_name}")
-        await cache.delete(f"item_info:{item_name}")
-        await cache.delete(f"item_stock:{item_name}")  # Updated from item_values
+        generation = await cache.get_generation("item")
+        keys = []
+        for item_name in item_names:
+            keys += [f"item_info:{item_name}", f"item_stock:{item_name}"]  # item_stock updated from item_values
+            if generation is not None:
+                keys.append(generation_key("item", generation, item_name))
         # Also invalidate categories, as the number of items may have changed
-        await cache.invalidate_pattern("category:*")
+        await cache.invalidate_batch(keys, namespaces=["category"])
 
 
 async def invalidate_category_cache(category_name: str):
     """Invalidate category cache"""
+    await invalidate_categories_cache([category_name])
+
+
+async def invalidate_categories_cache(category_names: Iterable[str]):
+    """Invalidate the cache of several categories in one batch"""
     cache = get_cache_manager()
     if cache:
-        await cache.delete(f"category:{category_name}")
-        await cache.invalidate_pattern(f"category_items:{category_name}:*")
+        names = list(category_names)
+        generation = await cache.get_generation("category") if names else None
+        if generation is not None:
+            await cache.delete_many(*(generation_key("category", generation, name) for name in names))
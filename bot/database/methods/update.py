@@ -1,8 +1,9 @@
 from sqlalchemy import exc
 from datetime import datetime, timezone
 
-from bot.database.methods import invalidate_user_cache, invalidate_item_cache, invalidate_category_cache
-from bot.database.methods.cache_utils import safe_create_task
+from bot.database.methods import invalidate_user_cache
+from bot.database.methods.cache_utils import safe_create_task, invalidate_item_after_commit, \
+    invalidate_category_after_commit
 from bot.database.models import User, Goods, Categories, BoughtGoods
 from bot.database import Database
 from bot.i18n import localize
@@ -33,6 +34,10 @@ def update_item(item_name: str, new_name: str, description: str, price, category
             if not goods:
                 return False, localize("admin.goods.update.position.invalid")
 
+            # Invalidate the cache once the change is committed
+            invalidate_item_after_commit(session, item_name)
+            invalidate_item_after_commit(session, new_name)
+
             if new_name == item_name:
                 goods.description = description
                 goods.price = price
@@ -67,10 +72,6 @@ def update_item(item_name: str, new_name: str, description: str, price, category
             # Remove the old merchandise
             session.query(Goods).filter(Goods.name == item_name).delete(synchronize_session=False)
 
-            safe_create_task(invalidate_item_cache(item_name))
-            if new_name != item_name:
-                safe_create_task(invalidate_item_cache(new_name))
-
             return True, None
 
     except exc.SQLAlchemyError as e:
@@ -100,11 +101,10 @@ def update_category(category_name: str, new_name: str) -> None:
             # Update the category
             category.name = new_name
 
-            s.commit()
+            invalidate_category_after_commit(s, category_name)
+            invalidate_category_after_commit(s, new_name)
 
-            safe_create_task(invalidate_category_cache(category_name))
-            if new_name != category_name:
-                safe_create_task(invalidate_category_cache(new_name))
+            s.commit()
 
         except Exception:
             s.rollback()
@@ -419,6 +419,51 @@ class BitcoinAddress(Database.BASE):
         self.address = address
 
 
+class BitcoinDerivationIndex(Database.BASE):
+    """Next receive address index of an HD wallet (xpub) address source"""
+    __tablename__ = 'btc_derivation_index'
+
+    key_fingerprint = Column(String(64), primary_key=True)
+    next_index = Column(Integer, nullable=False, default=0)
+
+    def __init__(self, key_fingerprint: str, **kw: Any):
+        super().__init__(**kw)
+        self.key_fingerprint = key_fingerprint
+
+
+class BitcoinAddressLease(Database.BASE):
+    """Prefetched address held by a running bot instance, renewed while the instance is alive"""
+    __tablename__ = 'btc_address_leases'
+
+    address = Column(String(100), ForeignKey('bitcoin_addresses.address', ondelete="CASCADE"), primary_key=True)
+    instance_id = Column(String(32), nullable=False, index=True)
+    leased_at = Column(DateTime, nullable=False, index=True)
+
+    def __init__(self, address: str, instance_id: str, leased_at: datetime.datetime, **kw: Any):
+        super().__init__(**kw)
+        self.address = address
+        self.instance_id = instance_id
+        self.leased_at = leased_at
+
+
+class BitcoinPayment(Database.BASE):
+    """On-chain payment seen by the payment watcher for a Bitcoin order"""
+    __tablename__ = 'bitcoin_payments'
+
+    order_id = Column(Integer, ForeignKey('orders.id', ondelete="CASCADE"), primary_key=True)
+    address = Column(String(100), nullable=False)
+    status = Column(String(20), nullable=False)  # seen, underpaid, paid, received (amount unchecked), late (after expiry)
+    confirmed_sats = Column(BigInteger, nullable=False, default=0)
+    pending_sats = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False, server_default=func.now())
+
+    def __init__(self, order_id: int, address: str, status: str, **kw: Any):
+        super().__init__(**kw)
+        self.order_id = order_id
+        self.address = address
+        self.status = status
+
+
 class BotSettings(Database.BASE):
     __tablename__ = 'bot_settings'
 
@@ -489,6 +534,85 @@ class InventoryLog(Database.BASE):
         self.comment = comment
 
 
+
+class NotificationOutbox(Database.BASE):
+    __tablename__ = 'outbox'
+
+    id = Column(Integer, primary_key=True)
+    chat_id = Column(BigInteger, nullable=False)
+    kind = Column(String(30), nullable=False)  # order_confirmed, order_delivered, order_modified, bonus_refund, referral_bonus, admin_alert
+    text = Column(Text, nullable=False)
+    status = Column(String(10), nullable=False, default='pending')  # pending, sent, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False)
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
+    sent_at = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+
+    __table_args__ = (
+        Index('ix_outbox_status_next_attempt', 'status', 'next_attempt_at'),
+    )
+
+    def __init__(self, chat_id: int, kind: str, text: str,
+                 next_attempt_at: datetime.datetime = None, **kw: Any):
+        super().__init__(**kw)
+        self.chat_id = chat_id
+        self.kind = kind
+        self.text = text
+        self.status = 'pending'
+        self.attempts = 0
+        self.next_attempt_at = next_attempt_at or datetime.datetime.now(datetime.timezone.utc)
+
+
+class BroadcastJob(Database.BASE):
+    __tablename__ = 'broadcast_jobs'
+
+    id = Column(Integer, primary_key=True)
+    text = Column(Text, nullable=False)
+    parse_mode = Column(String(10), nullable=True)
+    status = Column(String(20), nullable=False, default='running', index=True)  # running, completed, cancelled
+    created_by = Column(BigInteger, ForeignKey('users.telegram_id', ondelete="SET NULL"), nullable=True)
+    total = Column(Integer, nullable=False, default=0)
+    last_user_id = Column(BigInteger, nullable=False, default=0)  # keyset cursor: last acknowledged telegram_id
+    sent = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+    blocked = Column(Integer, nullable=False, default=0)
+    progress_chat_id = Column(BigInteger, nullable=True)
+    progress_message_id = Column(Integer, nullable=True)
+    owner = Column(String(32), nullable=True)  # instance delivering the job
+    heartbeat_at = Column(DateTime, nullable=True)  # renewed by the owner on every checkpoint
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
+    updated_at = Column(DateTime, nullable=False, server_default=func.now(), onupdate=func.now())
+    finished_at = Column(DateTime, nullable=True)
+
+    def __init__(self, text: str, parse_mode: str = None, created_by: int = None, total: int = 0,
+                 progress_chat_id: int = None, progress_message_id: int = None, **kw: Any):
+        super().__init__(**kw)
+        self.text = text
+        self.parse_mode = parse_mode
+        self.status = 'running'
+        self.created_by = created_by
+        self.total = total
+        self.last_user_id = 0
+        self.sent = 0
+        self.failed = 0
+        self.blocked = 0
+        self.progress_chat_id = progress_chat_id
+        self.progress_message_id = progress_message_id
+
+
+class BotBlockedUser(Database.BASE):
+    __tablename__ = 'bot_blocked_users'
+
+    telegram_id = Column(BigInteger, ForeignKey('users.telegram_id', ondelete="CASCADE"), primary_key=True)
+    blocked_at = Column(DateTime, nullable=False, server_default=func.now())
+    broadcast_id = Column(Integer, ForeignKey('broadcast_jobs.id', ondelete="SET NULL"), nullable=True)
+
+    def __init__(self, telegram_id: int, broadcast_id: int = None, **kw: Any):
+        super().__init__(**kw)
+        self.telegram_id = telegram_id
+        self.broadcast_id = broadcast_id
+
 def register_models():
     """Create all database tables and insert default roles"""
     import logging
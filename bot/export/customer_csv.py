@@ -1,6 +1,10 @@
+import asyncio
 import csv
+import logging
+import os
+import time
 from pathlib import Path
-from typing import Optional, Dict
+from typing import Optional, Dict, Iterable, List, Tuple
 from decimal import Decimal
 import threading
 
@@ -9,7 +13,7 @@ from aiogram.client.default import DefaultBotProperties
 
 from bot.database.main import Database
 from bot.database.models.main import CustomerInfo
-from .custom_logging import log_customer_info_change
+from .custom_logging import log_customer_info_change, get_metrics_lazy
 from bot.config import EnvKeys
 
 # CSV file path
@@ -25,6 +29,9 @@ CSV_HEADERS = [
     'Client Bonus Balance'
 ]
 
+# Queued customer changes are written to the CSV at most this often
+CSV_FLUSH_INTERVAL = 5
+
 # Lock for thread-safe CSV operations
 _csv_lock = threading.Lock()
 
@@ -69,7 +76,7 @@ def get_customer_info(telegram_id: int) -> Optional[Dict]:
 
 def get_username_by_telegram_id(telegram_id: int) -> Optional[str]:
     """
-    Get username from CSV file by telegram_id
+    Get username from the customer list by telegram_id
 
     Args:
         telegram_id: Telegram ID
@@ -77,23 +84,10 @@ def get_username_by_telegram_id(telegram_id: int) -> Optional[str]:
     Returns:
         Username from CSV or None if not found or empty
     """
-    if not CUSTOMER_CSV_PATH.exists():
-        return None
-
-    with _csv_lock:
-        try:
-            with open(CUSTOMER_CSV_PATH, 'r', newline='', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    if row.get('Telegram ID') == str(telegram_id):
-                        username = row.get('Username', '').strip()
-                        # Return username only if it's not empty and not a fallback pattern
-                        if username and not username.startswith('user_'):
-                            return username
-                        return None
-        except Exception:
-            return None
-
+    username = _store.username(telegram_id)
+    # Return username only if it's not empty and not a fallback pattern
+    if username and not username.startswith('user_'):
+        return username
     return None
 
 
@@ -163,60 +157,188 @@ def create_or_update_customer_info(telegram_id: int, username: str,
     return is_new
 
 
+def _customer_row(customer: CustomerInfo, username: str) -> Dict[str, str]:
+    return {
+        'Telegram ID': str(customer.telegram_id),
+        'Username': username,
+        'Phone Number': customer.phone_number or '',
+        'Delivery Address': customer.delivery_address or '',
+        'Delivery Note': customer.delivery_note or '',
+        'Client Total Spendings': f"{float(customer.total_spendings):.2f}",
+        'Completed Orders Total': str(customer.completed_orders_count),
+        'Client Bonus Balance': f"{float(customer.bonus_balance):.2f}"
+    }
+
+
+class CustomerCsvStore:
+    """
+    The customer CSV as an export of the database, kept in memory by Telegram ID.
+
+    Changes are queued (one entry per customer, the latest username wins) and
+    written by flush(): one query for all queued customers, then a new file is
+    written next to the old one and renamed over it, so readers never see a
+    half-written list. The CLI writes the same file from another process: the
+    rows are re-read whenever the file is not the one last read or written here.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._pending: Dict[int, str] = {}
+        self._rows: Optional[Dict[int, Dict[str, str]]] = None
+        self._signature: Optional[Tuple[int, int, int]] = None
+        self._lock = threading.Lock()
+
+    def _file_signature(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def _load(self) -> Dict[int, Dict[str, str]]:
+        """Rows of the current file (kept in memory, re-read if someone else changed the file)"""
+        signature = self._file_signature()
+        if self._rows is None or signature != self._signature:
+            rows = {}
+            if self.path.exists():
+                with open(self.path, 'r', newline='', encoding='utf-8') as f:
+                    for row in csv.DictReader(f):
+                        try:
+                            rows[int(row['Telegram ID'])] = row
+                        except (KeyError, TypeError, ValueError):
+                            continue
+            self._rows = rows
+            self._signature = signature
+        return self._rows
+
+    def _write(self, rows: Iterable[Dict[str, str]]) -> None:
+        self.path.parent.mkdir(exist_ok=True)
+        temp_path = self.path.with_name(f".{self.path.name}.tmp")
+        with open(temp_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=CSV_HEADERS, extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(rows)
+        # Taken before the rename (which keeps inode and mtime), so a write by another
+        # process right after it is still noticed
+        stat = temp_path.stat()
+        os.replace(temp_path, self.path)
+        self._signature = stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def queue(self, telegram_id: int, username: str) -> None:
+        with self._lock:
+            self._pending[telegram_id] = username
+
+    def username(self, telegram_id: int) -> Optional[str]:
+        with self._lock:
+            username = self._pending.get(telegram_id)
+        if username is not None:
+            return username
+        with _csv_lock:
+            try:
+                row = self._load().get(telegram_id)
+            except Exception:
+                return None
+        return row.get('Username', '').strip() if row else None
+
+    def flush(self) -> int:
+        """Write queued changes; returns the number of customers written"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        started_at = time.monotonic()
+        try:
+            with Database().session() as session:
+                customers = session.query(CustomerInfo).filter(CustomerInfo.telegram_id.in_(list(pending))).all()
+                updates = {customer.telegram_id: _customer_row(customer, pending[customer.telegram_id])
+                           for customer in customers}
+
+            if updates:
+                with _csv_lock:
+                    rows = self._load()
+                    rows.update(updates)
+                    self._write(rows.values())
+        except Exception:
+            # Put the changes back unless newer ones were queued meanwhile
+            with self._lock:
+                self._pending = {**pending, **self._pending}
+            raise
+
+        metrics = get_metrics_lazy()
+        if metrics:
+            metrics.track_timing("customer_csv_flush", time.monotonic() - started_at)
+        return len(updates)
+
+    def replace(self, rows: List[Dict[str, str]]) -> None:
+        """Write a complete list (full resync)"""
+        with _csv_lock:
+            self._write(rows)
+            self._rows = {int(row['Telegram ID']): row for row in rows}
+
+
+_store = CustomerCsvStore(CUSTOMER_CSV_PATH)
+_task: Optional[asyncio.Task] = None
+
+
 def sync_customer_to_csv(telegram_id: int, username: str):
     """
     Sync a customer's information to the CSV file
 
+    While the CSV writer runs (the bot), the change is queued and written with
+    the next flush; elsewhere (CLI) it is written right away.
+
     Args:
         telegram_id: Telegram ID
         username: Telegram username
     """
-    initialize_customer_csv()
+    _store.queue(telegram_id, username)
+    if _task is None:
+        flush_customer_csv()
 
-    customer = get_customer_info(telegram_id)
-    if not customer:
-        return
 
-    with _csv_lock:
-        # Read existing CSV
-        rows = []
-        customer_exists = False
-
-        with open(CUSTOMER_CSV_PATH, 'r', newline='', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                # Search by Telegram ID instead of Username
-                if row.get('Telegram ID') == str(telegram_id):
-                    # Update existing row (including username if it changed)
-                    row['Telegram ID'] = str(telegram_id)
-                    row['Username'] = username
-                    row['Phone Number'] = customer['phone_number'] or ''
-                    row['Delivery Address'] = customer['delivery_address'] or ''
-                    row['Delivery Note'] = customer['delivery_note'] or ''
-                    row['Client Total Spendings'] = f"{customer['total_spendings']:.2f}"
-                    row['Completed Orders Total'] = str(customer['completed_orders_count'])
-                    row['Client Bonus Balance'] = f"{customer['bonus_balance']:.2f}"
-                    customer_exists = True
-                rows.append(row)
-
-        # Add new customer if doesn't exist
-        if not customer_exists:
-            rows.append({
-                'Telegram ID': str(telegram_id),
-                'Username': username,
-                'Phone Number': customer['phone_number'] or '',
-                'Delivery Address': customer['delivery_address'] or '',
-                'Delivery Note': customer['delivery_note'] or '',
-                'Client Total Spendings': f"{customer['total_spendings']:.2f}",
-                'Completed Orders Total': str(customer['completed_orders_count']),
-                'Client Bonus Balance': f"{customer['bonus_balance']:.2f}"
-            })
-
-        # Write back to CSV
-        with open(CUSTOMER_CSV_PATH, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=CSV_HEADERS)
-            writer.writeheader()
-            writer.writerows(rows)
+def flush_customer_csv() -> int:
+    """Write queued customer changes to the CSV now"""
+    return _store.flush()
+
+
+async def _flush_in_background() -> None:
+    # Lazy import to avoid circular dependency
+    from bot.database.executor import run_db
+    try:
+        await run_db(_store.flush)
+    except Exception as e:
+        logging.error(f"Error writing customer CSV: {e}")
+
+
+async def _flush_loop(interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        if _store.pending:
+            await _flush_in_background()
+
+
+def start_customer_csv_writer(interval: float = CSV_FLUSH_INTERVAL) -> None:
+    """Queue customer CSV changes and write them in the background (call on startup)"""
+    global _task
+    _task = asyncio.create_task(_flush_loop(interval))
+
+
+async def stop_customer_csv_writer() -> None:
+    """Stop the background writer and write what is still queued (call on shutdown)"""
+    global _task
+    if _task:
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+        _task = None
+    await _flush_in_background()
 
 
 def update_customer_spendings(telegram_id: int, username: str, amount: Decimal):
@@ -310,32 +432,21 @@ async def sync_all_customers_to_csv():
         with Database().session() as session:
             customers = session.query(CustomerInfo).all()
 
-            with _csv_lock:
-                with open(CUSTOMER_CSV_PATH, 'w', newline='', encoding='utf-8') as f:
-                    writer = csv.DictWriter(f, fieldnames=CSV_HEADERS)
-                    writer.writeheader()
-
-                    for customer in customers:
-                        # Get username from Telegram API
-                        username = f"user_{customer.telegram_id}"  # Default fallback
-                        try:
-                            chat = await bot.get_chat(customer.telegram_id)
-                            if chat.username:
-                                username = chat.username
-                        except Exception:
-                            # If we can't get username from Telegram, use fallback
-                            pass
-
-                        writer.writerow({
-                            'Telegram ID': str(customer.telegram_id),
-                            'Username': username,
-                            'Phone Number': customer.phone_number or '',
-                            'Delivery Address': customer.delivery_address or '',
-                            'Delivery Note': customer.delivery_note or '',
-                            'Client Total Spendings': f"{float(customer.total_spendings):.2f}",
-                            'Completed Orders Total': str(customer.completed_orders_count),
-                            'Client Bonus Balance': f"{float(customer.bonus_balance):.2f}"
-                        })
+        rows = []
+        for customer in customers:
+            # Get username from Telegram API
+            username = f"user_{customer.telegram_id}"  # Default fallback
+            try:
+                chat = await bot.get_chat(customer.telegram_id)
+                if chat.username:
+                    username = chat.username
+            except Exception:
+                # If we can't get username from Telegram, use fallback
+                pass
+
+            rows.append(_customer_row(customer, username))
+
+        _store.replace(rows)
     finally:
         await bot.session.close()
 
@@ -350,6 +461,11 @@ def export_customers_csv(output_path: Path) -> bool:
     Returns:
         True if successful
     """
+    try:
+        flush_customer_csv()
+    except Exception:
+        return False
+
     if not CUSTOMER_CSV_PATH.exists():
         return False
 
@@ -1,14 +1,16 @@
 from datetime import datetime
 from typing import Optional
 
-from aiogram import Router, F
+from aiogram import Bot, Router, F
 from aiogram.types import CallbackQuery, Message
 from aiogram.fsm.context import FSMContext
 from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
 
 from bot.i18n import localize
 from bot.database.models import Permission
-from bot.database.methods import get_all_users
+from bot.database import run_db
+from bot.database.dto import BroadcastJobDTO
+from bot.database.methods import count_broadcast_recipients, create_broadcast_job, claim_interrupted_broadcast_job
 from bot.keyboards import back, close
 from bot.logger_mesh import audit_logger
 from bot.filters import HasPermissionFilter
@@ -33,11 +35,82 @@ async def send_message_callback_handler(call: CallbackQuery, state: FSMContext):
     await state.set_state(BroadcastFSM.waiting_message)
 
 
+async def _run_broadcast(bot: Bot, job: BroadcastJobDTO) -> BroadcastStats:
+    """Deliver a broadcast job, keeping its progress message up to date"""
+    global broadcast_manager
+
+    async def edit_progress(text: str):
+        if not job.progress_chat_id or not job.progress_message_id:
+            return
+        try:
+            await bot.edit_message_text(
+                text,
+                chat_id=job.progress_chat_id,
+                message_id=job.progress_message_id,
+                reply_markup=back("send_message")
+            )
+        except (TelegramBadRequest, TelegramForbiddenError) as e:
+            audit_logger.warning(f"Failed to update broadcast progress message: {e}")
+
+    # Progress update function
+    async def update_progress(stats: BroadcastStats):
+        progress = min((stats.sent + stats.failed) / stats.total * 100, 100) if stats.total else 100
+        await edit_progress(localize("broadcast.progress",
+                                     progress=progress,
+                                     sent=stats.sent,
+                                     total=stats.total,
+                                     failed=stats.failed,
+                                     time=int((datetime.now() - stats.start_time).total_seconds())))
+
+    # Start the mailing
+    broadcast_manager = BroadcastManager(
+        bot=bot,
+        batch_size=30
+    )
+
+    try:
+        stats = await broadcast_manager.run_job(
+            job,
+            reply_markup=close(),
+            progress_callback=update_progress
+        )
+    finally:
+        broadcast_manager = None
+
+    # Final message
+    duration = int(stats.duration) if stats.duration else 0
+    await edit_progress(localize("broadcast.done",
+                                 total=stats.total,
+                                 sent=stats.sent,
+                                 failed=stats.failed,
+                                 blocked=stats.blocked,
+                                 success=f"{stats.success_rate:.1f}",
+                                 duration=duration))
+    return stats
+
+
+async def resume_interrupted_broadcasts(bot: Bot) -> int:
+    """
+    Continue broadcasts whose instance stopped (crash, restart), from their last
+    acknowledged user. Jobs are claimed one at a time, so with several instances
+    each job is resumed by exactly one of them. Returns the number of resumed broadcasts.
+    """
+    resumed = 0
+    while True:
+        job = await run_db(claim_interrupted_broadcast_job)
+        if job is None:
+            return resumed
+
+        audit_logger.info(f"Resuming broadcast {job.id} after user {job.last_user_id} "
+                          f"({job.sent + job.failed}/{job.total} done before restart)")
+        stats = await _run_broadcast(bot, job)
+        audit_logger.info(f"Resumed broadcast {job.id} finished. Delivered to {stats.sent}/{stats.total} users")
+        resumed += 1
+
+
 @router.message(BroadcastFSM.waiting_message, F.text)
 async def broadcast_messages(message: Message, state: FSMContext):
     """Executing mailing with progress bar"""
-    global broadcast_manager
-
     try:
         # Validate broadcast message
         broadcast_msg = BroadcastMessage(
@@ -48,69 +121,37 @@ async def broadcast_messages(message: Message, state: FSMContext):
         # Sanitize HTML if needed
         safe_text = sanitize_html(broadcast_msg.text) if broadcast_msg.parse_mode == "HTML" else broadcast_msg.text
 
-        users = get_all_users()
-        user_ids = [int(row[0]) for row in users]
+        total = await run_db(count_broadcast_recipients)
 
         await message.delete()
 
         # Create a progress message
         progress_msg = await message.answer(
-            localize("broadcast.creating", ids=len(user_ids)),
+            localize("broadcast.creating", ids=total),
             reply_markup=back("send_message")
         )
 
-        # Progress update function
-        async def update_progress(stats: BroadcastStats):
-            progress = (stats.sent + stats.failed) / stats.total * 100
-
-            try:
-                await progress_msg.edit_text(
-                    localize("broadcast.progress",
-                             progress=progress,
-                             sent=stats.sent,
-                             total=stats.total,
-                             failed=stats.failed,
-                             time=int((datetime.now() - stats.start_time).total_seconds())),
-                    reply_markup=back("send_message")
-                )
-            except (TelegramBadRequest, TelegramForbiddenError) as e:
-                audit_logger.warning(f"Failed to update broadcast progress message: {e}")
-
-        # Start the mailing
-        broadcast_manager = BroadcastManager(
-            bot=message.bot,
-            batch_size=30,
-            batch_delay=1.0
+        # Store the broadcast first, so it survives a restart
+        job = await run_db(
+            create_broadcast_job,
+            text=safe_text,
+            parse_mode=str(broadcast_msg.parse_mode),
+            created_by=message.from_user.id,
+            total=total,
+            progress_chat_id=progress_msg.chat.id,
+            progress_message_id=progress_msg.message_id
         )
 
         # Track broadcast start
         metrics = get_metrics()
         if metrics:
             metrics.track_event("broadcast_started", message.from_user.id, {
-                "target_users": len(user_ids),
+                "target_users": total,
                 "message_length": len(safe_text)
             })
 
-        stats = await broadcast_manager.broadcast(
-            user_ids=user_ids,
-            text=safe_text,
-            reply_markup=close(),
-            parse_mode=str(broadcast_msg.parse_mode),
-            progress_callback=update_progress
-        )
-
-        # Final message
+        stats = await _run_broadcast(message.bot, job)
         duration = int(stats.duration) if stats.duration else 0
-        await progress_msg.edit_text(
-            localize("broadcast.done",
-                     total=stats.total,
-                     sent=stats.sent,
-                     failed=stats.failed,
-                     blocked=stats.blocked,
-                     success=f"{stats.success_rate:.1f}",
-                     duration=duration),
-            reply_markup=back("send_message")
-        )
 
         # Track broadcast completion
         metrics = get_metrics()
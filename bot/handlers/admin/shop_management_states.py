@@ -17,6 +17,7 @@ from bot.database.methods import (
     check_user_referrals, check_role_name_by_id, select_user_items,
     query_admins, query_all_users, check_user_cached
 )
+from bot.database import run_db
 from bot.keyboards import back, simple_buttons, lazy_paginated_keyboard
 from bot.filters import HasPermissionFilter
 from bot.config import EnvKeys
@@ -110,7 +111,7 @@ async def statistics_callback_handler(call: CallbackQuery):
             users=global_stats['total_users'],
             items=global_stats['total_items'],
             goods=global_stats['total_goods'],
-            categories=select_count_categories(),
+            categories=await run_db(select_count_categories),
             currency=EnvKeys.PAY_CURRENCY
         )
 
@@ -118,12 +119,12 @@ async def statistics_callback_handler(call: CallbackQuery):
         # Fallback on direct requests if cache is unavailable
         text = localize(
             "admin.shop.stats.template",
-            today_users=select_today_users(today_str),
-            admins=select_admins(),
-            users=get_user_count(),
-            items=select_count_items(),
-            goods=select_count_goods(),
-            categories=select_count_categories(),
+            today_users=await run_db(select_today_users, today_str),
+            admins=await run_db(select_admins),
+            users=await run_db(get_user_count),
+            items=await run_db(select_count_items),
+            goods=await run_db(select_count_goods),
+            categories=await run_db(select_count_categories),
             currency=EnvKeys.PAY_CURRENCY
         )
 
@@ -136,7 +137,7 @@ async def admins_callback_handler(call: CallbackQuery, state: FSMContext):
     Show list of admins with lazy loading pagination.
     """
     # Create paginator
-    paginator = LazyPaginator(query_admins, per_page=10)
+    paginator = LazyPaginator(query_admins, per_page=10, cursor_key=lambda user_id: user_id)
 
     markup = await lazy_paginated_keyboard(
         paginator=paginator,
@@ -168,7 +169,7 @@ async def navigate_admins(call: CallbackQuery, state: FSMContext):
     paginator_state = data.get('admins_paginator')
 
     # Create paginator with cached state
-    paginator = LazyPaginator(query_admins, per_page=10, state=paginator_state)
+    paginator = LazyPaginator(query_admins, per_page=10, state=paginator_state, cursor_key=lambda user_id: user_id)
 
     markup = await lazy_paginated_keyboard(
         paginator=paginator,
@@ -191,7 +192,7 @@ async def users_callback_handler(call: CallbackQuery, state: FSMContext):
     Show list of all users with lazy loading pagination.
     """
     # Create paginator
-    paginator = LazyPaginator(query_all_users, per_page=10)
+    paginator = LazyPaginator(query_all_users, per_page=10, cursor_key=lambda user_id: user_id)
 
     markup = await lazy_paginated_keyboard(
         paginator=paginator,
@@ -223,7 +224,7 @@ async def navigate_users(call: CallbackQuery, state: FSMContext):
     paginator_state = data.get('users_paginator')
 
     # Create paginator with cached state
-    paginator = LazyPaginator(query_all_users, per_page=10, state=paginator_state)
+    paginator = LazyPaginator(query_all_users, per_page=10, state=paginator_state, cursor_key=lambda user_id: user_id)
 
     markup = await lazy_paginated_keyboard(
         paginator=paginator,
@@ -251,9 +252,9 @@ async def show_user_info(call: CallbackQuery):
 
     user = await check_user_cached(user_id)
     user_info = await call.message.bot.get_chat(user_id)
-    items = select_user_items(user_id)
-    role = check_role_name_by_id(user.get('role_id'))
-    referrals = check_user_referrals(user.get('telegram_id'))
+    items = await run_db(select_user_items, user_id)
+    role = await run_db(check_role_name_by_id, user.get('role_id'))
+    referrals = await run_db(check_user_referrals, user.get('telegram_id'))
 
     text = (
         f"{localize('profile.caption', name=user_info.first_name, id=user_id)}\n\n"
@@ -337,7 +337,7 @@ async def admin_referral_earnings_handler(call: CallbackQuery, state: FSMContext
 
     # Create paginator
     query_func = partial(query_referral_earnings_from_user, user_id, referral_id)
-    paginator = LazyPaginator(query_func, per_page=10)
+    paginator = LazyPaginator(query_func, per_page=10, cursor_key=lambda earning: earning.id)
 
     # Check if there are any earnings
     total = await paginator.get_total_count()
@@ -383,7 +383,7 @@ async def admin_view_all_earnings_handler(call: CallbackQuery, state: FSMContext
 
     # Create paginator
     query_func = partial(query_all_referral_earnings, user_id)
-    paginator = LazyPaginator(query_func, per_page=10)
+    paginator = LazyPaginator(query_func, per_page=10, cursor_key=lambda earning: earning.id)
 
     # Check if there are any earnings
     total = await paginator.get_total_count()
@@ -438,7 +438,7 @@ async def admin_all_earnings_pagination_handler(call: CallbackQuery, state: FSMC
 
     # Create paginator with cached state
     query_func = partial(query_all_referral_earnings, user_id)
-    paginator = LazyPaginator(query_func, per_page=10, state=paginator_state)
+    paginator = LazyPaginator(query_func, per_page=10, state=paginator_state, cursor_key=lambda earning: earning.id)
 
     markup = await lazy_paginated_keyboard(
         paginator=paginator,
@@ -524,7 +524,7 @@ async def user_items_callback_handler(call: CallbackQuery, state: FSMContext):
 
     # Create paginator
     query_func = partial(query_user_bought_items, user_id)
-    paginator = LazyPaginator(query_func, per_page=10)
+    paginator = LazyPaginator(query_func, per_page=10, cursor_key=lambda item: item.id)
 
     markup = await lazy_paginated_keyboard(
         paginator=paginator,
@@ -8,12 +8,12 @@ from urllib.parse import urlparse
 import datetime
 
 from bot.database.methods import (
-    select_max_role_id, create_user, check_role,
+    select_max_role_id, create_user, check_role, check_user,
     select_user_items, check_user_cached,
-    get_reference_bonus_percent
+    get_reference_bonus_percent, get_bot_setting, forget_bot_blocked
 )
-from bot.database import Database
-from bot.database.models.main import CustomerInfo
+from bot.database import run_db
+from bot.export.customer_csv import get_customer_bonus_balance
 from bot.handlers.other import check_sub_channel
 from bot.keyboards import main_menu, back, profile_keyboard, check_sub
 from bot.config import EnvKeys
@@ -41,7 +41,7 @@ async def show_main_menu(message: Message, state: FSMContext):
                            if parsed.path else channel_url.replace("https://t.me/", "").replace("t.me/", "").lstrip('@')
                        ) or None
 
-    role_data = check_role(user_id)
+    role_data = await run_db(check_role, user_id)
 
     # Optional subscription check
     try:
@@ -78,26 +78,23 @@ async def start(message: Message, state: FSMContext):
     existing_user = await check_user_cached(user_id)
 
     if existing_user:
-        # User already exists, show main menu
+        # User already exists (and has unblocked the bot, if they had blocked it), show main menu
+        await run_db(forget_bot_blocked, user_id)
         await show_main_menu(message, state)
         await message.delete()
         return
 
     # Check if reference codes are enabled
-    from bot.database.main import Database
-    from bot.database.models.main import BotSettings
-
-    with Database().session() as session:
-        setting = session.query(BotSettings).filter_by(setting_key='reference_codes_enabled').first()
-        refcodes_enabled = setting and setting.setting_value.lower() == 'true' if setting else True
+    refcodes_enabled = (await run_db(get_bot_setting, 'reference_codes_enabled', 'true')).lower() == 'true'
 
     # If reference codes are disabled or user is owner, create user directly
     if not refcodes_enabled or str(user_id) == EnvKeys.OWNER_ID:
-        owner_max_role = select_max_role_id()
+        owner_max_role = await run_db(select_max_role_id)
         referral_id = message.text[7:] if len(message.text) > 7 and message.text[7:] != str(user_id) else None
         user_role = owner_max_role if str(user_id) == EnvKeys.OWNER_ID else 1
 
-        create_user(
+        await run_db(
+            create_user,
             telegram_id=int(user_id),
             registration_date=datetime.datetime.now(),
             referral_id=int(referral_id) if referral_id and referral_id.isdigit() else None,
@@ -121,13 +118,15 @@ async def back_to_menu_callback_handler(call: CallbackQuery, state: FSMContext):
     user_id = call.from_user.id
     user = await check_user_cached(user_id)
     if not user:
-        create_user(
+        await run_db(
+            create_user,
             telegram_id=user_id,
             registration_date=datetime.datetime.now(),
             referral_id=None,
             role=1
         )
-        user = await check_user_cached(user_id)
+        # The cached "not found" may not be dropped yet
+        user = await run_db(check_user, user_id)
 
     role_id = user.get('role_id')
 
@@ -165,13 +164,11 @@ async def profile_callback_handler(call: CallbackQuery, state: FSMContext):
     tg_user = call.from_user
     user_info = await check_user_cached(user_id)
 
-    items = select_user_items(user_id)
-    referral = int(get_reference_bonus_percent())
+    items = await run_db(select_user_items, user_id)
+    referral = int(await run_db(get_reference_bonus_percent))
 
     # Get referral bonus balance from CustomerInfo
-    with Database().session() as session:
-        customer_info = session.query(CustomerInfo).filter_by(telegram_id=user_id).first()
-        bonus_balance = customer_info.bonus_balance if customer_info and customer_info.bonus_balance else 0
+    bonus_balance = await run_db(get_customer_bonus_balance, user_id) or 0
 
     markup = profile_keyboard(referral, items)
     text = (
@@ -4,15 +4,18 @@ from aiogram.fsm.context import FSMContext
 import html
 from decimal import Decimal
 
+from sqlalchemy.orm import Session
+
+from bot.communication.outbox import enqueue_notification
 from bot.database import Database
 from bot.database.models.main import Order, OrderItem, CustomerInfo, ShoppingCart
-from bot.database.methods import reserve_inventory, get_cart_items, calculate_cart_total
+from bot.database.methods import flash_reserve_inventory, CheckoutQueueFull, get_cart_items, calculate_cart_total
 from bot.keyboards import back, simple_buttons
 from bot.i18n import localize
 from bot.config import EnvKeys
 from bot.states import OrderStates
 from bot.logger_mesh import logger
-from bot.payments.bitcoin import get_available_bitcoin_address, mark_bitcoin_address_used
+from bot.payments.bitcoin import get_available_bitcoin_address, claim_bitcoin_address
 from bot.export import log_order_creation, sync_customer_to_csv
 from bot.utils import generate_unique_order_code, get_telegram_username
 from bot.monitoring import get_metrics
@@ -374,6 +377,28 @@ async def finalize_order_and_payment(message: Message, state: FSMContext, user_i
     await show_payment_method_selection(message, state, user_id=user_id)
 
 
+async def reserve_order_inventory(order_id: int, items: list, payment_method: str, session, reply) -> bool:
+    """
+    Reserve stock for a new order (through the flash-sale queue when enabled).
+    On failure rolls the order back and tells the customer with reply(text, reply_markup=...).
+    """
+
+    async def on_queued(position: int):
+        await reply(localize("order.flash_sale.queued", position=position))
+
+    try:
+        success, reserve_message = await flash_reserve_inventory(order_id, items, payment_method=payment_method,
+                                                                 session=session, on_queued=on_queued)
+        error_text = localize("order.inventory.unable_to_reserve", unavailable_items=reserve_message)
+    except CheckoutQueueFull:
+        success, error_text = False, localize("order.flash_sale.busy")
+
+    if not success:
+        session.rollback()
+        await reply(error_text, reply_markup=back("view_cart"))
+    return success
+
+
 async def process_bitcoin_payment(call: CallbackQuery, state: FSMContext):
     """
     Process Bitcoin payment from callback query
@@ -393,7 +418,7 @@ async def process_bitcoin_payment(call: CallbackQuery, state: FSMContext):
     # Calculate total
     total_amount = await calculate_cart_total(user_id)
 
-    # Get Bitcoin address
+    # Check that a Bitcoin address is available before building the order
     btc_address = get_available_bitcoin_address()
 
     if not btc_address:
@@ -425,7 +450,6 @@ async def process_bitcoin_payment(call: CallbackQuery, state: FSMContext):
                 delivery_address=customer_info.delivery_address,
                 phone_number=customer_info.phone_number,
                 delivery_note=customer_info.delivery_note or "",
-                bitcoin_address=btc_address,
                 order_status="pending"
             )
             session.add(order)
@@ -459,18 +483,21 @@ async def process_bitcoin_payment(call: CallbackQuery, state: FSMContext):
                 items_summary.append(f"{item_name} x{quantity} = {cart_item['total']} {EnvKeys.PAY_CURRENCY}")
 
             # Reserve inventory for 15 minutes
-            success, msg = reserve_inventory(order.id, items_to_reserve, session)
-            if not success:
+            if not await reserve_order_inventory(order.id, items_to_reserve, 'bitcoin', session,
+                                                 call.message.edit_text):
+                return
+
+            # Claim a Bitcoin address for this order (the check above may have lost a race)
+            btc_address = claim_bitcoin_address(session, user_id, username, order.id,
+                                                order_code=order.order_code)
+            if not btc_address:
                 session.rollback()
                 await call.message.edit_text(
-                    localize("order.inventory.unable_to_reserve", unavailable_items=msg),
-                    reply_markup=back("view_cart")
+                    localize("order.payment.system_unavailable"),
+                    reply_markup=back("back_to_menu")
                 )
                 return
-
-            # Mark Bitcoin address as used with this order
-            mark_bitcoin_address_used(btc_address, user_id, username, order.id, session=session,
-                                      order_code=order.order_code)
+            order.bitcoin_address = btc_address
 
             # Log order creation
             log_order_creation(
@@ -486,6 +513,14 @@ async def process_bitcoin_payment(call: CallbackQuery, state: FSMContext):
                 order_code=order.order_code
             )
 
+            # Notify admin (sent by the outbox worker once the order commits)
+            notify_admin_new_order(
+                session, order.order_code, user_id, username,
+                "\n".join(items_summary), total_amount, btc_address,
+                customer_info.delivery_address, customer_info.phone_number,
+                customer_info.delivery_note or ""
+            )
+
             # Clear cart
             session.query(ShoppingCart).filter_by(user_id=user_id).delete()
 
@@ -522,14 +557,6 @@ async def process_bitcoin_payment(call: CallbackQuery, state: FSMContext):
                 reply_markup=back("back_to_menu")
             )
 
-            # Notify admin
-            await notify_admin_new_order(
-                call.bot, order.order_code, user_id, username,
-                "\n".join(items_summary), total_amount, btc_address,
-                customer_info.delivery_address, customer_info.phone_number,
-                customer_info.delivery_note or ""
-            )
-
             # Sync customer CSV
             sync_customer_to_csv(user_id, username)
 
@@ -572,7 +599,7 @@ async def process_bitcoin_payment_new_message(message: Message, state: FSMContex
     # Calculate final amount after bonus
     final_amount = total_amount - bonus_applied
 
-    # Get Bitcoin address
+    # Check that a Bitcoin address is available before building the order
     btc_address = get_available_bitcoin_address()
 
     if not btc_address:
@@ -618,7 +645,6 @@ async def process_bitcoin_payment_new_message(message: Message, state: FSMContex
                 delivery_address=customer_info.delivery_address,
                 phone_number=customer_info.phone_number,
                 delivery_note=customer_info.delivery_note or "",
-                bitcoin_address=btc_address,
                 order_status="pending"
             )
             session.add(order)
@@ -652,19 +678,20 @@ async def process_bitcoin_payment_new_message(message: Message, state: FSMContex
                 })
 
             # Reserve inventory for this order (extended timeout for bitcoin - 7 days)
-            success, reserve_message = reserve_inventory(order.id, items_to_reserve, payment_method='bitcoin',
-                                                         session=session)
-            if not success:
+            if not await reserve_order_inventory(order.id, items_to_reserve, 'bitcoin', session, message.answer):
+                return
+
+            # Claim a Bitcoin address for this order (the check above may have lost a race)
+            btc_address = claim_bitcoin_address(session, user_id, username, order.id,
+                                                order_code=order.order_code)
+            if not btc_address:
                 session.rollback()
                 await message.answer(
-                    localize("order.inventory.unable_to_reserve", unavailable_items=reserve_message),
-                    reply_markup=back("view_cart")
+                    localize("order.payment.system_unavailable"),
+                    reply_markup=back("back_to_menu")
                 )
                 return
-
-            # Mark Bitcoin address as used with this order
-            mark_bitcoin_address_used(btc_address, user_id, username, order.id, session=session,
-                                      order_code=order.order_code)
+            order.bitcoin_address = btc_address
 
             # Log order creation
             log_order_creation(
@@ -680,6 +707,14 @@ async def process_bitcoin_payment_new_message(message: Message, state: FSMContex
                 order_code=order.order_code
             )
 
+            # Notify admin (sent by the outbox worker once the order commits)
+            notify_admin_new_order(
+                session, order.order_code, user_id, username,
+                "\n".join(items_summary), total_amount, btc_address,
+                customer_info.delivery_address, customer_info.phone_number,
+                customer_info.delivery_note or "", bonus_applied, final_amount
+            )
+
             # Clear cart
             session.query(ShoppingCart).filter_by(user_id=user_id).delete()
 
@@ -752,14 +787,6 @@ async def process_bitcoin_payment_new_message(message: Message, state: FSMContex
                 reply_markup=back("back_to_menu")
             )
 
-            # Notify admin
-            await notify_admin_new_order(
-                message.bot, order.order_code, user_id, username,
-                "\n".join(items_summary), total_amount, btc_address,
-                customer_info.delivery_address, customer_info.phone_number,
-                customer_info.delivery_note or "", bonus_applied, final_amount
-            )
-
             # Sync customer CSV
             sync_customer_to_csv(user_id, username)
 
@@ -872,14 +899,7 @@ async def process_cash_payment_new_message(message: Message, state: FSMContext,
                 })
 
             # Reserve inventory for this order (configurable timeout for cash - default 24 hours)
-            success, reserve_message = reserve_inventory(order.id, items_to_reserve, payment_method='cash',
-                                                         session=session)
-            if not success:
-                session.rollback()
-                await message.answer(
-                    localize("order.inventory.unable_to_reserve", unavailable_items=reserve_message),
-                    reply_markup=back("view_cart")
-                )
+            if not await reserve_order_inventory(order.id, items_to_reserve, 'cash', session, message.answer):
                 return
 
             # Log order creation
@@ -896,6 +916,14 @@ async def process_cash_payment_new_message(message: Message, state: FSMContext,
                 order_code=order.order_code
             )
 
+            # Notify admin about new cash order (sent by the outbox worker once the order commits)
+            notify_admin_new_cash_order(
+                session, order.order_code, user_id, username,
+                "\n".join(items_summary), total_amount,
+                customer_info.delivery_address, customer_info.phone_number,
+                customer_info.delivery_note or "", bonus_applied, final_amount
+            )
+
             # Clear cart
             session.query(ShoppingCart).filter_by(user_id=user_id).delete()
 
@@ -973,14 +1001,6 @@ async def process_cash_payment_new_message(message: Message, state: FSMContext,
                 reply_markup=back("back_to_menu")
             )
 
-            # Notify admin about new cash order
-            await notify_admin_new_cash_order(
-                message.bot, order.order_code, user_id, username,
-                "\n".join(items_summary), total_amount,
-                customer_info.delivery_address, customer_info.phone_number,
-                customer_info.delivery_note or "", bonus_applied, final_amount
-            )
-
             # Sync customer CSV
             sync_customer_to_csv(user_id, username)
 
@@ -996,12 +1016,12 @@ async def process_cash_payment_new_message(message: Message, state: FSMContext,
             return
 
 
-async def notify_admin_new_order(bot, order_code: str, buyer_id: int, buyer_username: str,
-                                 items_summary: str, total_amount: Decimal, btc_address: str,
-                                 delivery_address: str, phone_number: str, delivery_note: str,
-                                 bonus_applied: Decimal = Decimal('0'), final_amount: Decimal = None):
+def notify_admin_new_order(session: Session, order_code: str, buyer_id: int, buyer_username: str,
+                           items_summary: str, total_amount: Decimal, btc_address: str,
+                           delivery_address: str, phone_number: str, delivery_note: str,
+                           bonus_applied: Decimal = Decimal('0'), final_amount: Decimal = None):
     """
-    Send notification to admin about new order
+    Queue notification to admin about new order (in the order's transaction)
     """
     owner_id = EnvKeys.OWNER_ID
 
@@ -1047,21 +1067,18 @@ async def notify_admin_new_order(bot, order_code: str, buyer_id: int, buyer_user
                 localize("admin.order.awaiting_payment_status")
         )
 
-        await bot.send_message(
-            int(owner_id),
-            admin_text
-        )
+        enqueue_notification(session, int(owner_id), admin_text, "admin_alert")
 
     except Exception as e:
-        logger.error(f"Failed to send admin notification: {e}")
+        logger.error(f"Failed to queue admin notification: {e}")
 
 
-async def notify_admin_new_cash_order(bot, order_code: str, buyer_id: int, buyer_username: str,
-                                      items_summary: str, total_amount: Decimal,
-                                      delivery_address: str, phone_number: str, delivery_note: str,
-                                      bonus_applied: Decimal = Decimal('0'), final_amount: Decimal = None):
+def notify_admin_new_cash_order(session: Session, order_code: str, buyer_id: int, buyer_username: str,
+                                items_summary: str, total_amount: Decimal,
+                                delivery_address: str, phone_number: str, delivery_note: str,
+                                bonus_applied: Decimal = Decimal('0'), final_amount: Decimal = None):
     """
-    Send notification to admin about new cash order
+    Queue notification to admin about new cash order (in the order's transaction)
     """
     owner_id = EnvKeys.OWNER_ID
 
@@ -1107,10 +1124,7 @@ async def notify_admin_new_cash_order(bot, order_code: str, buyer_id: int, buyer
                 "\n" + localize("admin.order.action_required_title") + "\n" +
                 localize("admin.order.use_cli_confirm", code=html.escape(order_code)))
 
-        await bot.send_message(
-            int(owner_id),
-            admin_text
-        )
+        enqueue_notification(session, int(owner_id), admin_text, "admin_alert")
 
     except Exception as e:
-        logger.error(f"Failed to send admin notification for cash order: {e}")
+        logger.error(f"Failed to queue admin notification for cash order: {e}")
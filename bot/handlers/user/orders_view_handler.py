@@ -86,38 +86,7 @@ async def view_orders_list(call: CallbackQuery, state: FSMContext):
     elif status_filter == 'active':
         # Active orders: pending, reserved, confirmed
         title = localize("myorders.active_title")
-        with Database().session() as session:
-            query = session.query(Order).filter(
-                Order.buyer_id == user_id,
-                Order.order_status.in_(['pending', 'reserved', 'confirmed'])
-            ).order_by(Order.created_at.desc())
-
-            active_orders = query.limit(10).offset(0).all()
-            orders = []
-            for order in active_orders:
-                order_items = session.query(OrderItem).filter(OrderItem.order_id == order.id).all()
-                items_data = [{
-                    'item_name': item.item_name,
-                    'price': float(item.price),
-                    'quantity': item.quantity
-                } for item in order_items]
-
-                orders.append({
-                    'id': order.id,
-                    'order_code': order.order_code,
-                    'total_price': float(order.total_price) if order.total_price else 0,
-                    'bonus_applied': float(order.bonus_applied) if order.bonus_applied else 0,
-                    'payment_method': order.payment_method,
-                    'delivery_address': order.delivery_address,
-                    'phone_number': order.phone_number,
-                    'delivery_note': order.delivery_note,
-                    'bitcoin_address': order.bitcoin_address,
-                    'order_status': order.order_status,
-                    'created_at': order.created_at,
-                    'completed_at': order.completed_at,
-                    'delivery_time': order.delivery_time,
-                    'items': items_data
-                })
+        orders = await query_user_orders(user_id, status=['pending', 'reserved', 'confirmed'], limit=10, offset=0)
     elif status_filter == 'delivered':
         status = 'delivered'
         title = localize("myorders.delivered_title")
@@ -150,7 +150,7 @@ async def referral_earnings_handler(call: CallbackQuery, state: FSMContext):
 
     # Create paginator
     query_func = partial(query_referral_earnings_from_user, user_id, referral_id)
-    paginator = LazyPaginator(query_func, per_page=10)
+    paginator = LazyPaginator(query_func, per_page=10, cursor_key=lambda earning: earning.id)
 
     # Check if there are any earnings
     total = await paginator.get_total_count()
@@ -192,7 +192,7 @@ async def view_all_earnings_handler(call: CallbackQuery, state: FSMContext):
 
     # Create paginator
     query_func = partial(query_all_referral_earnings, user_id)
-    paginator = LazyPaginator(query_func, per_page=10)
+    paginator = LazyPaginator(query_func, per_page=10, cursor_key=lambda earning: earning.id)
 
     # Check if there are any earnings
     total = await paginator.get_total_count()
@@ -246,7 +246,7 @@ async def all_earnings_pagination_handler(call: CallbackQuery, state: FSMContext
 
     # Create paginator with cached state
     query_func = partial(query_all_referral_earnings, user_id)
-    paginator = LazyPaginator(query_func, per_page=10, state=paginator_state)
+    paginator = LazyPaginator(query_func, per_page=10, state=paginator_state, cursor_key=lambda earning: earning.id)
 
     markup = await lazy_paginated_keyboard(
         paginator=paginator,
@@ -4,9 +4,11 @@ from aiogram import Router, F
 from aiogram.types import CallbackQuery, InputMediaPhoto, InputMediaVideo, ContentType
 from aiogram.fsm.context import FSMContext
 
-from bot.database.methods import get_bought_item_info, check_value, query_categories, query_user_bought_items, \
+from bot.database.methods import get_bought_item_info, check_value, query_user_bought_items, \
     get_item_info_cached
+from bot.database.methods.catalog import query_catalog_categories, query_catalog_items, ensure_catalog
 from bot.database.methods.media import get_goods_media
+from bot.database import run_db
 from bot.keyboards import item_info, back, lazy_paginated_keyboard
 from bot.i18n import localize
 from bot.config import EnvKeys
@@ -34,7 +36,7 @@ async def shop_callback_handler(call: CallbackQuery, state: FSMContext):
     Show list of shop categories with lazy loading.
     """
     # Create paginator
-    paginator = LazyPaginator(query_categories, per_page=10)
+    paginator = LazyPaginator(query_catalog_categories, per_page=10, cursor_key=lambda name: name, share_count=False)
 
     # Create keyboard
     markup = await lazy_paginated_keyboard(
@@ -67,9 +69,11 @@ async def navigate_categories(call: CallbackQuery, state: FSMContext):
 
     # Create paginator with cached state
     paginator = LazyPaginator(
-        query_categories,
+        query_catalog_categories,
         per_page=10,
-        state=paginator_state
+        state=paginator_state,
+        cursor_key=lambda name: name,
+        share_count=False
     )
 
     markup = await lazy_paginated_keyboard(
@@ -104,11 +108,8 @@ async def items_list_callback_handler(call: CallbackQuery, state: FSMContext):
         back_data = "shop"
 
     # Create paginator for items in category
-    from bot.database.methods.lazy_queries import query_items_in_category
-    from functools import partial
-
-    query_func = partial(query_items_in_category, category_name)
-    paginator = LazyPaginator(query_func, per_page=10)
+    query_func = partial(query_catalog_items, category_name)
+    paginator = LazyPaginator(query_func, per_page=10, cursor_key=lambda name: name, share_count=False)
 
     markup = await lazy_paginated_keyboard(
         paginator=paginator,
@@ -150,11 +151,9 @@ async def navigate_goods(call: CallbackQuery, state: FSMContext):
     back_data = f"categories-page_{categories_page}"
 
     # Create paginator
-    from bot.database.methods.lazy_queries import query_items_in_category
-    from functools import partial
-
-    query_func = partial(query_items_in_category, category_name)
-    paginator = LazyPaginator(query_func, per_page=10, state=paginator_state)
+    query_func = partial(query_catalog_items, category_name)
+    paginator = LazyPaginator(query_func, per_page=10, state=paginator_state, cursor_key=lambda name: name,
+                              share_count=False)
 
     markup = await lazy_paginated_keyboard(
         paginator=paginator,
@@ -197,7 +196,9 @@ async def item_info_callback_handler(call: CallbackQuery):
         back_data = "shop"
         category = ""
 
-    item_info_data = await get_item_info_cached(item_name)
+    # Served from the in-memory catalog when it is loaded (no database round trips)
+    catalog = await ensure_catalog()
+    item_info_data = catalog.get_item(item_name) if catalog else await get_item_info_cached(item_name)
     if not item_info_data:
         await call.answer(localize("shop.item.not_found"), show_alert=True)
         return
@@ -209,10 +210,18 @@ async def item_info_callback_handler(call: CallbackQuery):
     # Get detailed stock information with reservation details
     if check_value(item_name):
         quantity_line = localize("shop.item.quantity_unlimited")
+    elif catalog:
+        # The snapshot is refreshed after every committed stock change
+        quantity_line = localize(
+            "shop.item.quantity_detailed",
+            total=item_info_data.stock_quantity,
+            reserved=item_info_data.reserved_quantity,
+            available=item_info_data.available_quantity
+        )
     else:
         # Get inventory statistics (stock, reserved, available)
         from bot.database.methods.inventory import get_inventory_stats
-        inventory_stats = get_inventory_stats(item_name)
+        inventory_stats = await run_db(get_inventory_stats, item_name)
 
         if inventory_stats:
             quantity_line = localize(
@@ -226,7 +235,7 @@ async def item_info_callback_handler(call: CallbackQuery):
             quantity_line = localize("shop.item.quantity_left", count=0)
 
     # Get media for the item
-    media_list = get_goods_media(item_name)
+    media_list = catalog.get_media(item_name) if catalog else await run_db(get_goods_media, item_name)
 
     text = "\n".join([
         localize("shop.item.title", name=item_name),
@@ -270,7 +279,8 @@ async def gallery_callback_handler(call: CallbackQuery):
     Send all media for a product as a media group.
     """
     item_name = call.data[8:]  # Remove 'gallery_'
-    media_list = get_goods_media(item_name)
+    catalog = await ensure_catalog()
+    media_list = catalog.get_media(item_name) if catalog else await run_db(get_goods_media, item_name)
 
     if not media_list or len(media_list) < 2:
         await call.answer(localize("shop.item.not_found"), show_alert=True)
@@ -298,7 +308,7 @@ async def bought_items_callback_handler(call: CallbackQuery, state: FSMContext):
 
     # Create paginator for user's bought items
     query_func = partial(query_user_bought_items, user_id)
-    paginator = LazyPaginator(query_func, per_page=10)
+    paginator = LazyPaginator(query_func, per_page=10, cursor_key=lambda item: item.id)
 
     markup = await lazy_paginated_keyboard(
         paginator=paginator,
@@ -347,7 +357,7 @@ async def navigate_bought_items(call: CallbackQuery, state: FSMContext):
 
     # Create paginator with cached state
     query_func = partial(query_user_bought_items, user_id)
-    paginator = LazyPaginator(query_func, per_page=10, state=paginator_state)
+    paginator = LazyPaginator(query_func, per_page=10, state=paginator_state, cursor_key=lambda item: item.id)
 
     markup = await lazy_paginated_keyboard(
         paginator=paginator,
@@ -370,7 +380,7 @@ async def bought_item_info_callback_handler(call: CallbackQuery):
     Show details for a purchased item.
     """
     trash, item_id, back_data = call.data.split(':', 2)
-    item = get_bought_item_info(item_id)
+    item = await run_db(get_bought_item_info, item_id)
     if not item:
         await call.answer(localize("purchases.item.not_found"), show_alert=True)
         return
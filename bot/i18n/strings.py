@@ -360,6 +360,8 @@ TRANSLATIONS: dict[str, dict[str, str]] = {
 
         # === Inventory/Reservation ===
         "order.inventory.unable_to_reserve": "❌ <b>Не удается зарезервировать товары</b>\n\nСледующие товары недоступны в запрошенных количествах:\n\n{unavailable_items}\n\nПожалуйста, скорректируйте вашу корзину и попробуйте снова.",
+        "order.flash_sale.queued": "⏳ Сейчас много заказов. Ваше место в очереди: {position}",
+        "order.flash_sale.busy": "⏳ <b>Слишком много заказов</b>\n\nОчередь оформления заполнена. Пожалуйста, попробуйте снова через минуту.",
 
         # === My Orders View ===
         "myorders.title": "📦 <b>Мои заказы</b>\n\n",
@@ -425,6 +427,32 @@ TRANSLATIONS: dict[str, dict[str, str]] = {
         "admin.order.order_label": "Заказ: <b>{code}</b>",
         "admin.order.payment_cash": "Наличными при доставке",
         "admin.order.payment_method_label": "Способ оплаты: <b>{method}</b>",
+        "admin.order.payment_after_expiry": (
+            "⚠️ <b>Bitcoin оплата после закрытия заказа</b>\n\n"
+            "Заказ: <b>{code}</b> ({status})\n"
+            "Получено: {amount} BTC\n\n"
+            "Резерв товара снят. Свяжитесь с покупателем для отправки или возврата."
+        ),
+        "admin.order.payment_received": (
+            "💰 <b>Получена Bitcoin оплата</b>\n\n"
+            "Заказ: <b>{code}</b>\n"
+            "Получено: {amount} BTC\n\n"
+            "Укажите время доставки:\n"
+            "<code>python bot_cli.py order --order-code {code} --status-confirmed --delivery-time \"YYYY-MM-DD HH:MM\"</code>"
+        ),
+        "admin.order.payment_unverified": (
+            "💰 <b>Получена Bitcoin оплата, сумма не проверена</b>\n\n"
+            "Заказ: <b>{code}</b>\n"
+            "Получено: {amount} BTC\n\n"
+            "BTC_EXCHANGE_RATE не задан, заказ не подтверждён автоматически. Проверьте сумму и подтвердите заказ:\n"
+            "<code>python bot_cli.py order --order-code {code} --status-confirmed --delivery-time \"YYYY-MM-DD HH:MM\"</code>"
+        ),
+        "admin.order.payment_underpaid": (
+            "⚠️ <b>Недостаточная Bitcoin оплата</b>\n\n"
+            "Заказ: <b>{code}</b>\n"
+            "Получено: {amount} BTC\n"
+            "Ожидалось: {expected} BTC"
+        ),
         "admin.order.phone_label": "Телефон: {phone}",
         "admin.order.subtotal_label": "Подытог: <b>${amount} {currency}</b>",
         "admin.order.use_cli_confirm": "Используйте CLI для подтверждения заказа и установки времени доставки:\n<code>python bot_cli.py order --order-code {code} --status-confirmed --delivery-time \"YYYY-MM-DD HH:MM\"</code>",
@@ -475,6 +503,26 @@ TRANSLATIONS: dict[str, dict[str, str]] = {
         "order.payment.bitcoin.need_help": "Нужна помощь? Используйте /help для связи с поддержкой.",
         "order.payment.bitcoin.one_time_address": "• Этот адрес для ОДНОРАЗОВОГО использования",
         "order.payment.bitcoin.order_code": "Заказ: <b>{code}</b>",
+        "order.payment.bitcoin.payment_confirmed": (
+            "✅ Оплата заказа {code} подтверждена ({amount} BTC).\n\n"
+            "Мы готовим ваш заказ и сообщим время доставки."
+        ),
+        "order.payment.bitcoin.payment_after_expiry": (
+            "⚠️ Платёж по заказу {code} ({amount} BTC) получен после закрытия заказа (истёк срок или отменён).\n\n"
+            "Мы сообщили администратору, он свяжется с вами."
+        ),
+        "order.payment.bitcoin.payment_detected": (
+            "💰 Платёж по заказу {code} обнаружен: {amount} BTC.\n\n"
+            "Ожидаем подтверждений сети ({confirmations})..."
+        ),
+        "order.payment.bitcoin.payment_received": (
+            "💰 Платёж по заказу {code} получен ({amount} BTC).\n\n"
+            "Администратор проверит его и подтвердит заказ."
+        ),
+        "order.payment.bitcoin.payment_underpaid": (
+            "⚠️ Оплата заказа {code} меньше суммы заказа: получено {amount} BTC, ожидалось {expected} BTC.\n\n"
+            "Пожалуйста, свяжитесь с поддержкой через /help."
+        ),
         "order.payment.bitcoin.send_exact": "• Отправьте ТОЧНУЮ сумму, указанную выше",
         "order.payment.bitcoin.title": "💳 <b>Инструкции по оплате Bitcoin</b>",
         "order.payment.bitcoin.total_amount": "Сумма к оплате: <b>{amount} {currency}</b>",
@@ -894,6 +942,8 @@ TRANSLATIONS: dict[str, dict[str, str]] = {
 
         # === Inventory/Reservation ===
         "order.inventory.unable_to_reserve": "❌ <b>Unable to Reserve Items</b>\n\nThe following items are not available in the requested quantities:\n\n{unavailable_items}\n\nPlease adjust your cart and try again.",
+        "order.flash_sale.queued": "⏳ Lots of orders right now. Your place in the checkout queue: {position}",
+        "order.flash_sale.busy": "⏳ <b>Too Many Orders</b>\n\nThe checkout queue is full. Please try again in a minute.",
 
         # === My Orders View ===
         "myorders.title": "📦 <b>My Orders</b>\n\n",
@@ -958,6 +1008,32 @@ TRANSLATIONS: dict[str, dict[str, str]] = {
         "admin.order.order_label": "Order: <b>{code}</b>",
         "admin.order.payment_cash": "Cash on Delivery",
         "admin.order.payment_method_label": "Payment Method: <b>{method}</b>",
+        "admin.order.payment_after_expiry": (
+            "⚠️ <b>Bitcoin payment after the order was closed</b>\n\n"
+            "Order: <b>{code}</b> ({status})\n"
+            "Received: {amount} BTC\n\n"
+            "The reserved stock was released. Contact the customer to ship or refund."
+        ),
+        "admin.order.payment_received": (
+            "💰 <b>Bitcoin payment received</b>\n\n"
+            "Order: <b>{code}</b>\n"
+            "Received: {amount} BTC\n\n"
+            "Set the delivery time:\n"
+            "<code>python bot_cli.py order --order-code {code} --status-confirmed --delivery-time \"YYYY-MM-DD HH:MM\"</code>"
+        ),
+        "admin.order.payment_unverified": (
+            "💰 <b>Bitcoin payment received, amount not checked</b>\n\n"
+            "Order: <b>{code}</b>\n"
+            "Received: {amount} BTC\n\n"
+            "BTC_EXCHANGE_RATE is not set, so the order was not confirmed automatically. Check the amount and confirm:\n"
+            "<code>python bot_cli.py order --order-code {code} --status-confirmed --delivery-time \"YYYY-MM-DD HH:MM\"</code>"
+        ),
+        "admin.order.payment_underpaid": (
+            "⚠️ <b>Bitcoin underpayment</b>\n\n"
+            "Order: <b>{code}</b>\n"
+            "Received: {amount} BTC\n"
+            "Expected: {expected} BTC"
+        ),
         "admin.order.phone_label": "Phone: {phone}",
         "admin.order.subtotal_label": "Subtotal: <b>${amount} {currency}</b>",
         "admin.order.use_cli_confirm": "Use CLI to confirm order and set delivery time:\n<code>python bot_cli.py order --order-code {code} --status-confirmed --delivery-time \"YYYY-MM-DD HH:MM\"</code>",
@@ -1008,6 +1084,26 @@ TRANSLATIONS: dict[str, dict[str, str]] = {
         "order.payment.bitcoin.need_help": "Need help? Use /help to contact support.",
         "order.payment.bitcoin.one_time_address": "• This address is for ONE-TIME use only",
         "order.payment.bitcoin.order_code": "Order: <b>{code}</b>",
+        "order.payment.bitcoin.payment_confirmed": (
+            "✅ Payment for order {code} confirmed ({amount} BTC).\n\n"
+            "We are preparing your order and will let you know the delivery time."
+        ),
+        "order.payment.bitcoin.payment_after_expiry": (
+            "⚠️ Payment for order {code} ({amount} BTC) arrived after the order was closed (expired or cancelled).\n\n"
+            "The shop owner has been told and will contact you."
+        ),
+        "order.payment.bitcoin.payment_detected": (
+            "💰 Payment for order {code} detected: {amount} BTC.\n\n"
+            "Waiting for network confirmations ({confirmations})..."
+        ),
+        "order.payment.bitcoin.payment_received": (
+            "💰 Payment for order {code} received ({amount} BTC).\n\n"
+            "The shop owner will check it and confirm your order."
+        ),
+        "order.payment.bitcoin.payment_underpaid": (
+            "⚠️ Payment for order {code} is below the order total: received {amount} BTC, expected {expected} BTC.\n\n"
+            "Please contact support with /help."
+        ),
         "order.payment.bitcoin.send_exact": "• Send the EXACT amount shown above",
         "order.payment.bitcoin.title": "💳 <b>Bitcoin Payment Instructions</b>",
         "order.payment.bitcoin.total_amount": "Total Amount: <b>{amount} {currency}</b>",
@@ -7,7 +7,9 @@ from aiogram.client.default import DefaultBotProperties
 from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.fsm.storage.redis import RedisStorage
 
-from bot.database.methods import check_category_cached
+from bot.database import Database
+from bot.database.executor import shutdown_db_executor
+from bot.database.methods import check_category_cached, load_catalog, init_flash_sale, close_flash_sale
 from bot.handlers.admin.shop_management_states import init_stats_cache
 from bot.handlers import register_all_handlers
 from bot.database.models import register_models
@@ -15,10 +17,11 @@ from bot.logger_mesh import configure_logging
 
 from bot.config import EnvKeys, get_redis_storage, timezone
 from bot.middleware import setup_rate_limiting, RateLimitConfig, SecurityMiddleware, AuthenticationMiddleware
-from bot.caching import init_cache_manager, get_cache_manager, CacheScheduler
+from bot.caching import init_cache_manager, close_cache_manager, get_cache_manager, CacheScheduler
 from bot.monitoring import RecoveryManager, StateManager, init_metrics, get_metrics, AnalyticsMiddleware, \
     MonitoringServer
-from bot.tasks import start_file_watcher, stop_file_watcher
+from bot.tasks import start_file_watcher, stop_file_watcher, start_reservation_cleaner, stop_reservation_cleaner
+from bot.communication import start_outbox_worker, stop_outbox_worker, setup_send_governor
 
 # Global variables for components
 recovery_manager = None
@@ -50,12 +53,21 @@ async def __on_start_up(dp: Dispatcher, bot: Bot) -> None:
     register_all_handlers(dp)
 
     # Load Bitcoin addresses from file into database
-    from bot.payments.bitcoin import load_bitcoin_addresses_from_file, get_bitcoin_address_stats
+    from bot.payments.bitcoin import load_bitcoin_addresses_from_file, get_bitcoin_address_stats, init_address_pool
     loaded_count = load_bitcoin_addresses_from_file()
-    stats = get_bitcoin_address_stats()
     if loaded_count > 0:
         logging.info(f"Loaded {loaded_count} new Bitcoin addresses from btc_addresses.txt")
-    logging.info(f"Bitcoin address pool: {stats['available']} available, {stats['used']} used, {stats['total']} total")
+
+    # Pre-claim addresses for checkout (BTC_ADDRESS_PREFETCH, disabled by default)
+    address_pool = init_address_pool()
+    if address_pool is not None:
+        logging.info(f"Bitcoin address prefetch pool: {len(address_pool)} of {address_pool.size} addresses")
+
+    stats = get_bitcoin_address_stats()
+    if stats['source'] == 'xpub':
+        logging.info(f"Bitcoin addresses derived from BTC_XPUB ({stats['used']} used so far)")
+    else:
+        logging.info(f"Bitcoin address pool: {stats['available']} available, {stats['used']} used, {stats['total']} total")
     if stats['available'] == 0:
         logging.warning("⚠️  No Bitcoin addresses available! Add addresses to btc_addresses.txt")
 
@@ -65,11 +77,6 @@ async def __on_start_up(dp: Dispatcher, bot: Bot) -> None:
     else:
         logging.warning("⚠️  Failed to start Bitcoin address file watcher")
 
-    # Start reservation cleaner for expired inventory reservations
-    from bot.tasks.reservation_cleaner import start_reservation_cleaner
-    start_reservation_cleaner()
-    logging.info("🧹 Inventory reservation cleaner started - expired reservations will be auto-released every 60s")
-
     # Setting Rate Limiting
     rate_config = RateLimitConfig(
         global_limit=30,
@@ -112,16 +119,39 @@ async def __on_start_up(dp: Dispatcher, bot: Bot) -> None:
     if isinstance(storage, RedisStorage):
         # Use the same Redis for caching
         await init_cache_manager(storage.redis)
+        await init_flash_sale(storage.redis)
+    else:
+        logging.warning("Redis not available - using in-process cache only")
+        await init_cache_manager(None)
+        await init_flash_sale(None)
 
-        # Initialize the statistics cache
-        init_stats_cache()
+    # Start the scheduler releasing expired inventory reservations (deadlines shared via Redis if available)
+    start_reservation_cleaner(storage.redis if isinstance(storage, RedisStorage) else None)
+    logging.info("🧹 Inventory reservation scheduler started - expired reservations are released at their deadline")
 
-        # Warm up critical caches at startup
-        await warm_up_critical_caches()
+    # Deliver queued notifications through this bot's session
+    start_outbox_worker(bot)
+    logging.info("📨 Notification outbox worker started")
 
-        logging.info("Cache system initialized and warmed up")
-    else:
-        logging.warning("Redis not available - caching disabled")
+    # Detect Bitcoin payments on-chain (BTC_PAYMENT_BACKEND, disabled by default)
+    from bot.payments.payment_watcher import start_payment_watcher
+    if start_payment_watcher():
+        logging.info(f"₿ Bitcoin payment watcher started ({EnvKeys.BTC_PAYMENT_BACKEND})")
+
+    # Write customer list changes to logs/customer_list.csv in the background
+    from bot.export import start_customer_csv_writer
+    start_customer_csv_writer()
+
+    # Initialize the statistics cache
+    init_stats_cache()
+
+    # Warm up critical caches at startup
+    await warm_up_critical_caches()
+
+    # Load the in-memory catalog used by shop browsing
+    await load_catalog()
+
+    logging.info("Cache system initialized and warmed up")
 
     # Start the recovery system
     recovery_manager = RecoveryManager(bot)
@@ -146,6 +176,10 @@ async def __on_shutdown(dp: Dispatcher, bot: Bot) -> None:
     if stop_file_watcher():
         logging.info("Bitcoin address file watcher stopped")
 
+    # Give prefetched Bitcoin addresses back to the free stock
+    from bot.payments.bitcoin import close_address_pool
+    close_address_pool()
+
     # Create a data directory if it does not exist
     Path("data").mkdir(exist_ok=True)
 
@@ -165,6 +199,24 @@ async def __on_shutdown(dp: Dispatcher, bot: Bot) -> None:
     if monitoring_server:
         await monitoring_server.stop()
 
+    # Stop the reservation scheduler and the outbox worker (undelivered messages stay queued)
+    await stop_reservation_cleaner()
+    from bot.payments.payment_watcher import stop_payment_watcher
+    await stop_payment_watcher()
+    await stop_outbox_worker()
+
+    # Write customer list changes still queued
+    from bot.export import stop_customer_csv_writer
+    await stop_customer_csv_writer()
+
+    # Stop flash-sale stock reconciliation and cache invalidation listener
+    await close_flash_sale()
+    await close_cache_manager()
+
+    # Close pooled async database connections and the sync query executor
+    await Database().dispose_async()
+    shutdown_db_executor(wait=False)
+
     logging.info("Shutdown completed")
 
 
@@ -249,6 +301,9 @@ async def start_bot() -> None:
                 protect_content=False,
             ),
     ) as bot:
+        # Pace every API call (replies, notifications, broadcasts) through one token bucket
+        setup_send_governor(bot)
+
         # Getting information about the bot
         bot_info = await bot.get_me()
         logging.info(f"Starting bot: @{bot_info.username} (ID: {bot_info.id})")
@@ -164,8 +164,9 @@ class RateLimitMiddleware(BaseMiddleware):
             return False
 
         try:
+            from bot.database import run_db
             from bot.database.methods import check_role
-            role = check_role(user_id)
+            role = await run_db(check_role, user_id)
             return role > 1  # ADMIN or OWNER
         except Exception:
             return False
@@ -263,8 +263,9 @@ class AuthenticationMiddleware(BaseMiddleware):
                 return role
 
         # Download from DB
+        from bot.database import run_db
         from bot.database.methods import check_role
-        role = check_role(user_id) or 0
+        role = await run_db(check_role, user_id) or 0
 
         # Refresh cache
         self.admin_cache[user_id] = (role, time.time())
@@ -540,6 +540,11 @@ class MonitoringServer:
                 "pool": pool_stats
             }
 
+            if db.replica_engine is not None:
+                health_status["checks"]["database_replica"] = (
+                    "ok" if await db.async_replica_available() else "unavailable, reads use primary"
+                )
+
             # Check if pool is near exhaustion
             if pool_stats["checked_out"] > pool_stats["size"] * 0.9:
                 health_status["checks"]["database"]["warning"] = "connection pool nearly exhausted"
@@ -574,18 +579,24 @@ class MonitoringServer:
 
         # Bitcoin address pool check - using SQLAlchemy ORM
         try:
-            with Database().session() as s:
-                result = s.query(func.count(BitcoinAddress.address)).filter(
-                    BitcoinAddress.is_used == False
-                ).scalar()
-
-                health_status["checks"]["bitcoin_pool"] = {
-                    "available": result,
-                    "status": "ok" if result >= 10 else "warning" if result >= 5 else "critical"
-                }
+            from bot.payments.bitcoin import get_address_source
+            source = get_address_source()
+            if source.unlimited:
+                # Derived from an xpub: never runs out
+                health_status["checks"]["bitcoin_pool"] = {"source": source.name, "status": "ok"}
+            else:
+                with Database().session() as s:
+                    result = s.query(func.count(BitcoinAddress.address)).filter(
+                        BitcoinAddress.is_used == False
+                    ).scalar()
+
+                    health_status["checks"]["bitcoin_pool"] = {
+                        "available": result,
+                        "status": "ok" if result >= 10 else "warning" if result >= 5 else "critical"
+                    }
 
-                if result < 5:
-                    health_status["status"] = "degraded"
+                    if result < 5:
+                        health_status["status"] = "degraded"
 
         except Exception as e:
             health_status["checks"]["bitcoin_pool"] = f"error: {str(e)}"
@@ -631,7 +642,7 @@ class MonitoringServer:
 
         # Query database for current business state
         try:
-            with Database().session() as s:
+            with Database().session(readonly=True) as s:
                 # Orders by status - using SQLAlchemy ORM
                 order_stats = s.query(
                     Order.order_status,
@@ -817,7 +828,7 @@ class MonitoringServer:
             cleaner_status = {
                 "name": "Reservation Cleaner",
                 "status": "running" if cleaner_running else "not started",
-                "description": "Cleans up expired inventory reservations every 60 seconds",
+                "description": "Releases expired inventory reservations at their deadline",
                 "metrics": {
                     "orders_expired": summary.get('events', {}).get('order_expired', 0),
                     "inventory_released": summary.get('events', {}).get('inventory_released', 0)
@@ -14,6 +14,7 @@ class MetricsCollector:
         self.events: Dict[str, int] = defaultdict(int)
         self.timings: Dict[str, List[float]] = defaultdict(list)
         self.errors: Dict[str, int] = defaultdict(int)
+        self.gauges: Dict[str, float] = {}
         self.conversions: Dict[str, Dict] = {}
         self.start_time = datetime.now()
         self.last_flush = datetime.now()
@@ -66,6 +67,10 @@ class MetricsCollector:
         if len(self.timings[operation]) > 1000:
             self.timings[operation] = self.timings[operation][-1000:]
 
+    def set_gauge(self, name: str, value: float):
+        """Set the current value of a gauge (queue depth, pool usage, etc.)"""
+        self.gauges[name] = value
+
     def track_error(self, error_type: str, error_msg: str = None):
         """Error Tracking"""
         self.errors[error_type] += 1
@@ -146,6 +151,7 @@ class MetricsCollector:
             "uptime_seconds": uptime,
             "events": dict(self.events),
             "timings": avg_timings,
+            "gauges": dict(self.gauges),
             "errors": dict(self.errors),
             "conversions": conversion_rates,
             "timestamp": datetime.now().isoformat()
@@ -284,6 +290,11 @@ class MetricsCollector:
                 clean_op = op.replace("-", "_").replace("/", "_").replace(" ", "_")
                 lines.append(f'bot_operation_duration_seconds{{operation="{clean_op}"}} {avg_time}')
 
+        # Gauges
+        for name, value in self.gauges.items():
+            clean_name = name.replace("-", "_").replace("/", "_").replace(" ", "_")
+            lines.append(f'bot_gauge{{name="{clean_name}"}} {value}')
+
         # Add uptime
         uptime = (datetime.now() - self.start_time).total_seconds()
         lines.append(f'bot_uptime_seconds {uptime}')
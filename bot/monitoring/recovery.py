@@ -38,6 +38,15 @@ class RecoveryManager:
         for task in self.recovery_tasks:
             task.cancel()
         await asyncio.gather(*self.recovery_tasks, return_exceptions=True)
+
+        # Broadcasts cut off by this shutdown can be resumed by another instance at once
+        try:
+            from bot.database.executor import run_db
+            from bot.database.methods.broadcasts import release_broadcast_jobs
+
+            await run_db(release_broadcast_jobs)
+        except Exception as e:
+            logger.error(f"Error releasing broadcasts: {e}")
         logger.info("Recovery manager stopped")
 
     async def _safe_run(self, coro):
@@ -51,75 +60,20 @@ class RecoveryManager:
 
     async def recover_interrupted_broadcasts(self):
         """Restore interrupted mailings"""
-        # Loading state from Redis at startup
-        try:
-            from bot.caching.cache import get_cache_manager
-
-            cache = get_cache_manager()
-            if cache:
-                broadcast_state = await cache.get("broadcast:interrupted")
-                if broadcast_state:
-                    logger.info(f"Found interrupted broadcast: {broadcast_state}")
-                    # Continue mailing from where left off
-                    await self._resume_broadcast(broadcast_state)
-        except Exception as e:
-            logger.error(f"Error recovering broadcasts: {e}")
-
-    async def _resume_broadcast(self, state: dict):
-        """Resuming an interrupted broadcast"""
-        try:
-            from bot.caching.cache import get_cache_manager
-
-            logger.info(f"Attempting to resume broadcast from state: {state}")
-
-            # Validate state has required fields
-            if not all(key in state for key in ['user_ids', 'sent_count', 'message_text']):
-                logger.error("Invalid broadcast state, missing required fields")
-                return
+        from bot.database.methods.broadcasts import BROADCAST_LEASE
+        from bot.handlers.admin.broadcast import resume_interrupted_broadcasts
 
-            user_ids = state['user_ids']
-            sent_count = state['sent_count']
-            message_text = state['message_text']
-
-            # Calculate remaining users
-            remaining_users = user_ids[sent_count:]
-
-            if not remaining_users:
-                logger.info("Broadcast already completed, nothing to resume")
-                # Clear the interrupted state
-                cache = get_cache_manager()
-                if cache:
-                    await cache.delete("broadcast:interrupted")
-                return
-
-            logger.info(f"Resuming broadcast: {len(remaining_users)} users remaining")
-
-            # Import broadcast function
+        # Running broadcast jobs whose instance stopped checkpointing were cut off by a
+        # restart or a crash (of this or another instance): checked again every lease period
+        while self.running:
             try:
-                from bot.handlers.admin.broadcast_handler import send_broadcast_to_users
-
-                # Resume broadcast for remaining users
-                success_count = await send_broadcast_to_users(
-                    bot=self.bot,
-                    user_ids=remaining_users,
-                    message_text=message_text
-                )
-
-                logger.info(f"Resumed broadcast completed: {success_count} messages sent")
-
-                # Clear the interrupted state on successful completion
-                cache = get_cache_manager()
-                if cache:
-                    await cache.delete("broadcast:interrupted")
-                    await cache.delete("broadcast:state")
-
-            except ImportError:
-                logger.error("Could not import broadcast function, cannot resume")
+                resumed = await resume_interrupted_broadcasts(self.bot)
+                if resumed:
+                    logger.info(f"Resumed {resumed} interrupted broadcast(s)")
             except Exception as e:
-                logger.error(f"Error during broadcast resume: {e}")
+                logger.error(f"Error recovering broadcasts: {e}")
 
-        except Exception as e:
-            logger.error(f"Failed to resume broadcast: {e}", exc_info=True)
+            await asyncio.sleep(BROADCAST_LEASE.total_seconds())
 
     async def periodic_health_check(self):
         """Periodic system health checks with recovery actions"""
@@ -201,17 +155,32 @@ class RecoveryManager:
     async def check_bitcoin_address_pool(self):
         """Check Bitcoin address pool and alert if low"""
         try:
+            from bot.database.executor import run_db
+            from bot.payments.bitcoin import get_address_pool, get_address_source, renew_address_leases
+            if get_address_source().unlimited:
+                return
+
+            # Keep this instance's prefetched addresses, free those of instances that died
+            released = await run_db(renew_address_leases)
+            if released:
+                logger.info(f"Released {released} Bitcoin addresses prefetched by a stopped instance")
+
             with Database().session() as s:
                 # Check available Bitcoin addresses using SQLAlchemy ORM
                 available = s.query(func.count(BitcoinAddress.address)).filter(
                     BitcoinAddress.is_used == False
                 ).scalar()
 
-                if available < 5:
-                    logger.critical(f"CRITICAL: Bitcoin address pool critically low! Only {available} addresses available")
-                    # Could send notification to admin here
-                elif available < 10:
-                    logger.warning(f"WARNING: Bitcoin address pool running low: {available} addresses available")
+            # Addresses waiting in the prefetch pool are still available
+            pool = get_address_pool()
+            if pool is not None:
+                available += len(pool)
+
+            if available < 5:
+                logger.critical(f"CRITICAL: Bitcoin address pool critically low! Only {available} addresses available")
+                # Could send notification to admin here
+            elif available < 10:
+                logger.warning(f"WARNING: Bitcoin address pool running low: {available} addresses available")
 
         except Exception as e:
             logger.error(f"Error checking Bitcoin address pool: {e}")
@@ -1,18 +1,109 @@
+import hashlib
+import os
+import time
+import uuid
+from collections import deque
 from pathlib import Path
-from typing import Optional, List
-from datetime import datetime
+from typing import Deque, Iterable, Optional, List, Set
+from datetime import datetime, timedelta
 
+from sqlalchemy import delete, event, exists, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from bot.config import EnvKeys
+from bot.database.executor import run_db
 from bot.database.main import Database
-from bot.database.models.main import BitcoinAddress
+from bot.database.methods.cache_utils import safe_create_task
+from bot.database.models.main import BitcoinAddress, BitcoinAddressLease, BitcoinDerivationIndex
 from bot.export.custom_logging import log_bitcoin_address_assigned
+from bot.logger_mesh import logger
+from bot.payments.hd_wallet import HARDENED, ExtendedPublicKey
+from bot.monitoring import get_metrics
 import threading
 
 # File path for Bitcoin addresses
 BTC_ADDRESSES_FILE = Path("btc_addresses.txt")
 
+# Append-only ledger of assigned addresses not yet compacted out of BTC_ADDRESSES_FILE
+BTC_USED_LEDGER_FILE = Path("btc_addresses_used.txt")
+
+# Addresses per INSERT IGNORE statement when importing
+IMPORT_CHUNK_SIZE = 1000
+
 # Lock for thread-safe file operations
 _file_lock = threading.Lock()
 
+# (mtime_ns, size) of BTC_ADDRESSES_FILE after the bot's own last write
+_own_write_signature: Optional[tuple] = None
+
+# Identifies this process's prefetch leases (each instance pools its own addresses)
+INSTANCE_ID = uuid.uuid4().hex
+
+# Prefetched addresses whose lease was not renewed for this long belong to a dead
+# instance and go back to the free stock (leases are renewed by the health check)
+PREFETCH_LEASE = timedelta(minutes=10)
+
+# session.info keys: pooled addresses taken by the session (returned to the pool if it
+# rolls back) and addresses assigned by it (written to the ledger once it commits)
+_SESSION_POOLED = "btc_pooled_addresses"
+_SESSION_CONSUMED = "btc_consumed_addresses"
+
+
+def parse_bitcoin_addresses(lines: Iterable[str]) -> List[str]:
+    """
+    Addresses from lines of an address file, skipping comments and empty lines
+
+    Args:
+        lines: Lines of btc_addresses.txt
+
+    Returns:
+        List of addresses in file order
+    """
+    addresses = []
+    for line in lines:
+        stripped = line.strip()
+        if stripped and not stripped.startswith('#'):
+            addresses.append(stripped)
+    return addresses
+
+
+def insert_bitcoin_addresses(addresses: Iterable[str], chunk_size: int = IMPORT_CHUNK_SIZE) -> int:
+    """
+    Insert addresses with chunked INSERT IGNORE statements (existing ones are skipped by the database)
+
+    Args:
+        addresses: Bitcoin addresses
+        chunk_size: Addresses per statement
+
+    Returns:
+        Number of addresses added
+    """
+    addresses = list(dict.fromkeys(addresses))
+    if not addresses:
+        return 0
+
+    inserted = 0
+    with Database().session() as session:
+        ignore = "OR IGNORE" if session.get_bind().dialect.name == "sqlite" else "IGNORE"
+        for start in range(0, len(addresses), chunk_size):
+            rows = [{'address': address, 'is_used': False} for address in addresses[start:start + chunk_size]]
+            result = session.execute(insert(BitcoinAddress.__table__).prefix_with(ignore).values(rows))
+            inserted += result.rowcount
+
+    return inserted
+
+
+def get_known_bitcoin_addresses() -> Set[str]:
+    """
+    Every address in the database, used or not
+
+    Returns:
+        Set of addresses
+    """
+    with Database().session() as session:
+        return {address for address, in session.query(BitcoinAddress.address)}
+
 
 def load_bitcoin_addresses_from_file() -> int:
     """
@@ -28,50 +119,28 @@ def load_bitcoin_addresses_from_file() -> int:
 
     with _file_lock:
         with open(BTC_ADDRESSES_FILE, 'r') as f:
-            # Filter out comments and empty lines
-            addresses = [
-                line.strip() for line in f
-                if line.strip() and not line.strip().startswith('#')
-            ]
+            addresses = parse_bitcoin_addresses(f)
 
-    if not addresses:
-        return 0
-
-    loaded_count = 0
-    with Database().session() as session:
-        for address in addresses:
-            # Check if address already exists
-            existing = session.query(BitcoinAddress).filter_by(address=address).first()
-            if not existing:
-                btc_addr = BitcoinAddress(address=address)
-                session.add(btc_addr)
-                loaded_count += 1
-
-        session.commit()
-
-    return loaded_count
+    return insert_bitcoin_addresses(addresses)
 
 
 def get_available_bitcoin_address() -> Optional[str]:
     """
     Get an available (unused) Bitcoin address
 
+    Only a hint for showing "payment unavailable" early: the address an order
+    gets is taken by claim_bitcoin_address() in the order transaction.
+
     Returns:
         Bitcoin address string or None if no addresses available
     """
-    with Database().session() as session:
-        btc_addr = session.query(BitcoinAddress).filter_by(is_used=False).first()
-
-        if btc_addr:
-            return btc_addr.address
-
-    return None
+    return get_address_source().peek()
 
 
 def mark_bitcoin_address_used(address: str, user_id: int, user_username: str,
                                order_id: int, session=None, order_code: str = None) -> bool:
     """
-    Mark a Bitcoin address as used and remove from file
+    Mark a Bitcoin address as used and record it in the used-address ledger
 
     Args:
         address: Bitcoin address
@@ -97,7 +166,8 @@ def mark_bitcoin_address_used(address: str, user_id: int, user_username: str,
         btc_addr.used_at = datetime.now()
         btc_addr.order_id = order_id
 
-        # Don't commit here - caller will commit
+        # Don't commit here - caller will commit (the ledger is written then)
+        session.info.setdefault(_SESSION_CONSUMED, []).append(address)
     else:
         # Create new session (for backward compatibility)
         with Database().session() as db_session:
@@ -114,8 +184,8 @@ def mark_bitcoin_address_used(address: str, user_id: int, user_username: str,
 
             db_session.commit()
 
-    # Remove from file
-    remove_bitcoin_address_from_file(address)
+        # Drop from the address file
+        record_consumed_addresses([address])
 
     # Log assignment
     log_bitcoin_address_assigned(address, order_id, user_id, user_username, order_code=order_code)
@@ -123,33 +193,540 @@ def mark_bitcoin_address_used(address: str, user_id: int, user_username: str,
     return True
 
 
-def remove_bitcoin_address_from_file(address: str):
+def _lock_free_addresses(session, limit: int) -> List[BitcoinAddress]:
+    """Lock unused addresses, skipping rows another transaction is claiming"""
+    return (session.query(BitcoinAddress)
+            .filter(BitcoinAddress.is_used == False)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .all())
+
+
+def claim_bitcoin_address(session, user_id: int, user_username: str, order_id: int,
+                          order_code: str = None) -> Optional[str]:
     """
-    Remove a Bitcoin address from the btc_addresses.txt file
+    Atomically take a Bitcoin address for an order in the caller's transaction,
+    from the configured address source
+
+    Nothing is committed here: if the transaction rolls back, the address is
+    free again.
 
     Args:
-        address: Bitcoin address to remove
+        session: SQLAlchemy session of the order transaction
+        user_id: User's Telegram ID
+        user_username: User's username
+        order_id: Order ID
+        order_code: Order code (e.g., ECBDJI) if applicable
+
+    Returns:
+        Bitcoin address string or None if no addresses available
     """
-    if not BTC_ADDRESSES_FILE.exists():
-        return
+    started_at = time.monotonic()
+
+    address = get_address_source().claim(session, user_id, order_id)
+    _report_allocation(started_at, claimed=address is not None)
+    if address is None:
+        return None
+
+    # Log assignment
+    log_bitcoin_address_assigned(address, order_id, user_id, user_username, order_code=order_code)
+
+    return address
+
+
+class FileAddressSource:
+    """
+    Addresses loaded from btc_addresses.txt
+
+    Concurrent checkouts skip each other's locked rows (FOR UPDATE SKIP LOCKED), so
+    they never get the same address and never wait for one another. With a prefetch
+    pool the address comes from memory and only its owner is written.
+    """
+    name = "file"
+    unlimited = False
+
+    def peek(self) -> Optional[str]:
+        if _pool is not None:
+            address = _pool.peek()
+            if address is not None:
+                return address
+
+        with Database().session() as session:
+            btc_addr = session.query(BitcoinAddress).filter_by(is_used=False).first()
+
+            if btc_addr:
+                return btc_addr.address
+
+        return None
+
+    def claim(self, session, user_id: int, order_id: int) -> Optional[str]:
+        address = _pool.take(session) if _pool is not None else None
+        if address is not None and not self._claim_pooled(session, address, user_id, order_id):
+            # Lease lost (e.g. released as stale while this instance was stalled): the
+            # address may be someone else's now, it must not go back to the pool either
+            logger.warning(f"Prefetched Bitcoin address {address} is no longer leased, claiming a free one")
+            session.info[_SESSION_POOLED].remove(address)
+            address = None
+
+        if address is None:
+            rows = _lock_free_addresses(session, 1)
+            if not rows:
+                return None
+
+            btc_addr = rows[0]
+            btc_addr.is_used = True
+            btc_addr.used_by = user_id
+            btc_addr.used_at = datetime.now()
+            btc_addr.order_id = order_id
+            address = btc_addr.address
+
+        # Drop from the address file once the order commits
+        session.info.setdefault(_SESSION_CONSUMED, []).append(address)
+        return address
+
+    @staticmethod
+    def _claim_pooled(session, address: str, user_id: int, order_id: int) -> bool:
+        """Assign a pooled address, only if this instance still leases it and nobody owns it"""
+        lease = session.execute(
+            delete(BitcoinAddressLease)
+            .where(BitcoinAddressLease.address == address, BitcoinAddressLease.instance_id == INSTANCE_ID)
+        )
+        if lease.rowcount != 1:
+            return False
+
+        assigned = _unclaimed(session).filter(BitcoinAddress.address == address).update(
+            {'used_by': user_id, 'used_at': datetime.now(), 'order_id': order_id},
+            synchronize_session=False
+        )
+        return assigned == 1
+
+    def available(self, session) -> int:
+        return session.query(BitcoinAddress).filter_by(is_used=False).count() + \
+            (len(_pool) if _pool is not None else 0)
+
+
+class XpubAddressSource:
+    """
+    Receive addresses derived locally from an account-level extended public key
+
+    Each claim takes the next index from a counter row in the order transaction
+    (the row lock serializes claims, a rollback gives the index back) and stores
+    the derived address as an assigned row, so the rest of the bot sees it like
+    any other address. No file, no network, and it never runs out.
+    """
+    name = "xpub"
+    unlimited = True
+
+    # Addresses already known (e.g. also pasted into btc_addresses.txt) are skipped, up to this many in a row
+    MAX_SKIPPED = 100
+
+    def __init__(self, extended_key: str):
+        self.account_key = ExtendedPublicKey.parse(extended_key)
+        self.receive_key = self.account_key.child(0)
+        self.key_fingerprint = hashlib.sha256(self.account_key.serialize().encode()).hexdigest()
+        self._ensure_counter()
+
+    def _ensure_counter(self) -> None:
+        try:
+            with Database().session() as session:
+                if session.get(BitcoinDerivationIndex, self.key_fingerprint) is None:
+                    session.add(BitcoinDerivationIndex(self.key_fingerprint, next_index=0))
+        except IntegrityError:
+            # Created by another instance meanwhile
+            pass
+
+    def derive(self, index: int) -> str:
+        return self.receive_key.child(index).address()
+
+    def _next_index(self, session) -> int:
+        """Increment the counter (locking its row until the transaction ends) and return the taken index"""
+        session.execute(
+            update(BitcoinDerivationIndex)
+            .where(BitcoinDerivationIndex.key_fingerprint == self.key_fingerprint)
+            .values(next_index=BitcoinDerivationIndex.next_index + 1)
+        )
+        return session.execute(
+            select(BitcoinDerivationIndex.next_index)
+            .where(BitcoinDerivationIndex.key_fingerprint == self.key_fingerprint)
+        ).scalar_one() - 1
+
+    def peek(self) -> Optional[str]:
+        with Database().session() as session:
+            index = session.execute(
+                select(BitcoinDerivationIndex.next_index)
+                .where(BitcoinDerivationIndex.key_fingerprint == self.key_fingerprint)
+            ).scalar_one()
+        return self.derive(index)
+
+    def claim(self, session, user_id: int, order_id: int) -> Optional[str]:
+        for _ in range(self.MAX_SKIPPED):
+            index = self._next_index(session)
+            try:
+                address = self.derive(index)
+            except ValueError:
+                # Invalid child (probability below 1 in 2**127): BIP32 says use the next index
+                continue
+            if session.get(BitcoinAddress, address) is not None:
+                continue
+
+            session.add(BitcoinAddress(address, is_used=True, used_by=user_id, used_at=datetime.now(),
+                                       order_id=order_id))
+            session.flush()
+            return address
+
+        logger.error("Bitcoin xpub source: every derived address is already in use, check BTC_XPUB")
+        return None
+
+    def available(self, session) -> int:
+        next_index = session.get(BitcoinDerivationIndex, self.key_fingerprint).next_index
+        return HARDENED - next_index
+
+
+_source = None
+
+
+def get_address_source():
+    """
+    The configured address source (BTC_ADDRESS_SOURCE), created on first use
+
+    Returns:
+        FileAddressSource or XpubAddressSource
+    """
+    global _source
+    if _source is None:
+        if EnvKeys.BTC_ADDRESS_SOURCE == "xpub":
+            if not EnvKeys.BTC_XPUB:
+                raise ValueError("BTC_ADDRESS_SOURCE=xpub requires BTC_XPUB")
+            _source = XpubAddressSource(EnvKeys.BTC_XPUB)
+        else:
+            _source = FileAddressSource()
+    return _source
+
+
+def _report_allocation(started_at: float, claimed: bool) -> None:
+    metrics = get_metrics()
+    if metrics:
+        metrics.track_timing("btc_address_allocation", time.monotonic() - started_at)
+        if not claimed:
+            metrics.track_event("btc_addresses_exhausted")
+
+
+class AddressPool:
+    """
+    Bitcoin addresses claimed ahead of checkout and handed out from memory.
+
+    Pooled rows are marked used without an owner (used_by, used_at and order_id NULL)
+    and leased to this instance in a transaction of their own, so a checkout only
+    writes the owner of an address it already holds. The pool is topped up in the
+    background once it drops to the low-water mark. Addresses taken by a transaction
+    that rolls back return to the pool; rows still pooled at shutdown, and rows whose
+    lease expired because their instance died, go back to the free stock
+    (release_prefetched_addresses).
+    """
+
+    def __init__(self, size: int, low_water: int = None):
+        self.size = size
+        self.low_water = size // 2 if low_water is None else low_water
+        self._queue: Deque[str] = deque()
+        self._lock = threading.Lock()
+        self._refilling = False
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def peek(self) -> Optional[str]:
+        with self._lock:
+            return self._queue[0] if self._queue else None
+
+    def take(self, session) -> Optional[str]:
+        """Hand out a pooled address to the session's transaction (None when the pool is empty)"""
+        with self._lock:
+            address = self._queue.popleft() if self._queue else None
+
+        if address is not None:
+            session.info.setdefault(_SESSION_POOLED, []).append(address)
+        self._schedule_refill()
+        self._report()
+        return address
+
+    def give_back(self, addresses: Iterable[str]) -> None:
+        """Return addresses of a rolled back transaction to the front of the pool"""
+        with self._lock:
+            self._queue.extendleft(reversed(list(addresses)))
+        self._report()
+
+    def refill(self) -> int:
+        """Claim free addresses up to the pool size; returns the number added"""
+        with self._lock:
+            missing = self.size - len(self._queue)
+        if missing <= 0:
+            return 0
+
+        with Database().session() as session:
+            rows = _lock_free_addresses(session, missing)
+            for row in rows:
+                row.is_used = True
+            addresses = [row.address for row in rows]
+            now = datetime.now()
+            if addresses:
+                session.execute(delete(BitcoinAddressLease).where(BitcoinAddressLease.address.in_(addresses)))
+                session.add_all(BitcoinAddressLease(address, INSTANCE_ID, now) for address in addresses)
+            self._renew(session, now)
+            session.flush()
+            available = session.query(func.count(BitcoinAddress.address)).filter(
+                BitcoinAddress.is_used == False
+            ).scalar()
+
+        with self._lock:
+            self._queue.extend(addresses)
+        self._report(available)
+        return len(addresses)
+
+    def renew(self) -> int:
+        """Extend the leases of the pooled addresses; returns the number renewed"""
+        with Database().session() as session:
+            return self._renew(session, datetime.now())
+
+    @staticmethod
+    def _renew(session, now: datetime) -> int:
+        return session.execute(
+            update(BitcoinAddressLease)
+            .where(BitcoinAddressLease.instance_id == INSTANCE_ID)
+            .values(leased_at=now)
+        ).rowcount
+
+    def release(self) -> int:
+        """Return every pooled address to the free stock; returns the number released"""
+        with self._lock:
+            addresses = list(self._queue)
+            self._queue.clear()
+        if not addresses:
+            return 0
+
+        with Database().session() as session:
+            session.execute(
+                delete(BitcoinAddressLease)
+                .where(BitcoinAddressLease.address.in_(addresses), BitcoinAddressLease.instance_id == INSTANCE_ID)
+            )
+            released = _unclaimed(session).filter(BitcoinAddress.address.in_(addresses)).update(
+                {'is_used': False}, synchronize_session=False
+            )
+        self._report()
+        return released
+
+    def _schedule_refill(self) -> None:
+        with self._lock:
+            if self._refilling or len(self._queue) > self.low_water:
+                return
+            self._refilling = True
+        safe_create_task(self._refill_in_background())
+
+    async def _refill_in_background(self) -> None:
+        try:
+            added = await run_db(self.refill)
+            if not added and not self._queue:
+                logger.warning("Bitcoin address prefetch pool is empty: no free addresses left")
+        except Exception as e:
+            logger.error(f"Error refilling Bitcoin address pool: {e}")
+        finally:
+            self._refilling = False
+
+    def _report(self, available: int = None) -> None:
+        metrics = get_metrics()
+        if metrics:
+            metrics.set_gauge("btc_addresses_prefetched", len(self._queue))
+            if available is not None:
+                metrics.set_gauge("btc_addresses_available", available + len(self._queue))
+
+
+@event.listens_for(Session, "after_commit")
+def _record_consumed_on_commit(session: Session) -> None:
+    session.info.pop(_SESSION_POOLED, None)
+    addresses = session.info.pop(_SESSION_CONSUMED, None)
+    if addresses:
+        try:
+            record_consumed_addresses(addresses)
+        except OSError as e:
+            # The database is the source of truth: the address only stays in the file
+            logger.error(f"Error writing Bitcoin address ledger: {e}")
+
+
+@event.listens_for(Session, "after_rollback")
+def _return_pooled_on_rollback(session: Session) -> None:
+    session.info.pop(_SESSION_CONSUMED, None)
+    addresses = session.info.pop(_SESSION_POOLED, None)
+    if addresses and _pool is not None:
+        _pool.give_back(addresses)
+
+
+def _unclaimed(session):
+    """Rows marked used by a prefetch pool but not assigned to anyone"""
+    return session.query(BitcoinAddress).filter(
+        BitcoinAddress.is_used == True,
+        BitcoinAddress.used_by.is_(None),
+        BitcoinAddress.used_at.is_(None),
+        BitcoinAddress.order_id.is_(None),
+    )
+
+
+_pool: Optional[AddressPool] = None
+
+
+def get_address_pool() -> Optional[AddressPool]:
+    """The prefetch pool, None when prefetching is disabled"""
+    return _pool
+
+
+def release_prefetched_addresses() -> int:
+    """
+    Return addresses left pre-claimed by a crashed run to the free stock
+
+    Only rows without a live lease are released: pools of other running instances
+    keep renewing theirs and are left alone.
+    """
+    expired = datetime.now() - PREFETCH_LEASE
+    with Database().session() as session:
+        leased = exists().where(
+            BitcoinAddressLease.address == BitcoinAddress.address,
+            BitcoinAddressLease.leased_at >= expired,
+        )
+        released = _unclaimed(session).filter(~leased).update({'is_used': False}, synchronize_session=False)
+        session.execute(delete(BitcoinAddressLease).where(BitcoinAddressLease.leased_at < expired))
+        return released
+
+
+def renew_address_leases() -> int:
+    """
+    Keep this instance's prefetched addresses leased and free those of dead
+    instances (call periodically, well within PREFETCH_LEASE)
+
+    Returns:
+        Number of addresses returned to the free stock
+    """
+    if _pool is not None:
+        _pool.renew()
+    return release_prefetched_addresses()
+
+
+def init_address_pool(size: int = None) -> Optional[AddressPool]:
+    """
+    Start prefetching addresses (BTC_ADDRESS_PREFETCH of them, 0 disables the pool).
+    Call on startup, after the addresses are loaded.
+    """
+    global _pool
+    size = EnvKeys.BTC_ADDRESS_PREFETCH if size is None else size
+
+    released = release_prefetched_addresses()
+    if released:
+        logger.info(f"Released {released} Bitcoin addresses pre-claimed by a previous run")
+
+    # Derived addresses are created at checkout, there is nothing to prefetch
+    if size <= 0 or get_address_source().name != FileAddressSource.name:
+        return None
+
+    _pool = AddressPool(size)
+    _pool.refill()
+    return _pool
+
+
+def close_address_pool() -> None:
+    """Give the pooled addresses back (call on shutdown)"""
+    global _pool
+    if _pool is not None:
+        _pool.release()
+        _pool = None
+
 
+def record_consumed_addresses(addresses: Iterable[str]):
+    """
+    Append assigned addresses to the used-address ledger
+
+    Constant time per order: the address file itself is only rewritten by
+    compact_bitcoin_address_file(), in the background.
+
+    Args:
+        addresses: Bitcoin addresses assigned to orders
+    """
+    lines = "".join(f"{address}\n" for address in addresses)
     with _file_lock:
-        # Read all lines (including comments)
-        with open(BTC_ADDRESSES_FILE, 'r') as f:
-            lines = [line.rstrip('\n') for line in f]
+        with open(BTC_USED_LEDGER_FILE, 'a') as f:
+            f.write(lines)
+
+
+def compact_bitcoin_address_file() -> int:
+    """
+    Remove addresses recorded in the used-address ledger from btc_addresses.txt
+    (keeping comments and empty lines), then empty the ledger
+
+    The file is replaced atomically and the write is remembered, so the file
+    watcher does not reload addresses because of it.
+
+    Returns:
+        Number of addresses removed from the file
+    """
+    with _file_lock:
+        if not BTC_USED_LEDGER_FILE.exists():
+            return 0
+        with open(BTC_USED_LEDGER_FILE, 'r') as f:
+            consumed = {line.strip() for line in f if line.strip()}
+        if not consumed:
+            return 0
+
+        removed = 0
+        if BTC_ADDRESSES_FILE.exists():
+            signature = _file_signature()
+            with open(BTC_ADDRESSES_FILE, 'r') as f:
+                lines = [line.rstrip('\n') for line in f]
+
+            kept = []
+            for line in lines:
+                if line.strip() in consumed:
+                    removed += 1
+                else:
+                    kept.append(line)
+
+            if removed:
+                tmp_path = BTC_ADDRESSES_FILE.with_name(BTC_ADDRESSES_FILE.name + ".tmp")
+                with open(tmp_path, 'w') as f:
+                    f.writelines(f"{line}\n" for line in kept)
+
+                # Edited by hand meanwhile: keep the edit, compact next time
+                if _file_signature() != signature:
+                    tmp_path.unlink()
+                    return 0
 
-        # Remove the specified address but keep comments
-        filtered_lines = []
-        for line in lines:
-            stripped = line.strip()
-            # Keep comments and empty lines, remove only the matching address
-            if not stripped or stripped.startswith('#') or stripped != address:
-                filtered_lines.append(line)
+                os.replace(tmp_path, BTC_ADDRESSES_FILE)
+                _remember_own_write()
 
-        # Write back
-        with open(BTC_ADDRESSES_FILE, 'w') as f:
-            for line in filtered_lines:
-                f.write(f"{line}\n")
+        # Everything in the ledger is applied now
+        open(BTC_USED_LEDGER_FILE, 'w').close()
+
+    return removed
+
+
+def _file_signature() -> Optional[tuple]:
+    try:
+        stat = BTC_ADDRESSES_FILE.stat()
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _remember_own_write():
+    """Record the address file as written by the bot (call under _file_lock, right after writing)"""
+    global _own_write_signature
+    _own_write_signature = _file_signature()
+
+
+def is_own_write() -> bool:
+    """
+    Whether the address file is exactly as the bot last wrote it
+
+    Returns:
+        True if the file has not changed since the bot's own last write
+    """
+    with _file_lock:
+        return _own_write_signature is not None and _file_signature() == _own_write_signature
 
 
 def add_bitcoin_address(address: str) -> bool:
@@ -176,6 +753,7 @@ def add_bitcoin_address(address: str) -> bool:
     with _file_lock:
         with open(BTC_ADDRESSES_FILE, 'a') as f:
             f.write(f"{address}\n")
+        _remember_own_write()
 
     return True
 
@@ -190,17 +768,7 @@ def add_bitcoin_addresses_bulk(addresses: List[str]) -> int:
     Returns:
         Number of addresses added
     """
-    added_count = 0
-
-    with Database().session() as session:
-        for address in addresses:
-            existing = session.query(BitcoinAddress).filter_by(address=address).first()
-            if not existing:
-                btc_addr = BitcoinAddress(address=address)
-                session.add(btc_addr)
-                added_count += 1
-
-        session.commit()
+    added_count = insert_bitcoin_addresses(addresses)
 
     # Add to file
     if added_count > 0:
@@ -208,6 +776,7 @@ def add_bitcoin_addresses_bulk(addresses: List[str]) -> int:
             with open(BTC_ADDRESSES_FILE, 'a') as f:
                 for address in addresses:
                     f.write(f"{address}\n")
+            _remember_own_write()
 
     return added_count
 
@@ -219,13 +788,18 @@ def get_bitcoin_address_stats() -> dict:
     Returns:
         Dictionary with stats
     """
+    source = get_address_source()
+    prefetched = len(_pool) if _pool is not None else 0
+
     with Database().session() as session:
         total = session.query(BitcoinAddress).count()
-        used = session.query(BitcoinAddress).filter_by(is_used=True).count()
-        available = total - used
+        used = session.query(BitcoinAddress).filter_by(is_used=True).count() - prefetched
+        available = source.available(session)
 
         return {
             'total': total,
             'used': used,
-            'available': available
+            'available': available,
+            'prefetched': prefetched,
+            'source': source.name
         }
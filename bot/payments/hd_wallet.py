@@ -0,0 +1,359 @@
+"""
+BIP32 public key derivation and address encoding (pure Python, no network)
+
+Only public derivation is implemented: the bot never sees a private key. An
+account-level extended public key is enough to derive every receive address
+of a BIP44 (xpub), BIP49 (ypub) or BIP84 (zpub) account.
+"""
+import hashlib
+import hmac
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+# secp256k1
+_P = 2 ** 256 - 2 ** 32 - 977
+_N = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEBAAEDCE6AF48A03BBFD25E8CD0364141
+_G = (
+    0x79BE667EF9DCBBAC55A06295CE870B07029BFCDB2DCE28D959F2815B16F81798,
+    0x483ADA7726A3C4655DA4FBFC0E1108A8FD17B448A68554199C47D08FFB10D4B8,
+)
+
+# Child indexes from 2**31 up are hardened and need the private key
+HARDENED = 2 ** 31
+
+_BASE58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+_BECH32_ALPHABET = "qpzry9x8gf2tvdw0s3jn54khce6mua7l"
+
+
+@dataclass(frozen=True)
+class _Network:
+    script: str  # p2pkh, p2sh-p2wpkh or p2wpkh
+    p2pkh_version: int
+    p2sh_version: int
+    hrp: str
+
+
+_MAINNET = dict(p2pkh_version=0x00, p2sh_version=0x05, hrp="bc")
+_TESTNET = dict(p2pkh_version=0x6F, p2sh_version=0xC4, hrp="tb")
+
+# Extended public key version bytes: address type and network
+_VERSIONS = {
+    bytes.fromhex("0488b21e"): _Network("p2pkh", **_MAINNET),  # xpub
+    bytes.fromhex("049d7cb2"): _Network("p2sh-p2wpkh", **_MAINNET),  # ypub
+    bytes.fromhex("04b24746"): _Network("p2wpkh", **_MAINNET),  # zpub
+    bytes.fromhex("043587cf"): _Network("p2pkh", **_TESTNET),  # tpub
+    bytes.fromhex("044a5262"): _Network("p2sh-p2wpkh", **_TESTNET),  # upub
+    bytes.fromhex("045f1cf6"): _Network("p2wpkh", **_TESTNET),  # vpub
+}
+
+
+# --- Elliptic curve -------------------------------------------------------
+
+def _point_add(a: Optional[Tuple[int, int]], b: Optional[Tuple[int, int]]) -> Optional[Tuple[int, int]]:
+    if a is None:
+        return b
+    if b is None:
+        return a
+    if a[0] == b[0] and (a[1] + b[1]) % _P == 0:
+        return None
+    if a == b:
+        slope = 3 * a[0] * a[0] * pow(2 * a[1], -1, _P) % _P
+    else:
+        slope = (b[1] - a[1]) * pow(b[0] - a[0], -1, _P) % _P
+    x = (slope * slope - a[0] - b[0]) % _P
+    return x, (slope * (a[0] - x) - a[1]) % _P
+
+
+def _jacobian_double(point: Tuple[int, int, int]) -> Tuple[int, int, int]:
+    x, y, z = point
+    if not y:
+        return 0, 0, 0
+    ysq = y * y % _P
+    s = 4 * x * ysq % _P
+    m = 3 * x * x % _P
+    nx = (m * m - 2 * s) % _P
+    return nx, (m * (s - nx) - 8 * ysq * ysq) % _P, 2 * y * z % _P
+
+
+def _jacobian_add(a: Tuple[int, int, int], b: Tuple[int, int, int]) -> Tuple[int, int, int]:
+    if not a[1]:
+        return b
+    if not b[1]:
+        return a
+    z1z1 = a[2] * a[2] % _P
+    z2z2 = b[2] * b[2] % _P
+    u1 = a[0] * z2z2 % _P
+    u2 = b[0] * z1z1 % _P
+    s1 = a[1] * z2z2 * b[2] % _P
+    s2 = b[1] * z1z1 * a[2] % _P
+    if u1 == u2:
+        return _jacobian_double(a) if s1 == s2 else (0, 0, 1)
+    h = u2 - u1
+    r = s2 - s1
+    h2 = h * h % _P
+    h3 = h * h2 % _P
+    u1h2 = u1 * h2 % _P
+    nx = (r * r - h3 - 2 * u1h2) % _P
+    return nx, (r * (u1h2 - nx) - s1 * h3) % _P, h * a[2] * b[2] % _P
+
+
+def _point_mul(k: int, point: Tuple[int, int] = _G) -> Optional[Tuple[int, int]]:
+    # Jacobian coordinates: one modular inverse per multiplication instead of one per step
+    result = (0, 0, 1)
+    addend = (point[0], point[1], 1)
+    while k:
+        if k & 1:
+            result = _jacobian_add(result, addend)
+        addend = _jacobian_double(addend)
+        k >>= 1
+    if not result[1]:
+        return None
+    z_inv = pow(result[2], -1, _P)
+    return result[0] * z_inv * z_inv % _P, result[1] * z_inv ** 3 % _P
+
+
+def _decompress(key: bytes) -> Tuple[int, int]:
+    if len(key) != 33 or key[0] not in (2, 3):
+        raise ValueError("Invalid compressed public key")
+    x = int.from_bytes(key[1:], "big")
+    y = pow((pow(x, 3, _P) + 7) % _P, (_P + 1) // 4, _P)
+    if (y * y - x ** 3 - 7) % _P:
+        raise ValueError("Public key is not on the curve")
+    if y & 1 != key[0] & 1:
+        y = _P - y
+    return x, y
+
+
+def _compress(point: Tuple[int, int]) -> bytes:
+    return bytes([2 + (point[1] & 1)]) + point[0].to_bytes(32, "big")
+
+
+# --- Encodings ------------------------------------------------------------
+
+def _sha256(data: bytes) -> bytes:
+    return hashlib.sha256(data).digest()
+
+
+# RIPEMD-160 constants, for OpenSSL builds without the legacy provider
+_RMD_R1 = [
+    0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15, 7, 4, 13, 1, 10, 6, 15, 3, 12, 0, 9, 5, 2, 14, 11, 8,
+    3, 10, 14, 4, 9, 15, 8, 1, 2, 7, 0, 6, 13, 11, 5, 12, 1, 9, 11, 10, 0, 8, 12, 4, 13, 3, 7, 15, 14, 5, 6, 2,
+    4, 0, 5, 9, 7, 12, 2, 10, 14, 1, 3, 8, 11, 6, 15, 13,
+]
+_RMD_R2 = [
+    5, 14, 7, 0, 9, 2, 11, 4, 13, 6, 15, 8, 1, 10, 3, 12, 6, 11, 3, 7, 0, 13, 5, 10, 14, 15, 8, 12, 4, 9, 1, 2,
+    15, 5, 1, 3, 7, 14, 6, 9, 11, 8, 12, 2, 10, 0, 4, 13, 8, 6, 4, 1, 3, 11, 15, 0, 5, 12, 2, 13, 9, 7, 10, 14,
+    12, 15, 10, 4, 1, 5, 8, 7, 6, 2, 13, 14, 0, 3, 9, 11,
+]
+_RMD_S1 = [
+    11, 14, 15, 12, 5, 8, 7, 9, 11, 13, 14, 15, 6, 7, 9, 8, 7, 6, 8, 13, 11, 9, 7, 15, 7, 12, 15, 9, 11, 7, 13, 12,
+    11, 13, 6, 7, 14, 9, 13, 15, 14, 8, 13, 6, 5, 12, 7, 5, 11, 12, 14, 15, 14, 15, 9, 8, 9, 14, 5, 6, 8, 6, 5, 12,
+    9, 15, 5, 11, 6, 8, 13, 12, 5, 12, 13, 14, 11, 8, 5, 6,
+]
+_RMD_S2 = [
+    8, 9, 9, 11, 13, 15, 15, 5, 7, 7, 8, 11, 14, 14, 12, 6, 9, 13, 15, 7, 12, 8, 9, 11, 7, 7, 12, 7, 6, 15, 13, 11,
+    9, 7, 15, 11, 8, 6, 6, 14, 12, 13, 5, 14, 13, 13, 7, 5, 15, 5, 8, 11, 14, 14, 6, 14, 6, 9, 12, 9, 12, 5, 15, 8,
+    8, 5, 12, 9, 12, 5, 14, 6, 8, 13, 6, 5, 15, 13, 11, 11,
+]
+_RMD_K1 = (0x00000000, 0x5A827999, 0x6ED9EBA1, 0x8F1BBCDC, 0xA953FD4E)
+_RMD_K2 = (0x50A28BE6, 0x5C4DD124, 0x6D703EF3, 0x7A6D76E9, 0x00000000)
+
+
+def _rmd_f(round_: int, x: int, y: int, z: int) -> int:
+    if round_ == 0:
+        return x ^ y ^ z
+    if round_ == 1:
+        return (x & y) | (~x & z)
+    if round_ == 2:
+        return (x | ~y) ^ z
+    if round_ == 3:
+        return (x & z) | (y & ~z)
+    return x ^ (y | ~z)
+
+
+def _rol(x: int, n: int) -> int:
+    x &= 0xFFFFFFFF
+    return ((x << n) | (x >> (32 - n))) & 0xFFFFFFFF
+
+
+def _ripemd160(data: bytes) -> bytes:
+    """Pure Python RIPEMD-160"""
+    state = [0x67452301, 0xEFCDAB89, 0x98BADCFE, 0x10325476, 0xC3D2E1F0]
+    message = data + b"\x80" + b"\0" * ((55 - len(data)) % 64) + (8 * len(data)).to_bytes(8, "little")
+    for offset in range(0, len(message), 64):
+        x = [int.from_bytes(message[offset + 4 * i:offset + 4 * i + 4], "little") for i in range(16)]
+        al, bl, cl, dl, el = state
+        ar, br, cr, dr, er = state
+        for j in range(80):
+            round_ = j // 16
+            t = _rol(al + _rmd_f(round_, bl, cl, dl) + x[_RMD_R1[j]] + _RMD_K1[round_], _RMD_S1[j]) + el
+            al, el, dl, cl, bl = el, dl, _rol(cl, 10), bl, t & 0xFFFFFFFF
+            t = _rol(ar + _rmd_f(4 - round_, br, cr, dr) + x[_RMD_R2[j]] + _RMD_K2[round_], _RMD_S2[j]) + er
+            ar, er, dr, cr, br = er, dr, _rol(cr, 10), br, t & 0xFFFFFFFF
+        t = (state[1] + cl + dr) & 0xFFFFFFFF
+        state[1] = (state[2] + dl + er) & 0xFFFFFFFF
+        state[2] = (state[3] + el + ar) & 0xFFFFFFFF
+        state[3] = (state[4] + al + br) & 0xFFFFFFFF
+        state[4] = (state[0] + bl + cr) & 0xFFFFFFFF
+        state[0] = t
+    return b"".join(word.to_bytes(4, "little") for word in state)
+
+
+def hash160(data: bytes) -> bytes:
+    """RIPEMD160(SHA256(data))"""
+    digest = _sha256(data)
+    try:
+        return hashlib.new("ripemd160", digest).digest()
+    except ValueError:
+        return _ripemd160(digest)
+
+
+def base58check_encode(payload: bytes) -> str:
+    data = payload + _sha256(_sha256(payload))[:4]
+    number = int.from_bytes(data, "big")
+    encoded = ""
+    while number:
+        number, remainder = divmod(number, 58)
+        encoded = _BASE58_ALPHABET[remainder] + encoded
+    padding = len(data) - len(data.lstrip(b"\0"))
+    return "1" * padding + encoded
+
+
+def base58check_decode(text: str) -> bytes:
+    number = 0
+    for char in text:
+        index = _BASE58_ALPHABET.find(char)
+        if index < 0:
+            raise ValueError(f"Invalid base58 character: {char!r}")
+        number = number * 58 + index
+    padding = len(text) - len(text.lstrip("1"))
+    data = b"\0" * padding + number.to_bytes((number.bit_length() + 7) // 8, "big")
+    payload, checksum = data[:-4], data[-4:]
+    if _sha256(_sha256(payload))[:4] != checksum:
+        raise ValueError("Invalid base58 checksum")
+    return payload
+
+
+def _bech32_polymod(values) -> int:
+    generator = (0x3B6A57B2, 0x26508E6D, 0x1EA119FA, 0x3D4233DD, 0x2A1462B3)
+    checksum = 1
+    for value in values:
+        top = checksum >> 25
+        checksum = (checksum & 0x1FFFFFF) << 5 ^ value
+        for i in range(5):
+            checksum ^= generator[i] if (top >> i) & 1 else 0
+    return checksum
+
+
+def bech32_encode_segwit(hrp: str, witness_version: int, program: bytes) -> str:
+    """Segwit v0 address (BIP173)"""
+    data = [witness_version]
+    accumulator = bits = 0
+    for byte in program:
+        accumulator = accumulator << 8 | byte
+        bits += 8
+        while bits >= 5:
+            bits -= 5
+            data.append(accumulator >> bits & 31)
+    if bits:
+        data.append(accumulator << (5 - bits) & 31)
+
+    expanded = [ord(c) >> 5 for c in hrp] + [0] + [ord(c) & 31 for c in hrp]
+    polymod = _bech32_polymod(expanded + data + [0] * 6) ^ 1
+    checksum = [polymod >> 5 * (5 - i) & 31 for i in range(6)]
+    return hrp + "1" + "".join(_BECH32_ALPHABET[d] for d in data + checksum)
+
+
+# --- Extended public keys -------------------------------------------------
+
+@dataclass(frozen=True)
+class ExtendedPublicKey:
+    """A BIP32 extended public key (xpub/ypub/zpub and their testnet forms)"""
+    version: bytes
+    depth: int
+    parent_fingerprint: bytes
+    child_number: int
+    chain_code: bytes
+    key: bytes
+
+    @classmethod
+    def parse(cls, text: str) -> "ExtendedPublicKey":
+        """
+        Decode a serialized extended public key
+
+        Args:
+            text: Base58 extended public key
+
+        Returns:
+            ExtendedPublicKey
+
+        Raises:
+            ValueError: Not a valid extended public key
+        """
+        data = base58check_decode(text.strip())
+        if len(data) != 78:
+            raise ValueError("Invalid extended key length")
+        version = data[:4]
+        if version not in _VERSIONS:
+            raise ValueError("Not an extended public key (xpub, ypub, zpub, tpub, upub or vpub)")
+        key = data[45:]
+        _decompress(key)
+        return cls(version, data[4], data[5:9], int.from_bytes(data[9:13], "big"), data[13:45], key)
+
+    def serialize(self) -> str:
+        return base58check_encode(
+            self.version + bytes([self.depth]) + self.parent_fingerprint +
+            self.child_number.to_bytes(4, "big") + self.chain_code + self.key
+        )
+
+    @property
+    def fingerprint(self) -> bytes:
+        return hash160(self.key)[:4]
+
+    def child(self, index: int) -> "ExtendedPublicKey":
+        """
+        Derive a non-hardened child key (CKDpub)
+
+        Args:
+            index: Child index, below 2**31
+
+        Returns:
+            ExtendedPublicKey of the child
+        """
+        if not 0 <= index < HARDENED:
+            raise ValueError("Hardened children cannot be derived from a public key")
+
+        digest = hmac.new(self.chain_code, self.key + index.to_bytes(4, "big"), hashlib.sha512).digest()
+        tweak = int.from_bytes(digest[:32], "big")
+        if tweak >= _N:
+            raise ValueError(f"Invalid child index {index}, use the next one")
+        point = _point_add(_point_mul(tweak), _decompress(self.key))
+        if point is None:
+            raise ValueError(f"Invalid child index {index}, use the next one")
+
+        return ExtendedPublicKey(self.version, self.depth + 1, self.fingerprint, index, digest[32:],
+                                 _compress(point))
+
+    def address(self) -> str:
+        """Address of this key, of the type its version bytes stand for"""
+        network = _VERSIONS[self.version]
+        key_hash = hash160(self.key)
+        if network.script == "p2wpkh":
+            return bech32_encode_segwit(network.hrp, 0, key_hash)
+        if network.script == "p2sh-p2wpkh":
+            return base58check_encode(bytes([network.p2sh_version]) + hash160(b"\x00\x14" + key_hash))
+        return base58check_encode(bytes([network.p2pkh_version]) + key_hash)
+
+
+def derive_receive_address(account_key: ExtendedPublicKey, index: int) -> str:
+    """
+    Receive address number `index` of an account (path <account>/0/<index>)
+
+    Args:
+        account_key: Account-level extended public key (m/44'/0'/0', m/84'/0'/0', ...)
+        index: Address index
+
+    Returns:
+        Bitcoin address
+    """
+    return account_key.child(0).child(index).address()
@@ -1,40 +1,31 @@
 from datetime import datetime
 
-from aiogram import Bot
-from aiogram.client.default import DefaultBotProperties
+from sqlalchemy.orm import Session
 
-from bot.database.models.main import Order
+from bot.communication.outbox import enqueue_notification
+from bot.database.models.main import Order, NotificationOutbox
 from bot.i18n import localize
 from bot.config.env import EnvKeys
 
 
-async def send_order_notification(telegram_id: int, message_text: str) -> bool:
+def send_order_notification(session: Session, telegram_id: int, message_text: str,
+                            kind: str = "order") -> NotificationOutbox:
     """
-    Send a notification message to user via Telegram
+    Queue a notification message to user via Telegram
+
+    The message goes to the outbox in the caller's transaction and is sent
+    by the outbox worker after the order change commits.
 
     Args:
+        session: Session of the order change
         telegram_id: Telegram user ID
         message_text: Message to send
+        kind: Notification kind (for the outbox)
 
     Returns:
-        True if sent successfully, False otherwise
+        Queued outbox message
     """
-    try:
-        bot = Bot(
-            token=EnvKeys.TOKEN,
-            default=DefaultBotProperties(parse_mode="HTML")
-        )
-
-        try:
-            await bot.send_message(telegram_id, message_text)
-            return True
-        finally:
-            await bot.session.close()
-
-    except Exception as e:
-        # Avoid emoji in print for Windows console compatibility
-        print(f"[WARNING] Failed to send notification to {telegram_id}: {str(e)[:100]}")
-        return False
+    return enqueue_notification(session, telegram_id, message_text, kind)
 
 
 def format_order_items(items: list) -> str:
@@ -55,17 +46,18 @@ def format_order_items(items: list) -> str:
     return "\n".join(items_list)
 
 
-async def notify_order_confirmed(order: Order, items: list, delivery_time: datetime) -> bool:
+def notify_order_confirmed(session: Session, order: Order, items: list, delivery_time: datetime) -> NotificationOutbox:
     """
-    Send order confirmation notification to customer
+    Queue order confirmation notification to customer
 
     Args:
+        session: Session of the order change
         order: Order object
         items: List of OrderItem objects
         delivery_time: Planned delivery time
 
     Returns:
-        True if sent successfully
+        Queued outbox message
     """
 
     # Format delivery time
@@ -82,18 +74,19 @@ async def notify_order_confirmed(order: Order, items: list, delivery_time: datet
                        total=f"{order.total_price} {EnvKeys.PAY_CURRENCY}"
                        )
 
-    return await send_order_notification(order.buyer_id, message)
+    return send_order_notification(session, order.buyer_id, message, kind="order_confirmed")
 
 
-async def notify_order_delivered(order: Order) -> bool:
+def notify_order_delivered(session: Session, order: Order) -> NotificationOutbox:
     """
-    Send order delivery confirmation to customer
+    Queue order delivery confirmation to customer
 
     Args:
+        session: Session of the order change
         order: Order object
 
     Returns:
-        True if sent successfully
+        Queued outbox message
     """
     # Format message
     message = localize("order.status.notify_order_delivered",
@@ -101,19 +94,20 @@ async def notify_order_delivered(order: Order) -> bool:
                        total=f"${order.total_price}"
                        )
 
-    return await send_order_notification(order.buyer_id, message)
+    return send_order_notification(session, order.buyer_id, message, kind="order_delivered")
 
 
-async def notify_order_modified(order: Order, changes_description: str) -> bool:
+def notify_order_modified(session: Session, order: Order, changes_description: str) -> NotificationOutbox:
     """
-    Send order modification notification to customer
+    Queue order modification notification to customer
 
     Args:
+        session: Session of the order change
         order: Order object
         changes_description: Description of changes made
 
     Returns:
-        True if sent successfully
+        Queued outbox message
     """
     # Format message
     message = localize("order.status.notify_order_modified",
@@ -122,4 +116,4 @@ async def notify_order_modified(order: Order, changes_description: str) -> bool:
                        total=f"${order.total_price}"
                        )
 
-    return await send_order_notification(order.buyer_id, message)
+    return send_order_notification(session, order.buyer_id, message, kind="order_modified")
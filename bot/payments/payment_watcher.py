@@ -0,0 +1,463 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from decimal import Decimal, ROUND_CEILING
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import aiohttp
+from sqlalchemy import and_, or_
+
+from bot.communication.outbox import enqueue_notification
+from bot.config import EnvKeys
+from bot.database.executor import run_db
+from bot.database.main import Database
+from bot.database.models.main import BitcoinPayment, Order
+from bot.i18n import localize
+from bot.logger_mesh import logger
+from bot.monitoring import get_metrics
+
+SATS_PER_BTC = 100_000_000
+
+# Bitcoin orders still waiting for their payment
+OPEN_STATUSES = ('pending', 'reserved')
+
+# Orders that ended unpaid; their addresses are still watched for LATE_PAYMENT_WINDOW
+# after the order was placed, so a payment arriving after expiry reaches the owner
+CLOSED_STATUSES = ('expired', 'cancelled', 'canceled')
+LATE_PAYMENT_WINDOW = timedelta(days=14)
+
+# A confirmed payment this much below the expected amount still counts (rounding, rate drift)
+UNDERPAYMENT_TOLERANCE = Decimal('0.01')
+
+# Pause after a failed cycle (backend or database down)
+RETRY_DELAY = 30
+
+
+class PaymentBackendError(Exception):
+    """The backend could not report balances"""
+
+
+@dataclass(frozen=True, slots=True)
+class AddressBalance:
+    """Satoshis received by an address, split at the required confirmation depth"""
+    confirmed: int
+    pending: int
+
+
+@dataclass(frozen=True, slots=True)
+class OpenOrder:
+    """A Bitcoin order waiting for payment (or recently closed unpaid), detached from its session"""
+    id: int
+    order_code: str
+    buyer_id: Optional[int]
+    address: str
+    due: Decimal
+    closed: bool
+    payment_status: Optional[str]
+    confirmed_sats: int
+    pending_sats: int
+
+
+class PaymentBackend:
+    """Reports received amounts for many addresses with one request"""
+
+    async def get_balances(self, addresses: Sequence[str], confirmations: int) -> Dict[str, AddressBalance]:
+        """Balances of the addresses that received anything (others may be left out)"""
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+
+class FakePaymentBackend(PaymentBackend):
+    """In-memory chain for tests and local development"""
+
+    def __init__(self):
+        self.transactions: Dict[str, List[List[int]]] = {}
+        self.requests = 0
+
+    def pay(self, address: str, sats: int, confirmations: int = 0) -> None:
+        self.transactions.setdefault(address, []).append([sats, confirmations])
+
+    def mine(self, blocks: int = 1) -> None:
+        for transactions in self.transactions.values():
+            for transaction in transactions:
+                transaction[1] += blocks
+
+    async def get_balances(self, addresses: Sequence[str], confirmations: int) -> Dict[str, AddressBalance]:
+        self.requests += 1
+        balances = {}
+        for address in addresses:
+            transactions = self.transactions.get(address)
+            if transactions:
+                confirmed = sum(sats for sats, depth in transactions if depth >= confirmations)
+                total = sum(sats for sats, _ in transactions)
+                balances[address] = AddressBalance(confirmed, total - confirmed)
+        return balances
+
+
+def btc_to_sats(amount: Any) -> int:
+    return int(Decimal(str(amount)) * SATS_PER_BTC)
+
+
+def format_btc(sats: int) -> str:
+    return f"{Decimal(sats) / SATS_PER_BTC:.8f}"
+
+
+class JsonRpcBackend(PaymentBackend):
+    """Sends JSON-RPC calls as one batch over a pooled HTTP session"""
+
+    def __init__(self, url: str, user: str = None, password: str = None, timeout: float = 30):
+        self.url = url
+        self.auth = aiohttp.BasicAuth(user, password or "") if user else None
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def batch(self, calls: List[Tuple[str, list]]) -> List[Any]:
+        """Results of the calls, in order"""
+        if self._session is None:
+            self._session = aiohttp.ClientSession(auth=self.auth, timeout=self.timeout)
+
+        payload = [{"jsonrpc": "2.0", "id": index, "method": method, "params": params}
+                   for index, (method, params) in enumerate(calls)]
+        try:
+            async with self._session.post(self.url, json=payload) as response:
+                response.raise_for_status()
+                replies = await response.json(content_type=None)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise PaymentBackendError(f"JSON-RPC request failed: {e}") from e
+
+        by_id = {reply.get("id"): reply for reply in replies}
+        results = []
+        for index, (method, _) in enumerate(calls):
+            reply = by_id.get(index)
+            if reply is None or reply.get("error"):
+                raise PaymentBackendError(f"{method} failed: {reply.get('error') if reply else 'no reply'}")
+            results.append(reply["result"])
+        return results
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+class BitcoindBackend(JsonRpcBackend):
+    """
+    Bitcoin Core wallet holding the shop's addresses as watch-only (for an xpub,
+    import the descriptor, e.g. wpkh(<xpub>/0/*)).
+
+    Two listreceivedbyaddress calls in one batch per cycle, however many orders are open.
+    """
+
+    async def get_balances(self, addresses: Sequence[str], confirmations: int) -> Dict[str, AddressBalance]:
+        confirmed, seen = await self.batch([
+            ("listreceivedbyaddress", [confirmations, False, True]),
+            ("listreceivedbyaddress", [0, False, True]),
+        ])
+        confirmed_sats = {entry["address"]: btc_to_sats(entry["amount"]) for entry in confirmed}
+        wanted = set(addresses)
+
+        balances = {}
+        for entry in seen:
+            address = entry["address"]
+            if address in wanted:
+                total = btc_to_sats(entry["amount"])
+                received = confirmed_sats.get(address, 0)
+                balances[address] = AddressBalance(received, total - received)
+        return balances
+
+
+class ElectrumBackend(JsonRpcBackend):
+    """
+    Electrum daemon: one getaddressbalance per open order, all in one batch.
+    Electrum balances are confirmed from one confirmation on.
+    """
+
+    async def get_balances(self, addresses: Sequence[str], confirmations: int) -> Dict[str, AddressBalance]:
+        addresses = list(addresses)
+        if not addresses:
+            return {}
+
+        results = await self.batch([("getaddressbalance", [address]) for address in addresses])
+        balances = {}
+        for address, result in zip(addresses, results):
+            confirmed = btc_to_sats(result.get("confirmed", 0))
+            pending = btc_to_sats(result.get("unconfirmed", 0))
+            if confirmed or pending:
+                balances[address] = AddressBalance(confirmed, max(pending, 0))
+        return balances
+
+
+def expected_sats(due: Decimal, exchange_rate: Optional[Decimal]) -> Optional[int]:
+    """Satoshis an order must receive, None when amounts are not checked"""
+    if not exchange_rate:
+        return None
+    return int((due / exchange_rate * SATS_PER_BTC).to_integral_value(rounding=ROUND_CEILING))
+
+
+def classify_payment(balance: AddressBalance, expected: Optional[int], closed: bool = False) -> Optional[str]:
+    """
+    seen (waiting for confirmations), underpaid, paid, received (confirmed but no
+    expected amount to check it against), late (received after the order expired
+    or was cancelled) or None (nothing received)
+    """
+    if closed:
+        return 'late' if balance.confirmed or balance.pending else None
+    if balance.confirmed > 0:
+        # Without an exchange rate even dust would pass: the owner checks the amount
+        if expected is None:
+            return 'received'
+        if balance.confirmed >= expected * (1 - UNDERPAYMENT_TOLERANCE):
+            return 'paid'
+        return 'underpaid'
+    if balance.pending > 0:
+        return 'seen'
+    return None
+
+
+def _open_orders() -> List[OpenOrder]:
+    """Every Bitcoin order waiting for payment or recently closed, with what was seen so far (one query)"""
+    closed_since = datetime.now() - LATE_PAYMENT_WINDOW
+    with Database().session() as session:
+        rows = (session.query(Order, BitcoinPayment)
+                .outerjoin(BitcoinPayment, BitcoinPayment.order_id == Order.id)
+                .filter(Order.payment_method == 'bitcoin',
+                        Order.bitcoin_address.isnot(None),
+                        or_(Order.order_status.in_(OPEN_STATUSES),
+                            and_(Order.order_status.in_(CLOSED_STATUSES), Order.created_at >= closed_since)))
+                .all())
+        return [
+            OpenOrder(
+                id=order.id,
+                order_code=order.order_code,
+                buyer_id=order.buyer_id,
+                address=order.bitcoin_address,
+                due=order.total_price - (order.bonus_applied or 0),
+                closed=order.order_status in CLOSED_STATUSES,
+                payment_status=payment.status if payment else None,
+                confirmed_sats=payment.confirmed_sats if payment else 0,
+                pending_sats=payment.pending_sats if payment else 0,
+            )
+            for order, payment in rows
+        ]
+
+
+def _record_payments(changes: List[Tuple[OpenOrder, str, AddressBalance, Optional[int]]],
+                     confirmations: int) -> int:
+    """
+    Store changed payments in one transaction; paid orders move to 'confirmed'.
+    Customers and the owner are told about status changes through the outbox,
+    including payments to orders that expired or were cancelled meanwhile and
+    payments whose amount could not be checked (left for the owner to confirm).
+
+    Returns:
+        Number of orders marked paid
+    """
+    paid = 0
+    owner_id = int(EnvKeys.OWNER_ID) if EnvKeys.OWNER_ID else None
+
+    with Database().session() as session:
+        orders = {order.id: order for order in (
+            session.query(Order)
+            .filter(Order.id.in_([change[0].id for change in changes]))
+            .with_for_update()
+        )}
+        payments = {payment.order_id: payment for payment in (
+            session.query(BitcoinPayment)
+            .filter(BitcoinPayment.order_id.in_(list(orders)))
+        )}
+
+        for open_order, status, balance, expected in changes:
+            order = orders.get(open_order.id)
+            # Confirmed by an admin meanwhile
+            if order is None or order.order_status not in OPEN_STATUSES + CLOSED_STATUSES:
+                continue
+            # Expired or cancelled since the orders were read: the stock is gone, the owner decides
+            if order.order_status in CLOSED_STATUSES:
+                status = 'late'
+
+            payment = payments.get(order.id)
+            if payment is None:
+                payment = BitcoinPayment(order.id, open_order.address, status)
+                session.add(payment)
+            previous_status = payment.status if order.id in payments else None
+            payment.status = status
+            payment.confirmed_sats = balance.confirmed
+            payment.pending_sats = balance.pending
+            payment.updated_at = datetime.now()
+
+            if status == previous_status:
+                continue
+
+            amount = format_btc(balance.confirmed + balance.pending)
+            if status == 'late':
+                if order.buyer_id:
+                    enqueue_notification(session, order.buyer_id, localize(
+                        "order.payment.bitcoin.payment_after_expiry", code=order.order_code, amount=amount
+                    ), "payment_late")
+                if owner_id:
+                    enqueue_notification(session, owner_id, localize(
+                        "admin.order.payment_after_expiry", code=order.order_code, amount=amount,
+                        status=order.order_status
+                    ), "admin_alert")
+
+            elif status == 'paid':
+                order.order_status = 'confirmed'
+                paid += 1
+                if order.buyer_id:
+                    enqueue_notification(session, order.buyer_id, localize(
+                        "order.payment.bitcoin.payment_confirmed", code=order.order_code, amount=amount
+                    ), "payment_confirmed")
+                if owner_id:
+                    enqueue_notification(session, owner_id, localize(
+                        "admin.order.payment_received", code=order.order_code, amount=amount
+                    ), "admin_alert")
+
+            elif status == 'underpaid':
+                expected_btc = format_btc(expected) if expected else "?"
+                if order.buyer_id:
+                    enqueue_notification(session, order.buyer_id, localize(
+                        "order.payment.bitcoin.payment_underpaid", code=order.order_code, amount=amount,
+                        expected=expected_btc
+                    ), "payment_underpaid")
+                if owner_id:
+                    enqueue_notification(session, owner_id, localize(
+                        "admin.order.payment_underpaid", code=order.order_code, amount=amount,
+                        expected=expected_btc
+                    ), "admin_alert")
+
+            elif status == 'received':
+                if order.buyer_id:
+                    enqueue_notification(session, order.buyer_id, localize(
+                        "order.payment.bitcoin.payment_received", code=order.order_code, amount=amount
+                    ), "payment_received")
+                if owner_id:
+                    enqueue_notification(session, owner_id, localize(
+                        "admin.order.payment_unverified", code=order.order_code, amount=amount
+                    ), "admin_alert")
+
+            elif status == 'seen' and previous_status is None and order.buyer_id:
+                enqueue_notification(session, order.buyer_id, localize(
+                    "order.payment.bitcoin.payment_detected", code=order.order_code, amount=amount,
+                    confirmations=confirmations
+                ), "payment_detected")
+
+    return paid
+
+
+class PaymentWatcher:
+    """
+    Moves Bitcoin orders forward when their payment arrives.
+
+    Each cycle reads all open Bitcoin orders with one query, asks the backend for
+    all their addresses with one batched request and writes only the orders whose
+    payment changed, in one transaction: the cost per cycle stays flat as the
+    number of open orders grows. Paid orders become 'confirmed' (no longer
+    expire) and the owner sets the delivery time as before. Without an exchange
+    rate the amount cannot be checked, so payments are only reported and the
+    owner confirms the order. Money sent to an order that already expired or was
+    cancelled is reported to the owner.
+    """
+
+    def __init__(self, backend: PaymentBackend, confirmations: int = 1,
+                 poll_interval: float = 60, exchange_rate: Optional[Decimal] = None):
+        self.backend = backend
+        self.confirmations = confirmations
+        self.poll_interval = poll_interval
+        self.exchange_rate = exchange_rate
+
+    async def check(self) -> int:
+        """Run one detection cycle; returns the number of orders marked paid"""
+        started_at = time.monotonic()
+        orders = await run_db(_open_orders)
+        if not orders:
+            return 0
+
+        balances = await self.backend.get_balances([order.address for order in orders], self.confirmations)
+
+        changes = []
+        for order in orders:
+            balance = balances.get(order.address)
+            if balance is None:
+                continue
+            expected = expected_sats(order.due, self.exchange_rate)
+            status = classify_payment(balance, expected, order.closed)
+            if status is None:
+                continue
+            if (status, balance.confirmed, balance.pending) != (order.payment_status, order.confirmed_sats,
+                                                                order.pending_sats):
+                changes.append((order, status, balance, expected))
+
+        paid = await run_db(_record_payments, changes, self.confirmations) if changes else 0
+        if paid:
+            logger.info(f"Bitcoin payments confirmed for {paid} order(s)")
+
+        metrics = get_metrics()
+        if metrics:
+            metrics.track_timing("btc_payment_check", time.monotonic() - started_at)
+            metrics.set_gauge("btc_open_orders", sum(not order.closed for order in orders))
+        return paid
+
+    async def run(self) -> None:
+        logger.info(f"Bitcoin payment watcher started ({self.confirmations} confirmation(s), "
+                    f"every {self.poll_interval}s)")
+        while True:
+            try:
+                await self.check()
+                await asyncio.sleep(self.poll_interval)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in Bitcoin payment watcher: {e}")
+                await asyncio.sleep(RETRY_DELAY)
+
+
+def create_payment_backend(name: str) -> PaymentBackend:
+    """Backend for BTC_PAYMENT_BACKEND"""
+    if name == "bitcoind":
+        return BitcoindBackend(EnvKeys.BTC_RPC_URL, EnvKeys.BTC_RPC_USER, EnvKeys.BTC_RPC_PASSWORD)
+    if name == "electrum":
+        if EnvKeys.BTC_CONFIRMATIONS > 1:
+            logger.warning("Electrum reports balances confirmed from one confirmation, "
+                           "BTC_CONFIRMATIONS above 1 is not enforced")
+        return ElectrumBackend(EnvKeys.BTC_RPC_URL, EnvKeys.BTC_RPC_USER, EnvKeys.BTC_RPC_PASSWORD)
+    if name == "fake":
+        return FakePaymentBackend()
+    raise ValueError(f"Unknown BTC_PAYMENT_BACKEND: {name}")
+
+
+_watcher: Optional[PaymentWatcher] = None
+_task: Optional[asyncio.Task] = None
+
+
+def start_payment_watcher() -> Optional[PaymentWatcher]:
+    """Start watching payments if BTC_PAYMENT_BACKEND is set (call on startup)"""
+    global _watcher, _task
+    if not EnvKeys.BTC_PAYMENT_BACKEND:
+        return None
+
+    exchange_rate = Decimal(EnvKeys.BTC_EXCHANGE_RATE) if EnvKeys.BTC_EXCHANGE_RATE else None
+    _watcher = PaymentWatcher(
+        create_payment_backend(EnvKeys.BTC_PAYMENT_BACKEND),
+        confirmations=EnvKeys.BTC_CONFIRMATIONS,
+        poll_interval=EnvKeys.BTC_PAYMENT_POLL_INTERVAL,
+        exchange_rate=exchange_rate,
+    )
+    _task = asyncio.create_task(_watcher.run())
+    return _watcher
+
+
+async def stop_payment_watcher() -> None:
+    """Stop the payment watcher and close its backend (call on shutdown)"""
+    global _watcher, _task
+    if _task:
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+    if _watcher:
+        await _watcher.backend.close()
+    _watcher = _task = None
@@ -2,15 +2,122 @@ import logging
 import threading
 import time
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional, Set
 
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 
-from bot.payments.bitcoin import load_bitcoin_addresses_from_file
+from bot.monitoring import get_metrics
+from bot.payments.bitcoin import (
+    IMPORT_CHUNK_SIZE, compact_bitcoin_address_file, get_known_bitcoin_addresses, insert_bitcoin_addresses,
+    is_own_write, parse_bitcoin_addresses
+)
 
 logger = logging.getLogger(__name__)
 
+# How often assigned addresses are compacted out of btc_addresses.txt (seconds)
+COMPACT_INTERVAL = 300
+
+
+class AddressFileImporter:
+    """
+    Imports addresses appended to btc_addresses.txt since the last import
+
+    Remembers the file's inode and the offset after the last complete line, so a
+    change costs only the appended bytes; a replaced or truncated file is read
+    again from the start. A last line without newline may still be being written:
+    it is only imported once the file is unchanged on the next check. Addresses are checked against an in-memory set of known
+    addresses (seeded from the database once) and new ones are inserted with
+    chunked INSERT IGNORE statements.
+    """
+
+    def __init__(self, file_path: str, chunk_size: int = IMPORT_CHUNK_SIZE):
+        """
+        Initialize the importer
+
+        Args:
+            file_path: Path to btc_addresses.txt file
+            chunk_size: Addresses per INSERT IGNORE statement
+        """
+        self.file_path = Path(file_path)
+        self.chunk_size = chunk_size
+        self.inode: Optional[int] = None
+        self.offset = 0
+        # (size, mtime_ns) of the file when a last line without newline was left unread
+        self.partial_signature: Optional[tuple] = None
+        self.known: Optional[Set[str]] = None
+        self._lock = threading.Lock()
+
+    def _read_appended(self) -> List[str]:
+        """
+        Addresses written since the last read
+
+        Returns:
+            List of addresses in file order
+        """
+        try:
+            stat = self.file_path.stat()
+        except FileNotFoundError:
+            return []
+
+        if stat.st_ino != self.inode or stat.st_size < self.offset:
+            self.inode = stat.st_ino
+            self.offset = 0
+            self.partial_signature = None
+        if stat.st_size == self.offset:
+            return []
+
+        with open(self.file_path, 'rb') as f:
+            f.seek(self.offset)
+            data = f.read()
+
+        complete = data.rfind(b"\n") + 1
+        signature = (stat.st_size, stat.st_mtime_ns)
+        if complete < len(data) and signature == self.partial_signature:
+            # Unchanged since the last check: a final line without newline, not a half-written one
+            complete = len(data)
+        self.partial_signature = signature if complete < len(data) else None
+
+        self.offset += complete
+        return parse_bitcoin_addresses(data[:complete].decode('utf-8', errors='replace').splitlines())
+
+    def import_new(self) -> int:
+        """
+        Import the appended addresses
+
+        Returns:
+            Number of addresses added to the database
+        """
+        with self._lock:
+            started_at = time.monotonic()
+            if self.known is None:
+                self.known = get_known_bitcoin_addresses()
+
+            inode, offset, partial = self.inode, self.offset, self.partial_signature
+            addresses = self._read_appended()
+            new = [address for address in dict.fromkeys(addresses) if address not in self.known]
+            try:
+                loaded_count = insert_bitcoin_addresses(new, self.chunk_size) if new else 0
+            except Exception:
+                # Read the same lines again next time
+                self.inode, self.offset, self.partial_signature = inode, offset, partial
+                raise
+            self.known.update(new)
+
+            elapsed = time.monotonic() - started_at
+            if addresses:
+                rate = len(addresses) / elapsed if elapsed > 0 else float(len(addresses))
+                logger.info(
+                    f"Imported {loaded_count} new of {len(addresses)} address(es) in {elapsed:.2f}s "
+                    f"({rate:.0f} addresses/s)"
+                )
+                metrics = get_metrics()
+                if metrics:
+                    metrics.track_timing("btc_address_import", elapsed)
+                    metrics.set_gauge("btc_address_import_rate", rate)
+
+            return loaded_count
+
 
 class BitcoinAddressFileHandler(FileSystemEventHandler):
     """
@@ -32,6 +139,7 @@ class BitcoinAddressFileHandler(FileSystemEventHandler):
         self.debounce_seconds = debounce_seconds
         self.last_reload_time = 0
         self._reload_lock = threading.Lock()
+        self.importer = AddressFileImporter(str(self.file_path))
 
         logger.info(f"BitcoinAddressFileHandler initialized for {self.file_path}")
 
@@ -51,6 +159,30 @@ class BitcoinAddressFileHandler(FileSystemEventHandler):
         if event_path != self.file_path:
             return
 
+        self._handle_change()
+
+    def on_moved(self, event):
+        """
+        Called when a file is renamed (editors and compaction replace the file this way)
+
+        Args:
+            event: FileSystemEvent object
+        """
+        if event.is_directory:
+            return
+
+        if Path(event.dest_path).resolve() != self.file_path:
+            return
+
+        self._handle_change()
+
+    def _handle_change(self):
+        """Reload after a change made by someone else than the bot, debounced"""
+        # The bot's own writes (new addresses, compaction) are already in the database
+        if is_own_write():
+            logger.debug(f"Ignoring own write to {self.file_name}")
+            return
+
         # Debounce: check if enough time has passed since last reload
         current_time = time.time()
         with self._reload_lock:
@@ -77,7 +209,7 @@ class BitcoinAddressFileHandler(FileSystemEventHandler):
         try:
             logger.info(f"📥 Detected change in {self.file_name}, reloading Bitcoin addresses...")
 
-            loaded_count = load_bitcoin_addresses_from_file()
+            loaded_count = self.importer.import_new()
 
             if loaded_count > 0:
                 logger.info(f"✅ Successfully loaded {loaded_count} new Bitcoin address(es)")
@@ -94,21 +226,26 @@ class BitcoinAddressFileWatcher:
     Monitors the file for changes and automatically reloads addresses
     """
 
-    def __init__(self, file_path: str = "btc_addresses.txt", debounce_seconds: float = 2.0):
+    def __init__(self, file_path: str = "btc_addresses.txt", debounce_seconds: float = 2.0,
+                 compact_interval: float = COMPACT_INTERVAL):
         """
         Initialize the file watcher
 
         Args:
             file_path: Path to btc_addresses.txt file (default: "btc_addresses.txt")
             debounce_seconds: Minimum time between reloads (default: 2 seconds)
+            compact_interval: Time between compactions of used addresses out of the file (seconds)
         """
         self.file_path = Path(file_path).resolve()
         self.watch_directory = self.file_path.parent
         self.debounce_seconds = debounce_seconds
+        self.compact_interval = compact_interval
 
         # Create watchdog observer and event handler
         self.observer: Optional[Observer] = None
         self.event_handler: Optional[BitcoinAddressFileHandler] = None
+        self._compactor: Optional[threading.Thread] = None
+        self._stop_compacting = threading.Event()
 
         self._started = False
         self._start_lock = threading.Lock()
@@ -150,6 +287,13 @@ class BitcoinAddressFileWatcher:
 
             # Start the observer thread
             self.observer.start()
+
+            # Start the compaction thread
+            self._stop_compacting.clear()
+            self._compactor = threading.Thread(
+                target=self._compact_loop, name="btc-address-compactor", daemon=True
+            )
+            self._compactor.start()
             self._started = True
 
             logger.info(
@@ -188,10 +332,39 @@ class BitcoinAddressFileWatcher:
 
                 self.observer = None
 
+            if self._compactor:
+                self._stop_compacting.set()
+                self._compactor.join(timeout=timeout)
+                self._compactor = None
+
             self.event_handler = None
             self._started = False
             return True
 
+    def _compact_loop(self):
+        """
+        Remove used addresses from the file periodically, and once more on stop
+
+        Each round first imports what no file event delivered: a last line left
+        without newline, or changes that fell into the debounce window.
+        """
+        while True:
+            stopping = self._stop_compacting.wait(self.compact_interval)
+            handler = self.event_handler
+            if handler is not None:
+                try:
+                    handler.importer.import_new()
+                except Exception as e:
+                    logger.error(f"❌ Error importing Bitcoin addresses: {e}", exc_info=True)
+            try:
+                removed = compact_bitcoin_address_file()
+                if removed:
+                    logger.info(f"🧹 Compacted {removed} used Bitcoin address(es) out of {self.file_path.name}")
+            except Exception as e:
+                logger.error(f"❌ Error compacting Bitcoin addresses file: {e}", exc_info=True)
+            if stopping:
+                return
+
     def is_running(self) -> bool:
         """
         Check if the file watcher is currently running
@@ -1,41 +1,231 @@
 import asyncio
+import heapq
 import logging
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
 
+from redis.asyncio import Redis
+
+from bot.database import Database, run_db
 from bot.database.methods.inventory import cleanup_expired_reservations
+from bot.database.models.main import Order
 
 logger = logging.getLogger(__name__)
 
+# Sorted set of order_id -> reserved_until (unix time), shared by all bot instances
+DEADLINES_KEY = "reservations:deadlines"
+
+# Re-read deadlines from the database at least this often, even with nothing scheduled
+# (catches reservations made by another instance or with reserved_until changed by hand)
+RESYNC_INTERVAL = 600
+
+# Wake up this long after a deadline, so the order is strictly past reserved_until
+DEADLINE_SLACK = 0.05
+
+# Pause after an unexpected error before trying again
+RETRY_DELAY = 120
+
+
+def _timestamp(value: datetime) -> float:
+    # Naive datetimes from the database are UTC
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+class DeadlineStore:
+    """Upcoming reservation deadlines, earliest first"""
+
+    async def add(self, deadlines: Dict[int, float]) -> None:
+        raise NotImplementedError
+
+    async def next(self) -> Optional[float]:
+        """Earliest deadline, None if nothing is scheduled"""
+        raise NotImplementedError
+
+    async def pop_due(self, now: float) -> List[int]:
+        """Remove and return orders whose deadline has passed"""
+        raise NotImplementedError
+
 
-async def run_reservation_cleaner():
+class HeapDeadlineStore(DeadlineStore):
     """
-    Background task that runs continuously to cleanup expired reservations.
-    Checks every 60 seconds for expired reservations and releases them.
+    In-process heap (single instance; rebuilt from the database at startup).
+
+    Like the Redis sorted set, it holds one deadline per order: re-adding an order only
+    pushes a heap entry when its deadline changed, and entries that no longer match
+    the current deadline are skipped.
     """
-    logger.info("Reservation cleaner task started")
 
-    while True:
-        try:
-            # Run cleanup
-            count, order_codes = await cleanup_expired_reservations()
+    def __init__(self):
+        self._heap: list[tuple[float, int]] = []
+        self._deadlines: Dict[int, float] = {}
+
+    def _drop_stale(self) -> None:
+        while self._heap and self._deadlines.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+
+    async def add(self, deadlines: Dict[int, float]) -> None:
+        for order_id, deadline in deadlines.items():
+            if self._deadlines.get(order_id) != deadline:
+                self._deadlines[order_id] = deadline
+                heapq.heappush(self._heap, (deadline, order_id))
+
+    async def next(self) -> Optional[float]:
+        self._drop_stale()
+        return self._heap[0][0] if self._heap else None
+
+    async def pop_due(self, now: float) -> List[int]:
+        due = []
+        self._drop_stale()
+        while self._heap and self._heap[0][0] <= now:
+            deadline, order_id = heapq.heappop(self._heap)
+            del self._deadlines[order_id]
+            due.append(order_id)
+            self._drop_stale()
+        return due
+
+
+class RedisDeadlineStore(DeadlineStore):
+    """Redis sorted set, so deadlines scheduled by one instance are seen by all"""
+
+    def __init__(self, redis: Redis):
+        self.redis = redis
+
+    async def add(self, deadlines: Dict[int, float]) -> None:
+        if deadlines:
+            await self.redis.zadd(DEADLINES_KEY, {str(order_id): deadline for order_id, deadline in deadlines.items()})
+
+    async def next(self) -> Optional[float]:
+        first = await self.redis.zrange(DEADLINES_KEY, 0, 0, withscores=True)
+        return first[0][1] if first else None
+
+    async def pop_due(self, now: float) -> List[int]:
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.zrangebyscore(DEADLINES_KEY, "-inf", now)
+        pipe.zremrangebyscore(DEADLINES_KEY, "-inf", now)
+        due, _ = await pipe.execute()
+        return [int(order_id) for order_id in due]
 
-            if count > 0:
-                logger.info(
-                    f"Released {count} expired reservation(s): {', '.join(order_codes)}"
-                )
 
-            # Wait 60 seconds before next check
-            await asyncio.sleep(60)
+def _query_deadlines() -> Dict[int, float]:
+    with Database().session() as session:
+        rows = session.query(Order.id, Order.reserved_until).filter(
+            Order.order_status == 'reserved',
+            Order.reserved_until.isnot(None)
+        )
+        return {order_id: _timestamp(reserved_until) for order_id, reserved_until in rows}
 
-        except Exception as e:
-            logger.error(f"Error in reservation cleaner task: {e}", exc_info=True)
-            # Wait a bit longer on error to avoid spam
-            await asyncio.sleep(120)
 
+class ReservationScheduler:
+    """
+    Releases expired reservations at their deadline instead of polling.
+
+    reserve_inventory() feeds it the reserved_until of each committed reservation; the loop
+    sleeps until the earliest deadline (or until an earlier one is scheduled), then runs
+    cleanup_expired_reservations(). Without upcoming deadlines it only re-syncs from the
+    database every RESYNC_INTERVAL seconds.
+    """
+
+    def __init__(self, store: DeadlineStore):
+        self.store = store
+        self._wakeup = asyncio.Event()
+        self._sleep_until: Optional[float] = None
+
+    async def load(self) -> int:
+        """Schedule every reserved order from the database (startup and periodic re-sync)"""
+        deadlines = await run_db(_query_deadlines)
+        await self.store.add(deadlines)
+        return len(deadlines)
+
+    async def schedule(self, deadlines: Dict[int, datetime]) -> None:
+        """Schedule committed reservations; wakes the loop if one is due earlier than it sleeps"""
+        timestamps = {order_id: _timestamp(deadline) for order_id, deadline in deadlines.items()}
+        await self.store.add(timestamps)
+        if self._sleep_until is None or min(timestamps.values()) < self._sleep_until:
+            self._wakeup.set()
+
+    async def run_due(self) -> int:
+        """Release reservations whose deadline has passed"""
+        due = await self.store.pop_due(time.time())
+        if not due:
+            return 0
+
+        count, order_codes = await cleanup_expired_reservations()
+        if count > 0:
+            logger.info(f"Released {count} expired reservation(s): {', '.join(order_codes)}")
+        return count
+
+    async def run(self) -> None:
+        loaded = await self.load()
+        logger.info(f"Reservation scheduler started ({type(self.store).__name__}, {loaded} reservation(s) pending)")
+        resync_at = time.monotonic() + RESYNC_INTERVAL
+
+        while True:
+            try:
+                self._wakeup.clear()
+                await self.run_due()
+
+                if time.monotonic() >= resync_at:
+                    await self.load()
+                    resync_at = time.monotonic() + RESYNC_INTERVAL
+                    continue
+
+                next_deadline = await self.store.next()
+                timeout = resync_at - time.monotonic()
+                if next_deadline is not None:
+                    timeout = min(timeout, next_deadline - time.time() + DEADLINE_SLACK)
+                self._sleep_until = time.time() + timeout
 
-def start_reservation_cleaner():
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=max(0.0, timeout))
+                except asyncio.TimeoutError:
+                    pass
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in reservation scheduler: {e}", exc_info=True)
+                # Wait a bit longer on error to avoid spam
+                await asyncio.sleep(RETRY_DELAY)
+            finally:
+                self._sleep_until = None
+
+
+_scheduler: Optional[ReservationScheduler] = None
+task: Optional[asyncio.Task] = None
+
+
+def get_reservation_scheduler() -> Optional[ReservationScheduler]:
+    """The running reservation scheduler, None before start_reservation_cleaner()"""
+    return _scheduler
+
+
+async def run_reservation_cleaner(scheduler: ReservationScheduler):
+    """Background task releasing expired reservations at their deadlines"""
+    await scheduler.run()
+
+
+def start_reservation_cleaner(redis: Optional[Redis] = None):
     """
-    Start the reservation cleaner task in the background.
-    Call this function when the bot starts.
+    Start the reservation scheduler in the background.
+    Call this function when the bot starts (deadlines live in Redis if given, in-process otherwise).
     """
-    asyncio.create_task(run_reservation_cleaner())
-    logger.info("Reservation cleaner task scheduled")
+    global _scheduler, task
+    store = RedisDeadlineStore(redis) if redis is not None else HeapDeadlineStore()
+    _scheduler = ReservationScheduler(store)
+    task = asyncio.create_task(run_reservation_cleaner(_scheduler))
+    logger.info("Reservation scheduler task scheduled")
+
+
+async def stop_reservation_cleaner():
+    """Stop the reservation scheduler (call on shutdown)"""
+    global _scheduler, task
+    if task:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    _scheduler = task = None
@@ -1,6 +1,10 @@
+from functools import partial
 from typing import Callable, List, Optional, Dict, Any
 from datetime import datetime
 
+# How long a total count is shared between paginator instances (seconds)
+COUNT_CACHE_TTL = 60
+
 
 class LazyPaginator:
     """
@@ -12,7 +16,9 @@ class LazyPaginator:
             query_func: Callable,
             per_page: int = 10,
             cache_pages: int = 3,
-            state: Optional[Dict] = None
+            state: Optional[Dict] = None,
+            cursor_key: Optional[Callable[[Any], Any]] = None,
+            share_count: bool = True
     ):
         """
         Args:
@@ -20,10 +26,16 @@ class LazyPaginator:
             per_page: Items per page
             cache_pages: Number of pages in cache
             state: Previous paginator state (dict) for cache restoration
+            cursor_key: Sort key of an item; enables keyset mode, where query_func
+                also receives after=<last key of the previous page> instead of scanning offset rows
+            share_count: Share the total count between instances via the cache
+                (disable for in-memory sources, where counting is free)
         """
         self.query_func = query_func
         self.per_page = per_page
         self.cache_pages = cache_pages
+        self.cursor_key = cursor_key
+        self.share_count = share_count
 
         # Restore from dictionary or create new
         if state and isinstance(state, dict):
@@ -31,15 +43,40 @@ class LazyPaginator:
             self._cache = {}
             self._total_count = state.get('total_count')
             self.current_page = state.get('current_page', 0)
+            # JSON storage turns int keys into strings
+            self._cursors = {int(page): key for page, key in (state.get('cursors') or {}).items()}
         else:
             self._cache = {}
             self._total_count = None
             self.current_page = 0
+            self._cursors = {}
+
+    def _count_cache_key(self) -> str:
+        """Cache key identifying the query (function name + bound arguments)"""
+        func = self.query_func
+        args = ()
+        if isinstance(func, partial):
+            args = func.args + tuple(sorted(func.keywords.items()))
+            func = func.func
+        return f"page_count:{func.__module__}.{func.__name__}:{args}"
 
     async def get_total_count(self) -> int:
-        """Get the total number of items"""
+        """Get the total number of items (shared via cache for COUNT_CACHE_TTL seconds)"""
         if self._total_count is None:
+            from bot.caching import get_cache_manager
+            cache = get_cache_manager() if self.share_count else None
+            key = self._count_cache_key()
+
+            if cache:
+                cached = await cache.get(key)
+                if cached is not None:
+                    self._total_count = int(cached)
+                    return self._total_count
+
             self._total_count = await self.query_func(count_only=True)
+
+            if cache:
+                await cache.set(key, self._total_count, ttl=COUNT_CACHE_TTL)
         return self._total_count
 
     async def get_page(self, page: int) -> List:
@@ -60,10 +97,21 @@ class LazyPaginator:
 
         # Load data
         offset = page * self.per_page
-        items = await self.query_func(
-            offset=offset,
-            limit=self.per_page
-        )
+        if self.cursor_key and page - 1 in self._cursors:
+            # Keyset mode: seek past the previous page instead of scanning offset rows
+            items = await self.query_func(
+                offset=offset,
+                limit=self.per_page,
+                after=self._cursors[page - 1]
+            )
+        else:
+            items = await self.query_func(
+                offset=offset,
+                limit=self.per_page
+            )
+
+        if self.cursor_key and items:
+            self._cursors[page] = self.cursor_key(items[-1])
 
         # Save to cache
         self._cache[page] = items
@@ -121,11 +169,13 @@ class LazyPaginator:
         """Get current state for FSM storage - without cache to avoid serialization issues"""
         return {
             'total_count': self._total_count,
-            'current_page': self.current_page
+            'current_page': self.current_page,
             # Don't include cache - it contains non-serializable SQLAlchemy objects
+            'cursors': {str(page): key for page, key in self._cursors.items()}
         }
 
     def clear_cache(self):
         """Clear cache"""
         self._cache.clear()
         self._total_count = None
+        self._cursors.clear()
@@ -37,6 +37,7 @@ from bot.export.custom_logging import (
 )
 from bot.config import timezone, EnvKeys
 
+from bot.communication.outbox import enqueue_notification
 from bot.payments.notifications import (
     notify_order_confirmed,
     notify_order_delivered,
@@ -184,34 +185,17 @@ async def complete_order_by_code(order_code: str):
                 else:
                     total_bonus_balance = referral_bonus_amount
 
-                # Send notification to referrer about the bonus
-                try:
-                    bot = Bot(
-                        token=EnvKeys.TOKEN,
-                        default=DefaultBotProperties(parse_mode="HTML")
-                    )
-
-                    try:
-                        notification_text = (
-                            f"🎉 <b>Referral Bonus Received!</b>\n\n"
-                            f"Your referral completed an order.\n\n"
-                            f"💰 <b>Bonus Amount: ${referral_bonus_amount}</b>\n"
-                            f"📊 Total Bonus Balance: <b>${total_bonus_balance}</b>\n\n"
-                            f"Order Total: ${order.total_price}\n"
-                            f"Order Code: {order.order_code}\n\n"
-                            f"💡 You can use this bonus to reduce payment on your next order!"
-                        )
-
-                        await bot.send_message(
-                            buyer.referral_id,
-                            notification_text
-                        )
-                    finally:
-                        await bot.session.close()
-
-                except Exception as e:
-                    print(f"⚠️  Failed to send referral bonus notification: {e}")
-                    # Continue execution even if notification fails
+                # Notify referrer about the bonus (sent by the outbox worker after commit)
+                notification_text = (
+                    f"🎉 <b>Referral Bonus Received!</b>\n\n"
+                    f"Your referral completed an order.\n\n"
+                    f"💰 <b>Bonus Amount: ${referral_bonus_amount}</b>\n"
+                    f"📊 Total Bonus Balance: <b>${total_bonus_balance}</b>\n\n"
+                    f"Order Total: ${order.total_price}\n"
+                    f"Order Code: {order.order_code}\n\n"
+                    f"💡 You can use this bonus to reduce payment on your next order!"
+                )
+                enqueue_notification(session, buyer.referral_id, notification_text, "referral_bonus")
 
                 print(f"💰 Referral bonus: ${referral_bonus_amount} credited to referrer (ID: {buyer.referral_id})")
 
@@ -311,31 +295,17 @@ async def cancel_order_by_code(order_code: str):
                 # Sync to CSV file
                 sync_customer_to_csv(order.buyer_id, buyer_username)
 
-                # Send notification to customer about bonus refund
-                try:
-                    bot = Bot(
-                        token=EnvKeys.TOKEN,
-                        default=DefaultBotProperties(parse_mode="HTML")
-                    )
-
-                    try:
-                        notification_text = (
-                            f"ℹ️ <b>Order Canceled</b>\n\n"
-                            f"Your order <b>{order.order_code}</b> has been canceled by admin.\n\n"
-                            f"💰 <b>Bonus Refund: ${order.bonus_applied}</b>\n"
-                            f"📊 New Bonus Balance: <b>${new_bonus_balance}</b>\n\n"
-                            f"Your referral bonus has been returned to your account.\n"
-                            f"You can use it for your next order!"
-                        )
-
-                        await bot.send_message(order.buyer_id, notification_text)
-                        print(f"📧 Bonus refund notification sent to customer")
-                    finally:
-                        await bot.session.close()
-
-                except Exception as e:
-                    print(f"⚠️  Failed to send bonus refund notification: {e}")
-                    # Continue execution even if notification fails
+                # Notify customer about bonus refund (sent by the outbox worker after commit)
+                notification_text = (
+                    f"ℹ️ <b>Order Canceled</b>\n\n"
+                    f"Your order <b>{order.order_code}</b> has been canceled by admin.\n\n"
+                    f"💰 <b>Bonus Refund: ${order.bonus_applied}</b>\n"
+                    f"📊 New Bonus Balance: <b>${new_bonus_balance}</b>\n\n"
+                    f"Your referral bonus has been returned to your account.\n"
+                    f"You can use it for your next order!"
+                )
+                enqueue_notification(session, order.buyer_id, notification_text, "bonus_refund")
+                print(f"📧 Bonus refund notification queued for customer")
 
         # Get order items for logging
         from bot.database.models.main import OrderItem
@@ -417,26 +387,19 @@ async def confirm_order_with_delivery_time(order_code: str, delivery_time_str: s
         if order.reserved_until and order.reserved_until < datetime.now(timezone.utc) + timedelta(hours=1):
             order.reserved_until = delivery_time + timedelta(hours=1)
 
-        session.commit()
-
         # Get order items for notification
         order_items = session.query(OrderItem).filter_by(order_id=order.id).all()
 
-        # Send notification to customer
-        try:
-            success = await notify_order_confirmed(
-                order=order,
-                items=order_items,
-                delivery_time=delivery_time
-            )
-
-            if success:
-                print(f"[OK] Notification sent to customer")
-            else:
-                print(f"[WARNING] Failed to send notification to customer")
+        # Queue notification to customer in the same transaction
+        notify_order_confirmed(
+            session,
+            order=order,
+            items=order_items,
+            delivery_time=delivery_time
+        )
 
-        except Exception as e:
-            print(f"[WARNING] Error sending notification: {str(e)[:100]}")
+        session.commit()
+        print(f"[OK] Notification queued for customer")
 
         print(f"[SUCCESS] Order {order_code} confirmed")
         print(f"   Status: {old_status} -> confirmed")
@@ -531,34 +494,25 @@ async def mark_order_delivered(order_code: str):
                 else:
                     total_bonus_balance = referral_bonus_amount
 
-                # Send notification to referrer about the bonus
-                try:
-                    bot = Bot(
-                        token=EnvKeys.TOKEN,
-                        default=DefaultBotProperties(parse_mode="HTML")
-                    )
-
-                    try:
-                        notification_text = (
-                            f"🎉 <b>Referral Bonus Received!</b>\n\n"
-                            f"Your referral completed an order.\n\n"
-                            f"💰 <b>Bonus Amount: ${referral_bonus_amount}</b>\n"
-                            f"📊 Total Bonus Balance: <b>${total_bonus_balance}</b>\n\n"
-                            f"Order Total: ${order.total_price}\n"
-                            f"Order Code: {order.order_code}\n\n"
-                            f"💡 You can use this bonus to reduce payment on your next order!"
-                        )
-
-                        await bot.send_message(buyer.referral_id, notification_text)
-                    finally:
-                        await bot.session.close()
-
-                except Exception as e:
-                    print(f"⚠️  Failed to send referral bonus notification: {e}")
+                # Notify referrer about the bonus (sent by the outbox worker after commit)
+                notification_text = (
+                    f"🎉 <b>Referral Bonus Received!</b>\n\n"
+                    f"Your referral completed an order.\n\n"
+                    f"💰 <b>Bonus Amount: ${referral_bonus_amount}</b>\n"
+                    f"📊 Total Bonus Balance: <b>${total_bonus_balance}</b>\n\n"
+                    f"Order Total: ${order.total_price}\n"
+                    f"Order Code: {order.order_code}\n\n"
+                    f"💡 You can use this bonus to reduce payment on your next order!"
+                )
+                enqueue_notification(session, buyer.referral_id, notification_text, "referral_bonus")
 
                 print(f"💰 Referral bonus: ${referral_bonus_amount} credited to referrer (ID: {buyer.referral_id})")
 
+        # Queue delivery notification to customer in the same transaction
+        notify_order_delivered(session, order=order)
+
         session.commit()
+        print(f"📧 Delivery notification queued for customer")
 
         # Log completion
         order_items = session.query(OrderItem).filter_by(order_id=order.id).all()
@@ -580,18 +534,6 @@ async def mark_order_delivered(order_code: str):
             order_code=order.order_code
         )
 
-        # Send delivery notification to customer
-        try:
-            success = await notify_order_delivered(order=order)
-
-            if success:
-                print(f"📧 Delivery notification sent to customer")
-            else:
-                print(f"⚠️  Failed to send delivery notification")
-
-        except Exception as e:
-            print(f"⚠️  Error sending notification: {e}")
-
         print(f"✅ Order {order_code} marked as delivered")
         print(f"   Status: {old_status} → delivered")
         print(f"   Customer: @{buyer_username} (ID: {order.buyer_id})")
@@ -664,19 +606,18 @@ async def add_item_to_order(order_code: str, item_name: str, quantity: int, noti
         order_items = session.query(OrderItem).filter_by(order_id=order.id).all()
         order.total_price = sum(item.price * item.quantity for item in order_items)
 
-        session.commit()
-
-        # Send notification if requested
+        # Queue notification if requested (same transaction as the change)
         if notify:
             changes_desc = f"+ {item_name} x {quantity} (${goods.price * quantity})"
-            try:
-                await notify_order_modified(
-                    order=order,
-                    changes_description=changes_desc
-                )
-                print(f"📧 Modification notification sent to customer")
-            except Exception as e:
-                print(f"⚠️  Failed to send notification: {e}")
+            notify_order_modified(
+                session,
+                order=order,
+                changes_description=changes_desc
+            )
+
+        session.commit()
+        if notify:
+            print(f"📧 Modification notification queued for customer")
 
         print(f"✅ Added {quantity}x {item_name} to order {order_code}")
         print(f"   Item price: ${goods.price}")
@@ -738,19 +679,18 @@ async def remove_item_from_order(order_code: str, item_name: str, quantity: int,
         order_items = session.query(OrderItem).filter_by(order_id=order.id).all()
         order.total_price = sum(item.price * item.quantity for item in order_items)
 
-        session.commit()
-
-        # Send notification if requested
+        # Queue notification if requested (same transaction as the change)
         if notify:
             changes_desc = f"- {item_name} x {quantity} (-${removed_value})"
-            try:
-                await notify_order_modified(
-                    order=order,
-                    changes_description=changes_desc
-                )
-                print(f"📧 Modification notification sent to customer")
-            except Exception as e:
-                print(f"⚠️  Failed to send notification: {e}")
+            notify_order_modified(
+                session,
+                order=order,
+                changes_description=changes_desc
+            )
+
+        session.commit()
+        if notify:
+            print(f"📧 Modification notification queued for customer")
 
         print(f"✅ Removed {quantity}x {item_name} from order {order_code}")
         print(f"   Value removed: ${removed_value}")
@@ -797,19 +737,18 @@ async def update_delivery_time(order_code: str, delivery_time_str: str, notify:
         if order.reserved_until and order.reserved_until < delivery_time:
             order.reserved_until = delivery_time + timedelta(hours=1)
 
-        session.commit()
-
-        # Send notification if requested
+        # Queue notification if requested (same transaction as the change)
         if notify:
             changes_desc = f"Delivery time updated:\n  {old_time} → {delivery_time.strftime('%Y-%m-%d %H:%M')}"
-            try:
-                await notify_order_modified(
-                    order=order,
-                    changes_description=changes_desc
-                )
-                print(f"📧 Update notification sent to customer")
-            except Exception as e:
-                print(f"⚠️  Failed to send notification: {e}")
+            notify_order_modified(
+                session,
+                order=order,
+                changes_description=changes_desc
+            )
+
+        session.commit()
+        if notify:
+            print(f"📧 Update notification queued for customer")
 
         print(f"✅ Updated delivery time for order {order_code}")
         print(f"   Old time: {old_time}")
@@ -944,6 +883,7 @@ def list_btc_addresses(args):
 
     print("\n📊 Bitcoin Address Statistics")
     print("-" * 40)
+    print(f"Address source:      {stats['source']}")
     print(f"Total addresses:     {stats['total']}")
     print(f"Available addresses: {stats['available']}")
     print(f"Used addresses:      {stats['used']}")
@@ -1218,23 +1158,14 @@ async def ban_user_cli(args):
 
         # Try to notify the user
         if args.notify:
-            try:
-                bot = Bot(
-                    token=EnvKeys.TOKEN,
-                    default=DefaultBotProperties(parse_mode="HTML")
+            with Database().session() as session:
+                enqueue_notification(
+                    session,
+                    user_id,
+                    f"⛔ <b>You have been banned</b>\n\nReason: {reason}",
+                    "ban"
                 )
-
-                try:
-                    await bot.send_message(
-                        user_id,
-                        f"⛔ <b>You have been banned</b>\n\nReason: {reason}"
-                    )
-                    print(f"📧 Ban notification sent to user")
-                finally:
-                    await bot.session.close()
-
-            except Exception as e:
-                print(f"⚠️  Failed to send ban notification: {e}")
+            print(f"📧 Ban notification queued for user")
     else:
         print(f"❌ Failed to ban user {user_id}")
 
@@ -1270,23 +1201,14 @@ async def unban_user_cli(args):
 
         # Try to notify the user
         if args.notify:
-            try:
-                bot = Bot(
-                    token=EnvKeys.TOKEN,
-                    default=DefaultBotProperties(parse_mode="HTML")
+            with Database().session() as session:
+                enqueue_notification(
+                    session,
+                    user_id,
+                    "✅ <b>You have been unbanned</b>\n\nYou can now use the bot again.",
+                    "unban"
                 )
-
-                try:
-                    await bot.send_message(
-                        user_id,
-                        "✅ <b>You have been unbanned</b>\n\nYou can now use the bot again."
-                    )
-                    print(f"📧 Unban notification sent to user")
-                finally:
-                    await bot.session.close()
-
-            except Exception as e:
-                print(f"⚠️  Failed to send unban notification: {e}")
+            print(f"📧 Unban notification queued for user")
     else:
         print(f"❌ Failed to unban user {user_id}")
 
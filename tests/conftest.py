@@ -6,9 +6,12 @@ import pytest
 import asyncio
 from decimal import Decimal
 from datetime import datetime, timezone
+from contextlib import contextmanager
 from typing import Generator
 from unittest.mock import AsyncMock, patch
+import aiosqlite
 from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import Session, sessionmaker
 from sqlalchemy.pool import StaticPool
 
@@ -81,19 +84,89 @@ def override_database_singleton(db_engine, monkeypatch):
     monkeypatch.setattr(db, '_Database__engine', db_engine)
     monkeypatch.setattr(db, '_Database__SessionLocal', test_session_local)
 
+    # Async engine runs on the very same in-memory SQLite connection
+    async_engine = _create_shared_async_engine(db_engine)
+    monkeypatch.setattr(db, '_Database__async_engine', async_engine)
+    monkeypatch.setattr(db, '_Database__AsyncSessionLocal', async_sessionmaker(
+        bind=async_engine,
+        autoflush=False,
+        expire_on_commit=False
+    ))
+
     return db
 
 
+class _SharedSQLiteConnection:
+    """Proxy for the StaticPool sqlite3 connection that must not be closed by aiosqlite"""
+
+    def __init__(self, connection):
+        object.__setattr__(self, '_connection', connection)
+
+    def close(self):
+        pass
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._connection, name, value)
+
+
+def _create_shared_async_engine(db_engine):
+    """Create an aiosqlite engine that shares the sync test engine's connection"""
+    raw_connection = db_engine.raw_connection().driver_connection
+
+    async def async_creator():
+        connection = aiosqlite.Connection(lambda: _SharedSQLiteConnection(raw_connection), iter_chunk_size=64)
+        connection._thread.daemon = True
+        return await connection
+
+    return create_async_engine("sqlite+aiosqlite://", async_creator=async_creator, poolclass=StaticPool)
+
+
 @pytest.fixture(scope="function", autouse=True)
 def mock_cache_invalidation():
     """Mock all cache invalidation functions to prevent coroutine warnings"""
     with patch('bot.database.methods.update.invalidate_user_cache', new_callable=AsyncMock), \
-            patch('bot.database.methods.update.invalidate_item_cache', new_callable=AsyncMock), \
-            patch('bot.database.methods.update.invalidate_category_cache', new_callable=AsyncMock), \
-            patch('bot.database.methods.inventory.invalidate_item_cache', new_callable=AsyncMock):
+            patch('bot.database.methods.cache_utils.invalidate_items_cache', new_callable=AsyncMock), \
+            patch('bot.database.methods.cache_utils.invalidate_categories_cache', new_callable=AsyncMock), \
+            patch('bot.database.methods.cache_utils.invalidate_user_cache', new_callable=AsyncMock):
         yield
 
 
+@pytest.fixture(scope="function")
+def assert_statement_count(override_database_singleton):
+    """
+    Assert how many SQL statements a block runs (sync and async sessions).
+
+    Usage:
+        with assert_statement_count(2):
+            await query_user_orders(user_id)
+    """
+    engines = [override_database_singleton.engine, override_database_singleton.async_engine.sync_engine]
+
+    @contextmanager
+    def _assert_statement_count(expected: int):
+        statements = []
+
+        def _record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        for engine in engines:
+            event.listen(engine, "before_cursor_execute", _record)
+        try:
+            yield statements
+        finally:
+            for engine in engines:
+                event.remove(engine, "before_cursor_execute", _record)
+
+        assert len(statements) == expected, (
+                f"Expected {expected} statements, got {len(statements)}:\n" + "\n".join(statements)
+        )
+
+    return _assert_statement_count
+
+
 @pytest.fixture(scope="function")
 def db_session(db_engine) -> Generator[Session, None, None]:
     """Create a test database session"""
@@ -0,0 +1 @@
+"""Cache system tests"""
@@ -0,0 +1,234 @@
+"""
+Tests for pluggable cache backends
+"""
+import json
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from bot.caching.backends import MemoryBackend, TieredBackend, INVALIDATION_CHANNEL
+from bot.caching.cache import CacheManager, create_cache_backend
+
+
+class FakeRedis:
+    """Minimal async Redis stand-in: get/set/setex/delete/incr/scan_iter/publish/pipeline and the lock script"""
+
+    def __init__(self):
+        self.data = {}
+        self.published = []
+        self.executed = []  # Pipeline sizes
+        self.get = AsyncMock(side_effect=lambda key: self.data.get(key))
+
+    async def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    async def setex(self, key, ttl, value):
+        self.data[key] = value
+
+    def register_script(self, script):
+        # The lock release script is the only one the cache backends use
+        async def delete_if_equal(keys, args):
+            return await self.delete(keys[0]) if self.data.get(keys[0]) == args[0] else 0
+        return delete_if_equal
+
+    async def delete(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    async def incr(self, key):
+        self.data[key] = int(self.data.get(key) or 0) + 1
+        return self.data[key]
+
+    async def scan_iter(self, match=None):
+        import fnmatch
+        for key in list(self.data):
+            if fnmatch.fnmatchcase(key, match):
+                yield key
+
+    async def publish(self, channel, message):
+        self.published.append((channel, message))
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    """Queues commands and runs them against FakeRedis on execute()"""
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def delete(self, *keys):
+        self.commands.append(lambda: self.redis.delete(*keys))
+
+    def incr(self, key):
+        self.commands.append(lambda: self.redis.incr(key))
+
+    async def execute(self):
+        self.redis.executed.append(len(self.commands))
+        return [await command() for command in self.commands]
+
+
+@pytest.mark.unit
+@pytest.mark.caching
+class TestMemoryBackend:
+    """Tests for the in-process TTL/LRU tier"""
+
+    async def test_ttl_expiry(self):
+        """Test entries disappear after their TTL"""
+        backend = MemoryBackend()
+        with patch('bot.caching.backends.time.monotonic', return_value=100.0):
+            await backend.set("key", b"value", ttl=10)
+            assert await backend.get("key") == b"value"
+
+        with patch('bot.caching.backends.time.monotonic', return_value=111.0):
+            assert await backend.get("key") is None
+
+    async def test_lru_eviction(self):
+        """Test least recently used entries are evicted at capacity"""
+        backend = MemoryBackend(max_entries=2)
+        await backend.set("a", b"1", ttl=60)
+        await backend.set("b", b"2", ttl=60)
+        await backend.get("a")  # "b" is now least recently used
+        await backend.set("c", b"3", ttl=60)
+
+        assert await backend.get("b") is None
+        assert await backend.get("a") == b"1"
+        assert backend.get_stats()["local"]["evictions"] == 1
+
+    async def test_delete_pattern(self):
+        """Test glob-pattern deletes"""
+        backend = MemoryBackend()
+        await backend.set("category:a", b"1", ttl=60)
+        await backend.set("category:b", b"1", ttl=60)
+        await backend.set("item:a", b"1", ttl=60)
+
+        assert await backend.delete_pattern("category:*") == 2
+        assert await backend.get("item:a") == b"1"
+
+    async def test_lock_released_only_by_holder(self):
+        """Test a lock that expired and was taken again is not released by its previous holder"""
+        cache = CacheManager(MemoryBackend())
+        with patch('bot.caching.backends.time.monotonic', return_value=100.0):
+            first = await cache.acquire_lock("lock:key", 30)
+            assert await cache.acquire_lock("lock:key", 30) is None
+
+        with patch('bot.caching.backends.time.monotonic', return_value=131.0):
+            second = await cache.acquire_lock("lock:key", 30)
+            assert second is not None
+            assert not await cache.release_lock("lock:key", first)
+            assert await cache.acquire_lock("lock:key", 30) is None
+
+            assert await cache.release_lock("lock:key", second)
+            assert await cache.acquire_lock("lock:key", 30) is not None
+
+    async def test_cache_manager_without_redis(self):
+        """Test caching works with the memory backend alone"""
+        cache = CacheManager(create_cache_backend(None))
+
+        await cache.set("user:1", {"role_id": 1})
+        assert await cache.get("user:1") == {"role_id": 1}
+        assert cache.get_stats()["backend"] == "local"
+
+
+@pytest.mark.unit
+@pytest.mark.caching
+class TestTieredBackend:
+    """Tests for the local + Redis tiered backend"""
+
+    async def test_local_hit_skips_redis(self):
+        """Test repeated reads are served from the local tier"""
+        redis = FakeRedis()
+        redis.data["role:1"] = b"value"
+        backend = TieredBackend(redis)
+
+        assert await backend.get("role:1") == b"value"
+        assert await backend.get("role:1") == b"value"
+
+        assert redis.get.await_count == 1
+        stats = backend.get_stats()
+        assert stats["local"]["hits"] == 1
+        assert stats["redis"]["hits"] == 1
+        assert stats["tiered"]["hits"] == 2
+
+    async def test_delete_publishes_invalidation(self):
+        """Test deletes reach both tiers and are broadcast"""
+        redis = FakeRedis()
+        backend = TieredBackend(redis)
+        await backend.set("user:1", b"value", ttl=60)
+
+        await backend.delete("user:1")
+
+        assert await backend.get("user:1") is None
+        channel, message = redis.published[0]
+        assert channel == INVALIDATION_CHANNEL
+        assert json.loads(message)["keys"] == ["user:1"]
+
+    async def test_remote_invalidation_drops_local_copy(self):
+        """Test another instance's invalidation clears this instance's local tier"""
+        redis = FakeRedis()
+        this_instance, other_instance = TieredBackend(redis), TieredBackend(redis)
+        await this_instance.set("item:a", b"old", ttl=60)
+        await this_instance.set("category:x", b"old", ttl=60)
+        await other_instance.delete_pattern("category:*")
+        await other_instance.delete("item:a")
+        redis.data["item:a"] = b"new"
+
+        for _, message in redis.published:
+            this_instance.apply_invalidation(message)
+
+        assert await this_instance.get("item:a") == b"new"
+        assert await this_instance.local.get("category:x") is None
+
+    async def test_own_invalidation_ignored(self):
+        """Test an instance does not process its own messages"""
+        redis = FakeRedis()
+        backend = TieredBackend(redis)
+        await backend.publish(keys=["user:1"])
+        await backend.local.set("user:1", b"fresh", ttl=60)
+
+        backend.apply_invalidation(redis.published[0][1])
+
+        assert await backend.local.get("user:1") == b"fresh"
+
+    async def test_redis_outage_serves_local(self):
+        """Test local entries keep working when Redis fails"""
+        redis = FakeRedis()
+        backend = TieredBackend(redis)
+        await backend.set("role:1", b"value", ttl=60)
+        redis.get.side_effect = ConnectionError("down")
+
+        assert await backend.get("role:1") == b"value"
+        assert await backend.get("role:2") is None
+
+    async def test_lock_lives_in_redis(self):
+        """Test locks are taken and released (by their holder only) in the shared tier"""
+        redis = FakeRedis()
+        cache = CacheManager(TieredBackend(redis))
+
+        token = await cache.acquire_lock("lock:key", 30)
+        assert redis.data["lock:key"] == token.encode()
+        assert await cache.acquire_lock("lock:key", 30) is None
+
+        assert not await cache.release_lock("lock:key", "someone else")
+        assert await cache.release_lock("lock:key", token)
+        assert "lock:key" not in redis.data
+
+    async def test_batch_invalidation_is_one_round_trip(self):
+        """Test keys and generations are invalidated in one pipeline and one message"""
+        redis = FakeRedis()
+        backend = TieredBackend(redis)
+        await backend.set("item_info:a", b"1", ttl=60)
+        await backend.set("item_info:b", b"1", ttl=60)
+
+        await backend.invalidate(["item_info:a", "item_info:b"], ["gen:category"])
+
+        assert redis.executed == [2]
+        assert await backend.get("item_info:a") is None
+        assert await backend.get_counter("gen:category") == 1
+        assert len(redis.published) == 1
+        message = json.loads(redis.published[0][1])
+        assert message["keys"] == ["item_info:a", "item_info:b"]
+        assert message["counters"] == {"gen:category": 1}
@@ -0,0 +1,168 @@
+"""
+Tests for the cache codec and row DTOs
+"""
+import json
+import pickle
+import timeit
+import pytest
+from datetime import datetime, timezone
+from decimal import Decimal
+from unittest.mock import AsyncMock
+
+from bot.caching import codec
+from bot.caching.cache import CacheManager
+from bot.database.dto import GoodsDTO, UserDTO
+from bot.database.methods import check_user, get_item_info
+
+
+def _legacy_encode(value):
+    """Serialization path used by CacheManager.set before the codec"""
+    try:
+        return json.dumps(value).encode('utf-8')
+    except (TypeError, ValueError):
+        try:
+            return json.dumps(value, default=str).encode('utf-8')
+        except (TypeError, ValueError):
+            return pickle.dumps(value)
+
+
+def _legacy_decode(value):
+    """Deserialization path used by CacheManager.get before the codec"""
+    try:
+        return json.loads(value.decode('utf-8'))
+    except (UnicodeDecodeError, json.JSONDecodeError):
+        return pickle.loads(value)
+
+
+@pytest.fixture
+def goods_dto():
+    return GoodsDTO(name="Test Product", price=Decimal("99.99"), description="A test product",
+                    category_name="Test Category", stock_quantity=100, reserved_quantity=5)
+
+
+@pytest.mark.unit
+@pytest.mark.caching
+class TestCodec:
+    """Tests for codec round-trips"""
+
+    @pytest.mark.parametrize("value", [
+        "text", "", 42, -7, b"\x00raw", None, True, 1.5,
+        Decimal("10.50"), datetime(2025, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+        {"price": Decimal("1.10"), "items": [1, 2], "at": datetime(2025, 1, 1)},
+    ])
+    def test_round_trip_keeps_type(self, value):
+        """Test values come back equal and with the same type"""
+        decoded = codec.decode(codec.encode(value))
+
+        assert decoded == value
+        assert type(decoded) is type(value)
+
+    def test_dto_round_trip(self, goods_dto):
+        """Test DTOs decode to the same class with native Decimal"""
+        decoded = codec.decode(codec.encode(goods_dto))
+
+        assert decoded == goods_dto
+        assert isinstance(decoded.price, Decimal)
+        assert decoded['available_quantity'] == 95
+
+    def test_header_is_versioned(self):
+        """Test encoded values carry magic, version and type tag"""
+        data = codec.encode({"a": 1})
+
+        assert data[:1] == codec.MAGIC
+        assert data[1] == codec.VERSION
+        assert codec.is_encoded(data)
+        assert not codec.is_encoded(b'{"a": 1}')
+
+    def test_unknown_header_rejected(self):
+        """Test data from another serializer is not decoded"""
+        with pytest.raises(codec.CodecError):
+            codec.decode(b'{"a": 1}')
+
+    def test_unsafe_class_rejected(self):
+        """Test object payloads cannot reference arbitrary classes"""
+        data = codec.MAGIC + bytes([codec.VERSION]) + codec.TAG_OBJECT + pickle.dumps(CacheManager)
+
+        with pytest.raises(pickle.UnpicklingError):
+            codec.decode(data)
+
+
+@pytest.mark.unit
+@pytest.mark.caching
+class TestCacheManagerCodec:
+    """Tests for CacheManager using the codec"""
+
+    async def test_set_get_dto(self, goods_dto):
+        """Test a cached DTO is returned with its types"""
+        store = {}
+        redis = AsyncMock()
+        redis.setex.side_effect = lambda key, ttl, value: store.__setitem__(key, value)
+        redis.get.side_effect = lambda key: store.get(key)
+        cache = CacheManager(redis)
+
+        assert await cache.set("item:Test", goods_dto)
+        assert await cache.get("item:Test") == goods_dto
+        assert cache.hits == 1
+
+    async def test_legacy_value_is_a_miss(self):
+        """Test values written by the old serializer are treated as misses"""
+        redis = AsyncMock()
+        redis.get.return_value = b'{"name": "old"}'
+        cache = CacheManager(redis)
+
+        assert await cache.get("item:old") is None
+        assert cache.misses == 1
+
+
+@pytest.mark.unit
+@pytest.mark.database
+class TestRowDTOs:
+    """Tests for DTOs returned by read helpers"""
+
+    def test_check_user_returns_dto(self, test_user):
+        """Test user rows are detached DTOs with dict-style access"""
+        user = check_user(test_user.telegram_id)
+
+        assert isinstance(user, UserDTO)
+        assert user['telegram_id'] == test_user.telegram_id
+        assert user.get('role_id') == test_user.role_id
+        assert user.get('_sa_instance_state') is None
+
+    def test_item_info_cacheable(self, test_goods):
+        """Test goods rows survive the codec unchanged"""
+        item = get_item_info(test_goods.name)
+
+        assert codec.decode(codec.encode(item)) == item
+
+
+@pytest.mark.slow
+@pytest.mark.caching
+class TestCodecBenchmark:
+    """Micro-benchmarks: codec vs the previous JSON/pickle cascade (run with -s to see timings)"""
+
+    NUMBER = 5000
+
+    def _time(self, func) -> float:
+        """Microseconds per call"""
+        return timeit.timeit(func, number=self.NUMBER) / self.NUMBER * 1e6
+
+    def test_benchmark_goods_row(self, goods_dto):
+        """Compare encode/decode of a goods row (ORM __dict__ before, DTO now)"""
+        legacy_row = {**goods_dto.to_dict(), '_sa_instance_state': object()}
+
+        legacy_data = _legacy_encode(legacy_row)
+        codec_data = codec.encode(goods_dto)
+
+        results = {
+            "legacy_encode": self._time(lambda: _legacy_encode(legacy_row)),
+            "codec_encode": self._time(lambda: codec.encode(goods_dto)),
+            "legacy_decode": self._time(lambda: _legacy_decode(legacy_data)),
+            "codec_decode": self._time(lambda: codec.decode(codec_data)),
+        }
+        print("\n" + ", ".join(f"{name}={us:.2f}us" for name, us in results.items())
+              + f", legacy_size={len(legacy_data)}, codec_size={len(codec_data)}")
+
+        # The old path silently turned Decimal into str; the codec keeps it
+        assert isinstance(_legacy_decode(legacy_data)['price'], str)
+        assert isinstance(codec.decode(codec_data).price, Decimal)
+        assert len(codec_data) < len(legacy_data)
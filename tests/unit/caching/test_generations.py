@@ -0,0 +1,140 @@
+"""
+Tests for generation-versioned cache namespaces
+"""
+import json
+import pytest
+from unittest.mock import patch
+
+from bot.caching.backends import MemoryBackend, TieredBackend
+from bot.caching.cache import CacheManager, cache_result
+from bot.database.methods.read import async_cached, invalidate_item_cache, invalidate_items_cache, invalidate_categories_cache
+from tests.unit.caching.test_backends import FakeRedis
+
+
+@pytest.mark.unit
+@pytest.mark.caching
+class TestNamespaceGenerations:
+    """Tests for versioned keys and namespace invalidation"""
+
+    async def test_invalidate_namespace_changes_keys(self):
+        """Test one INCR moves a namespace to fresh keys"""
+        cache = CacheManager(MemoryBackend())
+        old_key = await cache.versioned_key("category", "Books")
+        await cache.set(old_key, "cached")
+
+        assert await cache.invalidate_namespace("category")
+
+        new_key = await cache.versioned_key("category", "Books")
+        assert new_key != old_key
+        assert await cache.get(new_key) is None
+        # Other namespaces are untouched
+        assert await cache.versioned_key("item", "x") == "item:v0:x"
+
+    async def test_generation_error_returns_none(self):
+        """Test an unreadable generation makes callers skip the cache"""
+        cache = CacheManager(FakeRedis())
+        cache.backend.redis.get.side_effect = ConnectionError("down")
+
+        assert await cache.versioned_key("category", "Books") is None
+
+    async def test_async_cached_versioned(self):
+        """Test versioned async_cached results are dropped by a namespace bump"""
+        cache = CacheManager(MemoryBackend())
+        calls = []
+
+        @async_cached(ttl=60, key_prefix="category", versioned=True)
+        def lookup(name):
+            calls.append(name)
+            return f"{name}:{len(calls)}"
+
+        with patch('bot.database.methods.read.get_cache_manager', return_value=cache):
+            assert await lookup("Books") == "Books:1"
+            assert await lookup("Books") == "Books:1"
+            await cache.invalidate_namespace("category")
+            assert await lookup("Books") == "Books:2"
+
+    async def test_invalidate_item_cache_bumps_category(self):
+        """Test item invalidation drops its own key and every category entry"""
+        cache = CacheManager(MemoryBackend())
+        item_key = await cache.versioned_key("item", "Book")
+        await cache.set(item_key, "cached")
+        await cache.set("item_info:Book", "cached")
+
+        with patch('bot.database.methods.read.get_cache_manager', return_value=cache):
+            await invalidate_item_cache("Book")
+
+        assert await cache.get(item_key) is None
+        assert await cache.get("item_info:Book") is None
+        assert await cache.versioned_key("category", "any") == "category:v1:any"
+
+    async def test_batch_invalidation_reads_generation_once(self):
+        """Test batch invalidation builds every versioned key from one generation read"""
+        cache = CacheManager(MemoryBackend())
+        keys = [await cache.versioned_key("item", name) for name in ("A", "B", "C")]
+        for key in keys:
+            await cache.set(key, "cached")
+
+        with patch('bot.database.methods.read.get_cache_manager', return_value=cache), \
+                patch.object(cache, 'get_generation', wraps=cache.get_generation) as get_generation:
+            await invalidate_items_cache(["A", "B", "C"])
+            await invalidate_categories_cache(["X", "Y"])
+
+        assert [call.args for call in get_generation.await_args_list] == [("item",), ("category",)]
+        assert [await cache.get(key) for key in keys] == [None, None, None]
+
+    async def test_cache_result_namespace(self):
+        """Test cache_result keys live under the given namespace"""
+        cache = CacheManager(MemoryBackend())
+        calls = []
+
+        @cache_result(ttl=60, key_prefix="daily", namespace="stats")
+        async def daily(date):
+            calls.append(date)
+            return len(calls)
+
+        with patch('bot.caching.cache.get_cache_manager', return_value=cache):
+            assert await daily("2026-01-01") == 1
+            assert await daily("2026-01-01") == 1
+            await cache.invalidate_namespace("stats")
+            assert await daily("2026-01-01") == 2
+
+
+@pytest.mark.unit
+@pytest.mark.caching
+class TestTieredGenerations:
+    """Tests for generation counters in the tiered backend"""
+
+    async def test_generation_read_is_local(self):
+        """Test repeated generation reads do not reach Redis"""
+        redis = FakeRedis()
+        backend = TieredBackend(redis)
+
+        assert await backend.get_counter("gen:category") == 0
+        assert await backend.get_counter("gen:category") == 0
+        assert redis.get.await_count == 1
+
+    async def test_incr_is_broadcast(self):
+        """Test another instance picks up a new generation from pub/sub"""
+        redis = FakeRedis()
+        this_instance, other_instance = TieredBackend(redis), TieredBackend(redis)
+        assert await this_instance.get_counter("gen:category") == 0
+
+        assert await other_instance.incr("gen:category") == 1
+        message = redis.published[-1][1]
+        assert json.loads(message)["counters"] == {"gen:category": 1}
+
+        this_instance.apply_invalidation(message)
+        assert await this_instance.get_counter("gen:category") == 1
+
+    async def test_stale_message_does_not_rewind(self):
+        """Test out-of-order messages never lower a generation"""
+        redis = FakeRedis()
+        this_instance, other_instance = TieredBackend(redis), TieredBackend(redis)
+        await other_instance.incr("gen:item")
+        await other_instance.incr("gen:item")
+        first, second = (message for _, message in redis.published)
+
+        this_instance.apply_invalidation(second)
+        this_instance.apply_invalidation(first)
+
+        assert await this_instance.get_counter("gen:item") == 2
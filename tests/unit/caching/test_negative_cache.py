@@ -0,0 +1,97 @@
+"""
+Tests for caching of "not found" lookups
+"""
+import pytest
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+from bot.caching.backends import MemoryBackend
+from bot.caching.cache import CacheManager
+from bot.database import run_db
+from bot.database.methods import create_user, create_category, check_user_cached, check_category_cached
+from bot.database.methods.read import async_cached, invalidate_items_cache, invalidate_categories_cache, \
+    invalidate_user_cache
+
+
+@pytest.fixture
+def memory_cache():
+    """Cache manager on the in-process backend, used by the read helpers (invalidation not mocked)"""
+    cache = CacheManager(MemoryBackend())
+    with patch('bot.database.methods.read.get_cache_manager', return_value=cache), \
+            patch('bot.database.methods.cache_utils.invalidate_items_cache', invalidate_items_cache), \
+            patch('bot.database.methods.cache_utils.invalidate_categories_cache', invalidate_categories_cache), \
+            patch('bot.database.methods.cache_utils.invalidate_user_cache', invalidate_user_cache):
+        yield cache
+
+
+@pytest.mark.unit
+@pytest.mark.caching
+class TestNegativeCache:
+    """Tests for negative-result caching"""
+
+    async def test_missing_result_cached(self, memory_cache):
+        """Test repeated lookups of a missing row cost one query"""
+        calls = []
+
+        @async_cached(ttl=60, key_prefix="user", negative_ttl=30)
+        def lookup(telegram_id):
+            calls.append(telegram_id)
+            return None
+
+        assert await lookup(42) is None
+        assert await lookup(42) is None
+        assert calls == [42]
+
+    async def test_negative_ttl_disabled_by_default(self, memory_cache):
+        """Test None results are not cached without negative_ttl"""
+        calls = []
+
+        @async_cached(ttl=60, key_prefix="lookup")
+        def lookup(telegram_id):
+            calls.append(telegram_id)
+            return None
+
+        await lookup(42)
+        await lookup(42)
+        assert calls == [42, 42]
+
+    async def test_negative_entry_uses_short_ttl(self, memory_cache):
+        """Test "not found" entries expire after negative_ttl"""
+        @async_cached(ttl=600, key_prefix="user", negative_ttl=30)
+        def lookup(telegram_id):
+            return None
+
+        with patch('bot.caching.backends.time.monotonic', return_value=100.0):
+            await lookup(42)
+        with patch('bot.caching.backends.time.monotonic', return_value=131.0):
+            assert await memory_cache.get("user:42") is None
+
+    @pytest.mark.database
+    async def test_create_user_invalidates_negative_entry(self, memory_cache, db_with_roles):
+        """Test a user registered right after a cached miss is found"""
+        assert await check_user_cached(555) is None
+
+        await run_db(create_user, telegram_id=555, registration_date=datetime.now(), referral_id=None)
+
+        user = await check_user_cached(555)
+        assert user is not None
+        assert user.telegram_id == 555
+
+    @pytest.mark.database
+    def test_create_user_invalidates_after_commit(self, db_with_roles):
+        """Test registration hands the invalidation to a task once committed, without waiting for it"""
+        with patch('bot.database.methods.cache_utils.safe_create_task') as schedule, \
+                patch('bot.database.methods.cache_utils._invalidate_committed', new_callable=MagicMock) as invalidate:
+            create_user(telegram_id=556, registration_date=datetime.now(), referral_id=None)
+
+        invalidate.assert_called_once_with([], [], [556])
+        schedule.assert_called_once_with(invalidate.return_value)
+
+    @pytest.mark.database
+    async def test_create_category_invalidates_negative_entry(self, memory_cache, db_session):
+        """Test a category created right after a cached miss is found"""
+        assert await check_category_cached("New") is None
+
+        await run_db(create_category, "New")
+
+        assert (await check_category_cached("New")).name == "New"
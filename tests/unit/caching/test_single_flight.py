@@ -0,0 +1,146 @@
+"""
+Tests for cache stampede protection
+"""
+import asyncio
+import pytest
+from unittest.mock import patch
+
+from bot.caching.backends import MemoryBackend
+from bot.caching.cache import CacheManager
+from bot.caching.single_flight import SingleFlight, load_cached, ENTRY_TAG
+from bot.database.methods.read import async_cached
+
+
+def make_loader(calls, value="value", delay=0.01):
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        return value
+    return loader
+
+
+@pytest.mark.unit
+@pytest.mark.caching
+class TestSingleFlight:
+    """Tests for in-process load deduplication"""
+
+    async def test_concurrent_misses_share_one_load(self):
+        """Test concurrent misses of a key run the loader once"""
+        cache = CacheManager(MemoryBackend())
+        calls = []
+        loader = make_loader(calls)
+
+        results = await asyncio.gather(*(load_cached(cache, "hot", 60, loader) for _ in range(20)))
+
+        assert calls == [1]
+        assert {value for value, _ in results} == {"value"}
+        assert await load_cached(cache, "hot", 60, loader) == ("value", True)
+
+    async def test_errors_reach_every_waiter(self):
+        """Test a failed load is raised to all callers and not cached"""
+        flights = SingleFlight()
+
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise ValueError("db down")
+
+        results = await asyncio.gather(*(flights.do("k", failing) for _ in range(3)), return_exceptions=True)
+
+        assert all(isinstance(r, ValueError) for r in results)
+        assert not flights.in_flight("k")
+
+    async def test_cancelled_caller_does_not_cancel_load(self):
+        """Test cancelling one waiter leaves the shared load running"""
+        flights = SingleFlight()
+        calls = []
+        first = asyncio.create_task(flights.do("k", make_loader(calls, delay=0.05)))
+        second = asyncio.create_task(flights.do("k", make_loader(calls, delay=0.05)))
+        await asyncio.sleep(0)
+
+        first.cancel()
+
+        assert await second == "value"
+        assert calls == [1]
+
+    async def test_async_cached_deduplicates_db_calls(self):
+        """Test async_cached runs one query for a burst of misses"""
+        cache = CacheManager(MemoryBackend())
+        calls = []
+
+        @async_cached(ttl=60, key_prefix="item_info")
+        def lookup(name):
+            calls.append(name)
+            return name.upper()
+
+        async def slow_run_db(func, *args):
+            await asyncio.sleep(0.01)
+            return func(*args)
+
+        with patch('bot.database.methods.read.get_cache_manager', return_value=cache), \
+                patch('bot.database.methods.read.run_db', side_effect=slow_run_db):
+            results = await asyncio.gather(*(lookup("book") for _ in range(10)))
+
+        assert results == ["BOOK"] * 10
+        assert calls == ["book"]
+
+
+@pytest.mark.unit
+@pytest.mark.caching
+class TestEarlyRefresh:
+    """Tests for probabilistic early refresh"""
+
+    async def test_fresh_entry_not_refreshed(self):
+        """Test entries far from expiry are served without reloading"""
+        cache = CacheManager(MemoryBackend())
+        calls = []
+        await load_cached(cache, "key", 300, make_loader(calls, delay=0))
+
+        for _ in range(50):
+            assert await load_cached(cache, "key", 300, make_loader(calls, delay=0)) == ("value", True)
+        assert calls == [1]
+
+    async def test_expiring_entry_refreshed_in_background(self):
+        """Test an entry past its soft expiry is served stale once and reloaded by one task"""
+        cache = CacheManager(MemoryBackend())
+        await cache.set("key", (ENTRY_TAG, 0.0, 0.5, "old"), 60)
+        calls = []
+        loader = make_loader(calls, value="new")
+
+        first = await asyncio.gather(*(load_cached(cache, "key", 60, loader) for _ in range(5)))
+        assert {value for value, _ in first} == {"old"}
+
+        await asyncio.sleep(0.05)
+        assert calls == [1]
+        assert (await load_cached(cache, "key", 60, loader))[0] == "new"
+
+
+@pytest.mark.unit
+@pytest.mark.caching
+class TestLoadLock:
+    """Tests for the cross-process load lock"""
+
+    async def test_lock_loser_waits_for_value(self):
+        """Test a process that loses the lock reads the winner's value"""
+        cache = CacheManager(MemoryBackend())
+        calls = []
+        token = await cache.acquire_lock("lock:key", 30)
+        assert token
+
+        async def winner():
+            await asyncio.sleep(0.1)
+            await cache.set("key", (ENTRY_TAG, 10 ** 12, 0.0, "computed elsewhere"), 60)
+            await cache.release_lock("lock:key", token)
+
+        asyncio.create_task(winner())
+        value, _ = await load_cached(cache, "key", 60, make_loader(calls), lock=True)
+
+        assert value == "computed elsewhere"
+        assert calls == []
+
+    async def test_lock_released_after_load(self):
+        """Test the lock is released once the value is stored"""
+        cache = CacheManager(MemoryBackend())
+        calls = []
+
+        assert await load_cached(cache, "key", 60, make_loader(calls), lock=True) == ("value", False)
+        assert await cache.acquire_lock("lock:key", 30)
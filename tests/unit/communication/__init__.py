@@ -0,0 +1 @@
+"""Communication tests"""
@@ -0,0 +1,147 @@
+"""
+Tests for stored, checkpointed broadcasts
+"""
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, patch
+
+from aiogram.exceptions import TelegramForbiddenError
+from aiogram.methods import SendMessage
+
+from bot.communication.broadcast_system import BroadcastManager
+from bot.database.methods import broadcasts
+from bot.database.methods.broadcasts import (
+    BROADCAST_LEASE, claim_interrupted_broadcast_job, count_broadcast_recipients, create_broadcast_job,
+    forget_bot_blocked, get_broadcast_job, get_running_broadcast_jobs, release_broadcast_jobs
+)
+from bot.database.models.main import BotBlockedUser, BroadcastJob, User
+
+USER_IDS = [1001, 1002, 1003, 1004, 1005]
+
+
+@pytest.fixture
+def users(db_with_roles):
+    """Five registered users"""
+    db_with_roles.add_all(User(telegram_id=telegram_id, registration_date=datetime.now(timezone.utc))
+                          for telegram_id in USER_IDS)
+    db_with_roles.commit()
+    return USER_IDS
+
+
+@pytest.fixture
+def bot():
+    """Bot double recording who received the broadcast"""
+    return AsyncMock()
+
+
+@pytest.fixture
+def manager(bot):
+    """Broadcast manager with tiny pages and batches, so jobs span several of each"""
+    return BroadcastManager(bot, batch_size=2, page_size=3)
+
+
+def _job(total: int = len(USER_IDS)):
+    return create_broadcast_job(text="Sale!", parse_mode="HTML", created_by=None, total=total)
+
+
+def _recipients(bot) -> list[int]:
+    return [call.kwargs['chat_id'] for call in bot.send_message.await_args_list]
+
+
+@pytest.mark.unit
+@pytest.mark.database
+class TestBroadcastJobs:
+    """Tests for streaming and checkpointing broadcast jobs"""
+
+    async def test_streams_every_user_once(self, manager, bot, users, db_session):
+        """Test all users get the message in id order and the job ends completed"""
+        job = _job()
+
+        with patch('bot.communication.broadcast_system.checkpoint_broadcast',
+                   wraps=broadcasts.checkpoint_broadcast) as checkpoint:
+            stats = await manager.run_job(job)
+
+        assert _recipients(bot) == USER_IDS
+        assert [call.args[1] for call in checkpoint.call_args_list] == [1002, 1003, 1005]
+        assert stats.sent == 5
+
+        stored = get_broadcast_job(job.id)
+        assert (stored.status, stored.last_user_id, stored.sent, stored.failed) == ('completed', 1005, 5, 0)
+
+    async def test_resumes_after_last_acknowledged_user(self, manager, bot, users, db_session):
+        """Test an interrupted job continues after its cursor and keeps earlier counters"""
+        job = _job()
+        broadcasts.checkpoint_broadcast(job.id, 1002, sent=2, failed=0)
+
+        interrupted, = get_running_broadcast_jobs()
+        stats = await manager.run_job(interrupted)
+
+        assert _recipients(bot) == [1003, 1004, 1005]
+        assert stats.sent == 5
+        assert get_running_broadcast_jobs() == []
+
+    async def test_blocked_users_recorded_and_skipped(self, manager, bot, users, db_session):
+        """Test users who blocked the bot are stored and left out of later broadcasts until they return"""
+        blocked = TelegramForbiddenError(SendMessage(chat_id=1003, text="Sale!"), "bot was blocked by the user")
+        bot.send_message.side_effect = lambda chat_id, **kwargs: _raise(blocked) if chat_id == 1003 else None
+
+        stats = await manager.run_job(_job())
+
+        assert (stats.sent, stats.failed, stats.blocked) == (4, 1, 1)
+        assert [row.telegram_id for row in db_session.query(BotBlockedUser)] == [1003]
+        assert count_broadcast_recipients() == 4
+
+        bot.send_message.reset_mock(side_effect=True)
+        await manager.run_job(_job(total=4))
+        assert 1003 not in _recipients(bot)
+
+        forget_bot_blocked(1003)
+        assert count_broadcast_recipients() == 5
+
+    async def test_cancel_stops_job(self, manager, bot, users, db_session):
+        """Test a cancelled job stops after the current batch and is not resumed after a restart"""
+        job = _job()
+
+        await manager.run_job(job, progress_callback=lambda stats: manager.cancel())
+
+        assert _recipients(bot) == [1001, 1002]
+        assert db_session.get(BroadcastJob, job.id).status == 'cancelled'
+        assert get_running_broadcast_jobs() == []
+
+    async def test_live_jobs_are_not_resumed(self, users, db_session):
+        """Test only jobs whose owner stopped checkpointing are claimed, by one instance"""
+        job = _job()
+        assert claim_interrupted_broadcast_job() is None
+
+        # The owner crashed: no checkpoint for longer than the lease
+        db_session.query(BroadcastJob).update({'owner': 'crashed',
+                                               'heartbeat_at': datetime.now() - BROADCAST_LEASE * 2})
+        db_session.commit()
+
+        claimed = claim_interrupted_broadcast_job()
+        assert claimed.id == job.id
+        assert claim_interrupted_broadcast_job() is None
+
+    async def test_released_jobs_are_resumed_at_once(self, users, db_session):
+        """Test a graceful shutdown hands running jobs over without waiting for the lease"""
+        job = _job()
+        assert release_broadcast_jobs() == 1
+        assert claim_interrupted_broadcast_job().id == job.id
+
+    async def test_taken_over_job_stops(self, manager, bot, users, db_session):
+        """Test an instance that lost its job stops delivering and leaves it running for the new owner"""
+        job = _job()
+
+        def take_over(stats):
+            db_session.query(BroadcastJob).update({'owner': 'other'})
+            db_session.commit()
+
+        await manager.run_job(job, progress_callback=take_over)
+
+        assert _recipients(bot) == [1001, 1002, 1003]
+        stored = get_broadcast_job(job.id)
+        assert (stored.status, stored.last_user_id) == ('running', 1002)
+
+
+def _raise(error: Exception):
+    raise error
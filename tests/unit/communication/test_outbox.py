@@ -0,0 +1,155 @@
+"""
+Tests for the notification outbox and its worker
+"""
+import asyncio
+import pytest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, patch
+
+from aiogram.exceptions import TelegramRetryAfter, TelegramForbiddenError, TelegramNetworkError
+from aiogram.methods import SendMessage
+
+from bot.communication.outbox import OutboxWorker, enqueue_notification, backoff_delay, MAX_ATTEMPTS
+from bot.database.models.main import NotificationOutbox, OrderItem
+from bot.payments.notifications import notify_order_confirmed
+
+METHOD = SendMessage(chat_id=1, text="test")
+
+
+@pytest.fixture
+def bot():
+    """Bot double whose send_message results can be scripted"""
+    return AsyncMock()
+
+
+@pytest.fixture
+def worker(bot):
+    """Outbox worker registered as the running one"""
+    outbox_worker = OutboxWorker(bot, batch_size=10)
+    with patch('bot.communication.outbox._worker', outbox_worker):
+        yield outbox_worker
+
+
+@pytest.fixture
+def queue(db_session):
+    """Factory queueing committed messages"""
+
+    def _queue(*chat_ids: int) -> list[NotificationOutbox]:
+        messages = [enqueue_notification(db_session, chat_id, f"message {chat_id}", "order_confirmed")
+                    for chat_id in chat_ids]
+        db_session.commit()
+        return messages
+
+    return _queue
+
+
+def _utcnow() -> datetime:
+    # The database hands back naive UTC datetimes
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _statuses(db_session) -> dict:
+    db_session.expire_all()
+    return {message.chat_id: message.status for message in db_session.query(NotificationOutbox)}
+
+
+@pytest.mark.unit
+@pytest.mark.database
+class TestOutboxEnqueue:
+    """Tests for writing messages in the caller's transaction"""
+
+    def test_rollback_discards_message(self, db_session):
+        """Test a message queued by a rolled back change is never stored"""
+        enqueue_notification(db_session, 1001, "Order confirmed", "order_confirmed")
+        db_session.rollback()
+
+        assert db_session.query(NotificationOutbox).count() == 0
+
+    async def test_commit_wakes_worker(self, db_session, worker):
+        """Test committing queued messages wakes the worker"""
+        worker._loop = asyncio.get_running_loop()
+        enqueue_notification(db_session, 1001, "Order confirmed", "order_confirmed")
+        assert not worker._wakeup.is_set()
+
+        db_session.commit()
+
+        assert worker._wakeup.is_set()
+
+    def test_order_notification_queued(self, db_session, test_order):
+        """Test customer notifications go to the outbox with their kind"""
+        items = db_session.query(OrderItem).filter_by(order_id=test_order.id).all()
+        notify_order_confirmed(db_session, test_order, items, datetime(2025, 11, 16, 18, 45))
+        db_session.commit()
+
+        message = db_session.query(NotificationOutbox).one()
+        assert message.chat_id == test_order.buyer_id
+        assert message.kind == 'order_confirmed'
+        assert message.status == 'pending'
+
+
+@pytest.mark.unit
+@pytest.mark.database
+class TestOutboxWorker:
+    """Tests for draining the outbox"""
+
+    async def test_drain_sends_through_shared_bot(self, worker, bot, queue, db_session):
+        """Test every due message is sent through the one bot and marked sent"""
+        queue(1001, 1002, 1003)
+
+        await worker.drain()
+
+        assert bot.send_message.await_count == 3
+        assert _statuses(db_session) == {1001: 'sent', 1002: 'sent', 1003: 'sent'}
+        assert await worker.drain() == 0
+
+    async def test_retry_after_pauses_and_puts_batch_back(self, worker, bot, queue, db_session):
+        """Test flood control pauses the worker and reschedules the rest of the batch without counting attempts"""
+        queue(1001, 1002, 1003)
+        bot.send_message.side_effect = [None, TelegramRetryAfter(METHOD, "Flood control", retry_after=30)]
+
+        with patch('bot.communication.outbox.asyncio.sleep', new_callable=AsyncMock) as sleep:
+            await worker.drain()
+
+        sleep.assert_awaited_once_with(30)
+        assert bot.send_message.await_count == 2
+        assert _statuses(db_session) == {1001: 'sent', 1002: 'pending', 1003: 'pending'}
+        for message in db_session.query(NotificationOutbox).filter_by(status='pending'):
+            assert message.attempts == 0
+            assert message.next_attempt_at > _utcnow() + timedelta(seconds=20)
+
+    async def test_transient_error_backs_off(self, worker, bot, queue, db_session):
+        """Test a transient failure is retried later, then given up after MAX_ATTEMPTS"""
+        message, = queue(1001)
+        bot.send_message.side_effect = TelegramNetworkError(METHOD, "Connection reset")
+
+        await worker.drain()
+
+        db_session.expire_all()
+        assert message.status == 'pending'
+        assert message.attempts == 1
+        assert message.next_attempt_at > _utcnow() + timedelta(seconds=backoff_delay(1) - 2)
+        assert await worker.drain() == 0
+
+        message.attempts = MAX_ATTEMPTS - 1
+        message.next_attempt_at = _utcnow() - timedelta(seconds=1)
+        db_session.commit()
+        await worker.drain()
+
+        db_session.expire_all()
+        assert message.status == 'failed'
+        assert "Connection reset" in message.last_error
+
+    async def test_blocked_chat_fails_without_retry(self, worker, bot, queue, db_session):
+        """Test a chat that blocked the bot is marked failed and the rest of the batch still goes out"""
+        queue(1001, 1002)
+        bot.send_message.side_effect = [TelegramForbiddenError(METHOD, "bot was blocked by the user"), None]
+
+        await worker.drain()
+
+        assert _statuses(db_session) == {1001: 'failed', 1002: 'sent'}
+
+
+def test_backoff_is_capped():
+    """Test backoff doubles per attempt and stops growing at the cap"""
+    assert backoff_delay(1) * 2 == backoff_delay(2)
+    assert backoff_delay(50) == backoff_delay(60)
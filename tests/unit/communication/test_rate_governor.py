@@ -0,0 +1,131 @@
+"""
+Tests for the Telegram API send governor
+"""
+import asyncio
+import time
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import DeleteMessage, EditMessageText, GetUpdates, SendMessage
+
+from bot.communication.rate_governor import (
+    SendGovernor, SendGovernorMiddleware, SendPriority, send_priority
+)
+
+
+@pytest.fixture
+def governor():
+    """Governor with a small global bucket (10 calls per second, no burst)"""
+    return SendGovernor(global_rate=10, global_burst=1, private_chat_rate=10, chat_burst=1)
+
+
+@pytest.mark.unit
+class TestSendGovernor:
+    """Tests for global and per-chat pacing"""
+
+    async def test_priority_order(self, governor):
+        """Test queued calls get free slots by priority, not by arrival"""
+        await governor.acquire()
+        order = []
+
+        async def send(priority: SendPriority):
+            await governor.acquire(priority=priority)
+            order.append(priority)
+
+        tasks = []
+        for priority in (SendPriority.BROADCAST, SendPriority.NOTIFICATION, SendPriority.INTERACTIVE):
+            tasks.append(asyncio.create_task(send(priority)))
+            await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+
+        assert order == [SendPriority.INTERACTIVE, SendPriority.NOTIFICATION, SendPriority.BROADCAST]
+
+    async def test_global_rate(self, governor):
+        """Test calls beyond the burst are spaced by the global rate"""
+        started_at = time.monotonic()
+        await asyncio.gather(*(governor.acquire() for _ in range(4)))
+
+        assert time.monotonic() - started_at == pytest.approx(0.3, abs=0.08)
+
+    async def test_busy_chat_does_not_hold_up_others(self):
+        """Test a second call to one chat waits for that chat only"""
+        governor = SendGovernor(global_rate=1000, global_burst=100, private_chat_rate=5, chat_burst=1)
+        await governor.acquire(1001)
+
+        waits = await asyncio.gather(governor.acquire(1001), governor.acquire(1002))
+
+        assert waits[0] == pytest.approx(0.2, abs=0.08)
+        assert waits[1] < 0.05
+
+    async def test_groups_paced_slower(self):
+        """Test group chats (negative ids) use the group rate"""
+        governor = SendGovernor(global_rate=1000, global_burst=100, private_chat_rate=100,
+                                group_chat_rate=5, chat_burst=1)
+        assert governor._chat_bucket(-100123).rate == 5
+        assert governor._chat_bucket(1001).rate == 100
+
+    async def test_retry_after_pauses_everyone(self, governor):
+        """Test flood control blocks all sends for the requested time"""
+        governor.retry_after(0.2)
+
+        waited = await governor.acquire(1001)
+
+        assert waited == pytest.approx(0.2, abs=0.08)
+        assert governor.retry_after_count == 1
+
+    async def test_context_priority_and_stats(self, governor):
+        """Test calls inside send_priority() are counted under that class"""
+        await governor.acquire()
+        with send_priority(SendPriority.BROADCAST):
+            await governor.acquire()
+
+        stats = governor.stats()
+        assert stats["broadcast"] == {"queued": 0, "throttled": 1}
+        assert stats["interactive"]["throttled"] == 0
+
+
+@pytest.mark.unit
+class TestSendGovernorMiddleware:
+    """Tests for routing bot API calls through the governor"""
+
+    async def test_send_goes_through_governor(self, governor):
+        """Test a send waits for its chat and global slot"""
+        middleware = SendGovernorMiddleware(governor)
+        make_request = AsyncMock(return_value="ok")
+
+        with patch.object(governor, 'acquire', wraps=governor.acquire) as acquire:
+            assert await middleware(make_request, AsyncMock(), SendMessage(chat_id=1001, text="hi")) == "ok"
+
+        acquire.assert_awaited_once_with(1001)
+
+    async def test_edits_skip_chat_bucket(self, governor):
+        """Test edits and deletions only take a global slot, so navigation is not paced per chat"""
+        middleware = SendGovernorMiddleware(governor)
+
+        with patch.object(governor, 'acquire', wraps=governor.acquire) as acquire:
+            await middleware(AsyncMock(), AsyncMock(), EditMessageText(chat_id=1001, message_id=1, text="hi"))
+            await middleware(AsyncMock(), AsyncMock(), DeleteMessage(chat_id=1001, message_id=1))
+
+        assert [call.args for call in acquire.await_args_list] == [(None,), (None,)]
+        assert 1001 not in governor.chat_buckets
+
+    async def test_polling_exempt(self, governor):
+        """Test long polling never waits behind queued sends"""
+        middleware = SendGovernorMiddleware(governor)
+
+        with patch.object(governor, 'acquire', new_callable=AsyncMock) as acquire:
+            await middleware(AsyncMock(), AsyncMock(), GetUpdates())
+
+        acquire.assert_not_awaited()
+
+    async def test_retry_after_reported(self, governor):
+        """Test a 429 from Telegram pauses the governor and reaches the caller"""
+        middleware = SendGovernorMiddleware(governor)
+        method = SendMessage(chat_id=1001, text="hi")
+        make_request = AsyncMock(side_effect=TelegramRetryAfter(method, "Flood control", retry_after=5))
+
+        with patch.object(governor, 'retry_after') as retry_after, pytest.raises(TelegramRetryAfter):
+            await middleware(make_request, AsyncMock(), method)
+
+        retry_after.assert_called_once_with(5)
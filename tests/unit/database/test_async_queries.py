@@ -0,0 +1,121 @@
+"""
+Tests for the asyncio database path (Database.async_session and lazy queries)
+"""
+import pytest
+from decimal import Decimal
+from datetime import datetime, timezone
+
+from sqlalchemy import select
+
+from bot.database.main import Database
+from bot.database.dsn import async_dsn
+from bot.database.methods.read import query_user_orders, count_user_orders
+from bot.database.methods.lazy_queries import query_categories, query_items_in_category, query_all_users
+from bot.database.methods.delete import remove_from_cart, clear_cart
+from bot.database.models.main import Categories, ShoppingCart
+
+
+@pytest.mark.unit
+@pytest.mark.database
+class TestAsyncSession:
+    """Tests for Database.async_session()"""
+
+    def test_async_dsn_swaps_driver(self, monkeypatch):
+        """Test sync drivers are mapped to their asyncio counterparts"""
+        monkeypatch.setenv('DATABASE_URL', 'mysql+pymysql://u:p@db:3306/shop?charset=utf8mb4')
+        assert async_dsn() == 'mysql+aiomysql://u:p@db:3306/shop?charset=utf8mb4'
+
+        monkeypatch.setenv('DATABASE_URL', 'sqlite:///:memory:')
+        assert async_dsn() == 'sqlite+aiosqlite:///:memory:'
+
+    def test_async_dsn_driver_override(self, monkeypatch):
+        """Test DB_ASYNC_DRIVER overrides the default mapping"""
+        monkeypatch.setenv('DATABASE_URL', 'mysql+pymysql://u:p@db:3306/shop')
+        monkeypatch.setenv('DB_ASYNC_DRIVER', 'mysql+asyncmy')
+        assert async_dsn() == 'mysql+asyncmy://u:p@db:3306/shop'
+
+    @pytest.mark.asyncio
+    async def test_async_session_commits(self, db_session):
+        """Test changes are committed when the block exits normally"""
+        async with Database().async_session() as s:
+            s.add(Categories(name="Async Category"))
+
+        assert db_session.query(Categories).filter_by(name="Async Category").first() is not None
+
+    @pytest.mark.asyncio
+    async def test_async_session_rolls_back_on_error(self, db_session):
+        """Test changes are rolled back when the block raises"""
+        with pytest.raises(RuntimeError):
+            async with Database().async_session() as s:
+                s.add(Categories(name="Rolled Back"))
+                await s.flush()
+                raise RuntimeError("boom")
+
+        async with Database().async_session() as s:
+            assert await s.scalar(select(Categories).where(Categories.name == "Rolled Back")) is None
+
+
+@pytest.mark.unit
+@pytest.mark.database
+class TestAsyncLazyQueries:
+    """Tests for paginated async queries"""
+
+    @pytest.mark.asyncio
+    async def test_query_categories(self, db_session, multiple_categories):
+        """Test categories page and count"""
+        assert await query_categories(count_only=True) == 3
+        assert await query_categories(offset=1, limit=1) == ["Category 2"]
+
+    @pytest.mark.asyncio
+    async def test_query_items_in_category(self, db_session, multiple_products, test_category):
+        """Test goods page inside a category"""
+        assert await query_items_in_category(test_category.name, count_only=True) == 5
+        assert await query_items_in_category(test_category.name, offset=0, limit=2) == ["Product 1", "Product 2"]
+
+    @pytest.mark.asyncio
+    async def test_query_all_users(self, db_session, test_user, test_admin):
+        """Test users are ordered by telegram_id"""
+        assert await query_all_users(count_only=True) == 2
+        assert await query_all_users() == [test_user.telegram_id, test_admin.telegram_id]
+
+    @pytest.mark.asyncio
+    async def test_query_user_orders(self, db_session, test_order, test_goods):
+        """Test orders are returned as dicts with items"""
+        orders = await query_user_orders(test_order.buyer_id)
+
+        assert len(orders) == 1
+        assert orders[0]['order_code'] == test_order.order_code
+        assert orders[0]['items'][0]['item_name'] == test_goods.name
+        assert await count_user_orders(test_order.buyer_id) == 1
+        assert await count_user_orders(test_order.buyer_id, status='delivered') == 0
+
+
+@pytest.mark.unit
+@pytest.mark.cart
+@pytest.mark.database
+class TestAsyncCartWrites:
+    """Tests for async cart removal"""
+
+    @pytest.mark.asyncio
+    async def test_remove_from_cart(self, db_session, test_shopping_cart):
+        """Test removing a single cart row"""
+        success, _ = await remove_from_cart(test_shopping_cart.id, test_shopping_cart.user_id)
+
+        assert success is True
+        assert db_session.query(ShoppingCart).count() == 0
+
+    @pytest.mark.asyncio
+    async def test_remove_from_cart_wrong_user(self, db_session, test_shopping_cart):
+        """Test another user's cart row is not removed"""
+        success, _ = await remove_from_cart(test_shopping_cart.id, test_shopping_cart.user_id + 1)
+
+        assert success is False
+        assert db_session.query(ShoppingCart).count() == 1
+
+    @pytest.mark.asyncio
+    async def test_clear_cart(self, db_session, test_shopping_cart):
+        """Test clearing the cart"""
+        success, _ = await clear_cart(test_shopping_cart.user_id)
+
+        assert success is True
+        assert db_session.query(ShoppingCart).count() == 0
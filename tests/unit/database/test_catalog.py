@@ -0,0 +1,177 @@
+"""
+Tests for the in-memory catalog snapshot
+"""
+import asyncio
+import pytest
+from unittest.mock import patch
+
+from bot.caching.backends import MemoryBackend
+from bot.caching.cache import CacheManager
+from bot.database.methods import create_item, create_category, delete_item, delete_category, add_goods_media
+from bot.database.methods.catalog import (
+    CatalogSnapshot, CATALOG_NAMESPACE, CATALOG_MAX_AGE, load_catalog, ensure_catalog,
+    query_catalog_categories, query_catalog_items, publish_catalog_change
+)
+from bot.database.methods.inventory import add_inventory
+
+
+@pytest.fixture
+def catalog(db_session, multiple_products):
+    """Fresh, loaded catalog snapshot (the module singleton is replaced for the test)"""
+    snapshot = CatalogSnapshot()
+    with patch('bot.database.methods.catalog._catalog', snapshot):
+        snapshot.load()
+        yield snapshot
+
+
+@pytest.mark.unit
+@pytest.mark.database
+class TestCatalogSnapshot:
+    """Tests for loading and browsing the catalog snapshot"""
+
+    def test_load(self, catalog, multiple_products):
+        """Test goods are indexed by category, sorted, with their stock"""
+        product = multiple_products[0]
+        names = sorted(p.name for p in multiple_products if p.category_name == product.category_name)
+
+        assert catalog.items(product.category_name, limit=100) == names
+        assert catalog.count_items(product.category_name) == len(names)
+        assert catalog.get_item(product.name).stock_quantity == product.stock_quantity
+        assert catalog.loaded and catalog.version == 1
+
+    def test_keyset_page(self, catalog):
+        """Test after= continues right after the given key"""
+        categories = catalog.categories(limit=100)
+
+        assert catalog.categories(offset=0, limit=1, after=categories[0]) == categories[1:2]
+
+    async def test_browsing_runs_no_queries(self, catalog, multiple_products, assert_statement_count):
+        """Test category and goods pages are served without database round trips"""
+        category = multiple_products[0].category_name
+
+        with assert_statement_count(0):
+            assert await query_catalog_categories(count_only=True) == catalog.count_categories()
+            assert await query_catalog_categories(limit=10)
+            assert await query_catalog_items(category, limit=10)
+
+    async def test_not_loaded_falls_back_to_database(self, db_session, multiple_products):
+        """Test the query functions read the database while no snapshot is loaded"""
+        with patch('bot.database.methods.catalog._catalog', CatalogSnapshot()):
+            assert await ensure_catalog() is None
+            assert multiple_products[0].name in await query_catalog_items(multiple_products[0].category_name, limit=100)
+
+
+@pytest.mark.unit
+@pytest.mark.database
+class TestCatalogUpdates:
+    """Tests for incremental catalog updates after commit"""
+
+    def test_stock_change(self, catalog, db_session, multiple_products):
+        """Test committed inventory changes update the snapshot"""
+        product = multiple_products[0]
+        initial_stock = product.stock_quantity
+        add_inventory(product.name, 7, session=db_session)
+        assert catalog.get_item(product.name).stock_quantity == initial_stock
+
+        db_session.commit()
+
+        assert catalog.get_item(product.name).stock_quantity == initial_stock + 7
+        assert catalog.version == 2
+
+    def test_commit_hook_runs_no_queries(self, catalog, db_session, multiple_products, assert_statement_count):
+        """Test the snapshot is refreshed by a task, not on the committing connection"""
+        product = multiple_products[0]
+        initial_stock = product.stock_quantity
+        add_inventory(product.name, 7, session=db_session)
+
+        with patch('bot.database.methods.cache_utils.safe_create_task') as schedule:
+            db_session.flush()
+            with assert_statement_count(0):
+                db_session.commit()
+
+        assert catalog.version == 1
+        asyncio.run(schedule.call_args.args[0])
+        assert catalog.get_item(product.name).stock_quantity == initial_stock + 7
+
+    def test_rollback_leaves_snapshot(self, catalog, db_session, multiple_products):
+        """Test rolled back changes never reach the snapshot"""
+        add_inventory(multiple_products[0].name, 7, session=db_session)
+        db_session.rollback()
+        db_session.commit()
+
+        assert catalog.version == 1
+
+    def test_create_and_delete_item(self, catalog, multiple_products):
+        """Test new and deleted goods appear in and leave their category"""
+        category = multiple_products[0].category_name
+
+        create_item("AAA New Product", "New", 10, category)
+        assert catalog.items(category, limit=1) == ["AAA New Product"]
+
+        delete_item("AAA New Product")
+        assert catalog.get_item("AAA New Product") is None
+        assert "AAA New Product" not in catalog.items(category, limit=100)
+
+    def test_category_changes(self, catalog, multiple_products):
+        """Test created and deleted categories"""
+        create_category("Zzz Empty")
+        assert catalog.categories(limit=100)[-1] == "Zzz Empty"
+        assert catalog.count_items("Zzz Empty") == 0
+
+        delete_category("Zzz Empty")
+        assert "Zzz Empty" not in catalog.categories(limit=100)
+
+    def test_media(self, catalog, multiple_products):
+        """Test added media file_ids are served from the snapshot"""
+        add_goods_media(multiple_products[0].name, "file-1", "photo")
+
+        assert [m['file_id'] for m in catalog.get_media(multiple_products[0].name)] == ["file-1"]
+
+
+@pytest.mark.unit
+@pytest.mark.database
+class TestCatalogGenerations:
+    """Tests for catalog coherence between bot instances"""
+
+    async def test_foreign_change_triggers_reload(self, catalog, multiple_products):
+        """Test a catalog generation bumped by another instance reloads the snapshot"""
+        cache = CacheManager(MemoryBackend())
+        with patch('bot.database.methods.catalog.get_cache_manager', return_value=cache):
+            await cache.invalidate_namespace(CATALOG_NAMESPACE)
+
+            assert await ensure_catalog() is catalog
+            assert catalog.version == 2
+            assert catalog.generation == 1
+
+    async def test_old_snapshot_is_reloaded(self, catalog, db_session, multiple_products):
+        """Test changes the bot never heard of (CLI) show up once the snapshot is too old"""
+        product = multiple_products[0]
+        initial_stock = product.stock_quantity
+        with patch('bot.database.methods.cache_utils.safe_create_task'):
+            add_inventory(product.name, 7, session=db_session)
+            db_session.commit()
+
+        assert await ensure_catalog() is catalog
+        assert catalog.version == 1
+
+        catalog.loaded_at -= CATALOG_MAX_AGE + 1
+        assert await ensure_catalog() is catalog
+        assert catalog.version == 2
+        assert catalog.get_item(product.name).stock_quantity == initial_stock + 7
+
+    async def test_own_change_does_not_reload(self, catalog):
+        """Test publishing this instance's own change keeps the snapshot"""
+        cache = CacheManager(MemoryBackend())
+        with patch('bot.database.methods.catalog.get_cache_manager', return_value=cache):
+            await publish_catalog_change()
+
+            assert await ensure_catalog() is catalog
+            assert catalog.version == 1
+            assert not catalog.stale
+
+    async def test_load_catalog(self, db_session, multiple_products):
+        """Test startup loading"""
+        snapshot = CatalogSnapshot()
+        with patch('bot.database.methods.catalog._catalog', snapshot):
+            assert await load_catalog()
+            assert await ensure_catalog() is snapshot
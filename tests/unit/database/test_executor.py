@@ -0,0 +1,113 @@
+"""
+Tests for the dedicated database executor
+"""
+import asyncio
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from bot.database.executor import DatabaseExecutor, run_db_to_completion
+from bot.database.methods import check_role
+from bot.monitoring.metrics import MetricsCollector
+
+
+@pytest.fixture
+def executor():
+    """Small executor, shut down after the test"""
+    db_executor = DatabaseExecutor(max_workers=2)
+    yield db_executor
+    db_executor.shutdown()
+
+
+@pytest.mark.unit
+@pytest.mark.database
+class TestDatabaseExecutor:
+    """Tests for DatabaseExecutor"""
+
+    def test_default_size_matches_connection_pool(self):
+        """Test default worker count equals pool_size + max_overflow"""
+        from bot.database.main import Database
+
+        db_executor = DatabaseExecutor()
+        try:
+            assert db_executor.max_workers == Database.POOL_SIZE + Database.MAX_OVERFLOW
+        finally:
+            db_executor.shutdown()
+
+    async def test_run_returns_result(self, executor, test_user):
+        """Test sync database helper runs in the pool and returns its result"""
+        role = await executor.run(check_role, test_user.telegram_id)
+
+        assert role == test_user.role_id
+        assert executor.get_stats()['completed'] == 1
+
+    async def test_run_propagates_exception(self, executor):
+        """Test exceptions from the worker reach the caller"""
+        def fail():
+            raise ValueError("boom")
+
+        with pytest.raises(ValueError):
+            await executor.run(fail)
+
+        stats = executor.get_stats()
+        assert stats['active'] == 0
+        assert stats['queued'] == 0
+
+    async def test_queue_depth_when_saturated(self, executor):
+        """Test calls queue once every worker is busy"""
+        release = threading.Event()
+        tasks = [asyncio.create_task(executor.run(release.wait, 5)) for _ in range(5)]
+
+        # Let the first two calls occupy both workers
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if executor.get_stats()['active'] == 2:
+                break
+
+        stats = executor.get_stats()
+        assert stats['active'] == 2
+        assert stats['queued'] == 3
+
+        release.set()
+        await asyncio.gather(*tasks)
+
+        stats = executor.get_stats()
+        assert stats['queued'] == 0
+        assert stats['max_queued'] >= 3
+        assert stats['completed'] == 5
+
+    async def test_metrics_recorded(self, executor):
+        """Test wait/exec timings and gauges are reported"""
+        metrics = MetricsCollector()
+
+        with patch('bot.database.executor.get_metrics', return_value=metrics):
+            await executor.run(lambda: 42)
+
+        assert len(metrics.timings['db_executor_wait']) == 1
+        assert len(metrics.timings['db_executor_exec']) == 1
+        assert metrics.gauges['db_executor_queue_depth'] == 0
+        assert metrics.gauges['db_executor_active'] == 0
+
+    async def test_cancelled_caller_waits_for_worker(self, executor):
+        """Test a cancelled call only returns once the worker is done with the caller's session"""
+        started, release = threading.Event(), threading.Event()
+        finished = []
+
+        def use_session():
+            started.set()
+            release.wait(5)
+            finished.append(True)
+
+        with patch('bot.database.executor.get_db_executor', return_value=executor):
+            task = asyncio.create_task(run_db_to_completion(use_session))
+            await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+            task.cancel()
+            await asyncio.sleep(0.05)
+            assert not task.done()
+
+            release.set()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        assert finished == [True]
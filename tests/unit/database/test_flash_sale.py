@@ -0,0 +1,179 @@
+"""
+Tests for flash-sale mode (stock counters and checkout queue in front of reserve_inventory)
+"""
+import asyncio
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from unittest.mock import patch
+
+from bot.database.methods.flash_sale import (
+    FlashSale, LocalStockGate, CheckoutQueue, CheckoutQueueFull, flash_reserve_inventory
+)
+from bot.database.models.main import Goods, Order
+
+
+@pytest.fixture
+def make_orders(db_session, test_user):
+    """Factory creating pending orders for the test user"""
+
+    def _make_orders(count: int) -> list[Order]:
+        orders = [
+            Order(buyer_id=test_user.telegram_id, total_price=Decimal("49.99"), payment_method="cash",
+                  delivery_address="123 Test Street", phone_number="+1234567890", order_status="pending")
+            for _ in range(count)
+        ]
+        db_session.add_all(orders)
+        db_session.commit()
+        return orders
+
+    return _make_orders
+
+
+@pytest.fixture
+async def flash_sale(test_goods_low_stock):
+    """Flash sale on in-process counters, mirrored from the database"""
+    flash_sale = FlashSale(LocalStockGate(), CheckoutQueue(max_size=100, concurrency=1))
+    await flash_sale.reconcile()
+    return flash_sale
+
+
+@pytest.mark.unit
+@pytest.mark.inventory
+@pytest.mark.database
+class TestFlashSaleReserve:
+    """Tests for reservations through the stock counters"""
+
+    async def test_no_oversell(self, flash_sale, make_orders, db_session, test_goods_low_stock):
+        """Test concurrent checkouts reserve exactly the available stock, losers rejected at the counter"""
+        orders = make_orders(8)
+        items = [{'item_name': test_goods_low_stock.name, 'quantity': 1}]
+
+        results = await asyncio.gather(*(
+            flash_sale.reserve(order.id, items, 'cash', session=db_session) for order in orders
+        ))
+        db_session.commit()
+
+        assert [success for success, _ in results].count(True) == 5
+        assert flash_sale.gate.counters[test_goods_low_stock.name] == 0
+        goods = db_session.query(Goods).filter_by(name=test_goods_low_stock.name).one()
+        assert goods.reserved_quantity == 5
+
+    async def test_loser_skips_database(self, flash_sale, make_orders, db_session, test_goods_low_stock,
+                                        assert_statement_count):
+        """Test a checkout the counters cannot cover runs no SQL"""
+        order, = make_orders(1)
+
+        with assert_statement_count(0):
+            success, message = await flash_sale.reserve(
+                order.id, [{'item_name': test_goods_low_stock.name, 'quantity': 6}], 'cash', session=db_session
+            )
+
+        assert not success
+        assert "Available: 5" in message
+
+    async def test_rollback_gives_counters_back(self, flash_sale, make_orders, db_session, test_goods_low_stock):
+        """Test counters taken by a rolled back order are returned"""
+        order, = make_orders(1)
+        items = [{'item_name': test_goods_low_stock.name, 'quantity': 2}]
+
+        assert (await flash_sale.reserve(order.id, items, 'cash', session=db_session))[0]
+        assert flash_sale.gate.counters[test_goods_low_stock.name] == 3
+
+        db_session.rollback()
+        await asyncio.sleep(0)
+
+        assert flash_sale.gate.counters[test_goods_low_stock.name] == 5
+
+    async def test_reconcile_keeps_in_flight(self, flash_sale, make_orders, db_session, test_goods_low_stock):
+        """Test reconciling before commit does not hand out reserved stock; after commit it matches the database"""
+        order, = make_orders(1)
+        items = [{'item_name': test_goods_low_stock.name, 'quantity': 2}]
+        await flash_sale.reserve(order.id, items, 'cash', session=db_session)
+
+        # Committed database value seen by another connection while the order is open
+        await flash_sale.reconcile(available={test_goods_low_stock.name: 5})
+        assert flash_sale.gate.counters[test_goods_low_stock.name] == 3
+
+        db_session.commit()
+        await flash_sale.reconcile([test_goods_low_stock.name])
+        assert flash_sale.gate.counters[test_goods_low_stock.name] == 3
+
+    def test_in_flight_tracking_is_thread_safe(self):
+        """Test commit hooks in executor threads and the loop can track in-flight stock at once"""
+        flash_sale = FlashSale(LocalStockGate(), CheckoutQueue(max_size=1, concurrency=1))
+
+        def churn():
+            for _ in range(2000):
+                flash_sale._track({'a': 1, 'b': 2}, 1)
+                flash_sale._track({'a': 1, 'b': 2}, -1)
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            for future in [pool.submit(churn) for _ in range(8)]:
+                future.result()
+
+        assert flash_sale._in_flight == {}
+
+    async def test_missing_counter_falls_back_to_database(self, make_orders, db_session, test_goods_low_stock):
+        """Test goods without a counter are reserved by the database and then mirrored"""
+        flash_sale = FlashSale(LocalStockGate(), CheckoutQueue(max_size=100, concurrency=1))
+        order, = make_orders(1)
+
+        success, _ = await flash_sale.reserve(
+            order.id, [{'item_name': test_goods_low_stock.name, 'quantity': 2}], 'cash', session=db_session
+        )
+
+        assert success
+        assert flash_sale.gate.counters[test_goods_low_stock.name] == 5
+
+    async def test_disabled_mode_reserves_directly(self, test_order, db_session):
+        """Test flash_reserve_inventory is plain reserve_inventory while the mode is off"""
+        with patch('bot.database.methods.flash_sale._flash_sale', None):
+            success, _ = await flash_reserve_inventory(
+                test_order.id, [{'item_name': "Test Product", 'quantity': 2}], 'cash', session=db_session
+            )
+
+        assert success
+        assert test_order.order_status == 'reserved'
+
+
+@pytest.mark.unit
+class TestCheckoutQueue:
+    """Tests for the bounded checkout queue"""
+
+    async def test_positions_and_overflow(self):
+        """Test waiting customers learn their position and the queue rejects beyond max_size"""
+        queue = CheckoutQueue(max_size=2, concurrency=1)
+        release = asyncio.Event()
+        positions = []
+
+        async def checkout():
+            async with queue.slot(lambda position: _record(positions, position)):
+                await release.wait()
+
+        tasks = [asyncio.create_task(checkout()) for _ in range(3)]
+        await asyncio.sleep(0)
+
+        assert positions == [1, 2]
+        with pytest.raises(CheckoutQueueFull):
+            async with queue.slot():
+                pass
+
+        release.set()
+        await asyncio.gather(*tasks)
+        assert len(queue) == 0
+
+    async def test_full_queue_gives_counters_back(self, flash_sale, make_orders, db_session, test_goods_low_stock):
+        """Test a customer turned away by the queue does not keep stock"""
+        flash_sale.queue = CheckoutQueue(max_size=0, concurrency=1)
+        order, = make_orders(1)
+
+        with pytest.raises(CheckoutQueueFull):
+            await flash_sale.reserve(order.id, [{'item_name': test_goods_low_stock.name, 'quantity': 2}], 'cash',
+                                     session=db_session)
+
+        assert flash_sale.gate.counters[test_goods_low_stock.name] == 5
+
+
+async def _record(positions: list, position: int):
+    positions.append(position)
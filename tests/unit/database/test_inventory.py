@@ -1,10 +1,15 @@
 """
 Tests for inventory management system
 """
+import random
+import threading
+import time
 import pytest
 from decimal import Decimal
 from datetime import datetime, timezone, timedelta
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
 
 from bot.database.methods.inventory import (
     reserve_inventory,
@@ -12,9 +17,12 @@ from bot.database.methods.inventory import (
     deduct_inventory,
     add_inventory,
     get_inventory_stats,
-    log_inventory_change
+    log_inventory_change,
+    cleanup_expired_reservations
 )
-from bot.database.models.main import Goods, Order, OrderItem, InventoryLog
+from bot.database.main import Database
+from bot.database.methods import inventory
+from bot.database.models.main import Goods, Order, OrderItem, InventoryLog, Categories, CustomerInfo, NotificationOutbox
 
 
 @pytest.mark.unit
@@ -75,6 +83,102 @@ class TestInventoryReservation:
         assert multiple_products[1].reserved_quantity == 3
 
 
+@pytest.mark.unit
+@pytest.mark.inventory
+@pytest.mark.database
+class TestInventoryStatements:
+    """Tests for the number of round trips of the reservation path"""
+
+    def _order_items(self, db_session, order, products):
+        for product in products:
+            db_session.add(OrderItem(order_id=order.id, item_name=product.name, price=product.price, quantity=1))
+        db_session.commit()
+        return [{'item_name': product.name, 'quantity': 1} for product in products]
+
+    def test_reserve_statement_count_independent_of_items(self, db_session, test_order, multiple_products,
+                                                          assert_statement_count):
+        """Test reserving five items costs the same statements as one (setting, order lock, update, log insert)"""
+        items = [{'item_name': product.name, 'quantity': 1} for product in reversed(multiple_products)]
+
+        with assert_statement_count(4):
+            success, _ = reserve_inventory(test_order.id, items, 'cash', db_session)
+
+        assert success
+        assert db_session.query(InventoryLog).filter_by(change_type='reserve').count() == len(multiple_products)
+
+    def test_failed_reservation_changes_nothing(self, db_session, test_order, multiple_products):
+        """Test one short item rolls back the whole conditional update"""
+        items = [
+            {'item_name': multiple_products[0].name, 'quantity': 1},
+            {'item_name': multiple_products[1].name, 'quantity': 1000},
+        ]
+
+        success, message = reserve_inventory(test_order.id, items, 'cash', db_session)
+
+        assert not success
+        assert f"Insufficient stock for '{multiple_products[1].name}'" in message
+        assert db_session.query(Goods).filter(Goods.reserved_quantity > 0).count() == 0
+
+    def test_release_locks_goods_in_one_statement(self, db_session, test_order, multiple_products,
+                                                  assert_statement_count):
+        """Test release locks all goods with a single sorted query"""
+        items = self._order_items(db_session, test_order, multiple_products)
+        reserve_inventory(test_order.id, items, 'cash', db_session)
+        db_session.commit()
+        order_id = test_order.id
+        db_session.expire_all()
+
+        # Order lock, order items, goods lock, goods update, log insert
+        with assert_statement_count(5) as statements:
+            success, _ = release_reservation(order_id, session=db_session)
+
+        assert success
+        goods_selects = [s for s in statements if s.lstrip().upper().startswith("SELECT") and "FROM goods" in s]
+        assert len(goods_selects) == 1
+        assert "ORDER BY goods.name" in goods_selects[0]
+
+    def test_without_session(self, db_session, test_order, test_goods):
+        """Test the functions run in their own committed transaction without a session"""
+        success, _ = reserve_inventory(test_order.id, [{'item_name': test_goods.name, 'quantity': 2}], 'cash')
+
+        assert success
+        db_session.refresh(test_goods)
+        assert test_goods.reserved_quantity == 2
+
+
+@pytest.mark.unit
+@pytest.mark.inventory
+@pytest.mark.database
+class TestInventoryCacheInvalidation:
+    """Tests for post-commit cache invalidation of inventory changes"""
+
+    def test_invalidated_once_after_commit(self, db_session, test_order, multiple_products):
+        """Test all touched items are invalidated in one batch, only after commit"""
+        items = [
+            {'item_name': multiple_products[0].name, 'quantity': 1},
+            {'item_name': multiple_products[1].name, 'quantity': 1},
+        ]
+
+        with patch('bot.database.methods.cache_utils.invalidate_items_cache', new_callable=AsyncMock) as invalidate:
+            success, _ = reserve_inventory(test_order.id, items, 'cash', db_session)
+            assert success
+            invalidate.assert_not_called()
+
+            db_session.commit()
+
+        invalidate.assert_called_once_with(sorted([multiple_products[0].name, multiple_products[1].name]))
+
+    def test_rollback_discards_invalidation(self, db_session, test_goods):
+        """Test a rolled back change never invalidates the cache"""
+        with patch('bot.database.methods.cache_utils.invalidate_items_cache', new_callable=AsyncMock) as invalidate:
+            success, _ = add_inventory(test_goods.name, 5, session=db_session)
+            assert success
+            db_session.rollback()
+            db_session.commit()
+
+        invalidate.assert_not_called()
+
+
 @pytest.mark.unit
 @pytest.mark.inventory
 @pytest.mark.database
@@ -128,6 +232,91 @@ class TestInventoryRelease:
         assert "not found" in message.lower()
 
 
+@pytest.fixture
+def expired_orders(db_session, test_user, test_goods):
+    """Factory creating reserved orders (2 units of test_goods each) whose reservation ran out"""
+
+    def _expired_orders(count: int, bonus_applied: Decimal = Decimal("0")) -> list[Order]:
+        orders = []
+        for i in range(count):
+            order = Order(
+                buyer_id=test_user.telegram_id,
+                total_price=Decimal("199.98"),
+                bonus_applied=bonus_applied,
+                payment_method="cash",
+                delivery_address="123 Test Street",
+                phone_number="+1234567890",
+                order_status="reserved",
+                order_code=f"EXP{i:03d}",
+                reserved_until=datetime.now(timezone.utc) - timedelta(hours=1)
+            )
+            db_session.add(order)
+            db_session.flush()
+            db_session.add(OrderItem(order_id=order.id, item_name=test_goods.name, price=test_goods.price, quantity=2))
+            orders.append(order)
+        test_goods.reserved_quantity += 2 * count
+        db_session.commit()
+        return orders
+
+    return _expired_orders
+
+
+@pytest.mark.unit
+@pytest.mark.inventory
+@pytest.mark.database
+class TestReservationExpiry:
+    """Tests for the chunked expiry job"""
+
+    @pytest.fixture(autouse=True)
+    def no_side_effects(self):
+        """Keep the audit log and customer CSV out of the test run"""
+        with patch('bot.database.methods.inventory.log_order_cancellation') as log_cancellation, \
+                patch('bot.database.methods.inventory.sync_customer_to_csv') as sync_csv:
+            yield log_cancellation, sync_csv
+
+    async def test_releases_in_chunks(self, db_session, expired_orders, test_goods):
+        """Test every expired order is released, one transaction per chunk"""
+        orders = expired_orders(5)
+
+        with patch('bot.database.methods.inventory._expire_reservation_chunk',
+                   wraps=inventory._expire_reservation_chunk) as expire_chunk:
+            count, order_codes = await cleanup_expired_reservations(chunk_size=2)
+
+        assert count == 5
+        assert sorted(order_codes) == [order.order_code for order in orders]
+        assert expire_chunk.call_count == 3
+
+        db_session.expire_all()
+        assert test_goods.reserved_quantity == 0
+        assert {order.order_status for order in orders} == {'expired'}
+        assert db_session.query(InventoryLog).filter_by(change_type='release').count() == 5
+
+    async def test_active_reservations_untouched(self, db_session, test_order, test_goods):
+        """Test reservations that have not run out stay reserved"""
+        reserve_inventory(test_order.id, [{'item_name': test_goods.name, 'quantity': 2}], 'cash', db_session)
+        db_session.commit()
+
+        assert await cleanup_expired_reservations() == (0, [])
+
+        db_session.expire_all()
+        assert test_order.order_status == 'reserved'
+        assert test_goods.reserved_quantity == 2
+
+    async def test_bonus_refund_after_commit(self, db_session, expired_orders, test_customer_info, no_side_effects):
+        """Test bonuses are refunded with their notices queued in the outbox, CSV sync runs after commit"""
+        _, sync_csv = no_side_effects
+        expired_orders(2, bonus_applied=Decimal("5.00"))
+
+        await cleanup_expired_reservations()
+
+        db_session.expire_all()
+        assert test_customer_info.bonus_balance == Decimal("10.00")
+        sync_csv.assert_called_once()
+        notices = db_session.query(NotificationOutbox).filter_by(kind='bonus_refund').all()
+        assert [notice.chat_id for notice in notices] == [test_customer_info.telegram_id] * 2
+        assert {notice.status for notice in notices} == {'pending'}
+
+
 @pytest.mark.unit
 @pytest.mark.inventory
 @pytest.mark.database
@@ -291,3 +480,93 @@ class TestInventoryLogging:
         assert log_entry.change_type == 'add'
         assert log_entry.quantity_change == 50
         assert log_entry.admin_id == test_admin.telegram_id
+
+
+@pytest.fixture
+def file_database(tmp_path, monkeypatch):
+    """
+    File SQLite database shared by several threads. BEGIN IMMEDIATE takes the write lock
+    at transaction start, standing in for the row locks SELECT ... FOR UPDATE takes on MySQL.
+    """
+    engine = create_engine(f"sqlite:///{tmp_path / 'shop.db'}", connect_args={"timeout": 30})
+
+    @event.listens_for(engine, "connect")
+    def _connect(dbapi_conn, connection_record):
+        dbapi_conn.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _begin(conn):
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+    Database.BASE.metadata.create_all(engine)
+    session_local = sessionmaker(bind=engine, expire_on_commit=False)
+    monkeypatch.setattr(Database(), '_Database__engine', engine)
+    monkeypatch.setattr(Database(), '_Database__SessionLocal', session_local)
+    yield session_local
+    engine.dispose()
+
+
+@pytest.mark.slow
+@pytest.mark.inventory
+@pytest.mark.database
+class TestReservationBenchmark:
+    """Concurrent checkout benchmark (run with -s to see reservations/sec)"""
+
+    THREADS = 8
+    ORDERS_PER_THREAD = 25
+    STOCK = 40
+
+    def test_concurrent_reservations_never_oversell(self, file_database):
+        """Test carts sharing goods in random order all finish, and reserved never exceeds stock"""
+        names = [f"Item {i}" for i in range(5)]
+        with file_database() as s:
+            s.add(Categories(name="Flash"))
+            s.add_all(Goods(name=name, price=Decimal("1.00"), description="-", category_name="Flash",
+                            stock_quantity=self.STOCK, reserved_quantity=0) for name in names)
+            orders = [Order(buyer_id=None, total_price=Decimal("1.00"), payment_method="cash", delivery_address="-",
+                            phone_number="-", order_status="pending")
+                      for _ in range(self.THREADS * self.ORDERS_PER_THREAD)]
+            s.add_all(orders)
+            s.commit()
+            order_ids = [order.id for order in orders]
+
+        results = []
+        results_lock = threading.Lock()
+
+        def checkout(thread_order_ids):
+            rng = random.Random(thread_order_ids[0])
+            for order_id in thread_order_ids:
+                # Same goods, different cart order in every thread
+                cart = [{'item_name': name, 'quantity': rng.randint(1, 3)} for name in rng.sample(names, 3)]
+                success, message = reserve_inventory(order_id, cart, 'cash')
+                with results_lock:
+                    results.append((success, message, cart))
+
+        threads = [
+            threading.Thread(target=checkout, args=(order_ids[i::self.THREADS],))
+            for i in range(self.THREADS)
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        reserved_by_orders = dict.fromkeys(names, 0)
+        for success, message, cart in results:
+            assert success or "Insufficient stock" in message, message
+            if success:
+                for item in cart:
+                    reserved_by_orders[item['item_name']] += item['quantity']
+
+        with file_database() as s:
+            goods = {row.name: row for row in s.query(Goods)}
+            logged = s.query(InventoryLog).filter_by(change_type='reserve').count()
+
+        print(f"\n{len(results) / elapsed:.0f} reservations/sec, "
+              f"{sum(success for success, _, _ in results)} of {len(results)} succeeded")
+        for name in names:
+            assert goods[name].reserved_quantity == reserved_by_orders[name]
+            assert goods[name].reserved_quantity <= goods[name].stock_quantity
+        assert logged == sum(len(cart) for success, _, cart in results if success)
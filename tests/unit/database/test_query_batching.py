@@ -0,0 +1,89 @@
+"""
+Tests for constant-query listings (no N+1 per row)
+"""
+import pytest
+from decimal import Decimal
+from datetime import datetime, timezone
+
+from bot.database.methods import query_user_orders
+from bot.database.methods.lazy_queries import query_user_referrals
+from bot.database.models.main import User, Order, OrderItem, ReferralEarnings
+
+
+@pytest.fixture
+def user_orders(db_session, test_user, test_goods):
+    """Create 5 orders with 2 items each"""
+    for i in range(5):
+        order = Order(
+            buyer_id=test_user.telegram_id,
+            total_price=Decimal("20.00"),
+            payment_method="cash",
+            delivery_address="123 Test Street",
+            phone_number="+1234567890",
+            order_status="delivered" if i % 2 else "pending",
+            order_code=f"BATCH{i}"
+        )
+        db_session.add(order)
+        db_session.flush()
+        for _ in range(2):
+            db_session.add(OrderItem(order_id=order.id, item_name=test_goods.name, price=test_goods.price,
+                                     quantity=1))
+    db_session.commit()
+
+
+@pytest.fixture
+def referrals_with_earnings(db_with_roles, test_user):
+    """Create 4 referrals of test_user with different earnings"""
+    amounts = {2001: [Decimal("5.00")], 2002: [Decimal("10.00"), Decimal("15.00")], 2003: [], 2004: [Decimal("1.00")]}
+    for telegram_id, earnings in amounts.items():
+        db_with_roles.add(User(telegram_id=telegram_id, registration_date=datetime.now(timezone.utc),
+                               referral_id=test_user.telegram_id))
+        db_with_roles.flush()
+        for amount in earnings:
+            db_with_roles.add(ReferralEarnings(referrer_id=test_user.telegram_id, referral_id=telegram_id,
+                                               amount=amount, original_amount=amount * 10))
+    db_with_roles.commit()
+
+
+@pytest.mark.unit
+@pytest.mark.database
+class TestOrderHistoryBatching:
+    """Tests for query_user_orders"""
+
+    async def test_orders_with_items_in_two_statements(self, user_orders, test_user, assert_statement_count):
+        """Test a page of orders and their items takes two queries regardless of size"""
+        with assert_statement_count(2):
+            orders = await query_user_orders(test_user.telegram_id, limit=10)
+
+        assert len(orders) == 5
+        assert all(len(order['items']) == 2 for order in orders)
+
+    async def test_status_list_filter(self, user_orders, test_user):
+        """Test filtering by several statuses at once"""
+        orders = await query_user_orders(test_user.telegram_id, status=['pending', 'reserved'])
+
+        assert len(orders) == 3
+        assert {order['order_status'] for order in orders} == {'pending'}
+
+
+@pytest.mark.unit
+@pytest.mark.referrals
+@pytest.mark.database
+class TestReferralListingBatching:
+    """Tests for query_user_referrals"""
+
+    async def test_referrals_single_statement(self, referrals_with_earnings, test_user, assert_statement_count):
+        """Test earnings are aggregated in the same query as the page"""
+        with assert_statement_count(1):
+            referrals = await query_user_referrals(test_user.telegram_id, limit=10)
+
+        assert [r['telegram_id'] for r in referrals] == [2002, 2001, 2004, 2003]
+        assert referrals[0]['total_earned'] == Decimal("25.00")
+        assert referrals[-1]['total_earned'] == 0
+
+    async def test_referrals_sorted_across_pages(self, referrals_with_earnings, test_user):
+        """Test ordering by earnings is global, not per page"""
+        first = await query_user_referrals(test_user.telegram_id, offset=0, limit=2)
+        second = await query_user_referrals(test_user.telegram_id, offset=2, limit=2)
+
+        assert [r['telegram_id'] for r in first + second] == [2002, 2001, 2004, 2003]
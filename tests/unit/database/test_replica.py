@@ -0,0 +1,108 @@
+"""
+Tests for read replica routing
+"""
+import pytest
+from unittest.mock import patch
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from bot.database import Database, use_replica
+from bot.database.models.main import Categories
+
+
+@pytest.fixture
+def replica_engine(monkeypatch):
+    """Attach a separate in-memory SQLite database as the read replica"""
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Database.BASE.metadata.create_all(engine)
+
+    db = Database()
+    monkeypatch.setattr(db, '_Database__replica_engine', engine)
+    monkeypatch.setattr(db, '_Database__ReplicaSessionLocal', sessionmaker(bind=engine, expire_on_commit=False))
+    monkeypatch.setattr(db, '_Database__replica_ok', True)
+    monkeypatch.setattr(db, '_Database__replica_checked_at', 0.0)
+    monkeypatch.setattr(db, '_Database__replica_down_until', 0.0)
+
+    yield engine
+    engine.dispose()
+
+
+@pytest.mark.unit
+@pytest.mark.database
+class TestReplicaRouting:
+    """Tests for Database().session(readonly=True)"""
+
+    def test_readonly_without_replica_uses_primary(self, db_session):
+        """Test readonly sessions use the primary when no replica is configured"""
+        db = Database()
+        assert db.replica_engine is None
+
+        with db.session(readonly=True) as s:
+            assert s.get_bind() is db.engine
+
+    def test_readonly_uses_replica(self, replica_engine):
+        """Test readonly sessions are bound to the replica"""
+        db = Database()
+
+        with db.session(readonly=True) as s:
+            assert s.get_bind() is replica_engine
+
+        with db.session() as s:
+            assert s.get_bind() is db.engine
+
+    def test_use_replica_decorator(self, replica_engine, db_session):
+        """Test @use_replica routes sessions opened inside the function"""
+        db_session.add(Categories(name="Primary only"))
+        db_session.commit()
+
+        @use_replica
+        def count_categories():
+            with Database().session() as s:
+                return s.query(Categories).count()
+
+        assert count_categories() == 0  # Replica has not received the row
+
+        with Database().session() as s:
+            assert s.query(Categories).count() == 1
+
+    def test_lagging_replica_falls_back(self, replica_engine):
+        """Test reads go to the primary while the replica lags too far behind"""
+        db = Database()
+
+        with patch('bot.database.main._replication_lag', return_value=db.REPLICA_MAX_LAG + 1):
+            with db.session(readonly=True) as s:
+                assert s.get_bind() is db.engine
+
+    def test_unreachable_replica_falls_back(self, monkeypatch, db_session):
+        """Test an unreachable replica is skipped and reads use the primary"""
+        broken = create_engine("sqlite:////nonexistent/dir/replica.db")
+        db = Database()
+        monkeypatch.setattr(db, '_Database__replica_engine', broken)
+        monkeypatch.setattr(db, '_Database__ReplicaSessionLocal', sessionmaker(bind=broken))
+        monkeypatch.setattr(db, '_Database__replica_ok', True)
+        monkeypatch.setattr(db, '_Database__replica_checked_at', 0.0)
+        monkeypatch.setattr(db, '_Database__replica_down_until', 0.0)
+
+        with db.session(readonly=True) as s:
+            assert s.get_bind() is db.engine
+
+        assert db.replica_available() is False
+
+    async def test_async_probe_before_first_async_session(self, replica_engine, monkeypatch):
+        """Test the async probe creates the async engines instead of reporting the replica unavailable"""
+        db = Database()
+        for name in ('__async_engine', '__AsyncSessionLocal', '__async_replica_engine',
+                     '__AsyncReplicaSessionLocal'):
+            monkeypatch.setattr(db, f'_Database{name}', None)
+        monkeypatch.setattr('bot.database.main.async_dsn', lambda: "sqlite+aiosqlite://")
+        monkeypatch.setattr('bot.database.main.async_replica_dsn', lambda: "sqlite+aiosqlite://")
+
+        try:
+            assert await db.async_replica_available() is True
+        finally:
+            await db.dispose_async()
@@ -0,0 +1,136 @@
+"""
+Tests for the event-driven reservation expiry scheduler
+"""
+import asyncio
+import time
+import pytest
+from datetime import datetime, timezone, timedelta
+from unittest.mock import AsyncMock, patch
+
+from bot.database.methods.inventory import reserve_inventory
+from bot.tasks.reservation_cleaner import HeapDeadlineStore, ReservationScheduler
+
+
+@pytest.fixture
+def scheduler():
+    """Scheduler on the in-process heap, registered as the running one"""
+    reservation_scheduler = ReservationScheduler(HeapDeadlineStore())
+    with patch('bot.tasks.reservation_cleaner._scheduler', reservation_scheduler):
+        yield reservation_scheduler
+
+
+@pytest.fixture
+def cleanup():
+    """Mocked expiry job, to observe when the scheduler runs it"""
+    with patch('bot.tasks.reservation_cleaner.cleanup_expired_reservations',
+               new_callable=AsyncMock, return_value=(0, [])) as cleanup_mock:
+        yield cleanup_mock
+
+
+async def _run_for(scheduler: ReservationScheduler, seconds: float, before_wait=None):
+    task = asyncio.create_task(scheduler.run())
+    try:
+        await asyncio.sleep(0.05)
+        if before_wait:
+            await before_wait()
+        await asyncio.sleep(seconds)
+    finally:
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+
+@pytest.mark.unit
+class TestHeapDeadlineStore:
+    """Tests for the in-process deadline store"""
+
+    async def test_earliest_first(self):
+        """Test next() is the earliest deadline and pop_due() only returns passed ones"""
+        store = HeapDeadlineStore()
+        await store.add({1: 300.0, 2: 100.0, 3: 200.0})
+
+        assert await store.next() == 100.0
+        assert await store.pop_due(250.0) == [2, 3]
+        assert await store.next() == 300.0
+
+    async def test_one_deadline_per_order(self):
+        """Test re-adding orders (periodic re-sync) keeps one entry each, with the latest deadline"""
+        store = HeapDeadlineStore()
+        for _ in range(3):
+            await store.add({1: 100.0, 2: 200.0})
+        await store.add({1: 300.0})
+
+        assert len(store._heap) == 3
+        assert await store.next() == 200.0
+        assert await store.pop_due(400.0) == [2, 1]
+        assert await store.next() is None
+
+
+@pytest.mark.unit
+@pytest.mark.inventory
+@pytest.mark.database
+class TestReservationScheduler:
+    """Tests for scheduling and waking up at deadlines"""
+
+    async def test_commit_schedules_deadline(self, scheduler, db_session, test_order, test_goods):
+        """Test a committed reservation is fed to the scheduler with its reserved_until"""
+        reserve_inventory(test_order.id, [{'item_name': test_goods.name, 'quantity': 1}], 'cash', db_session)
+        assert await scheduler.store.next() is None
+
+        db_session.commit()
+        await asyncio.sleep(0)
+
+        expected = test_order.reserved_until.replace(tzinfo=timezone.utc).timestamp()
+        assert await scheduler.store.next() == pytest.approx(expected)
+
+    async def test_rollback_schedules_nothing(self, scheduler, db_session, test_order, test_goods):
+        """Test a rolled back reservation is never scheduled"""
+        reserve_inventory(test_order.id, [{'item_name': test_goods.name, 'quantity': 1}], 'cash', db_session)
+        db_session.rollback()
+        db_session.commit()
+        await asyncio.sleep(0)
+
+        assert await scheduler.store.next() is None
+
+    async def test_wakes_at_deadline(self, scheduler, cleanup, db_session):
+        """Test the expiry job runs once the deadline passes, not before"""
+        await scheduler.store.add({1: time.time() + 0.2})
+
+        await _run_for(scheduler, 0.05)
+        cleanup.assert_not_awaited()
+
+        await _run_for(scheduler, 0.3)
+        cleanup.assert_awaited_once()
+
+    async def test_earlier_deadline_wakes_sleeping_loop(self, scheduler, cleanup, db_session):
+        """Test scheduling a deadline earlier than the current sleep interrupts it"""
+        async def schedule_soon():
+            await scheduler.schedule({1: datetime.now(timezone.utc) + timedelta(milliseconds=50)})
+
+        await _run_for(scheduler, 0.3, before_wait=schedule_soon)
+
+        cleanup.assert_awaited_once()
+
+    async def test_idle_loop_runs_nothing(self, scheduler, cleanup, db_session, assert_statement_count):
+        """Test no queries and no expiry runs while nothing is scheduled (after the startup load)"""
+        task = asyncio.create_task(scheduler.run())
+        await asyncio.sleep(0.05)
+        try:
+            with assert_statement_count(0):
+                await asyncio.sleep(0.2)
+        finally:
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        cleanup.assert_not_awaited()
+
+    async def test_startup_load_releases_overdue(self, scheduler, cleanup, db_session, test_order):
+        """Test reservations that ran out while the bot was down are released at startup"""
+        test_order.order_status = 'reserved'
+        test_order.reserved_until = datetime.now(timezone.utc) - timedelta(minutes=5)
+        db_session.commit()
+
+        await _run_for(scheduler, 0.05)
+
+        cleanup.assert_awaited_once()
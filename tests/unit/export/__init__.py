@@ -0,0 +1 @@
+"""Export tests"""
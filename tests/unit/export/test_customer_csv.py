@@ -0,0 +1,134 @@
+"""
+Tests for the customer CSV export
+"""
+import csv
+import os
+import pytest
+from decimal import Decimal
+from unittest.mock import patch
+
+from bot.database.models.main import CustomerInfo
+from bot.export.customer_csv import CustomerCsvStore, CSV_HEADERS, sync_customer_to_csv
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / "customer_list.csv"
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_HEADERS)
+        writer.writeheader()
+        writer.writerow({header: '' for header in CSV_HEADERS} | {'Telegram ID': '42', 'Username': 'old_customer'})
+    return path
+
+
+@pytest.fixture
+def customer(db_session, test_user) -> CustomerInfo:
+    info = CustomerInfo(telegram_id=test_user.telegram_id, phone_number="+100", delivery_address="Street 1")
+    db_session.add(info)
+    db_session.commit()
+    return info
+
+
+def _rows(path) -> dict:
+    with open(path, newline='', encoding='utf-8') as f:
+        return {row['Telegram ID']: row for row in csv.DictReader(f)}
+
+
+@pytest.mark.unit
+@pytest.mark.database
+class TestCustomerCsvStore:
+    """Tests for queued, coalesced CSV writes"""
+
+    def test_changes_are_coalesced_per_customer(self, csv_path, customer, db_session, assert_statement_count):
+        store = CustomerCsvStore(csv_path)
+        store.queue(customer.telegram_id, "first")
+        customer.bonus_balance = Decimal("12.5")
+        db_session.commit()
+        store.queue(customer.telegram_id, "second")
+
+        assert store.pending == 1
+        with assert_statement_count(1):
+            assert store.flush() == 1
+
+        rows = _rows(csv_path)
+        assert rows['42']['Username'] == 'old_customer'
+        assert rows[str(customer.telegram_id)]['Username'] == 'second'
+        assert rows[str(customer.telegram_id)]['Client Bonus Balance'] == '12.50'
+        assert store.pending == 0
+        assert store.flush() == 0
+
+    def test_file_is_replaced_atomically(self, csv_path, customer):
+        store = CustomerCsvStore(csv_path)
+        store.queue(customer.telegram_id, "buyer")
+
+        with patch('bot.export.customer_csv.os.replace', wraps=os.replace) as replace:
+            store.flush()
+
+        temp_path, target = replace.call_args.args
+        assert target == csv_path
+        assert temp_path != csv_path
+        assert list(csv_path.parent.iterdir()) == [csv_path]
+
+    def test_changes_by_another_process_are_kept(self, csv_path, customer, db_session):
+        """Test rows written to the file elsewhere (CLI) are re-read before the next flush"""
+        store = CustomerCsvStore(csv_path)
+        store.queue(customer.telegram_id, "buyer")
+        store.flush()
+
+        rows = _rows(csv_path)
+        rows['42']['Client Bonus Balance'] = '5.00'
+        rows['77'] = {header: '' for header in CSV_HEADERS} | {'Telegram ID': '77', 'Username': 'cli_customer'}
+        with open(csv_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=CSV_HEADERS)
+            writer.writeheader()
+            writer.writerows(rows.values())
+
+        customer.bonus_balance = Decimal("3")
+        db_session.commit()
+        store.queue(customer.telegram_id, "buyer")
+        store.flush()
+
+        rows = _rows(csv_path)
+        assert rows['42']['Client Bonus Balance'] == '5.00'
+        assert rows['77']['Username'] == 'cli_customer'
+        assert rows[str(customer.telegram_id)]['Client Bonus Balance'] == '3.00'
+
+    def test_failed_flush_keeps_changes(self, csv_path, customer):
+        store = CustomerCsvStore(csv_path)
+        store.queue(customer.telegram_id, "buyer")
+
+        with patch.object(store, '_write', side_effect=OSError("disk full")):
+            with pytest.raises(OSError):
+                store.flush()
+
+        assert store.pending == 1
+        store.flush()
+        assert _rows(csv_path)[str(customer.telegram_id)]['Username'] == 'buyer'
+
+    def test_username_lookup(self, csv_path, customer):
+        store = CustomerCsvStore(csv_path)
+        assert store.username(42) == 'old_customer'
+        assert store.username(customer.telegram_id) is None
+
+        store.queue(customer.telegram_id, "buyer")
+        assert store.username(customer.telegram_id) == 'buyer'
+
+    def test_unknown_customer_is_skipped(self, csv_path, db_session):
+        store = CustomerCsvStore(csv_path)
+        store.queue(555, "ghost")
+
+        assert store.flush() == 0
+        assert '555' not in _rows(csv_path)
+
+    def test_sync_is_queued_while_writer_runs(self, csv_path, customer):
+        store = CustomerCsvStore(csv_path)
+        with patch('bot.export.customer_csv._store', store):
+            with patch('bot.export.customer_csv._task', object()):
+                sync_customer_to_csv(customer.telegram_id, "buyer")
+            assert store.pending == 1
+            assert str(customer.telegram_id) not in _rows(csv_path)
+
+            # Without a background writer (CLI) the change is written right away
+            sync_customer_to_csv(customer.telegram_id, "buyer")
+            assert store.pending == 0
+            assert str(customer.telegram_id) in _rows(csv_path)
@@ -2,6 +2,7 @@
 Tests for Bitcoin address management
 """
 import pytest
+from datetime import datetime
 from pathlib import Path
 from tempfile import NamedTemporaryFile
 from unittest.mock import patch, MagicMock
@@ -13,9 +14,20 @@ from bot.payments.bitcoin import (
     add_bitcoin_address,
     add_bitcoin_addresses_bulk,
     get_bitcoin_address_stats,
+    claim_bitcoin_address,
+    record_consumed_addresses,
+    compact_bitcoin_address_file,
+    is_own_write,
+    insert_bitcoin_addresses,
+    release_prefetched_addresses,
+    AddressPool,
+    PREFETCH_LEASE,
+    XpubAddressSource,
     BTC_ADDRESSES_FILE
 )
-from bot.database.models.main import BitcoinAddress
+from bot.database.models.main import BitcoinAddress, BitcoinAddressLease
+from bot.tasks.file_watcher import AddressFileImporter
+from tests.unit.payments.test_hd_wallet import BIP84_ZPUB
 
 
 @pytest.mark.unit
@@ -97,9 +109,9 @@ class TestBitcoinAddressRetrieval:
 class TestBitcoinAddressUsage:
     """Tests for marking Bitcoin addresses as used"""
 
-    @patch('bot.payments.bitcoin.remove_bitcoin_address_from_file')
+    @patch('bot.payments.bitcoin.record_consumed_addresses')
     @patch('bot.payments.bitcoin.log_bitcoin_address_assigned')
-    def test_mark_bitcoin_address_used(self, mock_log, mock_remove, db_session, test_bitcoin_address, test_user, test_order):
+    def test_mark_bitcoin_address_used(self, mock_log, mock_record, db_session, test_bitcoin_address, test_user, test_order):
         """Test marking an address as used"""
         success = mark_bitcoin_address_used(
             address=test_bitcoin_address.address,
@@ -118,11 +130,11 @@ class TestBitcoinAddressUsage:
         assert test_bitcoin_address.used_by == test_user.telegram_id
         assert test_bitcoin_address.order_id == test_order.id
 
-        mock_remove.assert_called_once_with(test_bitcoin_address.address)
+        mock_record.assert_called_once_with([test_bitcoin_address.address])
         mock_log.assert_called_once()
 
-    @patch('bot.payments.bitcoin.remove_bitcoin_address_from_file')
-    def test_mark_nonexistent_address_used(self, mock_remove, db_session, test_user, test_order):
+    @patch('bot.payments.bitcoin.record_consumed_addresses')
+    def test_mark_nonexistent_address_used(self, mock_record, db_session, test_user, test_order):
         """Test marking non-existent address as used"""
         success = mark_bitcoin_address_used(
             address="bc1qnonexistent",
@@ -135,6 +147,296 @@ class TestBitcoinAddressUsage:
         assert success == False
 
 
+@pytest.mark.unit
+@pytest.mark.bitcoin
+@pytest.mark.database
+@patch('bot.payments.bitcoin.log_bitcoin_address_assigned')
+@patch('bot.payments.bitcoin.record_consumed_addresses')
+class TestBitcoinAddressClaim:
+    """Tests for claiming addresses in the order transaction"""
+
+    def test_claim_bitcoin_address(self, mock_record, mock_log, db_session, test_bitcoin_address,
+                                   test_user, test_order):
+        """Test claiming marks the address used by the order"""
+        address = claim_bitcoin_address(db_session, test_user.telegram_id, "test_user", test_order.id,
+                                        order_code=test_order.order_code)
+        db_session.commit()
+
+        assert address == test_bitcoin_address.address
+        db_session.refresh(test_bitcoin_address)
+        assert test_bitcoin_address.is_used == True
+        assert test_bitcoin_address.used_by == test_user.telegram_id
+        assert test_bitcoin_address.order_id == test_order.id
+        mock_record.assert_called_once_with([address])
+        mock_log.assert_called_once()
+
+    def test_claim_bitcoin_address_none_available(self, mock_record, mock_log, db_session, test_user, test_order):
+        """Test claiming without free addresses returns None"""
+        assert claim_bitcoin_address(db_session, test_user.telegram_id, "test_user", test_order.id) is None
+        mock_record.assert_not_called()
+
+    def test_claim_from_prefetch_pool(self, mock_record, mock_log, db_session, test_user, test_order):
+        """Test pooled addresses are handed out and return to the pool on rollback"""
+        db_session.add_all(BitcoinAddress(address=f"bc1qpool{i:010d}") for i in range(3))
+        db_session.commit()
+
+        pool = AddressPool(2)
+        assert pool.refill() == 2
+        first = pool.peek()
+        assert db_session.query(BitcoinAddress).filter_by(is_used=False).count() == 1
+
+        with patch('bot.payments.bitcoin._pool', pool), \
+                patch('bot.payments.bitcoin.safe_create_task') as mock_refill:
+            address = claim_bitcoin_address(db_session, test_user.telegram_id, "test_user", test_order.id)
+            assert address == first
+            assert len(pool) == 1
+            mock_refill.assert_called_once()
+            mock_refill.call_args.args[0].close()
+
+            # Order transaction failed: the address goes back to the pool
+            db_session.rollback()
+            assert len(pool) == 2
+            assert pool.peek() == address
+            mock_record.assert_not_called()
+
+            # Committed claims stay with the order
+            address = claim_bitcoin_address(db_session, test_user.telegram_id, "test_user", test_order.id)
+            db_session.commit()
+            mock_refill.call_args.args[0].close()
+
+        btc_addr = db_session.query(BitcoinAddress).filter_by(address=address).one()
+        assert btc_addr.order_id == test_order.id
+        assert len(pool) == 1
+
+    def test_release_prefetched_addresses(self, mock_record, mock_log, db_session, test_user, test_order):
+        """Test pre-claimed addresses go back to the free stock, assigned ones do not"""
+        db_session.add_all(BitcoinAddress(address=f"bc1qfree{i:010d}") for i in range(3))
+        db_session.commit()
+
+        pool = AddressPool(3)
+        pool.refill()
+        with patch('bot.payments.bitcoin._pool', pool), patch('bot.payments.bitcoin.safe_create_task'):
+            address = claim_bitcoin_address(db_session, test_user.telegram_id, "test_user", test_order.id)
+            db_session.commit()
+
+        # Crash: the pool is gone without releasing its addresses, but its lease is still live
+        assert release_prefetched_addresses() == 0
+
+        # Nobody renewed the lease
+        db_session.query(BitcoinAddressLease).update({'leased_at': datetime.now() - PREFETCH_LEASE * 2})
+        db_session.commit()
+        assert release_prefetched_addresses() == 2
+
+        db_session.expire_all()
+        used = [row.address for row in db_session.query(BitcoinAddress).filter_by(is_used=True)]
+        assert used == [address]
+        assert db_session.query(BitcoinAddressLease).count() == 0
+
+    def test_other_instance_pool_is_kept(self, mock_record, mock_log, db_session, test_user, test_order):
+        """Test a starting instance does not free a live pool, and a lost lease is never handed out"""
+        db_session.add_all(BitcoinAddress(address=f"bc1qlive{i:010d}") for i in range(3))
+        db_session.commit()
+
+        pool = AddressPool(2)
+        pool.refill()
+        stolen = pool.peek()
+
+        # Another instance starts while this one is running
+        assert release_prefetched_addresses() == 0
+
+        # This instance stalls past its lease, the address is freed and taken by another order
+        db_session.query(BitcoinAddressLease).update({'leased_at': datetime.now() - PREFETCH_LEASE * 2})
+        db_session.commit()
+        assert release_prefetched_addresses() == 2
+        db_session.query(BitcoinAddress).filter_by(address=stolen).update({'is_used': True, 'used_by': test_user.telegram_id, 'order_id': test_order.id})
+        db_session.commit()
+
+        with patch('bot.payments.bitcoin._pool', pool), patch('bot.payments.bitcoin.safe_create_task'):
+            address = claim_bitcoin_address(db_session, test_user.telegram_id, "test_user", test_order.id)
+            db_session.commit()
+
+        assert address != stolen
+        db_session.expire_all()
+        assert db_session.get(BitcoinAddress, stolen).order_id == test_order.id
+        assert db_session.get(BitcoinAddress, address).order_id == test_order.id
+
+
+@pytest.mark.unit
+@pytest.mark.bitcoin
+@pytest.mark.database
+@patch('bot.payments.bitcoin.log_bitcoin_address_assigned')
+@patch('bot.payments.bitcoin.record_consumed_addresses')
+class TestXpubAddressSource:
+    """Tests for addresses derived from an extended public key"""
+
+    def test_claims_consecutive_receive_addresses(self, mock_record, mock_log, db_session, test_user, test_order):
+        """Test each claim derives the next address and assigns it to the order"""
+        source = XpubAddressSource(BIP84_ZPUB)
+        with patch('bot.payments.bitcoin._source', source):
+            assert get_available_bitcoin_address() == "bc1qcr8te4kr609gcawutmrza0j4xv80jy8z306fyu"
+
+            first = claim_bitcoin_address(db_session, test_user.telegram_id, "test_user", test_order.id)
+            second = claim_bitcoin_address(db_session, test_user.telegram_id, "test_user", test_order.id)
+            db_session.commit()
+
+            stats = get_bitcoin_address_stats()
+
+        assert first == "bc1qcr8te4kr609gcawutmrza0j4xv80jy8z306fyu"
+        assert second == "bc1qnjg0jd8228aq7egyzacy8cys3knf9xvrerkf9g"
+        btc_addr = db_session.query(BitcoinAddress).filter_by(address=first).one()
+        assert btc_addr.is_used == True
+        assert btc_addr.order_id == test_order.id
+        assert stats['source'] == "xpub"
+        assert stats['used'] == 2
+        # Derived addresses never go through the address file
+        mock_record.assert_not_called()
+
+    def test_rollback_returns_index(self, mock_record, mock_log, db_session, test_user, test_order):
+        """Test a rolled back order does not use up a derivation index"""
+        source = XpubAddressSource(BIP84_ZPUB)
+        with patch('bot.payments.bitcoin._source', source):
+            address = claim_bitcoin_address(db_session, test_user.telegram_id, "test_user", test_order.id)
+            db_session.rollback()
+
+            assert claim_bitcoin_address(db_session, test_user.telegram_id, "test_user", test_order.id) == address
+
+    def test_skips_known_addresses(self, mock_record, mock_log, db_session, test_user, test_order):
+        """Test an address already in the database is never handed out twice"""
+        db_session.add(BitcoinAddress(address="bc1qcr8te4kr609gcawutmrza0j4xv80jy8z306fyu"))
+        db_session.commit()
+
+        source = XpubAddressSource(BIP84_ZPUB)
+        with patch('bot.payments.bitcoin._source', source):
+            address = claim_bitcoin_address(db_session, test_user.telegram_id, "test_user", test_order.id)
+
+        assert address == "bc1qnjg0jd8228aq7egyzacy8cys3knf9xvrerkf9g"
+
+
+@pytest.mark.unit
+@pytest.mark.bitcoin
+class TestUsedAddressLedger:
+    """Tests for the used-address ledger and address file compaction"""
+
+    @pytest.fixture
+    def address_files(self, tmp_path):
+        addresses_file = tmp_path / "btc_addresses.txt"
+        ledger_file = tmp_path / "btc_addresses_used.txt"
+        addresses_file.write_text("# pool\nbc1qledger1\n\nbc1qledger2\nbc1qledger3\n")
+        with patch('bot.payments.bitcoin.BTC_ADDRESSES_FILE', addresses_file), \
+                patch('bot.payments.bitcoin.BTC_USED_LEDGER_FILE', ledger_file):
+            yield addresses_file, ledger_file
+
+    def test_record_appends_without_touching_address_file(self, address_files):
+        """Test assigned addresses go to the ledger only"""
+        addresses_file, ledger_file = address_files
+        before = addresses_file.read_text()
+
+        record_consumed_addresses(["bc1qledger1"])
+        record_consumed_addresses(["bc1qledger3"])
+
+        assert ledger_file.read_text() == "bc1qledger1\nbc1qledger3\n"
+        assert addresses_file.read_text() == before
+
+    def test_compact_bitcoin_address_file(self, address_files):
+        """Test compaction drops ledger addresses, keeps comments and empties the ledger"""
+        addresses_file, ledger_file = address_files
+        record_consumed_addresses(["bc1qledger1", "bc1qledger3"])
+
+        assert compact_bitcoin_address_file() == 2
+
+        assert addresses_file.read_text() == "# pool\n\nbc1qledger2\n"
+        assert ledger_file.read_text() == ""
+        assert compact_bitcoin_address_file() == 0
+
+    def test_own_writes_are_recognized(self, address_files):
+        """Test the watcher can tell compaction from a manual edit"""
+        addresses_file, _ = address_files
+        record_consumed_addresses(["bc1qledger2"])
+        compact_bitcoin_address_file()
+
+        assert is_own_write()
+
+        with open(addresses_file, 'a') as f:
+            f.write("bc1qmanual\n")
+
+        assert not is_own_write()
+
+
+@pytest.mark.unit
+@pytest.mark.bitcoin
+@pytest.mark.database
+class TestAddressImport:
+    """Tests for bulk and incremental address import"""
+
+    def test_insert_bitcoin_addresses_chunked(self, db_session, test_bitcoin_address):
+        """Test chunked INSERT IGNORE skips existing and repeated addresses"""
+        addresses = [f"bc1qchunk{i:010d}" for i in range(5)]
+        added = insert_bitcoin_addresses(addresses + [test_bitcoin_address.address, addresses[0]], chunk_size=2)
+
+        assert added == 5
+        assert db_session.query(BitcoinAddress).count() == 6
+
+    def test_importer_reads_only_appended_lines(self, db_session, test_bitcoin_address, tmp_path):
+        """Test the watcher imports appended addresses without re-reading the file"""
+        addresses_file = tmp_path / "btc_addresses.txt"
+        addresses_file.write_text(f"# pool\n{test_bitcoin_address.address}\nbc1qimport1\nbc1qimport2\n")
+        importer = AddressFileImporter(str(addresses_file))
+
+        assert importer.import_new() == 2
+        assert importer.offset == addresses_file.stat().st_size
+
+        with open(addresses_file, 'a') as f:
+            f.write("bc1qimport3\nbc1qimport1\n")
+
+        with patch('bot.tasks.file_watcher.insert_bitcoin_addresses',
+                   wraps=insert_bitcoin_addresses) as mock_insert:
+            assert importer.import_new() == 1
+            mock_insert.assert_called_once_with(["bc1qimport3"], importer.chunk_size)
+
+            # Nothing appended: no database work
+            assert importer.import_new() == 0
+            assert mock_insert.call_count == 1
+
+        assert db_session.query(BitcoinAddress).count() == 4
+
+    def test_importer_waits_for_complete_lines(self, db_session, tmp_path):
+        """Test a half-written last line is not imported until it is finished or the file stays unchanged"""
+        addresses_file = tmp_path / "btc_addresses.txt"
+        addresses_file.write_text("bc1qpartial1\nbc1qpart")
+        importer = AddressFileImporter(str(addresses_file))
+
+        assert importer.import_new() == 1
+        assert importer.offset == len("bc1qpartial1\n")
+
+        with open(addresses_file, 'a') as f:
+            f.write("ial2\nbc1qpartial3")
+        assert importer.import_new() == 1
+
+        # Nothing written since: the last line is complete after all
+        assert importer.import_new() == 1
+        assert importer.offset == addresses_file.stat().st_size
+
+        addresses = sorted(row.address for row in db_session.query(BitcoinAddress))
+        assert addresses == ["bc1qpartial1", "bc1qpartial2", "bc1qpartial3"]
+
+    def test_importer_rereads_replaced_file(self, db_session, tmp_path):
+        """Test a replaced (compacted) file is read from the start and deduplicated in memory"""
+        addresses_file = tmp_path / "btc_addresses.txt"
+        addresses_file.write_text("bc1qreplace1\nbc1qreplace2\n")
+        importer = AddressFileImporter(str(addresses_file))
+        importer.import_new()
+
+        replacement = tmp_path / "btc_addresses.txt.tmp"
+        replacement.write_text("bc1qreplace2\n")
+        replacement.replace(addresses_file)
+
+        with patch('bot.tasks.file_watcher.insert_bitcoin_addresses') as mock_insert:
+            assert importer.import_new() == 0
+            mock_insert.assert_not_called()
+
+        assert importer.offset == addresses_file.stat().st_size
+
+
 @pytest.mark.unit
 @pytest.mark.bitcoin
 @pytest.mark.database
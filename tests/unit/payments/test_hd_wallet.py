@@ -0,0 +1,75 @@
+"""
+Tests for BIP32 public derivation and address encoding
+"""
+import hashlib
+import os
+
+import pytest
+
+from bot.payments.hd_wallet import (
+    ExtendedPublicKey,
+    derive_receive_address,
+    HARDENED,
+    _ripemd160,
+)
+
+# BIP32 test vector 1, chain m/0H
+BIP32_XPUB = ("xpub68Gmy5EdvgibQVfPdqkBBCHxA5htiqg55crXYuXoQRKfDBFA1WEjWgP6LHhwBZeNK1VTsfTFUHCdrfp1bgwQ9xv5ski8"
+              "PX9rL2dZXvgGDnw")
+BIP32_CHILD_XPUB = ("xpub6ASuArnXKPbfEwhqN6e3mwBcDTgzisQN1wXN9BJcM47sSikHjJf3UFHKkNAWbWMiGj7Wf5uMash7SyYq527Hqck2"
+                    "AxYysAA7xmALppuCkwQ")
+
+# BIP84 test mnemonic ("abandon ... about"), account m/84'/0'/0'
+BIP84_ZPUB = ("zpub6rFR7y4Q2AijBEqTUquhVz398htDFrtymD9xYYfG1m4wAcvPhXNfE3EfH1r1ADqtfSdVCToUG868RvUUkgDKf31mGDtK"
+              "sAYz2oz2AGutZYs")
+
+
+@pytest.mark.unit
+@pytest.mark.bitcoin
+class TestExtendedPublicKey:
+    """Tests for extended public key parsing and derivation"""
+
+    def test_parse_and_serialize_roundtrip(self):
+        """Test a parsed key serializes back to the same string"""
+        assert ExtendedPublicKey.parse(BIP32_XPUB).serialize() == BIP32_XPUB
+
+    def test_child_derivation_bip32_vector(self):
+        """Test CKDpub against BIP32 test vector 1 (m/0H -> m/0H/1)"""
+        child = ExtendedPublicKey.parse(BIP32_XPUB).child(1)
+
+        assert child.serialize() == BIP32_CHILD_XPUB
+        assert child.key.hex() == "03501e454bf00751f24b1b489aa925215d66af2234e3891c3b21a52bedb3cd711c"
+        assert child.address() == "1JQheacLPdM5ySCkrZkV66G2ApAXe1mqLj"
+
+    def test_bip84_receive_addresses(self):
+        """Test native segwit receive addresses against the BIP84 test vectors"""
+        account = ExtendedPublicKey.parse(BIP84_ZPUB)
+
+        assert derive_receive_address(account, 0) == "bc1qcr8te4kr609gcawutmrza0j4xv80jy8z306fyu"
+        assert derive_receive_address(account, 1) == "bc1qnjg0jd8228aq7egyzacy8cys3knf9xvrerkf9g"
+
+    def test_hardened_child_rejected(self):
+        """Test hardened children cannot be derived from a public key"""
+        with pytest.raises(ValueError):
+            ExtendedPublicKey.parse(BIP32_XPUB).child(HARDENED)
+
+    def test_invalid_keys_rejected(self):
+        """Test bad checksums and non-public keys are rejected"""
+        with pytest.raises(ValueError):
+            ExtendedPublicKey.parse(BIP32_XPUB[:-1] + "x")
+
+        # BIP32 test vector 1 master private key
+        with pytest.raises(ValueError):
+            ExtendedPublicKey.parse("xprv9s21ZrQH143K3QTDL4LXw2F7HEK3wJUD2nW2nRk4stbPy6cq3jPPqjiChkVvvNKmPGJxWUtg6LnF5kejMRN"
+                                    "NU3TGtRBeJgk33yuGBxrMPHi")
+
+    def test_ripemd160_fallback(self):
+        """Test the pure Python RIPEMD-160 used when OpenSSL lacks it"""
+        assert _ripemd160(b"abc").hex() == "8eb208f7e05d987a9b044a8e98c6b087f15a0bfc"
+        for size in (0, 55, 56, 64, 200):
+            data = os.urandom(size)
+            try:
+                expected = hashlib.new("ripemd160", data).digest()
+            except ValueError:
+                pytest.skip("hashlib has no ripemd160")
+            assert _ripemd160(data) == expected
@@ -0,0 +1,226 @@
+"""
+Tests for on-chain Bitcoin payment detection
+"""
+import pytest
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest.mock import AsyncMock, patch
+
+from bot.database.models.main import BitcoinPayment, NotificationOutbox, Order
+from bot.payments.payment_watcher import (
+    AddressBalance,
+    BitcoindBackend,
+    ElectrumBackend,
+    FakePaymentBackend,
+    LATE_PAYMENT_WINDOW,
+    PaymentWatcher,
+    _open_orders,
+    classify_payment,
+    expected_sats,
+)
+
+ADDRESS = "bc1qcr8te4kr609gcawutmrza0j4xv80jy8z306fyu"
+
+
+@pytest.fixture
+def bitcoin_order(test_order, db_session) -> Order:
+    """The test order (199.98) waiting for a Bitcoin payment"""
+    test_order.payment_method = "bitcoin"
+    test_order.order_status = "reserved"
+    test_order.bitcoin_address = ADDRESS
+    db_session.commit()
+    return test_order
+
+
+@pytest.fixture
+def chain() -> FakePaymentBackend:
+    return FakePaymentBackend()
+
+
+def _reload(db_session, order_id: int):
+    db_session.expire_all()
+    return db_session.get(Order, order_id), db_session.get(BitcoinPayment, order_id)
+
+
+def _notifications(db_session) -> list[str]:
+    return [message.kind for message in db_session.query(NotificationOutbox).order_by(NotificationOutbox.id)]
+
+
+@pytest.mark.unit
+@pytest.mark.bitcoin
+class TestPaymentMatching:
+    """Tests for turning received amounts into payment states"""
+
+    def test_expected_sats_rounds_up(self):
+        assert expected_sats(Decimal("100"), Decimal("30000")) == 333334
+
+    def test_no_rate_skips_amount_check(self):
+        assert expected_sats(Decimal("100"), None) is None
+        assert classify_payment(AddressBalance(1, 0), None) == 'received'
+        assert classify_payment(AddressBalance(0, 1), None) == 'seen'
+
+    def test_classify(self):
+        assert classify_payment(AddressBalance(0, 0), 1000) is None
+        assert classify_payment(AddressBalance(0, 1000), 1000) == 'seen'
+        assert classify_payment(AddressBalance(500, 0), 1000) == 'underpaid'
+        assert classify_payment(AddressBalance(995, 0), 1000) == 'paid'
+        assert classify_payment(AddressBalance(0, 10), 1000, closed=True) == 'late'
+        assert classify_payment(AddressBalance(0, 0), 1000, closed=True) is None
+
+
+@pytest.mark.unit
+@pytest.mark.bitcoin
+@pytest.mark.database
+class TestPaymentWatcher:
+    """Tests for the detection cycle against the fake backend"""
+
+    async def test_unconfirmed_payment_is_reported_once(self, bitcoin_order, chain, db_session):
+        watcher = PaymentWatcher(chain, confirmations=2)
+        chain.pay(ADDRESS, 50_000)
+
+        assert await watcher.check() == 0
+        assert await watcher.check() == 0
+
+        order, payment = _reload(db_session, bitcoin_order.id)
+        assert order.order_status == 'reserved'
+        assert payment.status == 'seen'
+        assert payment.pending_sats == 50_000
+        assert _notifications(db_session) == ['payment_detected']
+
+    async def test_confirmed_payment_moves_order_forward(self, bitcoin_order, chain, db_session):
+        # 199.98 at 400000 per BTC is 49995 sats
+        watcher = PaymentWatcher(chain, confirmations=2, exchange_rate=Decimal("400000"))
+        chain.pay(ADDRESS, 50_000)
+        await watcher.check()
+
+        chain.mine(2)
+        assert await watcher.check() == 1
+
+        order, payment = _reload(db_session, bitcoin_order.id)
+        assert order.order_status == 'confirmed'
+        assert payment.status == 'paid'
+        assert payment.confirmed_sats == 50_000
+        assert _notifications(db_session) == ['payment_detected', 'payment_confirmed', 'admin_alert']
+
+        # No longer open: not asked about again
+        requests = chain.requests
+        await watcher.check()
+        assert chain.requests == requests
+
+    async def test_unchecked_payment_is_left_to_the_owner(self, bitcoin_order, chain, db_session):
+        # No exchange rate: even dust must not confirm the order
+        watcher = PaymentWatcher(chain)
+        chain.pay(ADDRESS, 1, confirmations=1)
+
+        assert await watcher.check() == 0
+        assert await watcher.check() == 0
+
+        order, payment = _reload(db_session, bitcoin_order.id)
+        assert order.order_status == 'reserved'
+        assert payment.status == 'received'
+        assert payment.confirmed_sats == 1
+        assert _notifications(db_session) == ['payment_received', 'admin_alert']
+
+    async def test_underpayment_is_not_accepted(self, bitcoin_order, chain, db_session):
+        # 199.98 at 20000 per BTC is 999900 sats
+        watcher = PaymentWatcher(chain, confirmations=1, exchange_rate=Decimal("20000"))
+        chain.pay(ADDRESS, 500_000, confirmations=1)
+
+        assert await watcher.check() == 0
+
+        order, payment = _reload(db_session, bitcoin_order.id)
+        assert order.order_status == 'reserved'
+        assert payment.status == 'underpaid'
+        assert _notifications(db_session) == ['payment_underpaid', 'admin_alert']
+
+        chain.pay(ADDRESS, 499_900, confirmations=1)
+        assert await watcher.check() == 1
+        order, _ = _reload(db_session, bitcoin_order.id)
+        assert order.order_status == 'confirmed'
+
+    async def test_payment_after_expiry_is_reported(self, bitcoin_order, chain, db_session):
+        watcher = PaymentWatcher(chain, confirmations=2)
+        chain.pay(ADDRESS, 50_000)
+        await watcher.check()
+
+        # Reservation expires while the payment waits for confirmations
+        bitcoin_order.order_status = 'expired'
+        db_session.commit()
+        chain.mine(2)
+
+        assert await watcher.check() == 0
+        assert await watcher.check() == 0
+
+        order, payment = _reload(db_session, bitcoin_order.id)
+        assert order.order_status == 'expired'
+        assert payment.status == 'late'
+        assert payment.confirmed_sats == 50_000
+        assert _notifications(db_session) == ['payment_detected', 'payment_late', 'admin_alert']
+
+    async def test_order_closed_during_check_is_not_confirmed(self, bitcoin_order, chain, db_session):
+        watcher = PaymentWatcher(chain)
+        chain.pay(ADDRESS, 50_000, confirmations=1)
+
+        def expire_first(orders):
+            bitcoin_order.order_status = 'cancelled'
+            db_session.commit()
+            return orders
+
+        with patch('bot.payments.payment_watcher._open_orders', side_effect=lambda: expire_first(_open_orders())):
+            assert await watcher.check() == 0
+
+        order, payment = _reload(db_session, bitcoin_order.id)
+        assert order.order_status == 'cancelled'
+        assert payment.status == 'late'
+
+    async def test_old_closed_orders_are_not_watched(self, bitcoin_order, chain, db_session):
+        bitcoin_order.order_status = 'cancelled'
+        bitcoin_order.created_at = datetime.now() - LATE_PAYMENT_WINDOW - timedelta(days=1)
+        db_session.commit()
+        chain.pay(ADDRESS, 50_000, confirmations=1)
+
+        assert await PaymentWatcher(chain).check() == 0
+        assert chain.requests == 0
+
+    async def test_one_backend_request_per_cycle(self, test_user, chain, db_session):
+        for index in range(5):
+            db_session.add(Order(
+                buyer_id=test_user.telegram_id, total_price=Decimal("10"), payment_method="bitcoin",
+                delivery_address="Street", phone_number="+1", order_status="reserved",
+                order_code=f"BTC00{index}", bitcoin_address=f"bc1qtest{index}",
+            ))
+            chain.pay(f"bc1qtest{index}", 1000, confirmations=1)
+        db_session.commit()
+
+        watcher = PaymentWatcher(chain, exchange_rate=Decimal("1000000"))
+        assert await watcher.check() == 5
+        assert chain.requests == 1
+
+
+@pytest.mark.unit
+@pytest.mark.bitcoin
+class TestJsonRpcBackends:
+    """Tests for reading balances from node replies"""
+
+    async def test_bitcoind_balances(self):
+        backend = BitcoindBackend("http://node")
+        replies = [
+            [{"address": "a", "amount": 0.001}],
+            [{"address": "a", "amount": 0.0015}, {"address": "b", "amount": 0.0002},
+             {"address": "other", "amount": 1}],
+        ]
+        with patch.object(backend, 'batch', new=AsyncMock(return_value=replies)) as batch:
+            balances = await backend.get_balances(["a", "b", "c"], 3)
+
+        assert batch.await_count == 1
+        assert batch.call_args.args[0][0] == ("listreceivedbyaddress", [3, False, True])
+        assert balances == {"a": AddressBalance(100_000, 50_000), "b": AddressBalance(0, 20_000)}
+
+    async def test_electrum_balances(self):
+        backend = ElectrumBackend("http://electrum")
+        replies = [{"confirmed": "0.001", "unconfirmed": "0"}, {"confirmed": "0", "unconfirmed": "0"}]
+        with patch.object(backend, 'batch', new=AsyncMock(return_value=replies)) as batch:
+            balances = await backend.get_balances(["a", "b"], 1)
+
+        assert batch.call_args.args[0] == [("getaddressbalance", ["a"]), ("getaddressbalance", ["b"])]
+        assert balances == {"a": AddressBalance(100_000, 0)}
@@ -0,0 +1,122 @@
+"""
+Tests for lazy pagination (offset and keyset modes)
+"""
+import json
+import pytest
+from datetime import datetime, timezone
+from functools import partial
+
+from bot.database.methods.lazy_queries import query_all_users, query_user_bought_items
+from bot.database.models.main import User, BoughtGoods
+from bot.utils.pagination import LazyPaginator
+
+
+@pytest.fixture
+def many_users(db_with_roles):
+    """Create 25 users"""
+    users = [
+        User(telegram_id=1000 + i, registration_date=datetime.now(timezone.utc))
+        for i in range(25)
+    ]
+    db_with_roles.add_all(users)
+    db_with_roles.commit()
+    return [user.telegram_id for user in users]
+
+
+class RecordingQuery:
+    """Query function stub that records the pagination arguments"""
+
+    def __init__(self, items):
+        self.items = items
+        self.calls = []
+
+    async def __call__(self, offset=0, limit=10, count_only=False, after=None):
+        if count_only:
+            return len(self.items)
+        self.calls.append({'offset': offset, 'after': after})
+        if after is not None:
+            return [item for item in self.items if item > after][:limit]
+        return self.items[offset:offset + limit]
+
+
+@pytest.mark.unit
+class TestLazyPaginator:
+    """Tests for LazyPaginator"""
+
+    async def test_offset_mode_without_cursor_key(self):
+        """Test paginator keeps offset queries when no cursor key is given"""
+        query = RecordingQuery(list(range(30)))
+        paginator = LazyPaginator(query, per_page=10)
+
+        await paginator.get_page(0)
+        page = await paginator.get_page(1)
+
+        assert page == list(range(10, 20))
+        assert query.calls[-1] == {'offset': 10, 'after': None}
+
+    async def test_keyset_mode_seeks_after_previous_page(self):
+        """Test keyset mode passes the last key of the previous page"""
+        query = RecordingQuery(list(range(30)))
+        paginator = LazyPaginator(query, per_page=10, cursor_key=lambda item: item)
+
+        await paginator.get_page(0)
+        page = await paginator.get_page(1)
+
+        assert page == list(range(10, 20))
+        assert query.calls[-1]['after'] == 9
+
+    async def test_cursors_survive_state_roundtrip(self):
+        """Test cursors are restored from (JSON-serialized) FSM state"""
+        query = RecordingQuery(list(range(30)))
+        paginator = LazyPaginator(query, per_page=10, cursor_key=lambda item: item)
+        await paginator.get_page(0)
+        await paginator.get_page(1)
+
+        state = json.loads(json.dumps(paginator.get_state()))
+        restored = LazyPaginator(query, per_page=10, state=state, cursor_key=lambda item: item)
+        page = await restored.get_page(2)
+
+        assert page == list(range(20, 30))
+        assert query.calls[-1]['after'] == 19
+
+    async def test_missing_cursor_falls_back_to_offset(self):
+        """Test a page without a known cursor is loaded by offset"""
+        query = RecordingQuery(list(range(30)))
+        paginator = LazyPaginator(query, per_page=10, cursor_key=lambda item: item)
+
+        page = await paginator.get_page(2)
+
+        assert page == list(range(20, 30))
+        assert query.calls[-1] == {'offset': 20, 'after': None}
+
+
+@pytest.mark.unit
+@pytest.mark.database
+class TestKeysetQueries:
+    """Tests for keyset pagination in lazy queries"""
+
+    async def test_users_keyset_matches_offset(self, many_users):
+        """Test seeking by telegram_id returns the same pages as offset"""
+        by_offset = await query_all_users(offset=10, limit=10)
+        by_keyset = await query_all_users(limit=10, after=many_users[9])
+
+        assert by_keyset == by_offset == many_users[10:20]
+
+    async def test_bought_items_keyset_descending(self, db_session, test_user):
+        """Test bought items seek backwards from the last seen id"""
+        for i in range(5):
+            db_session.add(BoughtGoods(
+                name=f"Item {i}", value=f"value_{i}", price=10, bought_datetime=datetime.now(timezone.utc),
+                unique_id=i + 1, buyer_id=test_user.telegram_id
+            ))
+        db_session.commit()
+
+        first_page = await query_user_bought_items(test_user.telegram_id, limit=2)
+        paginator = LazyPaginator(partial(query_user_bought_items, test_user.telegram_id), per_page=2,
+                                  cursor_key=lambda item: item.id)
+        await paginator.get_page(0)
+        second_page = await paginator.get_page(1)
+
+        assert [item.id for item in first_page] == sorted([item.id for item in first_page], reverse=True)
+        assert second_page[0].id < first_page[-1].id
+        assert await paginator.get_total_count() == 5